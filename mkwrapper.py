@@ -70,7 +70,8 @@ RESERVED_NAMES = ('free',)
 # dasec_c - how to handle void types in parameter list
 # dafgh_c - does function actually exist?  I found no C file ...
 # ucase_c - not needed for python
-# gfevnt_c, gffove_c, gfocce_c, gfudb_c, gfuds_c, uddc_c, uddf_c - how to support callbacks
+# gfevnt_c, gffove_c, gfocce_c - how to support callbacks
+# gfudb_c, gfuds_c, uddc_c, uddf_c - hand-written in pyspice_gf.c
 exclude_list = (
 
     ### N0065
@@ -522,6 +523,7 @@ def gen_wrapper(prototype, buffer):
         pass
 
     py_to_c_conversions = [];
+    array_conversions = []
     extra_inoutput_name_list = []
 
     for output in output_list:
@@ -560,7 +562,7 @@ def gen_wrapper(prototype, buffer):
         if output.type=='SpiceCell' and output.get_spice_fn and output.param_type==OUTPUT_TYPE:
             py_output_name = "py_%s" % output.name
             buffer.write("\n  PyObject * %s = NULL;" % py_output_name)
-            py_to_c_conversions.append("%s = %s(%s);" % (output.name, output.get_spice_fn, py_output_name))
+            py_to_c_conversions.append("PYSPICE_CHECK_RETURN_STATUS(%s = %s(%s));" % (output.name, output.get_spice_fn, py_output_name))
             extra_inoutput_name_list.append( py_output_name )
             extra_parse_tuple_string += output.py_string
 
@@ -585,7 +587,14 @@ def gen_wrapper(prototype, buffer):
             )
 
         else:
-            parse_tuple_string += input.py_string
+            # fixed-size numeric arrays are taken as one object, which may
+            # be a buffer or a (nested) sequence; see get_spice_fixed_array
+            fixed_array = is_fixed_array(input)
+
+            if fixed_array:
+                parse_tuple_string += 'O'
+            else:
+                parse_tuple_string += input.py_string
 
             if input.is_pointer:
                 pointer_string = " * "
@@ -608,12 +617,22 @@ def gen_wrapper(prototype, buffer):
             if input.get_spice_fn:
                 input_name = "py_%s" % input_name
                 buffer.write("\n  PyObject * %s = NULL;" % input_name)
-                py_to_c_conversions.append("%s = %s(%s);" % (input.name, input.get_spice_fn, input_name))
+                py_to_c_conversions.append("PYSPICE_CHECK_RETURN_STATUS(%s = %s(%s));" % \
+                    (input.name, input.get_spice_fn, input_name))
+
+            if fixed_array:
+                input_name = "py_%s" % input_name
+                buffer.write("\n  PyObject * %s = NULL;" % input_name)
+                array_conversions.append(
+                    "PYSPICE_CHECK_RETURN_STATUS(get_spice_fixed_array(%s, '%s', %s, %s));" % \
+                    (input_name, get_array_type_code(input), input.name,
+                     ', '.join([str(count) for count in (input.num_elements + [0, 0])[:3]])))
+                input_name_list.append(input_name)
 
             # if this is an array, put in the right amount of elements
             # into the ParseTuple parameter list (one per element).
             # Also, the list coming in can be 1D, 2D, or 3D.
-            if input.is_array:
+            elif input.is_array:
                 input_name_list += get_array_sizes(
                     input.num_elements, input_name)
             else:
@@ -654,6 +673,11 @@ def gen_wrapper(prototype, buffer):
              'PyArg_ParseTuple(args, "%s", %s));') % \
             (parse_tuple_string+extra_parse_tuple_string, input_list_string))
 
+    # fixed-size array inputs are read next; these can fail, so they come
+    # before any conversion that allocates memory
+    if array_conversions:
+        buffer.write('\n  %s\n' % '\n  '.join(array_conversions))
+
     # if there are any Python -> C conversions that need to occur, add them here.
     if py_to_c_conversions:
         buffer.write('\n  %s\n' % '\n  '.join(py_to_c_conversions))
@@ -706,15 +730,20 @@ def gen_wrapper(prototype, buffer):
 
     # debug(param_list_string)
 
-    # Call the C function
+    # Call the C function with the GIL released, holding the SPICE lock
+    buffer.write("\n  PYSPICE_BEGIN_CALL;")
+
     if prototype_obj.type != "void":
         buffer.write("\n  result = %s(%s);" % (funcnm, param_list_string))
     else:
         buffer.write("\n  %s(%s);" % (funcnm, param_list_string))
 
-    # run the macro to check to see if an exception was raised.  once the
-    # check is made, see if the failed boolean was set.  this is an indication
-    # that the function should free any allocated memory and return NULL.
+    buffer.write("\n  PYSPICE_END_CALL;")
+
+    # run the macro to check to see if an exception was raised; it also lets
+    # go of the SPICE lock.  once the check is made, see if the failed
+    # boolean was set.  this is an indication that the function should free
+    # any allocated memory and return NULL.
     buffer.write("\n\n  PYSPICE_CHECK_FAILED;\n")
 
     buffer.write('\n  if(failed) {')
@@ -742,7 +771,7 @@ def gen_wrapper(prototype, buffer):
                 if output.is_array==1 and output.py_string=='s': sfx='#'
                 else                                           : sfx=''
                 buffer.write(
-                    '\n  strcat(buildvalue_string, "%s%s");' % (output.py_string,sfx,)
+                    '\n  strcat(buildvalue_string, "%s%s");' % (get_buildvalue_code(output),sfx,)
                 )
 
         buffer.write('\n')
@@ -775,8 +804,13 @@ def gen_wrapper(prototype, buffer):
     else:
         buffer.write('\nPyDoc_STRVAR(%s_doc, %s);\n' % (python_function_name, doc))
 
+    # the stub that counts and times the calls while instrumentation is
+    # on, see pyspice_stats.c; its entry in pyspice_stats is at the same
+    # index as the function's in module_defs
+    buffer.write('\nPYSPICE_COUNTED(%s, %d)\n' % (python_function_name, len(module_defs)))
+
     # add this functions definition to the module_defs list
-    module_defs.append('{"%s", spice_%s, METH_VARARGS, %s_doc},' % \
+    module_defs.append('{"%s", spice_%s_counted, METH_VARARGS, %s_doc},' % \
                        (python_function_name, python_function_name, python_function_name))
 
     ### Callers only check for True or false; buffer argument is modified in place
@@ -804,6 +838,39 @@ def get_array_sizes(list, name):
 
     return t_list
 
+def is_fixed_array(param_obj):
+    """
+    Return True for a numeric array parameter whose dimensions are all
+    known, e.g. ConstSpiceDouble m[3][3], which can be read from a buffer
+    """
+    return bool(param_obj.is_array) and \
+        get_array_type_code(param_obj) is not None and \
+        len(param_obj.num_elements) <= 3 and \
+        all([isinstance(count, int) for count in param_obj.num_elements])
+
+def get_array_type_code(param_obj):
+    """
+    Return the get_spice_fixed_array type code for the elements of an array
+    parameter, or None if its elements are not numeric
+    """
+    if param_obj.type in ('ConstSpiceDouble', 'SpiceDouble'):
+        return 'd'
+    elif param_obj.type in ('ConstSpiceInt', 'SpiceInt'):
+        return 'i'
+
+    return None
+
+def get_buildvalue_code(param_obj):
+    """
+    Return the Py_BuildValue format code for an output.  Outputs converted
+    by a get_py_fn function are new references, so they are handed over
+    with 'N' rather than 'O'.
+    """
+    if param_obj.get_py_fn:
+        return 'N'
+
+    return param_obj.py_string
+
 def make_automatic_returnVal(buffer, output_list):
     """
     The outputs parameters and their dimensions are defined so this function
@@ -813,6 +880,13 @@ def make_automatic_returnVal(buffer, output_list):
     # put together the outputs
     t_list = []
 
+    # the same outputs for array output mode, where fixed-size numeric
+    # arrays are handed to get_py_fixed_array instead of being expanded,
+    # and the Py_BuildValue format to go with them
+    array_t_list = []
+    array_buildvalue_string = ''
+    has_fixed_arrays = False
+
     # Check_found is used to indicate whether a found variable was
     # passed along with other output variables.  check_found is set to
     # True if the found variable indicating that the additional
@@ -842,15 +916,30 @@ def make_automatic_returnVal(buffer, output_list):
             if output.is_array==1 and output.py_string=='s':
                 t_list.append(output.name)
                 t_list.append(str(output.num_elements[0]))
+                array_t_list += t_list[-2:]
+                array_buildvalue_string += 's#'
+            elif is_fixed_array(output):
+                t_list += get_array_sizes(output.num_elements, output.name)
+                array_t_list.append("get_py_fixed_array(%s, '%s', %s)" % \
+                    (output.name, get_array_type_code(output),
+                     ', '.join([str(count) for count in (output.num_elements + [0, 0])[:3]])))
+                array_buildvalue_string += 'N'
+                has_fixed_arrays = True
             else:
                 t_list += get_array_sizes(output.num_elements, output.name)
+                array_t_list += get_array_sizes(output.num_elements, output.name)
+                array_buildvalue_string += output.py_string
         elif(output.get_py_fn):
             if(output.type=='SpiceCell'):
                 t_list.append('%s(%s)' % (output.get_py_fn, output.name))
             else:
                 t_list.append('%s(&%s)' % (output.get_py_fn, output.name))
+            array_t_list.append(t_list[-1])
+            array_buildvalue_string += get_buildvalue_code(output)
         else:
             t_list.append(output.name)
+            array_t_list.append(output.name)
+            array_buildvalue_string += output.py_string
 
     output_list_string = ", ".join(t_list)
 
@@ -861,10 +950,19 @@ def make_automatic_returnVal(buffer, output_list):
         else:
             buffer.write('\n  ')
 
+        if has_fixed_arrays:
+            buffer.write(
+                'if(pyspice_array_factory) {\n    ' +
+                'returnVal = Py_BuildValue("%s", %s);\n  } else {\n    ' % \
+                (array_buildvalue_string, ', '.join(array_t_list)))
+
         buffer.write(
             'returnVal = Py_BuildValue(buildvalue_string, %s);' % \
             (output_list_string))
 
+        if has_fixed_arrays:
+            buffer.write('\n  }')
+
         for output in output_list:
             if output.allocate_memory:
                 buffer.write('\n  PyMem_Free(%s);' % output.name)
@@ -892,6 +990,20 @@ def make_manual_returnVal(buffer, output_list):
         output = output_list[count]
 
         if output.allocate_memory:
+            # in array output mode the values go to get_py_fixed_array
+            # as a one dimensional array of the returned length
+            type_code = get_array_type_code(output)
+
+            if type_code:
+                buffer.write('\n  if(pyspice_array_factory) {')
+                buffer.write(
+                    "\n    t = get_py_fixed_array(%s, '%s', %s, 0, 0);" % \
+                    (output.name, type_code, output_list[0].name)
+                )
+                buffer.write('\n    if(!t) {\n      Py_DECREF(returnVal);')
+                buffer.write('\n      return NULL;\n    }')
+                buffer.write('\n  } else {')
+
             buffer.write('\n  t = PyTuple_New(%s);' % output_list[0].name)
             buffer.write(
                 '\n  for(i = 0; i < %s; ++ i) {' % output_list[0].name
@@ -901,6 +1013,10 @@ def make_manual_returnVal(buffer, output_list):
                 (output.py_string, output.name)
             )
             buffer.write('\n  }')
+
+            if type_code:
+                buffer.write('\n  }')
+
             buffer.write('\n  PyTuple_SET_ITEM(returnVal, %d, t);' % count)
         else:
             buffer.write(
@@ -1277,9 +1393,12 @@ def main(cspice_toolkit):
 
 
     sys.stderr.write("prototypes used: %d, total: %d\n" % (used_prototypes, total_prototypes))
-    # put together the methods array
+    # put together the methods array, and the instrumentation entries
+    # of the functions in it
+    module_stats = StringIO()
     for module_def in module_defs:
         module_methods.write("\n  %s" % module_def)
+        module_stats.write('\n  {"%s"},' % module_def.split('"')[1])
 
     # print out necessary boilerplate stuff
     return """\
@@ -1297,8 +1416,14 @@ BLAH.  SEE FILE "LICENSE" FOR MORE INFO.
 PyObject *SpiceException;
 
 %s
+PySpiceStats pyspice_stats[] = {
+%s
+  {NULL},
+};
+
 PyMethodDef methods[] = {
 %s
+  PYSPICE_EXTRA_METHODS
   {NULL, NULL},
 };
 
@@ -1308,6 +1433,10 @@ void init_spice(PyObject *self)
 
   m = Py_InitModule("_spice", methods);
 
+  if(!init_spice_lock()) {
+    return;
+  }
+
   /* Don't allow an exception to stop execution */
   erract_c("SET", 0, "RETURN");
   //errdev_c("SET", 0, "NULL");
@@ -1317,7 +1446,9 @@ void init_spice(PyObject *self)
   Py_INCREF(SpiceException);
 
   PyModule_AddObject(m, "SpiceException", SpiceException);
-}""" % (buffer.getvalue(), module_methods.getvalue())
+
+  init_spice_types(m);
+}""" % (buffer.getvalue(), module_stats.getvalue(), module_methods.getvalue())
 
 if __name__ == '__main__':
     if sys.argv:
@@ -11,33 +11,62 @@
  */
 #include "pyspice.h"
 
-void make_buildvalue_tuple(char *buf, const char *type, const int count)
+/* The SPICE lock, see PYSPICE_BEGIN_CALL, and the thread holding it */
+static PyThread_type_lock spice_lock = NULL;
+static long spice_lock_owner = 0;
+static int spice_lock_depth = 0;
+
+int init_spice_lock(void)
 {
-    int i = 0;
+    PyEval_InitThreads();
 
-    strcat(buf, "(");
+    if(!spice_lock && !(spice_lock = PyThread_allocate_lock())) {
+        PyErr_SetString(PyExc_RuntimeError, "can't allocate the SPICE lock");
+        return 0;
+    }
 
-    for(i = 0; i < count; ++ i) {
-        strcat(buf, type);
+    return 1;
+}
+
+/**
+ * Take the SPICE lock, or take it once more if this thread holds it.
+ * Only the holder sets spice_lock_owner to its own ident, so no other
+ * thread can mistake the lock for its own.  Called without the GIL.
+ */
+void pyspice_acquire_lock(void)
+{
+    long ident = PyThread_get_thread_ident();
+
+    if(spice_lock_depth && spice_lock_owner == ident) {
+        ++ spice_lock_depth;
+        return;
     }
 
-    strcat(buf, ")");
+    PyThread_acquire_lock(spice_lock, WAIT_LOCK);
+
+    spice_lock_owner = ident;
+    spice_lock_depth = 1;
 }
 
-static PyObject * get_double_list(double *array, const int count)
+void pyspice_release_lock(void)
+{
+    if(!-- spice_lock_depth) {
+        spice_lock_owner = 0;
+        PyThread_release_lock(spice_lock);
+    }
+}
+
+void make_buildvalue_tuple(char *buf, const char *type, const int count)
 {
     int i = 0;
-    /* set the center */
-    PyObject *list = PyList_New(count);
 
-    if(list) {
-        for(i = 0; i < count; ++ i) {
-            PyObject *d = PyFloat_FromDouble(array[i]);
-            PyList_SET_ITEM(list, i, d);
-        }
+    strcat(buf, "(");
+
+    for(i = 0; i < count; ++ i) {
+        strcat(buf, type);
     }
 
-    return list;
+    strcat(buf, ")");
 }
 
 PyObject * get_py_boolean(SpiceBoolean* spicebool)
@@ -46,407 +75,577 @@ PyObject * get_py_boolean(SpiceBoolean* spicebool)
 }
 
 /**
- * Create a Python Ellipse object from a SpiceEllipse object
+ * Return the type code of a single-item, native-order struct format
+ * string such as "d", "@d" or "<d" (on little-endian hosts), or 0.
  */
-PyObject * get_py_ellipse(SpiceEllipse *spice_obj)
+static char get_native_format_code(const char *format)
 {
-    PyObject *py_obj = NULL;
-    PyObject *module = PyImport_ImportModule("spice");
+    int little_endian = 1;
 
-    if(module) {
-        PyObject *py_cls = PyObject_GetAttrString(module, "Ellipse");
+    if(!format) {
+        return 'B';
+    }
 
-        if(py_cls) {
-            py_obj = PyObject_CallObject(py_cls, NULL);
+    little_endian = *(char *)&little_endian;
 
-            if(py_obj) {
-                PyObject_SetAttrString(py_obj, "center", get_double_list(spice_obj->center, 3));
-                PyObject_SetAttrString(py_obj, "semi_major", get_double_list(spice_obj->semiMajor, 3));
-                PyObject_SetAttrString(py_obj, "semi_minor", get_double_list(spice_obj->semiMinor, 3));
-            }
-        }
+    if(*format == '@' || *format == '=' ||
+       (*format == '<' && little_endian) || (*format == '>' && !little_endian)) {
+        ++ format;
     }
 
-    return py_obj;
+    if(format[0] && !format[1]) {
+        return format[0];
+    }
+
+    return 0;
 }
 
-#define XCLEAN(PYO) if ( PYO ) { Py_DECREF(PYO); PYO = NULL; }
-
-#define ALLCLEAN \
-  XCLEAN( pymodule ) \
-  XCLEAN( py_cls ) \
-  XCLEAN( pytooplArgs ) \
-  XCLEAN( pydiktKw ) \
-  XCLEAN( pybase ) \
-  XCLEAN( pydata ) \
-  XCLEAN( pyitem ) \
-  if ( cell && dofree) PyMem_Free( cell )
-
-#define RTNNULL \
-  { XCLEAN( py_obj ) \
-    ALLCLEAN; \
-    return NULL; \
-  }
-
-PyObject * get_py_cell_freeopt(SpiceCell *cell, int dofree)
+/**
+ * Get a contiguous array of doubles from a Python object.  Objects that
+ * export a C-contiguous float64 buffer (NumPy arrays, memoryviews) are
+ * read in place; any other sequence of numbers, or a single number, is
+ * copied.  Returns 0 with a Python exception set on failure; on success
+ * the array must be given back with release_spice_array.
+ */
+int get_spice_double_array(PyObject *py_obj, PySpiceArray *array)
 {
-    PyObject *py_obj = NULL;
-    PyObject *pymodule = NULL;
-    PyObject *py_cls = NULL;
-    PyObject *pytooplArgs = NULL;
-    PyObject *pydiktKw = NULL;
-    PyObject *pybase = NULL;
-    PyObject *pydata = NULL;
-    PyObject *pyitem = NULL;
-
     Py_ssize_t i;
-    int itemLen;
-
-    switch (cell->dtype) {
-    case SPICE_CHR: itemLen = cell->length * sizeof(SpiceChar); break;
-    case SPICE_INT: itemLen = sizeof(SpiceInt); break;
-    case SPICE_DP: itemLen = sizeof(SpiceDouble); break;
-
-    case SPICE_TIME: //itemLen = sizeof(SpiceDouble); break;
-    case SPICE_BOOL: //itemLen = sizeof(SpiceBoolean); break;
-    default: RTNNULL
-    }
-
-    if ( !(pymodule = PyImport_ImportModule("spice")) ) RTNNULL
-    if ( !(py_cls = PyObject_GetAttrString(pymodule, "Cell")) ) RTNNULL
-    if ( !(pytooplArgs = Py_BuildValue( "(ii)", (int)cell->dtype, (int)cell->size)) ) RTNNULL
-    if ( !(pydiktKw = Py_BuildValue( "{s:i}", "lenArg", cell->length)) ) RTNNULL
-    if ( !(py_obj = PyObject_Call(py_cls, pytooplArgs, pydiktKw)) ) RTNNULL
-    if ( !(pybase = PyObject_GetAttrString( py_obj, "base")) ) RTNNULL
-    if ( !(pydata = PyObject_GetAttrString( py_obj, "data")) ) RTNNULL
-
-#   define XI(ATTR) PyObject_SetAttrString(py_obj, #ATTR, PyInt_FromLong((long)cell->ATTR));
-#   define XB(ATTR) PyObject_SetAttrString(py_obj, #ATTR, get_py_boolean(&cell->ATTR) );
-    XI(dtype)
-    XI(length)
-    XI(size)
-    XI(card)
-    XB(isSet)
-    XB(adjust)
-    XB(init)
-    //printf( " after:" );
-    //printf( "Cell.card=%ld",   PyInt_AsLong( PyObject_GetAttrString(py_obj, "card") ) );
-    //printf( "; Cell.init=%s",   PyObject_GetAttrString(py_obj,"init")==Py_True?" True":"False" );
-    //printf( "; cell->card=%ld",   (long)cell->card);
-    //printf( "; cell->init=%s",   cell->init?"True ":"False");
-    //printf( "; err=%s\n",   PyErr_Occurred() ? "Yes" : "No " );
-#   undef XI
-#   undef XB
-
-    switch( cell->dtype ) {
-
-    case SPICE_CHR:
-
-      for ( i=0; i<(SPICE_CELL_CTRLSZ+cell->size); ++i ) {
-        if ( !(pyitem = PyString_FromStringAndSize( cell->base+(i*itemLen), (Py_ssize_t)cell->length)) ) RTNNULL
-        if ( -1==PyList_SetItem( i<SPICE_CELL_CTRLSZ ? pybase : pydata, i - (i<SPICE_CELL_CTRLSZ?0:SPICE_CELL_CTRLSZ), pyitem ) ) RTNNULL
-        pyitem = NULL;
-      }
-      break;
-
-    case SPICE_INT:
-
-      for ( i=0; i<(SPICE_CELL_CTRLSZ+cell->size); ++i ) {
-        if ( !(pyitem = PyInt_FromLong( (long) ((SpiceInt*)cell->base)[i] ) ) ) RTNNULL
-        if ( -1==PyList_SetItem( i<SPICE_CELL_CTRLSZ ? pybase : pydata, i - (i<SPICE_CELL_CTRLSZ?0:SPICE_CELL_CTRLSZ), pyitem ) ) RTNNULL
-        pyitem = NULL;
-      }
-      break;
-
-    case SPICE_DP:
-
-      for ( i=0; i<(SPICE_CELL_CTRLSZ+cell->size); ++i ) {
-        if ( !(pyitem = PyFloat_FromDouble( (double) ((SpiceDouble*)cell->base)[i] )) ) RTNNULL
-        if ( -1==PyList_SetItem( i<SPICE_CELL_CTRLSZ ? pybase : pydata, i - (i<SPICE_CELL_CTRLSZ?0:SPICE_CELL_CTRLSZ), pyitem ) ) RTNNULL
-        pyitem = NULL;
-      }
-
-      break;
-
-    case SPICE_TIME:
-    case SPICE_BOOL:
-    default:
-      RTNNULL
-    }
-
-    ALLCLEAN;
+    double *data;
+    PyObject *seq = NULL;
+
+    memset(array, 0, sizeof(PySpiceArray));
+
+    if(PyObject_CheckBuffer(py_obj)) {
+        if(PyObject_GetBuffer(py_obj, &array->view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == 0) {
+            if(array->view.itemsize == sizeof(double) &&
+               get_native_format_code(array->view.format) == 'd') {
+                array->data = array->view.buf;
+                array->count = array->view.len / sizeof(double);
+                return 1;
+            }
 
-    return py_obj;
-}
-#undef XCLEAN
-#undef RTNNULL
-#undef ALLCLEAN
+            PyBuffer_Release(&array->view);
+            memset(&array->view, 0, sizeof(Py_buffer));
+        }
+
+        PyErr_Clear();
+    }
+
+    /* a single number is an array of one */
+    if(PyNumber_Check(py_obj) && !PySequence_Check(py_obj)) {
+        array->data = PyMem_Malloc(sizeof(double));
 
-PyObject * get_py_cell(SpiceCell *cell) {
-  return get_py_cell_freeopt( cell, 1 );
+        if(!array->data) {
+            PyErr_NoMemory();
+            return 0;
+        }
+
+        array->count = 1;
+        *(double *)array->data = PyFloat_AsDouble(py_obj);
+
+        if(PyErr_Occurred()) {
+            release_spice_array(array);
+            return 0;
+        }
+
+        return 1;
+    }
+
+    seq = PySequence_Fast(py_obj, "expected a number, a sequence of numbers or a float64 buffer");
+
+    if(!seq) {
+        return 0;
+    }
+
+    array->count = PySequence_Fast_GET_SIZE(seq);
+    array->data = data = PyMem_Malloc(sizeof(double) * (array->count ? array->count : 1));
+
+    if(!data) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return 0;
+    }
+
+    for(i = 0; i < array->count; ++ i) {
+        data[i] = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+
+        if(data[i] == -1.0 && PyErr_Occurred()) {
+            Py_DECREF(seq);
+            release_spice_array(array);
+            return 0;
+        }
+    }
+
+    Py_DECREF(seq);
+
+    return 1;
 }
 
-PyObject * get_py_ekattdsc(SpiceEKAttDsc *spice_obj)
+/**
+ * Give back an array filled in by one of the get_spice_*_array functions
+ */
+void release_spice_array(PySpiceArray *array)
 {
-    PyObject *py_obj = NULL;
-    return py_obj;
+    if(array->view.obj) {
+        PyBuffer_Release(&array->view);
+    } else if(array->data) {
+        PyMem_Free(array->data);
+    }
+
+    memset(array, 0, sizeof(PySpiceArray));
 }
 
-PyObject * get_py_eksegsum(SpiceEKSegSum *spice_obj)
+/**
+ * Create a bytearray big enough for count doubles and point data at its
+ * storage.  The spice package wraps these without copying (see
+ * spice/arrays.py).
+ */
+PyObject * get_py_double_buffer(Py_ssize_t count, double **data)
 {
-    PyObject *py_obj = NULL;
+    PyObject *py_obj = PyByteArray_FromStringAndSize(NULL, sizeof(double) * count);
+
+    if(py_obj) {
+        *data = (double *)PyByteArray_AS_STRING(py_obj);
+    }
+
     return py_obj;
 }
 
-PyObject * get_py_plane(SpicePlane *spice_obj)
-{
-    PyObject *py_obj = NULL;
-    PyObject *module = PyImport_ImportModule("spice");
+PyObject *pyspice_array_factory = NULL;
 
-    if(module) {
-        PyObject *py_cls = PyObject_GetAttrString(module, "Plane");
+/* what the factory is given as the type of doubles and of SpiceInts */
+static PyObject *array_double_type = NULL;
+static PyObject *array_int_type = NULL;
 
-        if(py_cls) {
-            py_obj = PyObject_CallObject(py_cls, NULL);
+/* the shapes made so far, handed to the factory again and again */
+#define ARRAY_SHAPES 16
 
-            if(py_obj) {
-                PyObject_SetAttrString(py_obj, "constant", PyFloat_FromDouble(spice_obj->constant));
-                PyObject_SetAttrString(py_obj, "normal", get_double_list(spice_obj->normal, 3));
-            }
+static struct {
+    Py_ssize_t dims[3];
+    PyObject *shape;
+} array_shapes[ARRAY_SHAPES];
+
+/**
+ * Return a borrowed reference to the shape tuple of the non-zero
+ * dimensions, made once for each shape
+ */
+static PyObject * get_array_shape(Py_ssize_t dim0, Py_ssize_t dim1, Py_ssize_t dim2)
+{
+    static PyObject *uncached = NULL;
+    int i;
+
+    for(i = 0; i < ARRAY_SHAPES && array_shapes[i].shape; ++ i) {
+        if(array_shapes[i].dims[0] == dim0 && array_shapes[i].dims[1] == dim1 &&
+           array_shapes[i].dims[2] == dim2) {
+            return array_shapes[i].shape;
         }
     }
 
-    return py_obj;
-}
+    if(i == ARRAY_SHAPES) {
+        /* the cache is full: keep the last shape made until the next one */
+        Py_CLEAR(uncached);
+        i = -1;
+    }
 
+    if(dim2) {
+        uncached = Py_BuildValue("(nnn)", dim0, dim1, dim2);
+    } else if(dim1) {
+        uncached = Py_BuildValue("(nn)", dim0, dim1);
+    } else {
+        uncached = Py_BuildValue("(n)", dim0);
+    }
 
-static inline int gat( PyObject* pyo, char* attr, SpiceCellDataType* ptr) {
-PyObject* pySubo;
-    pySubo = PyObject_GetAttrString( pyo, attr );
-    if ( !pySubo ) return 0;
-    Py_DECREF( pySubo );
-    if ( PyInt_Check(pySubo) ) { *ptr = (SpiceCellDataType) PyInt_AsLong(pySubo); return 1; }
-    if ( PyLong_Check(pySubo) ) { *ptr = (SpiceCellDataType) PyLong_AsDouble(pySubo); return 1; }
-    return 0;
-}
+    if(uncached && i >= 0) {
+        array_shapes[i].dims[0] = dim0;
+        array_shapes[i].dims[1] = dim1;
+        array_shapes[i].dims[2] = dim2;
+        array_shapes[i].shape = uncached;
+        uncached = NULL;
+        return array_shapes[i].shape;
+    }
 
-static inline int gai( PyObject* pyo, char* attr, SpiceInt* ptr) {
-PyObject* pySubo;
-    pySubo = PyObject_GetAttrString( pyo, attr );
-    if ( !pySubo ) return 0;
-    Py_DECREF( pySubo );
-    if ( PyFloat_Check(pySubo) ) { *ptr = (SpiceDouble) PyFloat_AsDouble(pySubo); return 1; }
-    if ( PyInt_Check(pySubo) ) { *ptr = (SpiceDouble) PyInt_AsLong(pySubo); return 1; }
-    if ( PyLong_Check(pySubo) ) { *ptr = (SpiceDouble) PyLong_AsDouble(pySubo); return 1; }
-    return 0;
+    return uncached;
 }
 
-static inline int gad( PyObject* pyo, char* attr, SpiceInt* ptr) {
-PyObject* pySubo;
-    pySubo = PyObject_GetAttrString( pyo, attr );
-    if ( !pySubo ) return 0;
-    Py_DECREF( pySubo );
-    if ( PyInt_Check(pySubo) ) { *ptr = (SpiceInt) PyInt_AsLong(pySubo); return 1; }
-    if ( PyLong_Check(pySubo) ) { *ptr = (SpiceInt) PyLong_AsLong(pySubo); return 1; }
-    if ( PyFloat_Check(pySubo) ) { *ptr = (SpiceInt) PyFloat_AsDouble(pySubo); return 1; }
-    return 0;
-}
+/**
+ * Build an array output in array output mode.  The values are copied
+ * into a bytearray, and pyspice_array_factory is called with the shape
+ * (a tuple of the non-zero dimensions), the type given to
+ * _set_array_factory for doubles or for SpiceInts, and the bytearray;
+ * numpy.ndarray takes these as they are, with NumPy dtypes as types.
+ */
+PyObject * get_py_fixed_array(void *data, char type,
+                              Py_ssize_t dim0, Py_ssize_t dim1, Py_ssize_t dim2)
+{
+    PyObject *py_buf = NULL, *py_shape = NULL, *result = NULL;
+    Py_ssize_t itemsize = type == 'd' ? sizeof(SpiceDouble) : sizeof(SpiceInt);
 
-static inline int gab( PyObject* pyo, char* attr, SpiceBoolean* ptr) {
-PyObject* pySubo;
-    pySubo = PyObject_GetAttrString( pyo, attr );
-    if ( !pySubo ) return 0;
-    Py_DECREF( pySubo );
-    if ( pySubo == Py_True ) { *ptr = SPICETRUE; return 1; }
-    if ( pySubo == Py_False ) { *ptr = SPICEFALSE; return 1; }
-    return 0;
+    if(!pyspice_array_factory) {
+        PyErr_SetString(PyExc_RuntimeError, "array output mode is off");
+        return NULL;
+    }
+
+    if(!(py_shape = get_array_shape(dim0, dim1, dim2))) {
+        return NULL;
+    }
+
+    py_buf = PyByteArray_FromStringAndSize(data, itemsize * dim0 * (dim1 ? dim1 : 1) * (dim2 ? dim2 : 1));
+
+    if(!py_buf) {
+        return NULL;
+    }
+
+    result = PyObject_CallFunctionObjArgs(pyspice_array_factory, py_shape,
+                                          type == 'd' ? array_double_type : array_int_type,
+                                          py_buf, NULL);
+    Py_DECREF(py_buf);
+
+    return result;
 }
 
-#define GAANY(FUNC,ATTR) if ( ! FUNC(py_obj, #ATTR, &placeholder.ATTR) ) return NULL
-#define GAT(ATTR) GAANY(gat,ATTR)
-#define GAI(ATTR) GAANY(gai,ATTR)
-#define GAD(ATTR) GAANY(gad,ATTR)
-#define GAB(ATTR) GAANY(gab,ATTR)
+char set_array_factory_doc[] = "_set_array_factory(factory, types=None)\n\n"
+    "Return array outputs as factory(shape, type, buffer) instead of\n"
+    "tuples, or as tuples again when factory is None.  types maps the\n"
+    "array module type codes 'd', 'i' and 'l' to what the factory is\n"
+    "given as the type, the codes themselves by default; see\n"
+    "spice.arrays.set_array_output.";
 
-SpiceCell * get_spice_cell(PyObject *py_obj)
+/**
+ * Return a new reference to the value of types for typecode, or to the
+ * typecode as a string if types is None
+ */
+static PyObject * get_array_type(PyObject *types, const char *typecode)
 {
-    SpiceCell *spice_obj = NULL;
+    PyObject *type = NULL;
 
-    SpiceCell placeholder;
-    int baseLen;
-    int dataLen;
-    int itemLen;
-    int minLen;
-    int i;
-    int j;
-    Py_ssize_t pysz;
-    void* pVoid;
-    char* pChr;
-    SpiceDouble* psDbl;
-    SpiceInt* psInt;
-    SpiceChar* psChr;
-    PyObject* pyobj;
+    if(types == Py_None) {
+        return PyString_FromString(typecode);
+    }
+
+    if((type = PyMapping_GetItemString(types, (char *)typecode))) {
+        return type;
+    }
 
-    PyObject* pyBase = PyObject_GetAttrString( py_obj, "base");
-    PyObject* pyData = PyObject_GetAttrString( py_obj, "data");
+    return NULL;
+}
 
-#   define ANYCLEANUP(F) F(pyBase); F(pyData); if (spice_obj) PyMem_Free(spice_obj)
-#   define XCLEANUP ANYCLEANUP(Py_XDECREF)
-#   define CLEANUP ANYCLEANUP(Py_DECREF)
-#   define RTNNULL { XCLEANUP; return NULL; }
+PyObject * spice_set_array_factory(PyObject *self, PyObject *args)
+{
+    PyObject *factory = NULL, *types = Py_None, *double_type = NULL, *int_type = NULL;
 
-    if ( !pyBase || !pyData) RTNNULL
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O|O", &factory, &types));
 
-    if ( (baseLen=PyObject_Length(pyBase)) != SPICE_CELL_CTRLSZ) RTNNULL
+    if(factory != Py_None && !PyCallable_Check(factory)) {
+        PyErr_SetString(PyExc_TypeError, "factory must be callable or None");
+        return NULL;
+    }
 
-    GAI(size);
+    if(factory != Py_None) {
+        double_type = get_array_type(types, "d");
+        int_type = get_array_type(types, sizeof(SpiceInt) == sizeof(long) ? "l" : "i");
 
-    if ( (dataLen=PyObject_Length(pyData)) != placeholder.size) RTNNULL
+        if(!double_type || !int_type) {
+            Py_XDECREF(double_type);
+            Py_XDECREF(int_type);
+            return NULL;
+        }
 
-    GAT(dtype); GAI(length); GAI(card);
-    GAB(isSet); GAB(adjust); GAB(init);
+        Py_INCREF(factory);
+    }
 
-    switch (placeholder.dtype) {
-    case SPICE_CHR: itemLen = placeholder.length * sizeof(SpiceChar); break;
-    case SPICE_INT: itemLen = sizeof(SpiceInt); break;
-    case SPICE_DP: itemLen = sizeof(SpiceDouble); break;
+    Py_CLEAR(pyspice_array_factory);
+    Py_CLEAR(array_double_type);
+    Py_CLEAR(array_int_type);
 
-    case SPICE_TIME: //itemLen = sizeof(SpiceDouble); break;
-    case SPICE_BOOL: //itemLen = sizeof(SpiceBoolean); break;
-    default: RTNNULL
+    if(factory != Py_None) {
+        pyspice_array_factory = factory;
+        array_double_type = double_type;
+        array_int_type = int_type;
     }
-    
-    spice_obj = (SpiceCell*) PyMem_Malloc( sizeof( SpiceCell ) + ((SPICE_CELL_CTRLSZ + placeholder.size) * itemLen) );
 
-    placeholder.base = (void*) (spice_obj+1);
-    placeholder.data = placeholder.base + (SPICE_CELL_CTRLSZ * itemLen);
+    Py_INCREF(Py_None);
+    return Py_None;
+}
 
-    memset( placeholder.base, 0, (SPICE_CELL_CTRLSZ+placeholder.size)*itemLen );
+char get_array_factory_doc[] = "_get_array_factory() -> factory or None";
 
-#   define GETPYBASEORDATA \
-    if ( i<SPICE_CELL_CTRLSZ ) pyobj = PyList_GetItem( pyBase, i); \
-    else                       pyobj = PyList_GetItem( pyData, i-SPICE_CELL_CTRLSZ); \
-    if ( !pyobj ) RTNNULL
+PyObject * spice_get_array_factory(PyObject *self, PyObject *unused)
+{
+    PyObject *factory = pyspice_array_factory ? pyspice_array_factory : Py_None;
 
-    switch (placeholder.dtype) {
+    Py_INCREF(factory);
+    return factory;
+}
 
-    case SPICE_CHR:
-      for ( (pVoid=placeholder.base),i=0; i<(SPICE_CELL_CTRLSZ+placeholder.size); (pVoid+=itemLen),++i ) {
-        GETPYBASEORDATA
-        if ( -1==PyString_AsStringAndSize( pyobj, &pChr, &pysz) ) RTNNULL
-        psChr = pVoid;
-        minLen = ((int)pysz) < itemLen ? (int)pysz : itemLen;
-        for (j=0; j<minLen; ++j) *(psChr++) = (SpiceChar) *(pChr++);
-      }
-      break;
+/* the longest device name CSPICE takes, FILEN in the toolkit, and its null */
+#define ERROR_DEVICE_LEN 256
 
-    case SPICE_INT:
-      for ( (pVoid=placeholder.base),i=0; i<(SPICE_CELL_CTRLSZ+placeholder.size); (pVoid+=itemLen),++i ) {
-        GETPYBASEORDATA
-        psInt = pVoid;
-        if ( -1==(*psInt=(SpiceInt)PyInt_AsLong( pyobj )) ) if ( PyErr_Occurred() ) RTNNULL
-      }
-      break;
+char set_error_device_doc[] = "_set_error_device(device)\n\n"
+    "Send the CSPICE error reports to device, a file name, 'SCREEN' or\n"
+    "'NULL'; see spice.misc.set_error_device.";
 
-    case SPICE_DP:
-      for ( (pVoid=placeholder.base),i=0; i<(SPICE_CELL_CTRLSZ+placeholder.size); (pVoid+=itemLen),++i ) {
-        GETPYBASEORDATA
-        psDbl = pVoid;
-        if ( -1.0==(*psDbl=(SpiceDouble)PyInt_AsLong( pyobj )) ) if ( PyErr_Occurred() ) RTNNULL
-      }
-      break;
+PyObject * spice_set_error_device(PyObject *self, PyObject *args)
+{
+    char *device = NULL;
+    char failed = 0;
 
-    case SPICE_TIME:  // TBD
-    case SPICE_BOOL:
-    default: RTNNULL
-    }
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "s", &device));
+
+    PYSPICE_BEGIN_CALL;
+    errdev_c("SET", 0, device);
+    PYSPICE_END_CALL;
+
+    PYSPICE_CHECK_FAILED;
 
-    *spice_obj = placeholder;
+    if(failed) {
+        return NULL;
+    }
 
-    return spice_obj;
+    Py_INCREF(Py_None);
+    return Py_None;
 }
-#undef RTNNULL
-#undef ANYCLEANUP
-#undef XCLEANUP
-#undef CLEANUP
 
-SpiceEKAttDsc * get_spice_ekattdsc(PyObject *py_obj)
+char get_error_device_doc[] = "_get_error_device() -> device";
+
+PyObject * spice_get_error_device(PyObject *self, PyObject *unused)
 {
-    SpiceEKAttDsc *spice_obj = NULL;
-    return spice_obj;
+    char device[ERROR_DEVICE_LEN];
+    char failed = 0;
+
+    PYSPICE_BEGIN_CALL;
+    errdev_c("GET", ERROR_DEVICE_LEN, device);
+    PYSPICE_END_CALL;
+
+    PYSPICE_CHECK_FAILED;
+
+    if(failed) {
+        return NULL;
+    }
+
+    return PyString_FromString(device);
 }
 
-SpiceEKSegSum * get_spice_eksegsum(PyObject *py_obj)
+/**
+ * Fill a fixed-size array from a (nested) sequence, one element at a
+ * time.  This is what PyArg_ParseTuple did with formats like "(ddd)".
+ */
+static int get_fixed_sequence(PyObject *py_obj, char type, char **data,
+                              const Py_ssize_t *dims, int ndim)
 {
-    SpiceEKSegSum *spice_obj = NULL;
-    return spice_obj;
+    Py_ssize_t i;
+    PyObject *seq = NULL, *item = NULL;
+    int status = 1;
+
+    if(!(seq = PySequence_Fast(py_obj, "expected a sequence of numbers or a numeric buffer"))) {
+        return 0;
+    }
+
+    if(PySequence_Fast_GET_SIZE(seq) != dims[0]) {
+        PyErr_Format(PyExc_TypeError, "must be sequence of length %zd, not %zd",
+                     dims[0], PySequence_Fast_GET_SIZE(seq));
+        Py_DECREF(seq);
+        return 0;
+    }
+
+    for(i = 0; i < dims[0] && status; ++ i) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+
+        if(ndim > 1) {
+            status = get_fixed_sequence(item, type, data, dims + 1, ndim - 1);
+        } else if(type == 'd') {
+            *(SpiceDouble *)*data = PyFloat_AsDouble(item);
+            *data += sizeof(SpiceDouble);
+            status = !PyErr_Occurred();
+        } else {
+            *(SpiceInt *)*data = (SpiceInt)PyInt_AsLong(item);
+            *data += sizeof(SpiceInt);
+            status = !PyErr_Occurred();
+        }
+    }
+
+    Py_DECREF(seq);
+
+    return status;
 }
 
-SpicePlane * get_spice_plane(PyObject *py_obj)
+/**
+ * Fill a fixed-size SpiceDouble (type 'd') or SpiceInt (type 'i') array
+ * of up to three dimensions; unused dimensions are 0.  A C-contiguous
+ * buffer of the right type and shape, such as a NumPy array, is copied
+ * in directly; anything else is read as a nested sequence.  Returns 0
+ * with a Python exception set on failure.
+ */
+int get_spice_fixed_array(PyObject *py_obj, char type, void *data,
+                          Py_ssize_t dim0, Py_ssize_t dim1, Py_ssize_t dim2)
 {
-    SpicePlane *spice_obj = PyMem_Malloc(sizeof(SpicePlane));
+    Py_ssize_t dims[3];
+    Py_ssize_t itemsize = type == 'd' ? sizeof(SpiceDouble) : sizeof(SpiceInt);
+    Py_buffer view;
+    char code, *next = data;
+    int i, ndim, match;
+
+    dims[0] = dim0;
+    dims[1] = dim1;
+    dims[2] = dim2;
+
+    for(ndim = 0; ndim < 3 && dims[ndim]; ++ ndim);
+
+    if(PyObject_CheckBuffer(py_obj) && !PyString_Check(py_obj)) {
+        if(PyObject_GetBuffer(py_obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == 0) {
+            code = get_native_format_code(view.format);
+            match = view.itemsize == itemsize && view.ndim == ndim &&
+                (type == 'd' ? code == 'd' : (code == 'i' || code == 'l' || code == 'q'));
+
+            for(i = 0; i < ndim && match; ++ i) {
+                match = view.shape[i] == dims[i];
+            }
 
-    PyObject *l = NULL, *f = NULL;
+            if(match) {
+                memcpy(data, view.buf, view.len);
+            }
 
-    /* set the constant variable in the spice_obj */
-    f = PyObject_GetAttrString(py_obj, "constant");
-    spice_obj->constant = PyFloat_AsDouble(f);
+            PyBuffer_Release(&view);
 
-    /* now set each element in the normal array */
-    l = PyObject_GetAttrString(py_obj, "normal");
+            if(match) {
+                return 1;
+            }
+        }
 
-    f = PyList_GetItem(l, 0);
-    spice_obj->normal[0] = PyFloat_AsDouble(f);
+        PyErr_Clear();
+    }
 
-    f = PyList_GetItem(l, 1);
-    spice_obj->normal[1] = PyFloat_AsDouble(f);
+    return get_fixed_sequence(py_obj, type, &next, dims, ndim);
+}
 
-    f = PyList_GetItem(l, 2);
-    spice_obj->normal[2] = PyFloat_AsDouble(f);
+/**
+ * Return the item width of a fixed-width bytes format such as "10s" or
+ * "s", or 0 for any other format.
+ */
+static Py_ssize_t get_string_format_width(const char *format)
+{
+    Py_ssize_t width = 0;
 
-    return spice_obj;
+    if(!format) {
+        return 0;
+    }
+
+    if(*format == '@' || *format == '=' || *format == '<' || *format == '>' || *format == '!') {
+        ++ format;
+    }
+
+    if(*format == 's' && !format[1]) {
+        return 1;
+    }
+
+    while(*format >= '0' && *format <= '9') {
+        width = width * 10 + (*format ++ - '0');
+    }
+
+    if(*format == 's' && !format[1]) {
+        return width;
+    }
+
+    return 0;
 }
 
-SpiceEllipse * get_spice_ellipse(PyObject *ellipse)
+/**
+ * Get an array of strings from a Python object: a single str, a
+ * one-dimensional fixed-width bytes buffer (read in place) or any
+ * sequence of str.  Returns 0 with a Python exception set on failure; on
+ * success the array must be given back with release_spice_string_array.
+ */
+int get_spice_string_array(PyObject *py_obj, PySpiceStringArray *array)
 {
-    char failed = 0, *sections[3] = {"center", "semi_major", "semi_minor"};
-    int i, j;
+    memset(array, 0, sizeof(PySpiceStringArray));
 
-    SpiceEllipse *spice_ellipse = PyMem_Malloc(sizeof(SpiceEllipse));
+    if(PyString_Check(py_obj) || PyUnicode_Check(py_obj)) {
+        array->seq = PyTuple_Pack(1, py_obj);
+        array->count = 1;
+        return array->seq != NULL;
+    }
 
-    double *ellipse_sections[3] = {spice_ellipse->center, spice_ellipse->semiMajor, spice_ellipse->semiMinor};
+    if(PyObject_CheckBuffer(py_obj)) {
+        if(PyObject_GetBuffer(py_obj, &array->view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == 0) {
+            array->width = get_string_format_width(array->view.format);
 
-    for(i = 0; i < 3; ++ i) {
-        PyObject *section = PyObject_GetAttrString(ellipse, sections[i]);
+            if(array->width > 0 && array->view.ndim <= 1 && array->view.itemsize == array->width) {
+                array->count = array->view.len / array->width;
+                array->scratch = PyMem_Malloc(array->width + 1);
+
+                if(!array->scratch) {
+                    release_spice_string_array(array);
+                    PyErr_NoMemory();
+                    return 0;
+                }
 
-        if(section) {
-            for(j = 0; j < 3; ++ j) {
-                ellipse_sections[i][j] = PyFloat_AS_DOUBLE(PyList_GET_ITEM(section, j));
+                array->scratch[array->width] = '\0';
+
+                return 1;
             }
-        } else {
-            failed = 1;
-            break;
+
+            PyBuffer_Release(&array->view);
+            memset(&array->view, 0, sizeof(Py_buffer));
+            array->width = 0;
         }
+
+        PyErr_Clear();
     }
 
-    if(failed) {
-        PyMem_Free(spice_ellipse);
-        spice_ellipse = NULL;
+    array->seq = PySequence_Fast(py_obj, "expected a string, a sequence of strings or a fixed-width bytes array");
+
+    if(!array->seq) {
+        return 0;
     }
 
-    return spice_ellipse;
+    array->count = PySequence_Fast_GET_SIZE(array->seq);
+
+    return 1;
+}
+
+/**
+ * Return item i of a string array as a NUL terminated string, or NULL
+ * with a Python exception set.  Fixed-width items share one scratch
+ * buffer, so the result is only good until the next call.
+ */
+char * get_spice_string_item(PySpiceStringArray *array, Py_ssize_t i)
+{
+    if(array->seq) {
+        return PyString_AsString(PySequence_Fast_GET_ITEM(array->seq, i));
+    }
+
+    memcpy(array->scratch, (char *)array->view.buf + i * array->width, array->width);
+
+    return array->scratch;
+}
+
+void release_spice_string_array(PySpiceStringArray *array)
+{
+    if(array->view.obj) {
+        PyBuffer_Release(&array->view);
+    }
+
+    Py_XDECREF(array->seq);
+
+    if(array->scratch) {
+        PyMem_Free(array->scratch);
+    }
+
+    memset(array, 0, sizeof(PySpiceStringArray));
 }
 
 PyObject * spice_berto(PyObject *self, PyObject *args)
 {
     PyObject *py_ellipse = NULL;
+    SpiceEllipse *py_spice_ellipse = NULL;
 
     PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O", &py_ellipse));
+    PYSPICE_CHECK_RETURN_STATUS(py_spice_ellipse = get_spice_ellipse(py_ellipse));
 
-    SpiceEllipse *spice_ellipse = get_spice_ellipse(py_ellipse);
+    /* work on a copy, the pointer is into the Python object */
+    SpiceEllipse spice_ellipse = *py_spice_ellipse;
 
     char *sections[3] = {"center", "semi_major", "semi_minor"};
-    double *ellipse_sections[3] = {spice_ellipse->center, spice_ellipse->semiMajor, spice_ellipse->semiMinor};
+    double *ellipse_sections[3] = {spice_ellipse.center, spice_ellipse.semiMajor, spice_ellipse.semiMinor};
     int i = 0, j = 0;
 
     for(i = 0; i < 3; ++ i) {
@@ -455,21 +654,17 @@ PyObject * spice_berto(PyObject *self, PyObject *args)
         }
     }
 
-    spice_ellipse->center[0] = 1;
-    spice_ellipse->center[1] = 2;
-    spice_ellipse->center[2] = 3;
-    spice_ellipse->semiMajor[0] = 4;
-    spice_ellipse->semiMajor[1] = 5;
-    spice_ellipse->semiMajor[2] = 6;
-    spice_ellipse->semiMinor[0] = 7;
-    spice_ellipse->semiMinor[1] = 8;
-    spice_ellipse->semiMinor[2] = 9;
-
-    py_ellipse = get_py_ellipse(spice_ellipse);
-
-    PyMem_Free(spice_ellipse);
-
-    return py_ellipse;
+    spice_ellipse.center[0] = 1;
+    spice_ellipse.center[1] = 2;
+    spice_ellipse.center[2] = 3;
+    spice_ellipse.semiMajor[0] = 4;
+    spice_ellipse.semiMajor[1] = 5;
+    spice_ellipse.semiMajor[2] = 6;
+    spice_ellipse.semiMinor[0] = 7;
+    spice_ellipse.semiMinor[1] = 8;
+    spice_ellipse.semiMinor[2] = 9;
+
+    return get_py_ellipse(&spice_ellipse);
 }
 
 PyObject * spice_test(PyObject *self, PyObject *args)
@@ -478,11 +673,7 @@ PyObject * spice_test(PyObject *self, PyObject *args)
     SpicePlane *plane = NULL;
 
     PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O", &py_obj));
+    PYSPICE_CHECK_RETURN_STATUS(plane = get_spice_plane(py_obj));
 
-    plane = get_spice_plane(py_obj);
-
-    PyObject *py_obj2 = get_py_plane(plane);
-    PyMem_Free(plane);
-
-    return py_obj2;
+    return get_py_plane(plane);
 }
@@ -8,6 +8,7 @@
  * Released under the BSD license, see LICENSE for details
  */
 #include <Python.h>
+#include <pythread.h>
 #include <SpiceUsr.h>
 
 #include <stdio.h>
@@ -17,11 +18,14 @@
 
 extern PyObject *SpiceException;
 
+/* Callable that builds array outputs, or NULL to return them as tuples */
+extern PyObject *pyspice_array_factory;
+
 #define STRING_LEN 255
 #define SPICE_DETAIL_LEN 1840
 
 #define PYSPICE_CHECK_RETURN_STATUS(status) {                           \
-    if(!status) {                                                       \
+    if(!(status)) {                                                     \
       return NULL;                                                      \
     }                                                                   \
   }
@@ -38,6 +42,30 @@ getmsg_c("short", SPICE_MESSAGE_LEN, spice_msg);                        \
 PyMem_Free(spice_msg);                                                  \
 */
 
+/**
+ * CSPICE isn't thread safe, so every call into it is made holding the
+ * SPICE lock.  The GIL is released meanwhile, so other threads keep
+ * running Python code during long calls:
+ *
+ *   PYSPICE_BEGIN_CALL;
+ *   utc2et_c(utcstr, &et);
+ *   PYSPICE_END_CALL;
+ *
+ *   PYSPICE_CHECK_FAILED;
+ *
+ * PYSPICE_END_CALL takes the GIL back but keeps the lock, which
+ * PYSPICE_CHECK_FAILED lets go once it has read and reset the error
+ * state, so no other thread's calls come between a call and its check.
+ * The thread holding the lock may take it again, as it does when a GF
+ * callback calls a wrapper.  Nothing waits for the lock holding the GIL.
+ */
+#define PYSPICE_BEGIN_CALL Py_BEGIN_ALLOW_THREADS pyspice_acquire_lock(); \
+  if(pyspice_instrumented) pyspice_enter_section();
+
+#define PYSPICE_END_CALL                                                \
+  if(pyspice_section_depth) pyspice_leave_section();                    \
+  Py_END_ALLOW_THREADS
+
 #define PYSPICE_CHECK_FAILED {                                          \
     /* variables for exception handling */                              \
     char *spice_detail = NULL;                                          \
@@ -56,8 +84,176 @@ PyMem_Free(spice_msg);                                                  \
                                                                         \
       failed = 1;                                                       \
     }                                                                   \
+                                                                        \
+    pyspice_release_lock();                                             \
+  }
+
+int init_spice_lock(void);
+void pyspice_acquire_lock(void);
+void pyspice_release_lock(void);
+
+#if defined(_MSC_VER)
+#define PYSPICE_THREAD_LOCAL __declspec(thread)
+#else
+#define PYSPICE_THREAD_LOCAL __thread
+#endif
+
+/**
+ * Instrumentation, see pyspice_stats.c.  mkwrapper puts a stub made by
+ * PYSPICE_COUNTED in the method table in front of each wrapper, which
+ * counts and times the calls in the wrapper's entry of pyspice_stats, or
+ * hands them to the tracer, as pyspice_instrumented says, and only tests
+ * it otherwise.  PYSPICE_BEGIN_CALL and PYSPICE_END_CALL time the CSPICE
+ * calls in between, so the time they take can be told from the
+ * marshalling.
+ */
+typedef struct {
+    const char *name;
+    unsigned long calls;
+    unsigned long errors;
+    double seconds;         /* in the wrapper, all told */
+    double max_seconds;
+    double spice_seconds;   /* in CSPICE */
+} PySpiceStats;
+
+/* One entry per generated wrapper, ending with a NULL name */
+extern PySpiceStats pyspice_stats[];
+
+/* pyspice_instrumented flags */
+#define PYSPICE_COUNTING 1
+#define PYSPICE_TRACING 2
+
+extern int pyspice_instrumented;
+extern PYSPICE_THREAD_LOCAL int pyspice_section_depth;
+
+void pyspice_enter_section(void);
+void pyspice_leave_section(void);
+PyObject * pyspice_counted_call(PySpiceStats *stats, PyCFunction function,
+                                PyObject *self, PyObject *args);
+
+#define PYSPICE_COUNTED(name, index)                                    \
+  static PyObject * spice_##name##_counted(PyObject *self, PyObject *args) \
+  {                                                                     \
+    if(!pyspice_instrumented) {                                         \
+      return spice_##name(self, args);                                  \
+    }                                                                   \
+                                                                        \
+    return pyspice_counted_call(&pyspice_stats[index], spice_##name, self, args); \
   }
 
+/**
+ * A contiguous run of numbers read from a Python object.  When the object
+ * exports a suitable buffer, data points straight into it and view holds
+ * the buffer; otherwise data is a PyMem_Malloc'd copy and view.obj is NULL.
+ */
+typedef struct {
+    Py_buffer view;
+    void *data;
+    Py_ssize_t count;
+} PySpiceArray;
+
+/**
+ * An array of strings read from a Python object: either a fixed-width
+ * bytes buffer (such as a NumPy "S" array), read through view, or any
+ * sequence of str, held in seq.  scratch holds a NUL terminated copy of
+ * the current fixed-width item.
+ */
+typedef struct {
+    Py_buffer view;
+    PyObject *seq;
+    Py_ssize_t count;
+    Py_ssize_t width;
+    char *scratch;
+} PySpiceStringArray;
+
+/* Hand-written functions added to the generated method table */
+#define PYSPICE_EXTRA_METHODS                                           \
+  {"_spkezr_batch", spice_spkezr_batch_counted, METH_VARARGS, spkezr_batch_doc}, \
+  {"_spkpos_batch", spice_spkpos_batch_counted, METH_VARARGS, spkpos_batch_doc}, \
+  {"_str2et_batch", spice_str2et_batch_counted, METH_VARARGS, str2et_batch_doc}, \
+  {"_utc2et_batch", spice_utc2et_batch_counted, METH_VARARGS, utc2et_batch_doc}, \
+  {"_et2utc_batch", spice_et2utc_batch_counted, METH_VARARGS, et2utc_batch_doc}, \
+  {"_timout_batch", spice_timout_batch_counted, METH_VARARGS, timout_batch_doc}, \
+  {"_pxform_batch", spice_pxform_batch_counted, METH_VARARGS, pxform_batch_doc}, \
+  {"_sxform_batch", spice_sxform_batch_counted, METH_VARARGS, sxform_batch_doc}, \
+  {"_set_array_factory", spice_set_array_factory, METH_VARARGS, set_array_factory_doc}, \
+  {"_get_array_factory", spice_get_array_factory, METH_NOARGS, get_array_factory_doc}, \
+  {"_set_error_device", spice_set_error_device, METH_VARARGS, set_error_device_doc}, \
+  {"_get_error_device", spice_get_error_device, METH_NOARGS, get_error_device_doc}, \
+  {"_wncombine", spice_wncombine_counted, METH_VARARGS, wncombine_doc}, \
+  {"_wnreduce", spice_wnreduce_counted, METH_VARARGS, wnreduce_doc}, \
+  {"_wnadjust", spice_wnadjust_counted, METH_VARARGS, wnadjust_doc}, \
+  {"_wncontains", spice_wncontains_counted, METH_VARARGS, wncontains_doc}, \
+  {"_gfuds", spice_gfuds, METH_VARARGS, gfuds_doc}, \
+  {"_gfudb", spice_gfudb, METH_VARARGS, gfudb_doc}, \
+  {"_uddf", spice_uddf, METH_VARARGS, uddf_doc}, \
+  {"_uddc", spice_uddc, METH_VARARGS, uddc_doc}, \
+  {"_set_instrumentation", spice_set_instrumentation, METH_VARARGS, set_instrumentation_doc}, \
+  {"_get_instrumentation", spice_get_instrumentation, METH_NOARGS, get_instrumentation_doc}, \
+  {"_set_tracer", spice_set_tracer, METH_VARARGS, set_tracer_doc}, \
+  {"_get_tracer", spice_get_tracer, METH_NOARGS, get_tracer_doc}, \
+  {"_stats", spice_stats, METH_NOARGS, stats_doc}, \
+  {"_reset_stats", spice_reset_stats, METH_NOARGS, reset_stats_doc},
+
+/* Python types embedding the CSPICE structures, see pyspice_types.c */
+typedef struct {
+    PyObject_HEAD
+    SpiceEllipse ellipse;
+} PySpiceEllipse;
+
+typedef struct {
+    PyObject_HEAD
+    SpicePlane plane;
+} PySpicePlane;
+
+/* Ellipse.center, Plane.normal, ... */
+typedef struct {
+    PyObject_HEAD
+    PyObject *owner;
+    double *data;           /* three doubles inside the owner */
+} PySpiceVectorView;
+
+typedef struct {
+    PyObject_HEAD
+    SpiceEKAttDsc attdsc;
+} PySpiceEkAttDsc;
+
+typedef struct {
+    PyObject_HEAD
+    SpiceEKSegSum segsum;
+} PySpiceEkSegSum;
+
+/* A SpiceCell and the storage behind it, see pyspice_cell.c */
+typedef struct {
+    PyObject_HEAD
+    SpiceCell cell;
+    void *storage;          /* control area followed by the data */
+    Py_ssize_t capacity;    /* number of data items the storage holds */
+    Py_ssize_t itemsize;
+    Py_ssize_t shape;       /* buffer interface shape and format */
+    char format[24];
+} PySpiceCell;
+
+/* Cell.base and Cell.data */
+typedef struct {
+    PyObject_HEAD
+    PySpiceCell *owner;
+    int data;
+} PySpiceCellView;
+
+extern PyTypeObject PySpiceCell_Type;
+extern PyTypeObject PySpiceCellView_Type;
+
+int init_spice_cell_type(PyObject *module);
+
+extern PyTypeObject PySpiceEllipse_Type;
+extern PyTypeObject PySpicePlane_Type;
+extern PyTypeObject PySpiceVectorView_Type;
+extern PyTypeObject PySpiceEkAttDsc_Type;
+extern PyTypeObject PySpiceEkSegSum_Type;
+
+int init_spice_types(PyObject *module);
+
 /* Functions defined in the implementation file */
 PyObject * get_py_boolean(SpiceBoolean* spicebool);
 PyObject * get_py_ellipse(SpiceEllipse *spice_obj);
@@ -69,7 +265,95 @@ SpiceCell * get_spice_cell(PyObject *py_obj);
 SpiceEKAttDsc * get_spice_ekattdsc(PyObject *py_obj);
 SpiceEKSegSum * get_spice_eksegsum(PyObject *py_obj);
 SpicePlane * get_spice_plane(PyObject *py_obj);
-SpiceEllipse * get_spice_ellipse(PyObject *ellipse);
+SpiceEllipse * get_spice_ellipse(PyObject *py_obj);
+int get_spice_double_array(PyObject *py_obj, PySpiceArray *array);
+void release_spice_array(PySpiceArray *array);
+PyObject * get_py_double_buffer(Py_ssize_t count, double **data);
+PyObject * get_py_fixed_array(void *data, char type,
+                              Py_ssize_t dim0, Py_ssize_t dim1, Py_ssize_t dim2);
+int get_spice_fixed_array(PyObject *py_obj, char type, void *data,
+                          Py_ssize_t dim0, Py_ssize_t dim1, Py_ssize_t dim2);
+int get_spice_string_array(PyObject *py_obj, PySpiceStringArray *array);
+char * get_spice_string_item(PySpiceStringArray *array, Py_ssize_t i);
+void release_spice_string_array(PySpiceStringArray *array);
+
+/* Array output mode switch */
+extern char set_array_factory_doc[];
+extern char get_array_factory_doc[];
+PyObject * spice_set_array_factory(PyObject *self, PyObject *args);
+PyObject * spice_get_array_factory(PyObject *self, PyObject *unused);
+
+/* Where CSPICE writes its error reports */
+extern char set_error_device_doc[];
+extern char get_error_device_doc[];
+PyObject * spice_set_error_device(PyObject *self, PyObject *args);
+PyObject * spice_get_error_device(PyObject *self, PyObject *unused);
+
+/* Batch wrappers defined in pyspice_batch.c */
+extern char spkezr_batch_doc[];
+extern char spkpos_batch_doc[];
+PyObject * spice_spkezr_batch(PyObject *self, PyObject *args);
+PyObject * spice_spkpos_batch(PyObject *self, PyObject *args);
+extern char str2et_batch_doc[];
+extern char utc2et_batch_doc[];
+extern char et2utc_batch_doc[];
+extern char timout_batch_doc[];
+PyObject * spice_str2et_batch(PyObject *self, PyObject *args);
+PyObject * spice_utc2et_batch(PyObject *self, PyObject *args);
+PyObject * spice_et2utc_batch(PyObject *self, PyObject *args);
+PyObject * spice_timout_batch(PyObject *self, PyObject *args);
+extern char pxform_batch_doc[];
+extern char sxform_batch_doc[];
+PyObject * spice_pxform_batch(PyObject *self, PyObject *args);
+PyObject * spice_sxform_batch(PyObject *self, PyObject *args);
+
+/* The stubs of the batch and window functions, in pyspice_stats.c */
+PyObject * spice_spkezr_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_spkpos_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_str2et_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_utc2et_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_et2utc_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_timout_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_pxform_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_sxform_batch_counted(PyObject *self, PyObject *args);
+PyObject * spice_wncombine_counted(PyObject *self, PyObject *args);
+PyObject * spice_wnreduce_counted(PyObject *self, PyObject *args);
+PyObject * spice_wnadjust_counted(PyObject *self, PyObject *args);
+PyObject * spice_wncontains_counted(PyObject *self, PyObject *args);
+
+/* Window functions defined in pyspice_window.c */
+extern char wncombine_doc[];
+extern char wnreduce_doc[];
+extern char wnadjust_doc[];
+extern char wncontains_doc[];
+PyObject * spice_wncombine(PyObject *self, PyObject *args);
+PyObject * spice_wnreduce(PyObject *self, PyObject *args);
+PyObject * spice_wnadjust(PyObject *self, PyObject *args);
+PyObject * spice_wncontains(PyObject *self, PyObject *args);
+
+/* GF user-defined searches defined in pyspice_gf.c */
+extern char gfuds_doc[];
+extern char gfudb_doc[];
+extern char uddf_doc[];
+extern char uddc_doc[];
+PyObject * spice_gfuds(PyObject *self, PyObject *args);
+PyObject * spice_gfudb(PyObject *self, PyObject *args);
+PyObject * spice_uddf(PyObject *self, PyObject *args);
+PyObject * spice_uddc(PyObject *self, PyObject *args);
+
+/* Instrumentation switches and results defined in pyspice_stats.c */
+extern char set_instrumentation_doc[];
+extern char get_instrumentation_doc[];
+extern char set_tracer_doc[];
+extern char get_tracer_doc[];
+extern char stats_doc[];
+extern char reset_stats_doc[];
+PyObject * spice_set_instrumentation(PyObject *self, PyObject *args);
+PyObject * spice_get_instrumentation(PyObject *self, PyObject *unused);
+PyObject * spice_set_tracer(PyObject *self, PyObject *args);
+PyObject * spice_get_tracer(PyObject *self, PyObject *unused);
+PyObject * spice_stats(PyObject *self, PyObject *unused);
+PyObject * spice_reset_stats(PyObject *self, PyObject *unused);
 
 /* Some test code */
 PyObject * spice_berto(PyObject *self, PyObject *args);
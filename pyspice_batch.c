@@ -0,0 +1,468 @@
+/**
+ * PySPICE batch functions
+ *
+ * Hand-written wrappers that run one CSPICE routine over whole arrays of
+ * inputs in a single C loop, instead of paying the argument parsing and
+ * result building of the generated wrappers once per call.  Results are
+ * returned as bytearrays of native doubles; the spice.batch module gives
+ * them their shape.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+
+/**
+ * Work out the length of a broadcast between two arrays, either of which
+ * may have a single element.  Returns -1 with a ValueError set when the
+ * lengths don't match.
+ */
+static Py_ssize_t get_broadcast_count(Py_ssize_t n1, Py_ssize_t n2)
+{
+    if(n1 == n2 || n2 == 1) {
+        return n1;
+    }
+
+    if(n1 == 1) {
+        return n2;
+    }
+
+    PyErr_Format(PyExc_ValueError,
+                 "cannot broadcast arrays of length %zd and %zd", n1, n2);
+
+    return -1;
+}
+
+/**
+ * Return the targets of a spk batch as a list: a single name or ID as a
+ * list of one, with unicode names encoded as the scalar wrappers do
+ */
+static PyObject * get_target_list(PyObject *py_targ)
+{
+    PyObject *list = NULL, *item = NULL, *name = NULL;
+    Py_ssize_t i;
+
+    if(PyString_Check(py_targ) || PyUnicode_Check(py_targ) || PyIndex_Check(py_targ)) {
+        list = PyList_New(1);
+
+        if(list) {
+            Py_INCREF(py_targ);
+            PyList_SET_ITEM(list, 0, py_targ);
+        }
+    } else if(PySequence_Check(py_targ)) {
+        list = PySequence_List(py_targ);
+    } else {
+        PyErr_SetString(PyExc_TypeError, "target must be a name, an ID or a sequence of them");
+    }
+
+    for(i = 0; list && i < PyList_GET_SIZE(list); ++ i) {
+        item = PyList_GET_ITEM(list, i);
+
+        if(!PyUnicode_Check(item)) {
+            continue;
+        }
+
+        if(!(name = PyUnicode_AsEncodedString(item, NULL, NULL))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SetItem(list, i, name);
+    }
+
+    return list;
+}
+
+/**
+ * Run spkezr_c (states) or spkpos_c (positions) over an array of epochs.
+ *
+ * The target may be a name, an ID or a sequence of names and IDs; a
+ * single target or a single epoch is broadcast against the other.  IDs
+ * go through spkez_c/spkezp_c so no name lookup is done for them.  The
+ * targets are read before the loop, which runs without the GIL.
+ */
+static PyObject * spk_batch(PyObject *args, int states)
+{
+    PyObject *py_targ = NULL, *py_ets = NULL, *targ_seq = NULL, *item = NULL;
+    PyObject *py_out = NULL, *py_lt = NULL;
+    char *ref, *abcorr, *obs, **names = NULL, *name;
+    double *out = NULL, *lt = NULL, et;
+    PySpiceArray ets;
+    Py_ssize_t i, n, ntarg;
+    SpiceInt *targ_ids = NULL, obs_id = 0;
+    SpiceBoolean found = SPICETRUE;
+    int have_ids = 0, width = states ? 6 : 3;
+    char failed = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "OOsss", &py_targ, &py_ets, &ref, &abcorr, &obs));
+    PYSPICE_CHECK_RETURN_STATUS(get_spice_double_array(py_ets, &ets));
+
+    /* a single name or ID applies to every epoch */
+    if(!(targ_seq = get_target_list(py_targ))) {
+        release_spice_array(&ets);
+        return NULL;
+    }
+
+    ntarg = PyList_GET_SIZE(targ_seq);
+    n = get_broadcast_count(ets.count, ntarg);
+
+    if(n >= 0) {
+        py_out = get_py_double_buffer(n * width, &out);
+        py_lt = get_py_double_buffer(n, &lt);
+        names = PyMem_New(char *, ntarg);
+        targ_ids = PyMem_New(SpiceInt, ntarg);
+    }
+
+    if(!py_out || !py_lt || !names || !targ_ids) {
+        if(n >= 0 && !PyErr_Occurred()) {
+            PyErr_NoMemory();
+        }
+
+        failed = 1;
+    }
+
+    /* the names point into the list, which outlives the loop */
+    for(i = 0; i < ntarg && !failed; ++ i) {
+        item = PyList_GET_ITEM(targ_seq, i);
+        names[i] = PyString_Check(item) ? PyString_AS_STRING(item) : NULL;
+        targ_ids[i] = 0;
+
+        if(!names[i]) {
+            targ_ids[i] = (SpiceInt)PyNumber_AsSsize_t(item, PyExc_OverflowError);
+            failed = PyErr_Occurred() != NULL;
+            have_ids = 1;
+        }
+    }
+
+    if(!failed) {
+        /* the whole loop runs without the GIL, stopping at the first error */
+        PYSPICE_BEGIN_CALL;
+
+        if(have_ids) {
+            bods2c_c(obs, &obs_id, &found);
+        }
+
+        for(i = 0; i < n && found && !failed_c(); ++ i) {
+            name = names[ntarg == 1 ? 0 : i];
+            et = ((double *)ets.data)[ets.count == 1 ? 0 : i];
+
+            if(name && states) {
+                spkezr_c(name, et, ref, abcorr, obs, out + i * width, lt + i);
+            } else if(name) {
+                spkpos_c(name, et, ref, abcorr, obs, out + i * width, lt + i);
+            } else if(states) {
+                spkez_c(targ_ids[ntarg == 1 ? 0 : i], et, ref, abcorr, obs_id, out + i * width, lt + i);
+            } else {
+                spkezp_c(targ_ids[ntarg == 1 ? 0 : i], et, ref, abcorr, obs_id, out + i * width, lt + i);
+            }
+        }
+
+        PYSPICE_END_CALL;
+
+        PYSPICE_CHECK_FAILED;
+
+        if(!failed && !found) {
+            PyErr_Format(SpiceException, "observer %s is not a known body", obs);
+            failed = 1;
+        }
+    }
+
+    PyMem_Free(names);
+    PyMem_Free(targ_ids);
+    release_spice_array(&ets);
+    Py_DECREF(targ_seq);
+
+    if(failed || n < 0) {
+        Py_XDECREF(py_out);
+        Py_XDECREF(py_lt);
+        return NULL;
+    }
+
+    return Py_BuildValue("(NN)", py_out, py_lt);
+}
+
+char spkezr_batch_doc[] = "_spkezr_batch(targ, ets, ref, abcorr, obs) -> (states, lts)\n\n"
+    "Run spkezr over an array of epochs; see spice.batch.spkezr_batch.";
+
+PyObject * spice_spkezr_batch(PyObject *self, PyObject *args)
+{
+    return spk_batch(args, 1);
+}
+
+char spkpos_batch_doc[] = "_spkpos_batch(targ, ets, ref, abcorr, obs) -> (positions, lts)\n\n"
+    "Run spkpos over an array of epochs; see spice.batch.spkpos_batch.";
+
+PyObject * spice_spkpos_batch(PyObject *self, PyObject *args)
+{
+    return spk_batch(args, 0);
+}
+
+/**
+ * Return pointers to every string of an array, read before a loop that
+ * runs without the GIL.  The strings of a fixed-width array are copied
+ * NUL terminated into *copy, which the caller frees along with the
+ * pointers; the others point into the array's sequence.
+ */
+static char ** get_string_items(PySpiceStringArray *strings, char **copy)
+{
+    char **items = PyMem_New(char *, strings->count ? strings->count : 1);
+    Py_ssize_t i;
+
+    *copy = NULL;
+
+    if(!items) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    if(!strings->seq && !(*copy = PyMem_Malloc(strings->count * (strings->width + 1) + 1))) {
+        PyMem_Free(items);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    for(i = 0; i < strings->count; ++ i) {
+        if(strings->seq) {
+            items[i] = get_spice_string_item(strings, i);
+        } else {
+            items[i] = strcpy(*copy + i * (strings->width + 1), get_spice_string_item(strings, i));
+        }
+
+        if(!items[i]) {
+            PyMem_Free(items);
+            PyMem_Free(*copy);
+            *copy = NULL;
+            return NULL;
+        }
+    }
+
+    return items;
+}
+
+/**
+ * Run str2et_c or utc2et_c over an array of time strings
+ */
+static PyObject * time_string_batch(PyObject *args, void (*convert)(ConstSpiceChar *, SpiceDouble *))
+{
+    PyObject *py_strings = NULL, *py_out = NULL;
+    PySpiceStringArray strings;
+    double *out = NULL;
+    char **items = NULL, *copy = NULL;
+    Py_ssize_t i;
+    char failed = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O", &py_strings));
+    PYSPICE_CHECK_RETURN_STATUS(get_spice_string_array(py_strings, &strings));
+
+    py_out = get_py_double_buffer(strings.count, &out);
+
+    if(!py_out || !(items = get_string_items(&strings, &copy))) {
+        failed = 1;
+    } else {
+        /* the whole loop runs without the GIL, stopping at the first error */
+        PYSPICE_BEGIN_CALL;
+
+        for(i = 0; i < strings.count && !failed_c(); ++ i) {
+            convert(items[i], out + i);
+        }
+
+        PYSPICE_END_CALL;
+
+        PYSPICE_CHECK_FAILED;
+    }
+
+    PyMem_Free(items);
+    PyMem_Free(copy);
+    release_spice_string_array(&strings);
+
+    if(failed) {
+        Py_XDECREF(py_out);
+        return NULL;
+    }
+
+    return py_out;
+}
+
+char str2et_batch_doc[] = "_str2et_batch(strings) -> ets\n\n"
+    "Run str2et over an array of strings; see spice.batch.str2et_batch.";
+
+PyObject * spice_str2et_batch(PyObject *self, PyObject *args)
+{
+    return time_string_batch(args, str2et_c);
+}
+
+char utc2et_batch_doc[] = "_utc2et_batch(strings) -> ets\n\n"
+    "Run utc2et over an array of strings; see spice.batch.utc2et_batch.";
+
+PyObject * spice_utc2et_batch(PyObject *self, PyObject *args)
+{
+    return time_string_batch(args, utc2et_c);
+}
+
+/**
+ * Run et2utc_c (when format is given) or timout_c (when pictur is given)
+ * over an array of epochs.  The results are written into one buffer
+ * without the GIL and turned into Python objects afterwards.  With a
+ * width they are packed into a bytearray of NUL padded width-character
+ * items, otherwise they are returned as a list of str.
+ */
+static PyObject * et_string_batch(PyObject *py_ets, char *format, SpiceInt prec,
+                                  char *pictur, Py_ssize_t width)
+{
+    PyObject *py_out = NULL, *item = NULL;
+    PySpiceArray ets;
+    SpiceInt lenout = width > 0 ? (SpiceInt)width + 1 : STRING_LEN;
+    char *buffer = NULL, *packed = NULL;
+    Py_ssize_t i;
+    char failed = 0;
+
+    if(width < 0 || width >= INT_MAX) {
+        PyErr_SetString(PyExc_ValueError, "width must be positive");
+        return NULL;
+    }
+
+    PYSPICE_CHECK_RETURN_STATUS(get_spice_double_array(py_ets, &ets));
+
+    if(!(buffer = PyMem_Malloc(ets.count * lenout + 1))) {
+        release_spice_array(&ets);
+        return PyErr_NoMemory();
+    }
+
+    if(width > 0) {
+        if((py_out = PyByteArray_FromStringAndSize(NULL, ets.count * width))) {
+            packed = PyByteArray_AS_STRING(py_out);
+        }
+    } else {
+        py_out = PyList_New(ets.count);
+    }
+
+    if(!py_out) {
+        failed = 1;
+    } else {
+        /* the whole loop runs without the GIL, stopping at the first error */
+        PYSPICE_BEGIN_CALL;
+
+        for(i = 0; i < ets.count && !failed_c(); ++ i) {
+            if(format) {
+                et2utc_c(((double *)ets.data)[i], format, prec, lenout, buffer + i * lenout);
+            } else {
+                timout_c(((double *)ets.data)[i], pictur, lenout, buffer + i * lenout);
+            }
+        }
+
+        PYSPICE_END_CALL;
+
+        PYSPICE_CHECK_FAILED;
+    }
+
+    for(i = 0; i < ets.count && !failed; ++ i) {
+        if(packed) {
+            strncpy(packed + i * width, buffer + i * lenout, width);
+        } else if((item = PyString_FromString(buffer + i * lenout))) {
+            PyList_SET_ITEM(py_out, i, item);
+        } else {
+            failed = 1;
+        }
+    }
+
+    PyMem_Free(buffer);
+    release_spice_array(&ets);
+
+    if(failed) {
+        Py_XDECREF(py_out);
+        return NULL;
+    }
+
+    return py_out;
+}
+
+char et2utc_batch_doc[] = "_et2utc_batch(ets, format, prec, width) -> strings\n\n"
+    "Run et2utc over an array of epochs; see spice.batch.et2utc_batch.";
+
+PyObject * spice_et2utc_batch(PyObject *self, PyObject *args)
+{
+    PyObject *py_ets = NULL;
+    char *format;
+    int prec;
+    Py_ssize_t width = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "Osi|n", &py_ets, &format, &prec, &width));
+
+    return et_string_batch(py_ets, format, (SpiceInt)prec, NULL, width);
+}
+
+char timout_batch_doc[] = "_timout_batch(ets, pictur, width) -> strings\n\n"
+    "Run timout over an array of epochs; see spice.batch.timout_batch.";
+
+PyObject * spice_timout_batch(PyObject *self, PyObject *args)
+{
+    PyObject *py_ets = NULL;
+    char *pictur;
+    Py_ssize_t width = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "Os|n", &py_ets, &pictur, &width));
+
+    return et_string_batch(py_ets, NULL, 0, pictur, width);
+}
+
+/**
+ * Run pxform_c (3x3 rotations) or sxform_c (6x6 state transformations)
+ * over an array of epochs, writing the matrices one after another.
+ */
+static PyObject * xform_batch(PyObject *args, int states)
+{
+    PyObject *py_ets = NULL, *py_out = NULL;
+    char *from, *to;
+    double *out = NULL;
+    PySpiceArray ets;
+    Py_ssize_t i, size = states ? 36 : 9;
+    char failed = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "ssO", &from, &to, &py_ets));
+    PYSPICE_CHECK_RETURN_STATUS(get_spice_double_array(py_ets, &ets));
+
+    py_out = get_py_double_buffer(ets.count * size, &out);
+
+    if(!py_out) {
+        failed = 1;
+    } else {
+        /* the whole loop runs without the GIL, stopping at the first error */
+        PYSPICE_BEGIN_CALL;
+
+        for(i = 0; i < ets.count && !failed_c(); ++ i) {
+            if(states) {
+                sxform_c(from, to, ((double *)ets.data)[i], (SpiceDouble (*)[6])(out + i * size));
+            } else {
+                pxform_c(from, to, ((double *)ets.data)[i], (SpiceDouble (*)[3])(out + i * size));
+            }
+        }
+
+        PYSPICE_END_CALL;
+
+        PYSPICE_CHECK_FAILED;
+    }
+
+    release_spice_array(&ets);
+
+    if(failed) {
+        Py_XDECREF(py_out);
+        return NULL;
+    }
+
+    return py_out;
+}
+
+char pxform_batch_doc[] = "_pxform_batch(from, to, ets) -> rotations\n\n"
+    "Run pxform over an array of epochs; see spice.batch.pxform_batch.";
+
+PyObject * spice_pxform_batch(PyObject *self, PyObject *args)
+{
+    return xform_batch(args, 0);
+}
+
+char sxform_batch_doc[] = "_sxform_batch(from, to, ets) -> xforms\n\n"
+    "Run sxform over an array of epochs; see spice.batch.sxform_batch.";
+
+PyObject * spice_sxform_batch(PyObject *self, PyObject *args)
+{
+    return xform_batch(args, 1);
+}
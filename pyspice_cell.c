@@ -0,0 +1,719 @@
+/**
+ * PySPICE cell type
+ *
+ * Cell holds a SpiceCell together with the storage for its control area
+ * and data, one contiguous block in the layout CSPICE uses.  The wrappers
+ * hand CSPICE a pointer to the SpiceCell inside the object and return the
+ * same object, so cells are never copied in either direction.  The data
+ * are exported through the buffer interface and can be read and written
+ * item by item through the base and data attributes.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+#include <stddef.h>
+
+#define CELL_MIN_CHAR_LEN 6
+
+/**
+ * Number of data items a cell holds; a size larger than the storage (after
+ * ssize for instance) is cut to what is there
+ */
+static Py_ssize_t get_data_count(PySpiceCell *self)
+{
+    Py_ssize_t size = self->cell.size;
+
+    return size < 0 ? 0 : (size > self->capacity ? self->capacity : size);
+}
+
+/**
+ * Return item i of the cell storage, counting from the start of the
+ * control area
+ */
+static PyObject * get_cell_item(PySpiceCell *self, Py_ssize_t i)
+{
+    char *item = (char *)self->storage + i * self->itemsize;
+
+    switch(self->cell.dtype) {
+    case SPICE_CHR:
+        return PyString_FromStringAndSize(item, self->itemsize);
+    case SPICE_INT:
+        return PyInt_FromLong((long)*(SpiceInt *)item);
+    case SPICE_DP:
+        return PyFloat_FromDouble(*(SpiceDouble *)item);
+    default:
+        PyErr_SetString(PyExc_TypeError, "unsupported cell data type");
+        return NULL;
+    }
+}
+
+/**
+ * Set item i of the cell storage from a Python object.  Strings longer
+ * than the cell length less one are cut so they stay NUL terminated.
+ */
+static int set_cell_item(PySpiceCell *self, Py_ssize_t i, PyObject *value)
+{
+    char *item = (char *)self->storage + i * self->itemsize, *string;
+    Py_ssize_t length;
+    long int_value;
+    double double_value;
+
+    switch(self->cell.dtype) {
+    case SPICE_CHR:
+        if(PyString_AsStringAndSize(value, &string, &length) < 0) {
+            return -1;
+        }
+
+        if(length > self->itemsize - 1) {
+            length = self->itemsize - 1;
+        }
+
+        memset(item, 0, self->itemsize);
+        memcpy(item, string, length);
+        return 0;
+    case SPICE_INT:
+        int_value = PyInt_AsLong(value);
+
+        if(int_value == -1 && PyErr_Occurred()) {
+            return -1;
+        }
+
+        *(SpiceInt *)item = (SpiceInt)int_value;
+        return 0;
+    case SPICE_DP:
+        double_value = PyFloat_AsDouble(value);
+
+        if(double_value == -1.0 && PyErr_Occurred()) {
+            return -1;
+        }
+
+        *(SpiceDouble *)item = double_value;
+        return 0;
+    default:
+        PyErr_SetString(PyExc_TypeError, "unsupported cell data type");
+        return -1;
+    }
+}
+
+/* CellView, the sequences behind Cell.base and Cell.data */
+
+static Py_ssize_t cellview_length(PySpiceCellView *self)
+{
+    return self->data ? get_data_count(self->owner) : SPICE_CELL_CTRLSZ;
+}
+
+static PyObject * cellview_item(PySpiceCellView *self, Py_ssize_t i)
+{
+    if(i < 0 || i >= cellview_length(self)) {
+        PyErr_SetString(PyExc_IndexError, "cell index out of range");
+        return NULL;
+    }
+
+    return get_cell_item(self->owner, (self->data ? SPICE_CELL_CTRLSZ : 0) + i);
+}
+
+static int cellview_ass_item(PySpiceCellView *self, Py_ssize_t i, PyObject *value)
+{
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "cell items cannot be deleted");
+        return -1;
+    }
+
+    if(i < 0 || i >= cellview_length(self)) {
+        PyErr_SetString(PyExc_IndexError, "cell index out of range");
+        return -1;
+    }
+
+    return set_cell_item(self->owner, (self->data ? SPICE_CELL_CTRLSZ : 0) + i, value);
+}
+
+/**
+ * Return items start, start + step, ... of the view as a list
+ */
+static PyObject * get_cellview_list(PySpiceCellView *self, Py_ssize_t start,
+                                    Py_ssize_t step, Py_ssize_t count)
+{
+    PyObject *item = NULL, *list = PyList_New(count);
+    Py_ssize_t i;
+
+    for(i = 0; list && i < count; ++ i) {
+        if(!(item = cellview_item(self, start + i * step))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SET_ITEM(list, i, item);
+    }
+
+    return list;
+}
+
+static PyObject * cellview_subscript(PySpiceCellView *self, PyObject *key)
+{
+    Py_ssize_t i, start, stop, step, count;
+
+    if(PyIndex_Check(key)) {
+        if((i = PyNumber_AsSsize_t(key, PyExc_IndexError)) == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+
+        return cellview_item(self, i < 0 ? i + cellview_length(self) : i);
+    }
+
+    if(PySlice_Check(key)) {
+        if(PySlice_GetIndicesEx((PySliceObject *)key, cellview_length(self),
+                                &start, &stop, &step, &count) < 0) {
+            return NULL;
+        }
+
+        return get_cellview_list(self, start, step, count);
+    }
+
+    PyErr_Format(PyExc_TypeError, "cell indices must be integers or slices, not %.200s",
+                 Py_TYPE(key)->tp_name);
+
+    return NULL;
+}
+
+static int cellview_ass_subscript(PySpiceCellView *self, PyObject *key, PyObject *value)
+{
+    Py_ssize_t i;
+
+    if(!PyIndex_Check(key)) {
+        PyErr_SetString(PyExc_TypeError, "cell items can only be set one at a time");
+        return -1;
+    }
+
+    if((i = PyNumber_AsSsize_t(key, PyExc_IndexError)) == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    return cellview_ass_item(self, i < 0 ? i + cellview_length(self) : i, value);
+}
+
+/**
+ * Compare as a list, so that cell.data == [1, 2, 3] works
+ */
+static PyObject * cellview_richcompare(PyObject *a, PyObject *b, int op)
+{
+    PyObject *list_a = NULL, *list_b = NULL, *result = NULL;
+
+    list_a = PyObject_TypeCheck(a, &PySpiceCellView_Type) ? PySequence_List(a) : (Py_INCREF(a), a);
+    list_b = PyObject_TypeCheck(b, &PySpiceCellView_Type) ? PySequence_List(b) : (Py_INCREF(b), b);
+
+    if(list_a && list_b) {
+        result = PyObject_RichCompare(list_a, list_b, op);
+    }
+
+    Py_XDECREF(list_a);
+    Py_XDECREF(list_b);
+
+    return result;
+}
+
+static PyObject * cellview_repr(PySpiceCellView *self)
+{
+    PyObject *list = get_cellview_list(self, 0, 1, cellview_length(self));
+    PyObject *result = NULL;
+
+    if(list) {
+        result = PyObject_Repr(list);
+        Py_DECREF(list);
+    }
+
+    return result;
+}
+
+static void cellview_dealloc(PySpiceCellView *self)
+{
+    Py_XDECREF(self->owner);
+    PyObject_Del(self);
+}
+
+static PySequenceMethods cellview_as_sequence = {
+    (lenfunc)cellview_length,                 /* sq_length */
+    0,                                        /* sq_concat */
+    0,                                        /* sq_repeat */
+    (ssizeargfunc)cellview_item,              /* sq_item */
+    0,                                        /* sq_slice */
+    (ssizeobjargproc)cellview_ass_item,       /* sq_ass_item */
+};
+
+static PyMappingMethods cellview_as_mapping = {
+    (lenfunc)cellview_length,                 /* mp_length */
+    (binaryfunc)cellview_subscript,           /* mp_subscript */
+    (objobjargproc)cellview_ass_subscript,    /* mp_ass_subscript */
+};
+
+PyTypeObject PySpiceCellView_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.CellView",                        /* tp_name */
+    sizeof(PySpiceCellView),                  /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    (destructor)cellview_dealloc,             /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    (reprfunc)cellview_repr,                  /* tp_repr */
+    0,                                        /* tp_as_number */
+    &cellview_as_sequence,                    /* tp_as_sequence */
+    &cellview_as_mapping,                     /* tp_as_mapping */
+    PyObject_HashNotImplemented,              /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    0,                                        /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                       /* tp_flags */
+    "Live view of the control area or the data of a Cell", /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    cellview_richcompare,                     /* tp_richcompare */
+};
+
+static PyObject * get_cellview(PySpiceCell *owner, int data)
+{
+    PySpiceCellView *view = PyObject_New(PySpiceCellView, &PySpiceCellView_Type);
+
+    if(view) {
+        Py_INCREF(owner);
+        view->owner = owner;
+        view->data = data;
+    }
+
+    return (PyObject *)view;
+}
+
+/* Cell */
+
+/**
+ * Return a copy of the keyword arguments of Cell() with the names of the
+ * old Python class (dtArg, szArg, lenArg) replaced by the current ones
+ */
+static PyObject * get_cell_keywords(PyObject *kwds)
+{
+    static char *aliases[][2] = {{"dtArg", "dtype"}, {"szArg", "size"}, {"lenArg", "length"}};
+    PyObject *copy = NULL, *value = NULL;
+    size_t i;
+
+    if(!(copy = PyDict_Copy(kwds))) {
+        return NULL;
+    }
+
+    for(i = 0; i < sizeof(aliases) / sizeof(aliases[0]); ++ i) {
+        if(!(value = PyDict_GetItemString(copy, aliases[i][0]))) {
+            continue;
+        }
+
+        if(PyDict_GetItemString(copy, aliases[i][1])) {
+            PyErr_Format(PyExc_TypeError, "Cell() got both %s and %s", aliases[i][0], aliases[i][1]);
+            Py_DECREF(copy);
+            return NULL;
+        }
+
+        if(PyDict_SetItemString(copy, aliases[i][1], value) < 0 ||
+           PyDict_DelItemString(copy, aliases[i][0]) < 0) {
+            Py_DECREF(copy);
+            return NULL;
+        }
+    }
+
+    return copy;
+}
+
+static PyObject * cell_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"dtype", "size", "length", NULL};
+    int dtype, size, length = CELL_MIN_CHAR_LEN, status;
+    Py_ssize_t itemsize;
+    PySpiceCell *self = NULL;
+
+    if(kwds && !(kwds = get_cell_keywords(kwds))) {
+        return NULL;
+    }
+
+    status = PyArg_ParseTupleAndKeywords(args, kwds, "ii|i", kwlist, &dtype, &size, &length);
+    Py_XDECREF(kwds);
+
+    if(!status) {
+        return NULL;
+    }
+
+    switch(dtype) {
+    case SPICE_CHR:
+        if(length < CELL_MIN_CHAR_LEN) {
+            length = CELL_MIN_CHAR_LEN;
+        }
+
+        itemsize = length * sizeof(SpiceChar);
+        break;
+    case SPICE_INT:
+        length = 0;
+        itemsize = sizeof(SpiceInt);
+        break;
+    case SPICE_DP:
+        length = 0;
+        itemsize = sizeof(SpiceDouble);
+        break;
+    default:
+        PyErr_Format(PyExc_TypeError, "Invalid type:  %d", dtype);
+        return NULL;
+    }
+
+    if(size < 0) {
+        PyErr_SetString(PyExc_ValueError, "cell size must not be negative");
+        return NULL;
+    }
+
+    if(!(self = (PySpiceCell *)type->tp_alloc(type, 0))) {
+        return NULL;
+    }
+
+    if(!(self->storage = PyMem_Malloc((SPICE_CELL_CTRLSZ + size) * itemsize))) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+
+    memset(self->storage, 0, (SPICE_CELL_CTRLSZ + size) * itemsize);
+
+    self->capacity = size;
+    self->itemsize = itemsize;
+
+    self->cell.dtype = dtype;
+    self->cell.length = length;
+    self->cell.size = size;
+    self->cell.card = 0;
+    self->cell.isSet = SPICEFALSE;
+    self->cell.adjust = SPICEFALSE;
+    self->cell.init = SPICEFALSE;
+    self->cell.base = self->storage;
+    self->cell.data = (char *)self->storage + SPICE_CELL_CTRLSZ * itemsize;
+
+    return (PyObject *)self;
+}
+
+static void cell_dealloc(PySpiceCell *self)
+{
+    if(self->storage) {
+        PyMem_Free(self->storage);
+    }
+
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject * cell_get_int(PySpiceCell *self, void *offset)
+{
+    return PyInt_FromLong((long)*(SpiceInt *)((char *)&self->cell + (size_t)offset));
+}
+
+static PyObject * cell_get_dtype(PySpiceCell *self, void *closure)
+{
+    return PyInt_FromLong((long)self->cell.dtype);
+}
+
+static PyObject * cell_get_card(PySpiceCell *self, void *closure)
+{
+    return PyInt_FromLong((long)self->cell.card);
+}
+
+static int cell_set_card(PySpiceCell *self, PyObject *value, void *closure)
+{
+    long card;
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "cannot delete card");
+        return -1;
+    }
+
+    if((card = PyInt_AsLong(value)) == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    if(card < 0 || card > get_data_count(self)) {
+        PyErr_SetString(PyExc_ValueError, "card must be between 0 and the cell size");
+        return -1;
+    }
+
+    self->cell.card = (SpiceInt)card;
+
+    return 0;
+}
+
+static PyObject * cell_get_bool(PySpiceCell *self, void *offset)
+{
+    return PyBool_FromLong(*(SpiceBoolean *)((char *)&self->cell + (size_t)offset));
+}
+
+static int cell_set_bool(PySpiceCell *self, PyObject *value, void *offset)
+{
+    int truth;
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "cannot delete attribute");
+        return -1;
+    }
+
+    if((truth = PyObject_IsTrue(value)) < 0) {
+        return -1;
+    }
+
+    *(SpiceBoolean *)((char *)&self->cell + (size_t)offset) = truth ? SPICETRUE : SPICEFALSE;
+
+    return 0;
+}
+
+static PyObject * cell_get_base(PySpiceCell *self, void *closure)
+{
+    return get_cellview(self, 0);
+}
+
+static PyObject * cell_get_data(PySpiceCell *self, void *closure)
+{
+    return get_cellview(self, 1);
+}
+
+/**
+ * Set all the data items from a sequence of the cell's size
+ */
+static int cell_set_data(PySpiceCell *self, PyObject *value, void *closure)
+{
+    PyObject *seq = NULL;
+    Py_ssize_t i, count = get_data_count(self);
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "cannot delete data");
+        return -1;
+    }
+
+    if(!(seq = PySequence_Fast(value, "cell data must be a sequence"))) {
+        return -1;
+    }
+
+    if(PySequence_Fast_GET_SIZE(seq) != count) {
+        PyErr_Format(PyExc_ValueError, "cell data must have %zd items, not %zd",
+                     count, PySequence_Fast_GET_SIZE(seq));
+        Py_DECREF(seq);
+        return -1;
+    }
+
+    for(i = 0; i < count; ++ i) {
+        if(set_cell_item(self, SPICE_CELL_CTRLSZ + i, PySequence_Fast_GET_ITEM(seq, i)) < 0) {
+            Py_DECREF(seq);
+            return -1;
+        }
+    }
+
+    Py_DECREF(seq);
+
+    return 0;
+}
+
+static PyGetSetDef cell_getset[] = {
+    {"dtype", (getter)cell_get_dtype, NULL, "data type, one of the DataType codes", NULL},
+    {"length", (getter)cell_get_int, NULL, "string length of character cells, 0 otherwise",
+     (void *)offsetof(SpiceCell, length)},
+    {"size", (getter)cell_get_int, NULL, "number of items the cell can hold",
+     (void *)offsetof(SpiceCell, size)},
+    {"card", (getter)cell_get_card, (setter)cell_set_card, "number of items in use", NULL},
+    {"isSet", (getter)cell_get_bool, (setter)cell_set_bool, "whether the cell is a set",
+     (void *)offsetof(SpiceCell, isSet)},
+    {"adjust", (getter)cell_get_bool, (setter)cell_set_bool, "adjust flag",
+     (void *)offsetof(SpiceCell, adjust)},
+    {"init", (getter)cell_get_bool, (setter)cell_set_bool, "whether CSPICE has initialized the cell",
+     (void *)offsetof(SpiceCell, init)},
+    {"base", (getter)cell_get_base, NULL, "live view of the control area", NULL},
+    {"data", (getter)cell_get_data, (setter)cell_set_data, "live view of the data items", NULL},
+    {NULL}
+};
+
+static PyObject * cell_repr(PySpiceCell *self)
+{
+    return PyString_FromFormat("<Cell: dtype=%d, size=%ld, card=%ld>",
+                               (int)self->cell.dtype, (long)self->cell.size, (long)self->cell.card);
+}
+
+/**
+ * Export the data items: a 1-d array of doubles or SpiceInts, or of
+ * length-character strings for character cells
+ */
+static int cell_getbuffer(PySpiceCell *self, Py_buffer *view, int flags)
+{
+    switch(self->cell.dtype) {
+    case SPICE_CHR:
+        PyOS_snprintf(self->format, sizeof(self->format), "%lds", (long)self->itemsize);
+        break;
+    case SPICE_INT:
+        strcpy(self->format, sizeof(SpiceInt) == sizeof(long) ? "l" : "i");
+        break;
+    default:
+        strcpy(self->format, "d");
+    }
+
+    self->shape = get_data_count(self);
+
+    view->obj = (PyObject *)self;
+    view->buf = self->cell.data;
+    view->len = self->shape * self->itemsize;
+    view->readonly = 0;
+    view->itemsize = self->itemsize;
+    view->format = (flags & PyBUF_FORMAT) ? self->format : NULL;
+    view->ndim = 1;
+    view->shape = (flags & PyBUF_ND) ? &self->shape : NULL;
+    view->strides = (flags & PyBUF_STRIDES) ? &view->itemsize : NULL;
+    view->suboffsets = NULL;
+    view->internal = NULL;
+
+    Py_INCREF(self);
+
+    return 0;
+}
+
+/* old style buffer interface over the same data, for Python 2 code */
+static Py_ssize_t cell_getreadbuffer(PySpiceCell *self, Py_ssize_t segment, void **ptr)
+{
+    if(segment != 0) {
+        PyErr_SetString(PyExc_SystemError, "accessing non-existent buffer segment");
+        return -1;
+    }
+
+    *ptr = self->cell.data;
+
+    return get_data_count(self) * self->itemsize;
+}
+
+static Py_ssize_t cell_getsegcount(PySpiceCell *self, Py_ssize_t *lenp)
+{
+    if(lenp) {
+        *lenp = get_data_count(self) * self->itemsize;
+    }
+
+    return 1;
+}
+
+static PyBufferProcs cell_as_buffer = {
+    (readbufferproc)cell_getreadbuffer,
+    (writebufferproc)cell_getreadbuffer,
+    (segcountproc)cell_getsegcount,
+    0,
+    (getbufferproc)cell_getbuffer,
+    0,
+};
+
+PyTypeObject PySpiceCell_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.Cell",                            /* tp_name */
+    sizeof(PySpiceCell),                      /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    (destructor)cell_dealloc,                 /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    (reprfunc)cell_repr,                      /* tp_repr */
+    0,                                        /* tp_as_number */
+    0,                                        /* tp_as_sequence */
+    0,                                        /* tp_as_mapping */
+    0,                                        /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    &cell_as_buffer,                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /* tp_flags */
+    "Cell(dtype, size, length=6)\n\n"
+    "A SPICE cell of size items of type dtype (DataType.CHR, DP or INT);\n"
+    "length is the string length of character cells.  The wrappers pass\n"
+    "the cell to CSPICE in place, so routines that write to a cell change\n"
+    "it, and return the cell itself.  The buffer interface gives the data\n"
+    "items as a 1-d array.  A new cell isn't a set (isSet is False), as\n"
+    "before; dtArg, szArg and lenArg are accepted for dtype, size and\n"
+    "length.",                                /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    0,                                        /* tp_richcompare */
+    0,                                        /* tp_weaklistoffset */
+    0,                                        /* tp_iter */
+    0,                                        /* tp_iternext */
+    0,                                        /* tp_methods */
+    0,                                        /* tp_members */
+    cell_getset,                              /* tp_getset */
+    0,                                        /* tp_base */
+    0,                                        /* tp_dict */
+    0,                                        /* tp_descr_get */
+    0,                                        /* tp_descr_set */
+    0,                                        /* tp_dictoffset */
+    0,                                        /* tp_init */
+    0,                                        /* tp_alloc */
+    cell_new,                                 /* tp_new */
+};
+
+/* Conversions used by the generated wrappers */
+
+/**
+ * Return the SpiceCell held by a Cell, which CSPICE works on in place.
+ * Returns NULL with an exception set for any other object.
+ */
+SpiceCell * get_spice_cell(PyObject *py_obj)
+{
+    PySpiceCell *cell = (PySpiceCell *)py_obj;
+
+    if(!PyObject_TypeCheck(py_obj, &PySpiceCell_Type)) {
+        PyErr_Format(PyExc_TypeError, "expected Cell, not %.200s", Py_TYPE(py_obj)->tp_name);
+        return NULL;
+    }
+
+    if(cell->cell.size < 0 || cell->cell.size > cell->capacity) {
+        PyErr_Format(PyExc_ValueError, "cell size %ld is larger than its storage (%zd items)",
+                     (long)cell->cell.size, cell->capacity);
+        return NULL;
+    }
+
+    return &cell->cell;
+}
+
+/**
+ * Return a new reference to the Cell holding a SpiceCell; cell must have
+ * come from get_spice_cell
+ */
+PyObject * get_py_cell(SpiceCell *cell)
+{
+    PyObject *py_obj = (PyObject *)((char *)cell - offsetof(PySpiceCell, cell));
+
+    Py_INCREF(py_obj);
+
+    return py_obj;
+}
+
+/**
+ * Ready the cell types and add Cell to the module
+ */
+int init_spice_cell_type(PyObject *module)
+{
+    PyObject *value = NULL;
+
+    if(PyType_Ready(&PySpiceCellView_Type) < 0 || PyType_Ready(&PySpiceCell_Type) < 0) {
+        return -1;
+    }
+
+    /* class attributes kept from the Python implementation */
+    value = PyInt_FromLong(SPICE_CELL_CTRLSZ);
+
+    if(!value || PyDict_SetItemString(PySpiceCell_Type.tp_dict, "baseSize", value) < 0) {
+        Py_XDECREF(value);
+        return -1;
+    }
+
+    Py_DECREF(value);
+    value = PyInt_FromLong(CELL_MIN_CHAR_LEN);
+
+    if(!value || PyDict_SetItemString(PySpiceCell_Type.tp_dict, "minCharLen", value) < 0) {
+        Py_XDECREF(value);
+        return -1;
+    }
+
+    Py_DECREF(value);
+    Py_INCREF(&PySpiceCell_Type);
+
+    return PyModule_AddObject(module, "Cell", (PyObject *)&PySpiceCell_Type);
+}
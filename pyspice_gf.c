@@ -0,0 +1,614 @@
+/**
+ * PySPICE GF user-defined searches
+ *
+ * gfuds, gfudb, uddf and uddc take C function pointers, so they are
+ * given the trampolines below, which call the Python callables of the
+ * search in progress.
+ *
+ * In batch mode the callables take an array of epochs and return an array
+ * of results.  GF walks each confinement interval from its left end in
+ * steps (t = t + step, the right end last) and only asks for epochs off
+ * that walk while it refines a root.  Once two requests a step apart are
+ * seen, the next batch epochs of the walk are evaluated in one call and
+ * the requests that follow are answered from them.
+ *
+ * A Python exception raised by a callable is signalled to CSPICE as a
+ * SPICE(PYTHONERROR) error, which ends the search, and is raised again
+ * once the search has returned.
+ *
+ * Searches run holding the SPICE lock without the GIL, like the generated
+ * wrappers; the trampolines take the GIL while they call into Python.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+
+/* single epochs kept while a root is refined */
+#define GF_RECENT 8
+
+/* the kinds of requests GF makes: udfuns, udqdec and udfunb */
+enum { GF_VALUE, GF_DECR, GF_BOOL, GF_KINDS };
+
+typedef struct {
+    double *ets;            /* the epochs evaluated in the last batch */
+    double *values;
+    Py_ssize_t count;
+    double recent_ets[GF_RECENT];
+    double recent_values[GF_RECENT];
+    int nrecent;
+    int next_recent;
+    double last;            /* the last epoch evaluated alone */
+    double walked;          /* and the last epoch of the last batch */
+    int has_last;
+    int has_walked;
+} GFCache;
+
+typedef struct {
+    PyObject *udfuns;       /* borrowed references */
+    PyObject *udqdec;       /* NULL to use uddc with dt */
+    PyObject *udfunb;
+    Py_ssize_t batch;       /* 0 to call with one epoch at a time */
+    double step;
+    double dt;
+    SpiceCell *cnfine;
+    double *storage;
+    GFCache caches[GF_KINDS];
+    PyObject *exc_type, *exc_value, *exc_traceback;
+    char report[STRING_LEN];    /* errprt selection while it is off */
+} GFSearch;
+
+/* the search or derivative in progress, set holding the SPICE lock */
+static GFSearch *current = NULL;
+static int searching = 0;
+
+static int new_search(GFSearch *search, Py_ssize_t batch)
+{
+    int kind;
+
+    memset(search, 0, sizeof(GFSearch));
+
+    if(batch < 0) {
+        PyErr_SetString(PyExc_ValueError, "batch must not be negative");
+        return 0;
+    }
+
+    search->batch = batch;
+
+    if(!batch) {
+        return 1;
+    }
+
+    /* the epochs and results of a batch for each kind of request */
+    search->storage = PyMem_Malloc(GF_KINDS * 2 * (batch + 1) * sizeof(double));
+
+    if(!search->storage) {
+        PyErr_NoMemory();
+        return 0;
+    }
+
+    for(kind = 0; kind < GF_KINDS; ++ kind) {
+        search->caches[kind].ets = search->storage + kind * 2 * (batch + 1);
+        search->caches[kind].values = search->caches[kind].ets + batch + 1;
+    }
+
+    return 1;
+}
+
+static void free_search(GFSearch *search)
+{
+    if(search->storage) {
+        PyMem_Free(search->storage);
+    }
+
+    Py_XDECREF(search->exc_type);
+    Py_XDECREF(search->exc_value);
+    Py_XDECREF(search->exc_traceback);
+}
+
+/**
+ * Stop the search after a callable failed.  The Python exception is kept
+ * so it can be raised once CSPICE has returned; the SPICE error is not
+ * reported, as it is never seen.
+ */
+static void signal_python_error(GFSearch *search)
+{
+    PyErr_Fetch(&search->exc_type, &search->exc_value, &search->exc_traceback);
+
+    errprt_c("GET", STRING_LEN, search->report);
+    errprt_c("SET", 0, "NONE");
+
+    setmsg_c("A Python callback of the search raised an exception.");
+    sigerr_c("SPICE(PYTHONERROR)");
+}
+
+/**
+ * Finish a call that ran callbacks, and let go of the SPICE lock.
+ * Returns 0 with the Python exception set if the search couldn't start
+ * because another is in progress, or if a callable or CSPICE failed.
+ */
+static int finish_search(GFSearch *search, int nested)
+{
+    char failed = 0;
+
+    if(nested) {
+        pyspice_release_lock();
+
+        PyErr_SetString(PyExc_RuntimeError, "a GF search is already in progress");
+        return 0;
+    }
+
+    if(search->exc_type) {
+        /* CSPICE ignores errprt until the error is reset */
+        reset_c();
+        errprt_c("SET", 0, search->report);
+        pyspice_release_lock();
+
+        PyErr_Restore(search->exc_type, search->exc_value, search->exc_traceback);
+        search->exc_type = search->exc_value = search->exc_traceback = NULL;
+
+        return 0;
+    }
+
+    PYSPICE_CHECK_FAILED;
+
+    return !failed;
+}
+
+/**
+ * Call func with one epoch; truth values are returned as 1.0 or 0.0
+ */
+static int call_one(PyObject *func, double et, int truth, double *value)
+{
+    PyObject *py_result = PyObject_CallFunction(func, "d", et);
+    int flag;
+
+    if(!py_result) {
+        return 0;
+    }
+
+    if(truth) {
+        flag = PyObject_IsTrue(py_result);
+        *value = flag;
+    } else {
+        *value = PyFloat_AsDouble(py_result);
+        flag = (*value == -1.0 && PyErr_Occurred()) ? -1 : 0;
+    }
+
+    Py_DECREF(py_result);
+
+    return flag >= 0;
+}
+
+/**
+ * Call func with a bytearray of count epochs; it returns count results
+ */
+static int call_many(PyObject *func, double *ets, Py_ssize_t count, double *values)
+{
+    PyObject *py_ets = NULL, *py_result = NULL;
+    PySpiceArray result;
+    double *data;
+
+    if(!(py_ets = get_py_double_buffer(count, &data))) {
+        return 0;
+    }
+
+    memcpy(data, ets, count * sizeof(double));
+
+    py_result = PyObject_CallFunctionObjArgs(func, py_ets, NULL);
+    Py_DECREF(py_ets);
+
+    if(!py_result) {
+        return 0;
+    }
+
+    if(!get_spice_double_array(py_result, &result)) {
+        Py_DECREF(py_result);
+        return 0;
+    }
+
+    if(result.count != count) {
+        PyErr_Format(PyExc_ValueError, "callback returned %zd values for %zd epochs",
+                     result.count, count);
+    } else {
+        memcpy(values, result.data, count * sizeof(double));
+    }
+
+    release_spice_array(&result);
+    Py_DECREF(py_result);
+
+    return !PyErr_Occurred();
+}
+
+static int cache_lookup(GFCache *cache, double et, double *value)
+{
+    Py_ssize_t i;
+
+    for(i = 0; i < cache->count; ++ i) {
+        if(cache->ets[i] == et) {
+            *value = cache->values[i];
+            return 1;
+        }
+    }
+
+    for(i = 0; i < cache->nrecent; ++ i) {
+        if(cache->recent_ets[i] == et) {
+            *value = cache->recent_values[i];
+            return 1;
+        }
+    }
+
+    return 0;
+}
+
+/**
+ * Fill ets with the walk from et: et, et + step, ... up to batch epochs,
+ * ending with the right end of the confinement interval holding et.
+ * Returns the number of epochs, or 1 without touching ets when GF isn't
+ * walking.
+ */
+static Py_ssize_t walk(GFSearch *search, GFCache *cache, double et, double *ets)
+{
+    SpiceDouble *bounds = search->cnfine->data;
+    SpiceInt i, card = search->cnfine->card;
+    Py_ssize_t count;
+    double end;
+
+    if(search->batch < 2 ||
+       (!(cache->has_last && cache->last + search->step == et) &&
+        !(cache->has_walked && cache->walked + search->step == et))) {
+        return 1;
+    }
+
+    for(i = 0; i + 1 < card; i += 2) {
+        if(bounds[i] <= et && et < bounds[i + 1]) {
+            break;
+        }
+    }
+
+    if(i + 1 >= card) {
+        return 1;
+    }
+
+    end = bounds[i + 1];
+    ets[0] = et;
+
+    for(count = 1; count < search->batch; ++ count) {
+        et = ets[count - 1] + search->step;
+
+        if(et >= end) {
+            ets[count ++] = end;
+            break;
+        }
+
+        ets[count] = et;
+    }
+
+    return count;
+}
+
+/**
+ * Evaluate kind at et in batch mode, from the cache when it can be
+ */
+static int evaluate(GFSearch *search, int kind, double et, double *value)
+{
+    GFCache *cache = &search->caches[kind];
+    double *ets, *values, *shifted;
+    Py_ssize_t i, count;
+    int status;
+
+    if(cache_lookup(cache, et, value)) {
+        return 1;
+    }
+
+    /* batches overwrite the last one; single epochs go to recent */
+    ets = cache->ets;
+    values = cache->values;
+    count = walk(search, cache, et, ets);
+
+    if(count == 1) {
+        ets = &cache->recent_ets[cache->next_recent];
+        values = &cache->recent_values[cache->next_recent];
+        *ets = et;
+    } else {
+        cache->count = 0;
+    }
+
+    if(kind == GF_VALUE) {
+        status = call_many(search->udfuns, ets, count, values);
+    } else if(kind == GF_BOOL) {
+        status = call_many(search->udfunb, ets, count, values);
+    } else if(search->udqdec) {
+        status = call_many(search->udqdec, ets, count, values);
+    } else {
+        /* the derivatives the way uddc takes them, all in one call */
+        if(!(shifted = PyMem_Malloc(4 * count * sizeof(double)))) {
+            PyErr_NoMemory();
+            return 0;
+        }
+
+        for(i = 0; i < count; ++ i) {
+            shifted[i] = ets[i] - search->dt;
+            shifted[count + i] = ets[i] + search->dt;
+        }
+
+        status = call_many(search->udfuns, shifted, 2 * count, shifted + 2 * count);
+
+        for(i = 0; status && i < count; ++ i) {
+            values[i] = (shifted[3 * count + i] - shifted[2 * count + i]) / (2.0 * search->dt) < 0.0;
+        }
+
+        PyMem_Free(shifted);
+    }
+
+    if(!status) {
+        return 0;
+    }
+
+    if(count == 1) {
+        cache->next_recent = (cache->next_recent + 1) % GF_RECENT;
+
+        if(cache->nrecent < GF_RECENT) {
+            ++ cache->nrecent;
+        }
+
+        cache->last = et;
+        cache->has_last = 1;
+    } else {
+        cache->count = count;
+        cache->walked = ets[count - 1];
+        cache->has_walked = 1;
+    }
+
+    *value = values[0];
+
+    return 1;
+}
+
+static void gf_udfuns(SpiceDouble et, SpiceDouble *value)
+{
+    PyGILState_STATE gil;
+
+    *value = 0.0;
+
+    if(failed_c()) {
+        return;
+    }
+
+    gil = PyGILState_Ensure();
+
+    if(!(current->batch ? evaluate(current, GF_VALUE, et, value) :
+         call_one(current->udfuns, et, 0, value))) {
+        signal_python_error(current);
+    }
+
+    PyGILState_Release(gil);
+}
+
+static void gf_udqdec(void (*udfuns)(SpiceDouble et, SpiceDouble *value),
+                      SpiceDouble et, SpiceBoolean *isdecr)
+{
+    PyGILState_STATE gil;
+    double value = 0.0;
+
+    *isdecr = SPICEFALSE;
+
+    if(failed_c()) {
+        return;
+    }
+
+    if(!current->batch && !current->udqdec) {
+        uddc_c(udfuns, et, current->dt, isdecr);
+        return;
+    }
+
+    gil = PyGILState_Ensure();
+
+    if(!(current->batch ? evaluate(current, GF_DECR, et, &value) :
+         call_one(current->udqdec, et, 1, &value))) {
+        signal_python_error(current);
+    }
+
+    PyGILState_Release(gil);
+
+    *isdecr = value != 0.0;
+}
+
+static void gf_udfunb(void (*udfuns)(SpiceDouble et, SpiceDouble *value),
+                      SpiceDouble et, SpiceBoolean *xbool)
+{
+    PyGILState_STATE gil;
+    double value = 0.0;
+
+    *xbool = SPICEFALSE;
+
+    if(failed_c()) {
+        return;
+    }
+
+    gil = PyGILState_Ensure();
+
+    if(!(current->batch ? evaluate(current, GF_BOOL, et, &value) :
+         call_one(current->udfunb, et, 1, &value))) {
+        signal_python_error(current);
+    }
+
+    PyGILState_Release(gil);
+
+    *xbool = value != 0.0;
+}
+
+/* gfudb needs a udfuns to hand to udfunb, which doesn't use it */
+static void gf_no_udfuns(SpiceDouble et, SpiceDouble *value)
+{
+    *value = 0.0;
+}
+
+static int check_callable(PyObject *func, const char *name)
+{
+    if(!PyCallable_Check(func)) {
+        PyErr_Format(PyExc_TypeError, "%s must be callable", name);
+        return 0;
+    }
+
+    return 1;
+}
+
+char gfuds_doc[] = "_gfuds(udfuns, udqdec, relate, refval, adjust, step, nintvls, cnfine, result, batch, dt) -> result\n\n"
+    "gfuds with Python callables; udqdec may be None to take derivatives\n"
+    "with uddc and dt.  With batch > 0 the callables take bytearrays of\n"
+    "epochs; see spice.gf.";
+
+PyObject * spice_gfuds(PyObject *self, PyObject *args)
+{
+    PyObject *py_udfuns = NULL, *py_udqdec = NULL, *py_cnfine = NULL, *py_result = NULL;
+    SpiceCell *cnfine, *result;
+    GFSearch search;
+    char *relate = NULL;
+    double refval, adjust, step, dt;
+    int nintvls, nested, status;
+    Py_ssize_t batch;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "OOsdddiOOnd", &py_udfuns, &py_udqdec,
+                                                 &relate, &refval, &adjust, &step, &nintvls,
+                                                 &py_cnfine, &py_result, &batch, &dt));
+    PYSPICE_CHECK_RETURN_STATUS(check_callable(py_udfuns, "udfuns"));
+    PYSPICE_CHECK_RETURN_STATUS(py_udqdec == Py_None || check_callable(py_udqdec, "udqdec"));
+    PYSPICE_CHECK_RETURN_STATUS(cnfine = get_spice_cell(py_cnfine));
+    PYSPICE_CHECK_RETURN_STATUS(result = get_spice_cell(py_result));
+    PYSPICE_CHECK_RETURN_STATUS(new_search(&search, batch));
+
+    search.udfuns = py_udfuns;
+    search.udqdec = py_udqdec == Py_None ? NULL : py_udqdec;
+    search.step = step;
+    search.dt = dt;
+    search.cnfine = cnfine;
+
+    PYSPICE_BEGIN_CALL;
+
+    /* GF keeps the state of a search in CSPICE, so a callback can't start
+       another one */
+    if(!(nested = searching)) {
+        searching = 1;
+        current = &search;
+
+        gfuds_c(gf_udfuns, gf_udqdec, relate, refval, adjust, step, nintvls, cnfine, result);
+
+        searching = 0;
+        current = NULL;
+    }
+
+    PYSPICE_END_CALL;
+
+    status = finish_search(&search, nested);
+    free_search(&search);
+
+    PYSPICE_CHECK_RETURN_STATUS(status);
+
+    Py_INCREF(py_result);
+    return py_result;
+}
+
+char gfudb_doc[] = "_gfudb(udfunb, step, cnfine, result, batch) -> result\n\n"
+    "gfudb with a Python callable taking the epoch.  With batch > 0 it\n"
+    "takes bytearrays of epochs; see spice.gf.";
+
+PyObject * spice_gfudb(PyObject *self, PyObject *args)
+{
+    PyObject *py_udfunb = NULL, *py_cnfine = NULL, *py_result = NULL;
+    SpiceCell *cnfine, *result;
+    GFSearch search;
+    double step;
+    int nested, status;
+    Py_ssize_t batch;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "OdOOn", &py_udfunb, &step,
+                                                 &py_cnfine, &py_result, &batch));
+    PYSPICE_CHECK_RETURN_STATUS(check_callable(py_udfunb, "udfunb"));
+    PYSPICE_CHECK_RETURN_STATUS(cnfine = get_spice_cell(py_cnfine));
+    PYSPICE_CHECK_RETURN_STATUS(result = get_spice_cell(py_result));
+    PYSPICE_CHECK_RETURN_STATUS(new_search(&search, batch));
+
+    search.udfunb = py_udfunb;
+    search.step = step;
+    search.cnfine = cnfine;
+
+    PYSPICE_BEGIN_CALL;
+
+    if(!(nested = searching)) {
+        searching = 1;
+        current = &search;
+
+        gfudb_c(gf_no_udfuns, gf_udfunb, step, cnfine, result);
+
+        searching = 0;
+        current = NULL;
+    }
+
+    PYSPICE_END_CALL;
+
+    status = finish_search(&search, nested);
+    free_search(&search);
+
+    PYSPICE_CHECK_RETURN_STATUS(status);
+
+    Py_INCREF(py_result);
+    return py_result;
+}
+
+/**
+ * uddf and uddc call udfunc one epoch at a time; they may be used from
+ * the callbacks of a search, so the search in progress is put back after
+ */
+static PyObject * derivative(PyObject *args, int compare)
+{
+    PyObject *py_udfunc = NULL, *py_out = NULL;
+    GFSearch search, *outer;
+    double x, dx;
+    SpiceDouble deriv;
+    SpiceBoolean isdecr;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "Odd", &py_udfunc, &x, &dx));
+    PYSPICE_CHECK_RETURN_STATUS(check_callable(py_udfunc, "udfunc"));
+
+    new_search(&search, 0);
+    search.udfuns = py_udfunc;
+
+    PYSPICE_BEGIN_CALL;
+
+    outer = current;
+    current = &search;
+
+    if(compare) {
+        uddc_c(gf_udfuns, x, dx, &isdecr);
+    } else {
+        uddf_c(gf_udfuns, x, dx, &deriv);
+    }
+
+    current = outer;
+
+    PYSPICE_END_CALL;
+
+    if(finish_search(&search, 0)) {
+        py_out = compare ? get_py_boolean(&isdecr) : PyFloat_FromDouble(deriv);
+    }
+
+    free_search(&search);
+
+    return py_out;
+}
+
+char uddf_doc[] = "_uddf(udfunc, x, dx) -> deriv\n\n"
+    "uddf with a Python callable; see spice.gf.";
+
+PyObject * spice_uddf(PyObject *self, PyObject *args)
+{
+    return derivative(args, 0);
+}
+
+char uddc_doc[] = "_uddc(udfunc, x, dx) -> isdecr\n\n"
+    "uddc with a Python callable; see spice.gf.";
+
+PyObject * spice_uddc(PyObject *self, PyObject *args)
+{
+    return derivative(args, 1);
+}
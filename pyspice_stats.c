@@ -0,0 +1,318 @@
+/**
+ * PySPICE instrumentation
+ *
+ * While instrumentation is on, the stub in front of each generated
+ * wrapper counts its calls and errors and times them, all told and in
+ * CSPICE; the rest of a call's time goes to parsing the arguments and
+ * building the result.  The CSPICE time is kept per thread, as calls in
+ * different threads overlap while they wait for the SPICE lock, and the
+ * wait isn't counted.  The counts are only updated holding the GIL.
+ *
+ * A wrapper called by a GF callback runs its CSPICE calls inside those of
+ * the search, so they are counted in both, as is the Python code of the
+ * callbacks.  The batch and window functions have stubs too, below; the
+ * other hand-written functions have none.
+ *
+ * While a tracer is set, the stubs also call its enter(name, args) method
+ * before each call, and its leave(token, result, error, seconds,
+ * spice_seconds) method after it, with what enter returned, the result or
+ * None and the exception raised or None.  The calls the tracer makes
+ * itself aren't traced, and an exception it raises is reported as
+ * unraisable, so the traced call goes on as if there were no tracer.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+
+#include <time.h>
+
+int pyspice_instrumented = 0;
+
+static PyObject *tracer = NULL;
+
+/* the batch and window functions, counted like the generated ones */
+static PySpiceStats extra_stats[] = {
+    {"_spkezr_batch"},
+    {"_spkpos_batch"},
+    {"_str2et_batch"},
+    {"_utc2et_batch"},
+    {"_et2utc_batch"},
+    {"_timout_batch"},
+    {"_pxform_batch"},
+    {"_sxform_batch"},
+    {"_wncombine"},
+    {"_wnreduce"},
+    {"_wnadjust"},
+    {"_wncontains"},
+    {NULL},
+};
+
+static PySpiceStats *tables[] = {pyspice_stats, extra_stats, NULL};
+
+#define EXTRA_COUNTED(name, index)                                      \
+  PyObject * spice_##name##_counted(PyObject *self, PyObject *args)     \
+  {                                                                     \
+    if(!pyspice_instrumented) {                                         \
+      return spice_##name(self, args);                                  \
+    }                                                                   \
+                                                                        \
+    return pyspice_counted_call(&extra_stats[index], spice_##name, self, args); \
+  }
+
+EXTRA_COUNTED(spkezr_batch, 0)
+EXTRA_COUNTED(spkpos_batch, 1)
+EXTRA_COUNTED(str2et_batch, 2)
+EXTRA_COUNTED(utc2et_batch, 3)
+EXTRA_COUNTED(et2utc_batch, 4)
+EXTRA_COUNTED(timout_batch, 5)
+EXTRA_COUNTED(pxform_batch, 6)
+EXTRA_COUNTED(sxform_batch, 7)
+EXTRA_COUNTED(wncombine, 8)
+EXTRA_COUNTED(wnreduce, 9)
+EXTRA_COUNTED(wnadjust, 10)
+EXTRA_COUNTED(wncontains, 11)
+
+/* set while the thread runs the tracer */
+static PYSPICE_THREAD_LOCAL int in_tracer = 0;
+
+/* how many CSPICE sections the thread is in */
+PYSPICE_THREAD_LOCAL int pyspice_section_depth = 0;
+
+/* the thread's time in CSPICE so far, and when it was last brought up to date */
+static PYSPICE_THREAD_LOCAL double spice_seconds = 0.0;
+static PYSPICE_THREAD_LOCAL double spice_mark = 0.0;
+
+static double now(void)
+{
+    struct timespec ts;
+
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+
+    return ts.tv_sec + 1e-9 * ts.tv_nsec;
+}
+
+/* Called holding the SPICE lock at the start of a CSPICE section */
+void pyspice_enter_section(void)
+{
+    double t = now();
+
+    if(pyspice_section_depth) {
+        spice_seconds += t - spice_mark;
+    }
+
+    spice_mark = t;
+    ++ pyspice_section_depth;
+}
+
+/**
+ * Called holding the SPICE lock at the end of a CSPICE section.  It is
+ * called whenever the section was entered, even if instrumentation was
+ * turned off meanwhile.
+ */
+void pyspice_leave_section(void)
+{
+    double t = now();
+
+    spice_seconds += t - spice_mark;
+    spice_mark = t;
+    -- pyspice_section_depth;
+}
+
+/* Hand a call that is done to the tracer, keeping any exception it raised */
+static void trace_leave(PyObject *call_tracer, PyObject *token, PyObject *result,
+                        double elapsed, double spice_elapsed)
+{
+    PyObject *exc_type = NULL, *exc_value = NULL, *exc_traceback = NULL;
+    PyObject *done = NULL;
+
+    PyErr_Fetch(&exc_type, &exc_value, &exc_traceback);
+
+    if(!result) {
+        PyErr_NormalizeException(&exc_type, &exc_value, &exc_traceback);
+    }
+
+    in_tracer = 1;
+    done = PyObject_CallMethod(call_tracer, "leave", "OOOdd", token, result ? result : Py_None,
+                               exc_value ? exc_value : Py_None, elapsed, spice_elapsed);
+    in_tracer = 0;
+
+    if(!done) {
+        PyErr_WriteUnraisable(call_tracer);
+    }
+
+    Py_XDECREF(done);
+    PyErr_Restore(exc_type, exc_value, exc_traceback);
+}
+
+PyObject * pyspice_counted_call(PySpiceStats *stats, PyCFunction function,
+                                PyObject *self, PyObject *args)
+{
+    PyObject *call_tracer = NULL;
+    PyObject *token = NULL;
+    PyObject *result = NULL;
+    double spice_start, start, elapsed;
+
+    if((pyspice_instrumented & PYSPICE_TRACING) && !in_tracer) {
+        call_tracer = tracer;
+        Py_INCREF(call_tracer);
+
+        in_tracer = 1;
+        token = PyObject_CallMethod(call_tracer, "enter", "sO", stats->name, args);
+        in_tracer = 0;
+
+        if(!token) {
+            PyErr_WriteUnraisable(call_tracer);
+        }
+    }
+
+    spice_start = spice_seconds;
+    start = now();
+    result = function(self, args);
+    elapsed = now() - start;
+
+    if(pyspice_instrumented & PYSPICE_COUNTING) {
+        ++ stats->calls;
+        stats->seconds += elapsed;
+        stats->spice_seconds += spice_seconds - spice_start;
+
+        if(elapsed > stats->max_seconds) {
+            stats->max_seconds = elapsed;
+        }
+
+        if(!result) {
+            ++ stats->errors;
+        }
+    }
+
+    /* unless the tracer was removed meanwhile */
+    if(token && call_tracer == tracer) {
+        trace_leave(call_tracer, token, result, elapsed, spice_seconds - spice_start);
+    }
+
+    Py_XDECREF(token);
+    Py_XDECREF(call_tracer);
+
+    return result;
+}
+
+char set_instrumentation_doc[] = "_set_instrumentation(enabled)\n\n"
+    "Count and time the calls of the wrappers from now on, or stop; see\n"
+    "spice.instrument.set_instrumentation.";
+
+PyObject * spice_set_instrumentation(PyObject *self, PyObject *args)
+{
+    PyObject *enabled = NULL;
+    int status;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O", &enabled));
+
+    status = PyObject_IsTrue(enabled);
+    PYSPICE_CHECK_RETURN_STATUS(status >= 0);
+
+    if(status) {
+        pyspice_instrumented |= PYSPICE_COUNTING;
+    } else {
+        pyspice_instrumented &= ~PYSPICE_COUNTING;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+char get_instrumentation_doc[] = "_get_instrumentation() -> bool";
+
+PyObject * spice_get_instrumentation(PyObject *self, PyObject *unused)
+{
+    return PyBool_FromLong(pyspice_instrumented & PYSPICE_COUNTING);
+}
+
+char set_tracer_doc[] = "_set_tracer(tracer)\n\n"
+    "Hand the calls of the wrappers to tracer from now on, or stop when\n"
+    "it is None; see spice.trace.";
+
+PyObject * spice_set_tracer(PyObject *self, PyObject *args)
+{
+    PyObject *py_tracer = NULL;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "O", &py_tracer));
+
+    Py_CLEAR(tracer);
+
+    if(py_tracer != Py_None) {
+        Py_INCREF(py_tracer);
+        tracer = py_tracer;
+        pyspice_instrumented |= PYSPICE_TRACING;
+    } else {
+        pyspice_instrumented &= ~PYSPICE_TRACING;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+char get_tracer_doc[] = "_get_tracer() -> tracer or None";
+
+PyObject * spice_get_tracer(PyObject *self, PyObject *unused)
+{
+    PyObject *py_tracer = tracer ? tracer : Py_None;
+
+    Py_INCREF(py_tracer);
+    return py_tracer;
+}
+
+char stats_doc[] = "_stats() -> [(name, calls, errors, seconds, max_seconds, spice_seconds), ...]\n\n"
+    "The counts and times of the wrappers called since the last\n"
+    "_reset_stats().";
+
+PyObject * spice_stats(PyObject *self, PyObject *unused)
+{
+    PyObject *py_list = PyList_New(0);
+    PyObject *py_item = NULL;
+    PySpiceStats **table, *stats;
+
+    if(!py_list) {
+        return NULL;
+    }
+
+    for(table = tables; *table; ++ table) {
+        for(stats = *table; stats->name; ++ stats) {
+            if(!stats->calls) {
+                continue;
+            }
+
+            py_item = Py_BuildValue("skkddd", stats->name, stats->calls, stats->errors,
+                                    stats->seconds, stats->max_seconds, stats->spice_seconds);
+
+            if(!py_item || PyList_Append(py_list, py_item) < 0) {
+                Py_XDECREF(py_item);
+                Py_DECREF(py_list);
+                return NULL;
+            }
+
+            Py_DECREF(py_item);
+        }
+    }
+
+    return py_list;
+}
+
+char reset_stats_doc[] = "_reset_stats()\n\n"
+    "Set the counts and times of all the wrappers back to zero.";
+
+PyObject * spice_reset_stats(PyObject *self, PyObject *unused)
+{
+    PySpiceStats **table, *stats;
+
+    for(table = tables; *table; ++ table) {
+        for(stats = *table; stats->name; ++ stats) {
+            stats->calls = 0;
+            stats->errors = 0;
+            stats->seconds = 0.0;
+            stats->max_seconds = 0.0;
+            stats->spice_seconds = 0.0;
+        }
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
@@ -0,0 +1,1274 @@
+/**
+ * PySPICE structure types
+ *
+ * Extension types that embed the CSPICE structures SpiceEllipse,
+ * SpicePlane, SpiceEKAttDsc and SpiceEKSegSum, so that going between C and
+ * Python is a struct copy.  Ellipse and Plane export their vectors through
+ * the buffer protocol, their vector attributes are live views of the
+ * struct, and all four types pickle by value.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+#include <structmember.h>
+
+/* member type matching the width of a SpiceInt */
+#define T_SPICEINT (sizeof(SpiceInt) == sizeof(long) ? T_LONG : T_INT)
+
+#define EK_TABNAM_LEN ((Py_ssize_t)sizeof(((SpiceEKSegSum *)0)->tabnam))
+#define EK_CNAME_LEN ((Py_ssize_t)sizeof(((SpiceEKSegSum *)0)->cnames[0]))
+#define EK_MAX_COLS ((Py_ssize_t)(sizeof(((SpiceEKSegSum *)0)->cdescrs) / sizeof(SpiceEKAttDsc)))
+
+static PyObject * get_double_list(double *array, Py_ssize_t count)
+{
+    Py_ssize_t i;
+    PyObject *item = NULL, *list = PyList_New(count);
+
+    for(i = 0; list && i < count; ++ i) {
+        if(!(item = PyFloat_FromDouble(array[i]))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SET_ITEM(list, i, item);
+    }
+
+    return list;
+}
+
+/**
+ * Set a vector of three doubles from a buffer or a sequence
+ */
+static int set_vector(double *vector, PyObject *value, const char *name)
+{
+    if(!value) {
+        PyErr_Format(PyExc_TypeError, "cannot delete %s", name);
+        return -1;
+    }
+
+    return get_spice_fixed_array(value, 'd', vector, 3, 0, 0) ? 0 : -1;
+}
+
+/**
+ * Fill in a writable buffer view over ndim dimensions of doubles held in
+ * an object
+ */
+static int get_double_view(PyObject *obj, double *data, int ndim,
+                           Py_ssize_t *shape, Py_ssize_t *strides,
+                           Py_buffer *view, int flags)
+{
+    int i;
+
+    view->obj = obj;
+    view->buf = data;
+    view->len = sizeof(double);
+    view->readonly = 0;
+    view->itemsize = sizeof(double);
+    view->format = (flags & PyBUF_FORMAT) ? "d" : NULL;
+    view->ndim = ndim;
+    view->shape = (flags & PyBUF_ND) ? shape : NULL;
+    view->strides = (flags & PyBUF_STRIDES) ? strides : NULL;
+    view->suboffsets = NULL;
+    view->internal = NULL;
+
+    for(i = 0; i < ndim; ++ i) {
+        view->len *= shape[i];
+    }
+
+    Py_INCREF(obj);
+
+    return 0;
+}
+
+/*
+ * Old style buffer interface for Ellipse and Plane, for the Python 2 code
+ * (numpy.frombuffer, struct.unpack_from, ...) that still goes through it
+ */
+static Py_ssize_t get_vector_block(PyObject *self, void **ptr)
+{
+    if(PyObject_TypeCheck(self, &PySpiceEllipse_Type)) {
+        *ptr = ((PySpiceEllipse *)self)->ellipse.center;
+        return 9 * sizeof(double);
+    }
+
+    *ptr = ((PySpicePlane *)self)->plane.normal;
+    return 3 * sizeof(double);
+}
+
+static Py_ssize_t vector_getbuffer(PyObject *self, Py_ssize_t segment, void **ptr)
+{
+    if(segment != 0) {
+        PyErr_SetString(PyExc_SystemError, "accessing non-existent buffer segment");
+        return -1;
+    }
+
+    return get_vector_block(self, ptr);
+}
+
+static Py_ssize_t vector_getsegcount(PyObject *self, Py_ssize_t *lenp)
+{
+    void *ptr;
+
+    if(lenp) {
+        *lenp = get_vector_block(self, &ptr);
+    }
+
+    return 1;
+}
+
+/**
+ * Return the result of comparing two objects of the same type for op,
+ * given whether the structures they hold are equal field by field
+ */
+static PyObject * compare_result(int equal, int op)
+{
+    if(op != Py_EQ && op != Py_NE) {
+        Py_INCREF(Py_NotImplemented);
+        return Py_NotImplemented;
+    }
+
+    return PyBool_FromLong(op == Py_EQ ? equal : !equal);
+}
+
+static int equal_vectors(double *a, double *b)
+{
+    return a[0] == b[0] && a[1] == b[1] && a[2] == b[2];
+}
+
+static int equal_attdscs(SpiceEKAttDsc *a, SpiceEKAttDsc *b)
+{
+    return a->cclass == b->cclass && a->dtype == b->dtype && a->strlen == b->strlen &&
+           a->size == b->size && a->indexd == b->indexd && a->nullok == b->nullok;
+}
+
+/**
+ * Hash by identity, as the Python classes the structure types replace
+ * did; equal structures may hash differently
+ */
+static long identity_hash(PyObject *self)
+{
+    return _Py_HashPointer(self);
+}
+
+/* VectorView, the vectors of Ellipse and Plane */
+
+static Py_ssize_t vectorview_length(PySpiceVectorView *self)
+{
+    return 3;
+}
+
+static PyObject * vectorview_item(PySpiceVectorView *self, Py_ssize_t i)
+{
+    if(i < 0 || i >= 3) {
+        PyErr_SetString(PyExc_IndexError, "vector index out of range");
+        return NULL;
+    }
+
+    return PyFloat_FromDouble(self->data[i]);
+}
+
+static int vectorview_ass_item(PySpiceVectorView *self, Py_ssize_t i, PyObject *value)
+{
+    double double_value;
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "vector items cannot be deleted");
+        return -1;
+    }
+
+    if(i < 0 || i >= 3) {
+        PyErr_SetString(PyExc_IndexError, "vector index out of range");
+        return -1;
+    }
+
+    double_value = PyFloat_AsDouble(value);
+
+    if(double_value == -1.0 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    self->data[i] = double_value;
+    return 0;
+}
+
+/**
+ * Compare as a list, so that ellipse.center == [1.0, 2.0, 3.0] works
+ */
+static PyObject * vectorview_richcompare(PyObject *a, PyObject *b, int op)
+{
+    PyObject *list_a = NULL, *list_b = NULL, *result = NULL;
+
+    list_a = PyObject_TypeCheck(a, &PySpiceVectorView_Type) ?
+        get_double_list(((PySpiceVectorView *)a)->data, 3) : (Py_INCREF(a), a);
+    list_b = PyObject_TypeCheck(b, &PySpiceVectorView_Type) ?
+        get_double_list(((PySpiceVectorView *)b)->data, 3) : (Py_INCREF(b), b);
+
+    if(list_a && list_b) {
+        result = PyObject_RichCompare(list_a, list_b, op);
+    }
+
+    Py_XDECREF(list_a);
+    Py_XDECREF(list_b);
+
+    return result;
+}
+
+static PyObject * vectorview_repr(PySpiceVectorView *self)
+{
+    PyObject *list = get_double_list(self->data, 3);
+    PyObject *result = NULL;
+
+    if(list) {
+        result = PyObject_Repr(list);
+        Py_DECREF(list);
+    }
+
+    return result;
+}
+
+static void vectorview_dealloc(PySpiceVectorView *self)
+{
+    Py_XDECREF(self->owner);
+    PyObject_Del(self);
+}
+
+static int vectorview_getbuffer(PySpiceVectorView *self, Py_buffer *view, int flags)
+{
+    static Py_ssize_t shape[1] = {3};
+    static Py_ssize_t strides[1] = {sizeof(double)};
+
+    return get_double_view((PyObject *)self, self->data, 1, shape, strides, view, flags);
+}
+
+static Py_ssize_t vectorview_getreadbuffer(PySpiceVectorView *self, Py_ssize_t segment, void **ptr)
+{
+    if(segment != 0) {
+        PyErr_SetString(PyExc_SystemError, "accessing non-existent buffer segment");
+        return -1;
+    }
+
+    *ptr = self->data;
+    return 3 * sizeof(double);
+}
+
+static Py_ssize_t vectorview_getsegcount(PySpiceVectorView *self, Py_ssize_t *lenp)
+{
+    if(lenp) {
+        *lenp = 3 * sizeof(double);
+    }
+
+    return 1;
+}
+
+static PyObject * vectorview_subscript(PySpiceVectorView *self, PyObject *key)
+{
+    Py_ssize_t i, start, stop, step, count;
+    PyObject *item = NULL, *list = NULL;
+
+    if(PyIndex_Check(key)) {
+        if((i = PyNumber_AsSsize_t(key, PyExc_IndexError)) == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+
+        return vectorview_item(self, i < 0 ? i + 3 : i);
+    }
+
+    if(!PySlice_Check(key)) {
+        PyErr_Format(PyExc_TypeError, "vector indices must be integers or slices, not %.200s",
+                     Py_TYPE(key)->tp_name);
+        return NULL;
+    }
+
+    if(PySlice_GetIndicesEx((PySliceObject *)key, 3, &start, &stop, &step, &count) < 0) {
+        return NULL;
+    }
+
+    list = PyList_New(count);
+
+    for(i = 0; list && i < count; ++ i) {
+        if(!(item = PyFloat_FromDouble(self->data[start + i * step]))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SET_ITEM(list, i, item);
+    }
+
+    return list;
+}
+
+static int vectorview_ass_subscript(PySpiceVectorView *self, PyObject *key, PyObject *value)
+{
+    Py_ssize_t i, start, stop, step, count;
+    double values[3];
+
+    if(PyIndex_Check(key)) {
+        if((i = PyNumber_AsSsize_t(key, PyExc_IndexError)) == -1 && PyErr_Occurred()) {
+            return -1;
+        }
+
+        return vectorview_ass_item(self, i < 0 ? i + 3 : i, value);
+    }
+
+    if(!PySlice_Check(key)) {
+        PyErr_Format(PyExc_TypeError, "vector indices must be integers or slices, not %.200s",
+                     Py_TYPE(key)->tp_name);
+        return -1;
+    }
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "vector items cannot be deleted");
+        return -1;
+    }
+
+    if(PySlice_GetIndicesEx((PySliceObject *)key, 3, &start, &stop, &step, &count) < 0) {
+        return -1;
+    }
+
+    /* the vector keeps its length, so the values must fill the slice */
+    if(count && !get_spice_fixed_array(value, 'd', values, count, 0, 0)) {
+        return -1;
+    }
+
+    for(i = 0; i < count; ++ i) {
+        self->data[start + i * step] = values[i];
+    }
+
+    return 0;
+}
+
+static PySequenceMethods vectorview_as_sequence = {
+    (lenfunc)vectorview_length,               /* sq_length */
+    0,                                        /* sq_concat */
+    0,                                        /* sq_repeat */
+    (ssizeargfunc)vectorview_item,            /* sq_item */
+    0,                                        /* sq_slice */
+    (ssizeobjargproc)vectorview_ass_item,     /* sq_ass_item */
+};
+
+static PyMappingMethods vectorview_as_mapping = {
+    (lenfunc)vectorview_length,               /* mp_length */
+    (binaryfunc)vectorview_subscript,         /* mp_subscript */
+    (objobjargproc)vectorview_ass_subscript,  /* mp_ass_subscript */
+};
+
+static PyBufferProcs vectorview_as_buffer = {
+    (readbufferproc)vectorview_getreadbuffer,
+    (writebufferproc)vectorview_getreadbuffer,
+    (segcountproc)vectorview_getsegcount,
+    0,
+    (getbufferproc)vectorview_getbuffer,
+    0,
+};
+
+PyTypeObject PySpiceVectorView_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.VectorView",                      /* tp_name */
+    sizeof(PySpiceVectorView),                /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    (destructor)vectorview_dealloc,           /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    (reprfunc)vectorview_repr,                /* tp_repr */
+    0,                                        /* tp_as_number */
+    &vectorview_as_sequence,                  /* tp_as_sequence */
+    &vectorview_as_mapping,                   /* tp_as_mapping */
+    PyObject_HashNotImplemented,              /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    &vectorview_as_buffer,                    /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /* tp_flags */
+    "Live view of a vector of an Ellipse or a Plane", /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    vectorview_richcompare,                   /* tp_richcompare */
+};
+
+static PyObject * get_vectorview(PyObject *owner, double *data)
+{
+    PySpiceVectorView *view = PyObject_New(PySpiceVectorView, &PySpiceVectorView_Type);
+
+    if(view) {
+        Py_INCREF(owner);
+        view->owner = owner;
+        view->data = data;
+    }
+
+    return (PyObject *)view;
+}
+
+/* Ellipse */
+
+static PyObject * ellipse_get_vector(PySpiceEllipse *self, void *offset)
+{
+    return get_vectorview((PyObject *)self, (double *)((char *)&self->ellipse + (size_t)offset));
+}
+
+static int ellipse_set_vector(PySpiceEllipse *self, PyObject *value, void *offset)
+{
+    return set_vector((double *)((char *)&self->ellipse + (size_t)offset), value, "vector");
+}
+
+static PyGetSetDef ellipse_getset[] = {
+    {"center", (getter)ellipse_get_vector, (setter)ellipse_set_vector,
+     "center of the ellipse", (void *)offsetof(SpiceEllipse, center)},
+    {"semi_major", (getter)ellipse_get_vector, (setter)ellipse_set_vector,
+     "semi-major axis vector", (void *)offsetof(SpiceEllipse, semiMajor)},
+    {"semi_minor", (getter)ellipse_get_vector, (setter)ellipse_set_vector,
+     "semi-minor axis vector", (void *)offsetof(SpiceEllipse, semiMinor)},
+    {NULL}
+};
+
+static int ellipse_init(PySpiceEllipse *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"center", "semi_major", "semi_minor", NULL};
+    PyObject *vectors[3] = {NULL, NULL, NULL};
+    double *fields[3] = {self->ellipse.center, self->ellipse.semiMajor, self->ellipse.semiMinor};
+    int i;
+
+    if(!PyArg_ParseTupleAndKeywords(args, kwds, "|OOO", kwlist,
+                                    &vectors[0], &vectors[1], &vectors[2])) {
+        return -1;
+    }
+
+    for(i = 0; i < 3; ++ i) {
+        if(vectors[i] && vectors[i] != Py_None && set_vector(fields[i], vectors[i], kwlist[i]) < 0) {
+            return -1;
+        }
+    }
+
+    return 0;
+}
+
+static PyObject * ellipse_repr(PySpiceEllipse *self)
+{
+    PyObject *args = NULL, *format = NULL, *result = NULL;
+
+    args = Py_BuildValue("(NNN)", get_double_list(self->ellipse.center, 3),
+                         get_double_list(self->ellipse.semiMajor, 3),
+                         get_double_list(self->ellipse.semiMinor, 3));
+    format = PyString_FromString("<SpiceEllipse: center = %s, semi_major = %s, semi_minor = %s>");
+
+    if(args && format) {
+        result = PyString_Format(format, args);
+    }
+
+    Py_XDECREF(args);
+    Py_XDECREF(format);
+
+    return result;
+}
+
+static PyObject * ellipse_reduce(PySpiceEllipse *self)
+{
+    return Py_BuildValue("(O(NNN))", Py_TYPE(self),
+                         get_double_list(self->ellipse.center, 3),
+                         get_double_list(self->ellipse.semiMajor, 3),
+                         get_double_list(self->ellipse.semiMinor, 3));
+}
+
+static PyObject * ellipse_richcompare(PyObject *a, PyObject *b, int op)
+{
+    if(!PyObject_TypeCheck(a, &PySpiceEllipse_Type) || !PyObject_TypeCheck(b, &PySpiceEllipse_Type)) {
+        Py_INCREF(Py_NotImplemented);
+        return Py_NotImplemented;
+    }
+
+    return compare_result(equal_vectors(((PySpiceEllipse *)a)->ellipse.center,
+                                        ((PySpiceEllipse *)b)->ellipse.center) &&
+                          equal_vectors(((PySpiceEllipse *)a)->ellipse.semiMajor,
+                                        ((PySpiceEllipse *)b)->ellipse.semiMajor) &&
+                          equal_vectors(((PySpiceEllipse *)a)->ellipse.semiMinor,
+                                        ((PySpiceEllipse *)b)->ellipse.semiMinor), op);
+}
+
+static int ellipse_getbuffer(PySpiceEllipse *self, Py_buffer *view, int flags)
+{
+    static Py_ssize_t shape[2] = {3, 3};
+    static Py_ssize_t strides[2] = {3 * sizeof(double), sizeof(double)};
+
+    return get_double_view((PyObject *)self, self->ellipse.center, 2, shape, strides, view, flags);
+}
+
+static PyBufferProcs ellipse_as_buffer = {
+    (readbufferproc)vector_getbuffer,
+    (writebufferproc)vector_getbuffer,
+    (segcountproc)vector_getsegcount,
+    0,
+    (getbufferproc)ellipse_getbuffer,
+    0,
+};
+
+static PyMethodDef ellipse_methods[] = {
+    {"__reduce__", (PyCFunction)ellipse_reduce, METH_NOARGS, NULL},
+    {NULL}
+};
+
+PyTypeObject PySpiceEllipse_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.Ellipse",                         /* tp_name */
+    sizeof(PySpiceEllipse),                   /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    0,                                        /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    (reprfunc)ellipse_repr,                   /* tp_repr */
+    0,                                        /* tp_as_number */
+    0,                                        /* tp_as_sequence */
+    0,                                        /* tp_as_mapping */
+    (hashfunc)identity_hash,                  /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    &ellipse_as_buffer,                       /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /* tp_flags */
+    "Ellipse(center=None, semi_major=None, semi_minor=None)\n\n"
+    "The C struct SpiceEllipse.  The buffer interface gives the three\n"
+    "vectors as a 3x3 array of doubles, one row per vector.", /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    ellipse_richcompare,                      /* tp_richcompare */
+    0,                                        /* tp_weaklistoffset */
+    0,                                        /* tp_iter */
+    0,                                        /* tp_iternext */
+    ellipse_methods,                          /* tp_methods */
+    0,                                        /* tp_members */
+    ellipse_getset,                           /* tp_getset */
+    0,                                        /* tp_base */
+    0,                                        /* tp_dict */
+    0,                                        /* tp_descr_get */
+    0,                                        /* tp_descr_set */
+    0,                                        /* tp_dictoffset */
+    (initproc)ellipse_init,                   /* tp_init */
+    0,                                        /* tp_alloc */
+    PyType_GenericNew,                        /* tp_new */
+};
+
+/* Plane */
+
+static PyObject * plane_get_normal(PySpicePlane *self, void *closure)
+{
+    return get_vectorview((PyObject *)self, self->plane.normal);
+}
+
+static int plane_set_normal(PySpicePlane *self, PyObject *value, void *closure)
+{
+    return set_vector(self->plane.normal, value, "normal");
+}
+
+static PyGetSetDef plane_getset[] = {
+    {"normal", (getter)plane_get_normal, (setter)plane_set_normal,
+     "normal vector of the plane", NULL},
+    {NULL}
+};
+
+static PyMemberDef plane_members[] = {
+    {"constant", T_DOUBLE, offsetof(PySpicePlane, plane.constant), 0,
+     "plane constant"},
+    {NULL}
+};
+
+static int plane_init(PySpicePlane *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"normal", "constant", NULL};
+    PyObject *normal = NULL;
+
+    if(!PyArg_ParseTupleAndKeywords(args, kwds, "|Od", kwlist, &normal, &self->plane.constant)) {
+        return -1;
+    }
+
+    if(normal && normal != Py_None) {
+        return set_vector(self->plane.normal, normal, "normal");
+    }
+
+    return 0;
+}
+
+static PyObject * plane_str(PySpicePlane *self)
+{
+    PyObject *args = NULL, *format = NULL, *result = NULL;
+
+    args = Py_BuildValue("(NNNN)", PyFloat_FromDouble(self->plane.normal[0]),
+                         PyFloat_FromDouble(self->plane.normal[1]),
+                         PyFloat_FromDouble(self->plane.normal[2]),
+                         PyFloat_FromDouble(self->plane.constant));
+    format = PyString_FromString("<Plane: normal=%s, %s, %s; constant=%s>");
+
+    if(args && format) {
+        result = PyString_Format(format, args);
+    }
+
+    Py_XDECREF(args);
+    Py_XDECREF(format);
+
+    return result;
+}
+
+static PyObject * plane_reduce(PySpicePlane *self)
+{
+    return Py_BuildValue("(O(Nd))", Py_TYPE(self),
+                         get_double_list(self->plane.normal, 3), self->plane.constant);
+}
+
+static PyObject * plane_richcompare(PyObject *a, PyObject *b, int op)
+{
+    if(!PyObject_TypeCheck(a, &PySpicePlane_Type) || !PyObject_TypeCheck(b, &PySpicePlane_Type)) {
+        Py_INCREF(Py_NotImplemented);
+        return Py_NotImplemented;
+    }
+
+    return compare_result(equal_vectors(((PySpicePlane *)a)->plane.normal,
+                                        ((PySpicePlane *)b)->plane.normal) &&
+                          ((PySpicePlane *)a)->plane.constant == ((PySpicePlane *)b)->plane.constant, op);
+}
+
+static int plane_getbuffer(PySpicePlane *self, Py_buffer *view, int flags)
+{
+    static Py_ssize_t shape[1] = {3};
+    static Py_ssize_t strides[1] = {sizeof(double)};
+
+    return get_double_view((PyObject *)self, self->plane.normal, 1, shape, strides, view, flags);
+}
+
+static PyBufferProcs plane_as_buffer = {
+    (readbufferproc)vector_getbuffer,
+    (writebufferproc)vector_getbuffer,
+    (segcountproc)vector_getsegcount,
+    0,
+    (getbufferproc)plane_getbuffer,
+    0,
+};
+
+static PyMethodDef plane_methods[] = {
+    {"__reduce__", (PyCFunction)plane_reduce, METH_NOARGS, NULL},
+    {NULL}
+};
+
+PyTypeObject PySpicePlane_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.Plane",                           /* tp_name */
+    sizeof(PySpicePlane),                     /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    0,                                        /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    0,                                        /* tp_repr */
+    0,                                        /* tp_as_number */
+    0,                                        /* tp_as_sequence */
+    0,                                        /* tp_as_mapping */
+    (hashfunc)identity_hash,                  /* tp_hash */
+    0,                                        /* tp_call */
+    (reprfunc)plane_str,                      /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    &plane_as_buffer,                         /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /* tp_flags */
+    "Plane(normal=None, constant=0.0)\n\n"
+    "The C struct SpicePlane.  The buffer interface gives the normal\n"
+    "vector as an array of three doubles.",   /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    plane_richcompare,                        /* tp_richcompare */
+    0,                                        /* tp_weaklistoffset */
+    0,                                        /* tp_iter */
+    0,                                        /* tp_iternext */
+    plane_methods,                            /* tp_methods */
+    plane_members,                            /* tp_members */
+    plane_getset,                             /* tp_getset */
+    0,                                        /* tp_base */
+    0,                                        /* tp_dict */
+    0,                                        /* tp_descr_get */
+    0,                                        /* tp_descr_set */
+    0,                                        /* tp_dictoffset */
+    (initproc)plane_init,                     /* tp_init */
+    0,                                        /* tp_alloc */
+    PyType_GenericNew,                        /* tp_new */
+};
+
+/* EkAttDsc */
+
+static PyObject * ekattdsc_get_bool(PySpiceEkAttDsc *self, void *offset)
+{
+    return PyBool_FromLong(*(SpiceBoolean *)((char *)&self->attdsc + (size_t)offset));
+}
+
+static int ekattdsc_set_bool(PySpiceEkAttDsc *self, PyObject *value, void *offset)
+{
+    int truth;
+
+    if(!value) {
+        PyErr_SetString(PyExc_TypeError, "cannot delete attribute");
+        return -1;
+    }
+
+    if((truth = PyObject_IsTrue(value)) < 0) {
+        return -1;
+    }
+
+    *(SpiceBoolean *)((char *)&self->attdsc + (size_t)offset) = truth ? SPICETRUE : SPICEFALSE;
+
+    return 0;
+}
+
+static PyMemberDef ekattdsc_members[] = {
+    {"cclass", T_SPICEINT, offsetof(PySpiceEkAttDsc, attdsc.cclass), 0, "column class code"},
+    {"dtype", T_INT, offsetof(PySpiceEkAttDsc, attdsc.dtype), 0, "column data type code"},
+    {"strlen", T_SPICEINT, offsetof(PySpiceEkAttDsc, attdsc.strlen), 0, "string length"},
+    {"size", T_SPICEINT, offsetof(PySpiceEkAttDsc, attdsc.size), 0, "number of elements per entry"},
+    {NULL}
+};
+
+static PyGetSetDef ekattdsc_getset[] = {
+    {"indexd", (getter)ekattdsc_get_bool, (setter)ekattdsc_set_bool,
+     "whether the column is indexed", (void *)offsetof(SpiceEKAttDsc, indexd)},
+    {"nullok", (getter)ekattdsc_get_bool, (setter)ekattdsc_set_bool,
+     "whether null values are allowed", (void *)offsetof(SpiceEKAttDsc, nullok)},
+    {NULL}
+};
+
+static char *ekattdsc_fields[] = {"cclass", "dtype", "strlen", "size", "indexd", "nullok", NULL};
+
+/**
+ * Set the attributes named in fields from positional and keyword
+ * arguments, in order
+ */
+static int init_fields(PyObject *self, PyObject *args, PyObject *kwds, char **fields)
+{
+    PyObject *key = NULL, *value = NULL;
+    Py_ssize_t i, pos = 0, nargs = PyTuple_GET_SIZE(args), nfields = 0;
+
+    while(fields[nfields]) {
+        ++ nfields;
+    }
+
+    if(nargs > nfields) {
+        PyErr_Format(PyExc_TypeError, "%s() takes at most %zd arguments (%zd given)",
+                     Py_TYPE(self)->tp_name, nfields, nargs);
+        return -1;
+    }
+
+    for(i = 0; i < nargs; ++ i) {
+        if(PyObject_SetAttrString(self, fields[i], PyTuple_GET_ITEM(args, i)) < 0) {
+            return -1;
+        }
+    }
+
+    while(kwds && PyDict_Next(kwds, &pos, &key, &value)) {
+        for(i = 0; i < nfields; ++ i) {
+            if(PyString_Check(key) && strcmp(PyString_AS_STRING(key), fields[i]) == 0) {
+                break;
+            }
+        }
+
+        if(i == nfields || i < nargs) {
+            PyErr_Format(PyExc_TypeError, "%s() got an unexpected or repeated keyword argument",
+                         Py_TYPE(self)->tp_name);
+            return -1;
+        }
+
+        if(PyObject_SetAttr(self, key, value) < 0) {
+            return -1;
+        }
+    }
+
+    return 0;
+}
+
+/**
+ * Build the (type, args) pickle tuple from the attributes named in fields
+ */
+static PyObject * reduce_fields(PyObject *self, char **fields)
+{
+    PyObject *args = NULL, *value = NULL;
+    Py_ssize_t i, nfields = 0;
+
+    while(fields[nfields]) {
+        ++ nfields;
+    }
+
+    if(!(args = PyTuple_New(nfields))) {
+        return NULL;
+    }
+
+    for(i = 0; i < nfields; ++ i) {
+        if(!(value = PyObject_GetAttrString(self, fields[i]))) {
+            Py_DECREF(args);
+            return NULL;
+        }
+
+        PyTuple_SET_ITEM(args, i, value);
+    }
+
+    return Py_BuildValue("(ON)", Py_TYPE(self), args);
+}
+
+static int ekattdsc_init(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    return init_fields(self, args, kwds, ekattdsc_fields);
+}
+
+static PyObject * ekattdsc_reduce(PyObject *self)
+{
+    return reduce_fields(self, ekattdsc_fields);
+}
+
+static PyObject * ekattdsc_richcompare(PyObject *a, PyObject *b, int op)
+{
+    if(!PyObject_TypeCheck(a, &PySpiceEkAttDsc_Type) || !PyObject_TypeCheck(b, &PySpiceEkAttDsc_Type)) {
+        Py_INCREF(Py_NotImplemented);
+        return Py_NotImplemented;
+    }
+
+    return compare_result(equal_attdscs(&((PySpiceEkAttDsc *)a)->attdsc,
+                                        &((PySpiceEkAttDsc *)b)->attdsc), op);
+}
+
+static PyMethodDef ekattdsc_methods[] = {
+    {"__reduce__", (PyCFunction)ekattdsc_reduce, METH_NOARGS, NULL},
+    {NULL}
+};
+
+PyTypeObject PySpiceEkAttDsc_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.EkAttDsc",                        /* tp_name */
+    sizeof(PySpiceEkAttDsc),                  /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    0,                                        /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    0,                                        /* tp_repr */
+    0,                                        /* tp_as_number */
+    0,                                        /* tp_as_sequence */
+    0,                                        /* tp_as_mapping */
+    (hashfunc)identity_hash,                  /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    0,                                        /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                       /* tp_flags */
+    "EkAttDsc(cclass=0, dtype=0, strlen=0, size=0, indexd=False, nullok=False)\n\n"
+    "The C struct SpiceEKAttDsc, an EK column attribute description.", /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    ekattdsc_richcompare,                     /* tp_richcompare */
+    0,                                        /* tp_weaklistoffset */
+    0,                                        /* tp_iter */
+    0,                                        /* tp_iternext */
+    ekattdsc_methods,                         /* tp_methods */
+    ekattdsc_members,                         /* tp_members */
+    ekattdsc_getset,                          /* tp_getset */
+    0,                                        /* tp_base */
+    0,                                        /* tp_dict */
+    0,                                        /* tp_descr_get */
+    0,                                        /* tp_descr_set */
+    0,                                        /* tp_dictoffset */
+    (initproc)ekattdsc_init,                  /* tp_init */
+    0,                                        /* tp_alloc */
+    PyType_GenericNew,                        /* tp_new */
+};
+
+/* EkSegSum */
+
+/**
+ * Copy a Python string into a fixed-size C string field
+ */
+static int set_fixed_string(char *field, Py_ssize_t size, PyObject *value, const char *name)
+{
+    char *string;
+    Py_ssize_t length;
+
+    if(!value) {
+        PyErr_Format(PyExc_TypeError, "cannot delete %s", name);
+        return -1;
+    }
+
+    if(PyString_AsStringAndSize(value, &string, &length) < 0) {
+        return -1;
+    }
+
+    if(length >= size) {
+        PyErr_Format(PyExc_ValueError, "%s must be shorter than %zd characters", name, size);
+        return -1;
+    }
+
+    memset(field, 0, size);
+    memcpy(field, string, length);
+
+    return 0;
+}
+
+static PyObject * eksegsum_get_tabnam(PySpiceEkSegSum *self, void *closure)
+{
+    return PyString_FromStringAndSize(self->segsum.tabnam,
+                                      strnlen(self->segsum.tabnam, EK_TABNAM_LEN));
+}
+
+static int eksegsum_set_tabnam(PySpiceEkSegSum *self, PyObject *value, void *closure)
+{
+    return set_fixed_string(self->segsum.tabnam, EK_TABNAM_LEN, value, "tabnam");
+}
+
+/**
+ * Number of columns held in the summary, clamped to the space available
+ */
+static Py_ssize_t get_column_count(PySpiceEkSegSum *self)
+{
+    Py_ssize_t ncols = self->segsum.ncols;
+
+    return ncols < 0 ? 0 : (ncols > EK_MAX_COLS ? EK_MAX_COLS : ncols);
+}
+
+static PyObject * eksegsum_get_cnames(PySpiceEkSegSum *self, void *closure)
+{
+    Py_ssize_t i, ncols = get_column_count(self);
+    PyObject *item = NULL, *list = PyList_New(ncols);
+
+    for(i = 0; list && i < ncols; ++ i) {
+        if(!(item = PyString_FromStringAndSize(self->segsum.cnames[i],
+                                               strnlen(self->segsum.cnames[i], EK_CNAME_LEN)))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SET_ITEM(list, i, item);
+    }
+
+    return list;
+}
+
+/**
+ * Check a sequence of column values before it is stored, returning it as a
+ * fast sequence
+ */
+static PyObject * get_column_sequence(PyObject *value, const char *name)
+{
+    PyObject *seq = NULL;
+
+    if(!value) {
+        PyErr_Format(PyExc_TypeError, "cannot delete %s", name);
+        return NULL;
+    }
+
+    if(!(seq = PySequence_Fast(value, "columns must be a sequence"))) {
+        return NULL;
+    }
+
+    if(PySequence_Fast_GET_SIZE(seq) > EK_MAX_COLS) {
+        PyErr_Format(PyExc_ValueError, "%s can hold at most %zd columns", name, EK_MAX_COLS);
+        Py_DECREF(seq);
+        return NULL;
+    }
+
+    return seq;
+}
+
+static int eksegsum_set_cnames(PySpiceEkSegSum *self, PyObject *value, void *closure)
+{
+    SpiceChar cnames[sizeof(self->segsum.cnames) / EK_CNAME_LEN][EK_CNAME_LEN];
+    PyObject *seq = NULL;
+    Py_ssize_t i, n;
+
+    if(!(seq = get_column_sequence(value, "cnames"))) {
+        return -1;
+    }
+
+    n = PySequence_Fast_GET_SIZE(seq);
+
+    for(i = 0; i < n; ++ i) {
+        if(set_fixed_string(cnames[i], EK_CNAME_LEN, PySequence_Fast_GET_ITEM(seq, i), "column name") < 0) {
+            Py_DECREF(seq);
+            return -1;
+        }
+    }
+
+    Py_DECREF(seq);
+
+    memcpy(self->segsum.cnames, cnames, n * EK_CNAME_LEN);
+    self->segsum.ncols = (SpiceInt)n;
+
+    return 0;
+}
+
+static PyObject * eksegsum_get_cdescrs(PySpiceEkSegSum *self, void *closure)
+{
+    Py_ssize_t i, ncols = get_column_count(self);
+    PyObject *item = NULL, *list = PyList_New(ncols);
+
+    for(i = 0; list && i < ncols; ++ i) {
+        if(!(item = get_py_ekattdsc(&self->segsum.cdescrs[i]))) {
+            Py_CLEAR(list);
+            break;
+        }
+
+        PyList_SET_ITEM(list, i, item);
+    }
+
+    return list;
+}
+
+static int eksegsum_set_cdescrs(PySpiceEkSegSum *self, PyObject *value, void *closure)
+{
+    PyObject *seq = NULL, *item = NULL;
+    Py_ssize_t i, n;
+
+    if(!(seq = get_column_sequence(value, "cdescrs"))) {
+        return -1;
+    }
+
+    n = PySequence_Fast_GET_SIZE(seq);
+
+    for(i = 0; i < n; ++ i) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+
+        if(!PyObject_TypeCheck(item, &PySpiceEkAttDsc_Type)) {
+            PyErr_SetString(PyExc_TypeError, "cdescrs must be a sequence of EkAttDsc");
+            Py_DECREF(seq);
+            return -1;
+        }
+    }
+
+    for(i = 0; i < n; ++ i) {
+        self->segsum.cdescrs[i] = ((PySpiceEkAttDsc *)PySequence_Fast_GET_ITEM(seq, i))->attdsc;
+    }
+
+    Py_DECREF(seq);
+
+    self->segsum.ncols = (SpiceInt)n;
+
+    return 0;
+}
+
+static PyMemberDef eksegsum_members[] = {
+    {"nrows", T_SPICEINT, offsetof(PySpiceEkSegSum, segsum.nrows), 0, "number of rows"},
+    {"ncols", T_SPICEINT, offsetof(PySpiceEkSegSum, segsum.ncols), 0, "number of columns"},
+    {NULL}
+};
+
+static PyGetSetDef eksegsum_getset[] = {
+    {"tabnam", (getter)eksegsum_get_tabnam, (setter)eksegsum_set_tabnam,
+     "table name", NULL},
+    {"cnames", (getter)eksegsum_get_cnames, (setter)eksegsum_set_cnames,
+     "list of the column names; setting it also sets ncols", NULL},
+    {"cdescrs", (getter)eksegsum_get_cdescrs, (setter)eksegsum_set_cdescrs,
+     "list of the column descriptions (copies); setting it also sets ncols", NULL},
+    {NULL}
+};
+
+static char *eksegsum_fields[] = {"tabnam", "nrows", "ncols", "cnames", "cdescrs", NULL};
+
+static int eksegsum_init(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    return init_fields(self, args, kwds, eksegsum_fields);
+}
+
+static PyObject * eksegsum_reduce(PyObject *self)
+{
+    return reduce_fields(self, eksegsum_fields);
+}
+
+/**
+ * Compare two segment summaries up to their number of columns; what
+ * follows is left over from earlier contents
+ */
+static int equal_segsums(SpiceEKSegSum *a, SpiceEKSegSum *b)
+{
+    SpiceInt i;
+
+    if(strncmp(a->tabnam, b->tabnam, EK_TABNAM_LEN) || a->nrows != b->nrows || a->ncols != b->ncols) {
+        return 0;
+    }
+
+    for(i = 0; i < a->ncols && i < EK_MAX_COLS; ++ i) {
+        if(strncmp(a->cnames[i], b->cnames[i], EK_CNAME_LEN) ||
+           !equal_attdscs(&a->cdescrs[i], &b->cdescrs[i])) {
+            return 0;
+        }
+    }
+
+    return 1;
+}
+
+static PyObject * eksegsum_richcompare(PyObject *a, PyObject *b, int op)
+{
+    if(!PyObject_TypeCheck(a, &PySpiceEkSegSum_Type) || !PyObject_TypeCheck(b, &PySpiceEkSegSum_Type)) {
+        Py_INCREF(Py_NotImplemented);
+        return Py_NotImplemented;
+    }
+
+    return compare_result(equal_segsums(&((PySpiceEkSegSum *)a)->segsum,
+                                        &((PySpiceEkSegSum *)b)->segsum), op);
+}
+
+static PyMethodDef eksegsum_methods[] = {
+    {"__reduce__", (PyCFunction)eksegsum_reduce, METH_NOARGS, NULL},
+    {NULL}
+};
+
+PyTypeObject PySpiceEkSegSum_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_spice.EkSegSum",                        /* tp_name */
+    sizeof(PySpiceEkSegSum),                  /* tp_basicsize */
+    0,                                        /* tp_itemsize */
+    0,                                        /* tp_dealloc */
+    0,                                        /* tp_print */
+    0,                                        /* tp_getattr */
+    0,                                        /* tp_setattr */
+    0,                                        /* tp_compare */
+    0,                                        /* tp_repr */
+    0,                                        /* tp_as_number */
+    0,                                        /* tp_as_sequence */
+    0,                                        /* tp_as_mapping */
+    (hashfunc)identity_hash,                  /* tp_hash */
+    0,                                        /* tp_call */
+    0,                                        /* tp_str */
+    0,                                        /* tp_getattro */
+    0,                                        /* tp_setattro */
+    0,                                        /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                       /* tp_flags */
+    "EkSegSum(tabnam='', nrows=0, ncols=0, cnames=[], cdescrs=[])\n\n"
+    "The C struct SpiceEKSegSum, an EK segment summary.", /* tp_doc */
+    0,                                        /* tp_traverse */
+    0,                                        /* tp_clear */
+    eksegsum_richcompare,                     /* tp_richcompare */
+    0,                                        /* tp_weaklistoffset */
+    0,                                        /* tp_iter */
+    0,                                        /* tp_iternext */
+    eksegsum_methods,                         /* tp_methods */
+    eksegsum_members,                         /* tp_members */
+    eksegsum_getset,                          /* tp_getset */
+    0,                                        /* tp_base */
+    0,                                        /* tp_dict */
+    0,                                        /* tp_descr_get */
+    0,                                        /* tp_descr_set */
+    0,                                        /* tp_dictoffset */
+    (initproc)eksegsum_init,                  /* tp_init */
+    0,                                        /* tp_alloc */
+    PyType_GenericNew,                        /* tp_new */
+};
+
+/* Conversions used by the generated wrappers */
+
+PyObject * get_py_ellipse(SpiceEllipse *spice_obj)
+{
+    PySpiceEllipse *py_obj = PyObject_New(PySpiceEllipse, &PySpiceEllipse_Type);
+
+    if(py_obj) {
+        py_obj->ellipse = *spice_obj;
+    }
+
+    return (PyObject *)py_obj;
+}
+
+PyObject * get_py_plane(SpicePlane *spice_obj)
+{
+    PySpicePlane *py_obj = PyObject_New(PySpicePlane, &PySpicePlane_Type);
+
+    if(py_obj) {
+        py_obj->plane = *spice_obj;
+    }
+
+    return (PyObject *)py_obj;
+}
+
+PyObject * get_py_ekattdsc(SpiceEKAttDsc *spice_obj)
+{
+    PySpiceEkAttDsc *py_obj = PyObject_New(PySpiceEkAttDsc, &PySpiceEkAttDsc_Type);
+
+    if(py_obj) {
+        py_obj->attdsc = *spice_obj;
+    }
+
+    return (PyObject *)py_obj;
+}
+
+PyObject * get_py_eksegsum(SpiceEKSegSum *spice_obj)
+{
+    PySpiceEkSegSum *py_obj = PyObject_New(PySpiceEkSegSum, &PySpiceEkSegSum_Type);
+
+    if(py_obj) {
+        py_obj->segsum = *spice_obj;
+    }
+
+    return (PyObject *)py_obj;
+}
+
+/**
+ * Check that py_obj is an instance of type, setting a TypeError if not
+ */
+static int check_struct_type(PyObject *py_obj, PyTypeObject *type)
+{
+    if(PyObject_TypeCheck(py_obj, type)) {
+        return 1;
+    }
+
+    PyErr_Format(PyExc_TypeError, "expected %s, not %.200s",
+                 strchr(type->tp_name, '.') + 1, Py_TYPE(py_obj)->tp_name);
+
+    return 0;
+}
+
+/*
+ * The get_spice_* functions below return a pointer to the structure held by
+ * the Python object rather than a copy; it is valid as long as the object
+ * is.  They return NULL with a TypeError set for any other object.
+ */
+SpiceEllipse * get_spice_ellipse(PyObject *py_obj)
+{
+    return check_struct_type(py_obj, &PySpiceEllipse_Type) ? &((PySpiceEllipse *)py_obj)->ellipse : NULL;
+}
+
+SpicePlane * get_spice_plane(PyObject *py_obj)
+{
+    return check_struct_type(py_obj, &PySpicePlane_Type) ? &((PySpicePlane *)py_obj)->plane : NULL;
+}
+
+SpiceEKAttDsc * get_spice_ekattdsc(PyObject *py_obj)
+{
+    return check_struct_type(py_obj, &PySpiceEkAttDsc_Type) ? &((PySpiceEkAttDsc *)py_obj)->attdsc : NULL;
+}
+
+SpiceEKSegSum * get_spice_eksegsum(PyObject *py_obj)
+{
+    return check_struct_type(py_obj, &PySpiceEkSegSum_Type) ? &((PySpiceEkSegSum *)py_obj)->segsum : NULL;
+}
+
+/**
+ * Ready the structure types and add them to the module
+ */
+int init_spice_types(PyObject *module)
+{
+    PyTypeObject *types[] = {&PySpiceEllipse_Type, &PySpicePlane_Type,
+                             &PySpiceEkAttDsc_Type, &PySpiceEkSegSum_Type, NULL};
+    int i;
+
+    if(PyType_Ready(&PySpiceVectorView_Type) < 0) {
+        return -1;
+    }
+
+    for(i = 0; types[i]; ++ i) {
+        if(PyType_Ready(types[i]) < 0) {
+            return -1;
+        }
+
+        Py_INCREF(types[i]);
+
+        /* the attribute name is the part of tp_name after "_spice." */
+        if(PyModule_AddObject(module, strchr(types[i]->tp_name, '.') + 1, (PyObject *)types[i]) < 0) {
+            return -1;
+        }
+    }
+
+    return init_spice_cell_type(module);
+}
@@ -0,0 +1,385 @@
+/**
+ * PySPICE window functions
+ *
+ * Window algebra over arrays of intervals.  Each window is given as a
+ * flat array of left, right endpoint pairs (an (n,2) float64 array, any
+ * other float64 buffer, a sequence or a DP Cell) and loaded into a
+ * temporary SpiceCell, so the set operations are the CSPICE ones; a
+ * whole list of windows is combined in a single call.  Results are
+ * returned as bytearrays of native doubles, which spice.windows shapes
+ * into (n,2) arrays.
+ *
+ * Released under the BSD license, see LICENSE for details
+ */
+#include "pyspice.h"
+
+/**
+ * Set up cell as an empty double precision window with room for size
+ * endpoints
+ */
+static int new_window(SpiceCell *cell, Py_ssize_t size)
+{
+    void *base = PyMem_Malloc((SPICE_CELL_CTRLSZ + (size ? size : 1)) * sizeof(SpiceDouble));
+
+    if(!base) {
+        PyErr_NoMemory();
+        return 0;
+    }
+
+    memset(base, 0, SPICE_CELL_CTRLSZ * sizeof(SpiceDouble));
+
+    cell->dtype = SPICE_DP;
+    cell->length = 0;
+    cell->size = (SpiceInt)size;
+    cell->card = 0;
+    cell->isSet = SPICETRUE;
+    cell->adjust = SPICEFALSE;
+    cell->init = SPICEFALSE;
+    cell->base = base;
+    cell->data = (SpiceDouble *)base + SPICE_CELL_CTRLSZ;
+
+    return 1;
+}
+
+static void free_window(SpiceCell *cell)
+{
+    if(cell->base) {
+        PyMem_Free(cell->base);
+    }
+
+    memset(cell, 0, sizeof(SpiceCell));
+}
+
+/**
+ * Load the intervals in py_obj into a new window.  The intervals are
+ * validated with wnvald, which sorts them and merges any that overlap.
+ */
+static int load_window(PyObject *py_obj, SpiceCell *cell)
+{
+    PySpiceArray array;
+    PySpiceCell *py_cell = (PySpiceCell *)py_obj;
+    double *data;
+    Py_ssize_t count;
+    char failed = 0;
+
+    memset(&array, 0, sizeof(PySpiceArray));
+
+    if(PyObject_TypeCheck(py_obj, &PySpiceCell_Type)) {
+        if(py_cell->cell.dtype != SPICE_DP || py_cell->cell.card > py_cell->capacity) {
+            PyErr_SetString(PyExc_TypeError, "windows must be double precision cells");
+            return 0;
+        }
+
+        data = py_cell->cell.data;
+        count = py_cell->cell.card;
+    } else {
+        if(!get_spice_double_array(py_obj, &array)) {
+            return 0;
+        }
+
+        data = array.data;
+        count = array.count;
+    }
+
+    if(count % 2) {
+        PyErr_Format(PyExc_ValueError, "a window needs an even number of endpoints, not %zd", count);
+        release_spice_array(&array);
+        return 0;
+    }
+
+    if(!new_window(cell, count)) {
+        release_spice_array(&array);
+        return 0;
+    }
+
+    memcpy(cell->data, data, count * sizeof(SpiceDouble));
+    release_spice_array(&array);
+
+    PYSPICE_BEGIN_CALL;
+    wnvald_c(cell->size, (SpiceInt)count, cell);
+    PYSPICE_END_CALL;
+
+    PYSPICE_CHECK_FAILED;
+
+    if(failed) {
+        free_window(cell);
+        return 0;
+    }
+
+    return 1;
+}
+
+/**
+ * Return the intervals in a window as a bytearray of doubles
+ */
+static PyObject * get_py_window(SpiceCell *cell)
+{
+    double *out = NULL;
+    PyObject *py_out = get_py_double_buffer(cell->card, &out);
+
+    if(py_out) {
+        memcpy(out, cell->data, cell->card * sizeof(SpiceDouble));
+    }
+
+    return py_out;
+}
+
+/**
+ * Combine windows a and b into a new window c; op is 'u' (union), 'i'
+ * (intersection) or 'd' (difference, a - b).  Each of these has at most as
+ * many endpoints as a and b together.
+ */
+static int combine_windows(SpiceCell *a, SpiceCell *b, SpiceCell *c, char op)
+{
+    char failed = 0;
+
+    if(!new_window(c, a->card + b->card)) {
+        return 0;
+    }
+
+    PYSPICE_BEGIN_CALL;
+
+    switch(op) {
+    case 'u':
+        wnunid_c(a, b, c);
+        break;
+    case 'i':
+        wnintd_c(a, b, c);
+        break;
+    default:
+        wndifd_c(a, b, c);
+    }
+
+    PYSPICE_END_CALL;
+
+    PYSPICE_CHECK_FAILED;
+
+    if(failed) {
+        free_window(c);
+        return 0;
+    }
+
+    return 1;
+}
+
+static int check_op(char op, const char *ops)
+{
+    if(!op || !strchr(ops, op)) {
+        PyErr_Format(PyExc_ValueError, "op must be one of '%s'", ops);
+        return 0;
+    }
+
+    return 1;
+}
+
+char wncombine_doc[] = "_wncombine(a, b, op) -> window\n\n"
+    "Union ('u'), intersection ('i') or difference ('d') of two windows;\n"
+    "see spice.windows.";
+
+PyObject * spice_wncombine(PyObject *self, PyObject *args)
+{
+    PyObject *py_a = NULL, *py_b = NULL, *py_out = NULL;
+    SpiceCell a, b, c;
+    char op;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "OOc", &py_a, &py_b, &op));
+    PYSPICE_CHECK_RETURN_STATUS(check_op(op, "uid"));
+    PYSPICE_CHECK_RETURN_STATUS(load_window(py_a, &a));
+
+    if(!load_window(py_b, &b)) {
+        free_window(&a);
+        return NULL;
+    }
+
+    if(combine_windows(&a, &b, &c, op)) {
+        py_out = get_py_window(&c);
+        free_window(&c);
+    }
+
+    free_window(&a);
+    free_window(&b);
+
+    return py_out;
+}
+
+char wnreduce_doc[] = "_wnreduce(windows, op) -> window\n\n"
+    "Union ('u') or intersection ('i') of a sequence of windows;\n"
+    "see spice.windows.";
+
+/**
+ * Unions are done pairwise, as a balanced tree, so each endpoint is copied
+ * about log2(n) times rather than n times.  Intersections only shrink, so
+ * they are taken one window after another and stop once empty.
+ */
+PyObject * spice_wnreduce(PyObject *self, PyObject *args)
+{
+    PyObject *py_windows = NULL, *seq = NULL, *py_out = NULL;
+    SpiceCell *cells = NULL, result;
+    Py_ssize_t i, n, loaded = 0, step;
+    char op, failed = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "Oc", &py_windows, &op));
+    PYSPICE_CHECK_RETURN_STATUS(check_op(op, "ui"));
+    PYSPICE_CHECK_RETURN_STATUS(seq = PySequence_Fast(py_windows, "windows must be a sequence"));
+
+    n = PySequence_Fast_GET_SIZE(seq);
+
+    if(!n) {
+        Py_DECREF(seq);
+        PyErr_SetString(PyExc_ValueError, "no windows given");
+        return NULL;
+    }
+
+    if(!(cells = PyMem_Malloc(n * sizeof(SpiceCell)))) {
+        Py_DECREF(seq);
+        return PyErr_NoMemory();
+    }
+
+    memset(cells, 0, n * sizeof(SpiceCell));
+
+    for(loaded = 0; loaded < n; ++ loaded) {
+        if(!load_window(PySequence_Fast_GET_ITEM(seq, loaded), &cells[loaded])) {
+            failed = 1;
+            break;
+        }
+    }
+
+    if(!failed && op == 'u') {
+        /* combine neighbours at distance step, leaving results in place */
+        for(step = 1; step < n && !failed; step *= 2) {
+            for(i = 0; i + step < n; i += 2 * step) {
+                if(!combine_windows(&cells[i], &cells[i + step], &result, op)) {
+                    failed = 1;
+                    break;
+                }
+
+                free_window(&cells[i]);
+                free_window(&cells[i + step]);
+                cells[i] = result;
+            }
+        }
+    } else if(!failed) {
+        for(i = 1; i < n && cells[0].card; ++ i) {
+            if(!combine_windows(&cells[0], &cells[i], &result, op)) {
+                failed = 1;
+                break;
+            }
+
+            free_window(&cells[0]);
+            cells[0] = result;
+        }
+    }
+
+    if(!failed) {
+        py_out = get_py_window(&cells[0]);
+    }
+
+    for(i = 0; i < loaded; ++ i) {
+        free_window(&cells[i]);
+    }
+
+    PyMem_Free(cells);
+    Py_DECREF(seq);
+
+    return py_out;
+}
+
+char wnadjust_doc[] = "_wnadjust(window, op, left, right) -> window\n\n"
+    "Expand ('e') or contract ('c') the intervals of a window by left and\n"
+    "right, or filter out intervals ('f') or fill gaps ('g') no longer than\n"
+    "left; see spice.windows.";
+
+PyObject * spice_wnadjust(PyObject *self, PyObject *args)
+{
+    PyObject *py_window = NULL, *py_out = NULL;
+    SpiceCell window;
+    double left, right = 0.0;
+    char op, failed = 0;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "Ocd|d", &py_window, &op, &left, &right));
+    PYSPICE_CHECK_RETURN_STATUS(check_op(op, "ecfg"));
+    PYSPICE_CHECK_RETURN_STATUS(load_window(py_window, &window));
+
+    PYSPICE_BEGIN_CALL;
+
+    switch(op) {
+    case 'e':
+        wnexpd_c(left, right, &window);
+        break;
+    case 'c':
+        wncond_c(left, right, &window);
+        break;
+    case 'f':
+        wnfltd_c(left, &window);
+        break;
+    default:
+        wnfild_c(left, &window);
+    }
+
+    PYSPICE_END_CALL;
+
+    PYSPICE_CHECK_FAILED;
+
+    if(!failed) {
+        py_out = get_py_window(&window);
+    }
+
+    free_window(&window);
+
+    return py_out;
+}
+
+char wncontains_doc[] = "_wncontains(window, ets) -> flags\n\n"
+    "One byte per epoch, 1 where the epoch lies in the window;\n"
+    "see spice.windows.";
+
+/**
+ * The intervals of a validated window are sorted and disjoint, so each
+ * epoch is found with a binary search over the right endpoints.
+ */
+PyObject * spice_wncontains(PyObject *self, PyObject *args)
+{
+    PyObject *py_window = NULL, *py_ets = NULL, *py_out = NULL;
+    SpiceCell window;
+    PySpiceArray ets;
+    SpiceDouble *data;
+    char *flags;
+    double et;
+    Py_ssize_t i, low, high, middle, nintervals;
+
+    PYSPICE_CHECK_RETURN_STATUS(PyArg_ParseTuple(args, "OO", &py_window, &py_ets));
+    PYSPICE_CHECK_RETURN_STATUS(load_window(py_window, &window));
+
+    if(!get_spice_double_array(py_ets, &ets)) {
+        free_window(&window);
+        return NULL;
+    }
+
+    if((py_out = PyByteArray_FromStringAndSize(NULL, ets.count))) {
+        flags = PyByteArray_AS_STRING(py_out);
+        data = window.data;
+        nintervals = window.card / 2;
+
+        for(i = 0; i < ets.count; ++ i) {
+            et = ((double *)ets.data)[i];
+
+            /* find the first interval whose right end is not before et */
+            for(low = 0, high = nintervals; low < high; ) {
+                middle = low + (high - low) / 2;
+
+                if(data[2 * middle + 1] < et) {
+                    low = middle + 1;
+                } else {
+                    high = middle;
+                }
+            }
+
+            flags[i] = low < nintervals && data[2 * low] <= et;
+        }
+    }
+
+    release_spice_array(&ets);
+    free_window(&window);
+
+    return py_out;
+}
@@ -87,7 +87,8 @@ try:
 
     module1 = Extension(
         '_spice',
-        sources = ['pyspice.c', 'spicemodule.c'],
+        sources = ['pyspice.c', 'pyspice_batch.c', 'pyspice_types.c', 'pyspice_cell.c',
+                   'pyspice_window.c', 'pyspice_gf.c', 'pyspice_stats.c', 'spicemodule.c'],
         include_dirs = [os.path.join(CSPICE_SRC,'include')],
         library_dirs = [os.path.join(CSPICE_SRC,'lib')],
         libraries = ['cspice'],
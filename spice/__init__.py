@@ -2,3 +2,20 @@
 
 from misc import *
 from objects import *
+from batch import *
+from arrays import *
+from windows import *
+from gf import *
+from parallel import *
+from query import *
+from memo import *
+from daf import *
+from chebyshev import *
+from kernels import *
+from catalog import *
+from tables import *
+from daemon import *
+from instrument import *
+
+import stream
+import tracing
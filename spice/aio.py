@@ -0,0 +1,310 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+SPICE queries for asyncio programs.
+
+A CSPICE call made from a coroutine holds up the event loop until it
+returns.  The functions here return futures instead: the calls are made
+on a worker thread, and the futures are resolved on the loop when they
+are done.
+
+    @asyncio.coroutine
+    def query(et):
+        state, lt = yield From(aio.spkezr('SMAP', et, 'J2000', 'NONE', 'EARTH'))
+        ...
+
+    state, lt = loop.run_until_complete(aio.spkezr('SMAP', et, 'J2000', 'NONE', 'EARTH'))
+
+Many small queries arriving together cost far more one at a time than as
+a batch, so the worker waits a short window after the first request for
+others, and runs the spkezr and spkpos requests that share a target,
+frame, aberration correction and observer (or the pxform and sxform
+requests that share frames) as one batch call (see spice.batch).  The
+results are the same as those of the scalar functions.
+
+This module needs asyncio, or trollius under Python 2, and isn't
+imported by the spice package; import spice.aio to use it.
+"""
+
+import Queue
+import struct
+import threading
+import time
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+import _spice
+
+from arrays import double_array, get_array_output
+
+__all__ = ['Dispatcher', 'spkezr', 'spkpos', 'pxform', 'sxform', 'call', 'get_dispatcher']
+
+# seconds the worker waits for more requests after the first
+WINDOW = 0.001
+
+# the most requests run in one batch call
+MAX_BATCH = 4096
+
+
+def _value(buf, index, shape):
+    """Return result index of a batch buffer as the scalar wrapper would"""
+    size = 1
+
+    for n in shape:
+        size *= n
+
+    part = buf[8 * size * index:8 * size * (index + 1)]
+
+    if get_array_output():
+        return double_array(bytearray(part), shape)
+
+    values = struct.unpack('%dd' % size, part)
+
+    if len(shape) == 2:
+        return tuple(values[i:i + shape[1]] for i in xrange(0, size, shape[1]))
+
+    return values
+
+
+class _Request(object):
+
+    def __init__(self, key, args, loop):
+        self.key = key
+        self.args = args
+        self.loop = loop
+        self.future = asyncio.Future(loop=loop)
+
+
+def _settle(outcomes):
+    """Set the results of futures, on their loop"""
+    for request, result, error in outcomes:
+        # the awaiting coroutine may have been cancelled meanwhile, or the
+        # dispatcher failed the request after settling it
+        if request.future.done():
+            continue
+
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+
+
+def _spk(function, requests):
+    targ, ref, abcorr, obs = requests[0].key[1:]
+    out, lt = function(targ, [request.args[1] for request in requests], ref, abcorr, str(obs))
+    width = 6 if function is _spice._spkezr_batch else 3
+
+    return [(_value(out, i, (width,)), struct.unpack_from('d', lt, 8 * i)[0]) for i in xrange(len(requests))]
+
+
+def _xform(function, requests):
+    from_, to = requests[0].key[1:]
+    out = function(from_, to, [request.args[2] for request in requests])
+    size = 3 if function is _spice._pxform_batch else 6
+
+    return [_value(out, i, (size, size)) for i in xrange(len(requests))]
+
+
+# the batched functions: batch function, and how to run it
+_BATCHED = {
+    'spkezr': (_spice._spkezr_batch, _spk),
+    'spkpos': (_spice._spkpos_batch, _spk),
+    'pxform': (_spice._pxform_batch, _xform),
+    'sxform': (_spice._sxform_batch, _xform),
+}
+
+
+class Dispatcher(object):
+    """
+    A worker thread that runs SPICE calls for coroutines, batching the
+    requests that arrive within window seconds of each other, up to
+    max_batch at a time.  batches and requests count the calls made and
+    the requests they served.
+    """
+
+    def __init__(self, window=WINDOW, max_batch=MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+
+        self._queue = Queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='spice.aio')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def close(self):
+        """Stop the worker once the requests made so far are done"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _submit(self, key, args, loop):
+        request = _Request(key, args, loop or asyncio.get_event_loop())
+        self._queue.put(request)
+
+        return request.future
+
+    def spkezr(self, targ, et, ref, abcorr, obs, loop=None):
+        """Return a future of spkezr(targ, et, ref, abcorr, obs)"""
+        return self._submit(('spkezr', targ, ref, abcorr, obs), (targ, et, ref, abcorr, obs), loop)
+
+    def spkpos(self, targ, et, ref, abcorr, obs, loop=None):
+        """Return a future of spkpos(targ, et, ref, abcorr, obs)"""
+        return self._submit(('spkpos', targ, ref, abcorr, obs), (targ, et, ref, abcorr, obs), loop)
+
+    def pxform(self, from_, to, et, loop=None):
+        """Return a future of pxform(from_, to, et)"""
+        return self._submit(('pxform', from_, to), (from_, to, et), loop)
+
+    def sxform(self, from_, to, et, loop=None):
+        """Return a future of sxform(from_, to, et)"""
+        return self._submit(('sxform', from_, to), (from_, to, et), loop)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Return a future of function(*args), a function or the name of one
+        in the spice module, run on the worker after the requests before
+        it.  Configuration calls (furnsh, ...) go through here, so they
+        apply to the requests made after them.  loop may be given as a
+        keyword argument.
+        """
+        if isinstance(function, basestring):
+            import spice
+            function = getattr(spice, function)
+
+        return self._submit(None, (function,) + args, kwargs.get('loop'))
+
+    def _gather(self, first):
+        """Return the requests arriving within the window after first"""
+        requests = [first]
+        deadline = time.time() + self.window
+
+        while len(requests) < self.max_batch:
+            remaining = deadline - time.time()
+
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Queue.Empty:
+                break
+
+            requests.append(request)
+
+            if request is None:
+                break
+
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._gather(self._queue.get())
+            closing = requests[-1] is None
+
+            if closing:
+                requests.pop()
+
+            try:
+                self._serve(requests)
+            except Exception as error:
+                # fail the requests instead of stopping the worker
+                self._wake([(request, None, error) for request in requests])
+
+            if closing:
+                return
+
+    def _serve(self, requests):
+        # batch the requests by key, in the order the keys first came, but
+        # keep other calls in their place, as they may change what follows
+        groups = []
+        open_groups = {}
+
+        for request in requests:
+            if request.key is None:
+                groups.append([request])
+                open_groups.clear()
+            elif request.key in open_groups:
+                open_groups[request.key].append(request)
+            else:
+                open_groups[request.key] = group = [request]
+                groups.append(group)
+
+        for group in groups:
+            self.batches += 1
+            self.requests += len(group)
+            key = group[0].key
+
+            if key is None:
+                outcomes = [self._call(group[0], group[0].args[0], group[0].args[1:])]
+            else:
+                function, run = _BATCHED[key[0]]
+
+                try:
+                    outcomes = [(request, result, None) for request, result in zip(group, run(function, group))]
+                except Exception:
+                    # find which requests fail, one at a time
+                    outcomes = [self._call(request, getattr(_spice, key[0]), request.args) for request in group]
+
+            self._wake(outcomes)
+
+    def _wake(self, outcomes):
+        # waking a loop costs more than setting a result, so wake each
+        # loop once per group
+        loops = {}
+
+        for outcome in outcomes:
+            loops.setdefault(outcome[0].loop, []).append(outcome)
+
+        for loop, settled in loops.items():
+            try:
+                loop.call_soon_threadsafe(_settle, settled)
+            except RuntimeError:
+                # the loop is closed, so nothing can wait on its futures
+                pass
+
+    def _call(self, request, function, args):
+        try:
+            return request, function(*args), None
+        except Exception as error:
+            return request, None, error
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Return the Dispatcher the module functions use, starting it if need be"""
+    global _dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+
+        return _dispatcher
+
+
+def spkezr(targ, et, ref, abcorr, obs, loop=None):
+    """Return a future of spkezr(targ, et, ref, abcorr, obs)"""
+    return get_dispatcher().spkezr(targ, et, ref, abcorr, obs, loop)
+
+
+def spkpos(targ, et, ref, abcorr, obs, loop=None):
+    """Return a future of spkpos(targ, et, ref, abcorr, obs)"""
+    return get_dispatcher().spkpos(targ, et, ref, abcorr, obs, loop)
+
+
+def pxform(from_, to, et, loop=None):
+    """Return a future of pxform(from_, to, et)"""
+    return get_dispatcher().pxform(from_, to, et, loop)
+
+
+def sxform(from_, to, et, loop=None):
+    """Return a future of sxform(from_, to, et)"""
+    return get_dispatcher().sxform(from_, to, et, loop)
+
+
+def call(function, *args, **kwargs):
+    """Return a future of function(*args), as Dispatcher.call does"""
+    return get_dispatcher().call(function, *args, **kwargs)
@@ -0,0 +1,117 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Helpers for the array results handed back by _spice.
+
+The C side fills bytearrays with native numbers or fixed-width strings.
+When NumPy is installed those are wrapped as ndarrays without copying;
+otherwise they come back as flat array.array objects and lists.
+
+By default the generated wrappers return vectors and matrices as tuples.
+set_array_output(True), or the array_output() context manager, makes them
+return arrays instead: _spice calls numpy.ndarray(shape, dtype, buffer)
+itself, with dtypes made once, so an array costs one call.
+"""
+
+import array
+
+import _spice
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['set_array_output', 'get_array_output', 'array_output']
+
+
+# the dtypes of the array module type codes _spice uses, made once
+_DTYPES = numpy and dict((typecode, numpy.dtype(typecode)) for typecode in 'dil')
+
+
+def _flat_array(shape, typecode, buf):
+    """The array output factory without NumPy: a flat array.array"""
+    result = array.array(typecode)
+    result.fromstring(str(buf))
+    return result
+
+
+def new_array(buf, shape, typecode):
+    """Wrap a buffer of native numbers from _spice in an array of the given
+    shape; typecode is an array module type code, 'd' for doubles and 'i'
+    or 'l' for SpiceInts.  Without NumPy the shape is dropped and a flat
+    array.array is returned.
+    """
+    if numpy is not None:
+        return numpy.frombuffer(buf, dtype=_DTYPES[typecode]).reshape(shape)
+
+    return _flat_array(shape, typecode, buf)
+
+
+def double_array(buf, shape):
+    """Wrap a buffer of native doubles from _spice in an array of the given
+    shape.  Without NumPy a flat array.array('d') is returned.
+    """
+    return new_array(buf, shape, 'd')
+
+
+def bool_array(buf):
+    """Wrap a buffer of 0/1 bytes from _spice in a NumPy bool array.
+    Without NumPy a list of bool is returned.
+    """
+    if numpy is not None:
+        return numpy.frombuffer(buf, dtype=numpy.bool_)
+
+    return [bool(flag) for flag in bytearray(buf)]
+
+
+def string_array(buf, width):
+    """Wrap a buffer of NUL padded, width-character strings from _spice in
+    a NumPy "S" array.  Without NumPy a list of str is returned.
+    """
+    if numpy is not None:
+        return numpy.frombuffer(buf, dtype='S%d' % width)
+
+    return [str(buf[i:i + width]).rstrip('\0') for i in xrange(0, len(buf), width)]
+
+
+def set_array_output(enabled):
+    """
+    Return the vector and matrix outputs of the wrappers (states, 3x3 and
+    6x6 matrices, bodvrd values, ...) as arrays when enabled is true, or as
+    tuples of floats, the default, when it is false.  The setting applies
+    to the whole module, in every thread.
+    """
+    if not enabled:
+        _spice._set_array_factory(None)
+    elif numpy is not None:
+        _spice._set_array_factory(numpy.ndarray, _DTYPES)
+    else:
+        _spice._set_array_factory(_flat_array)
+
+
+def get_array_output():
+    """Return True if array output mode is on"""
+    return _spice._get_array_factory() is not None
+
+
+class array_output(object):
+    """
+    Context manager that turns array output mode on (or off, with
+    enabled=False) for the calls made inside it:
+
+      with array_output():
+          xform = sxform('J2000', 'IAU_EARTH', et)
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = get_array_output()
+        set_array_output(self.enabled)
+        return self
+
+    def __exit__(self, *exc_info):
+        set_array_output(self.previous)
+        return False
@@ -0,0 +1,109 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Batch versions of the SPICE query functions.
+
+Each function here takes an array (a NumPy array, any float64 buffer or a
+plain sequence) where the scalar wrapper takes a single epoch or time
+string, and runs the whole array through CSPICE in one C loop.
+"""
+
+import numbers
+
+import _spice
+
+from arrays import double_array, string_array
+
+__all__ = ['spkezr_batch', 'spkpos_batch',
+           'str2et_batch', 'utc2et_batch', 'et2utc_batch', 'timout_batch',
+           'pxform_batch', 'sxform_batch']
+
+
+def _spk_batch(function, targ, et, ref, abcorr, obs, width):
+    if isinstance(targ, (basestring, numbers.Integral)):
+        targets = targ
+    else:
+        targets = list(targ)
+
+    out, lt = function(targets, et, ref, abcorr, str(obs))
+
+    return double_array(out, (-1, width)), double_array(lt, (-1,))
+
+
+def spkezr_batch(targ, et, ref, abcorr, obs):
+    """
+    Return the states of a target relative to an observer at an array of
+    epochs, as an (N,6) array of states and an (N,) array of light times.
+
+    targ may be a body name or ID, or a sequence of them; a single target
+    or a single epoch is broadcast against the other.  Body IDs skip the
+    name lookup.  The other arguments are as for spkezr.
+    """
+    return _spk_batch(_spice._spkezr_batch, targ, et, ref, abcorr, obs, 6)
+
+
+def spkpos_batch(targ, et, ref, abcorr, obs):
+    """
+    Return the positions of a target relative to an observer at an array
+    of epochs, as an (N,3) array of positions and an (N,) array of light
+    times.  Arguments are as for spkezr_batch.
+    """
+    return _spk_batch(_spice._spkpos_batch, targ, et, ref, abcorr, obs, 3)
+
+
+def str2et_batch(strings):
+    """
+    Convert an array of time strings to an (N,) array of ephemeris times.
+    strings may be a sequence of str or a fixed-width bytes array (such as
+    a NumPy "S" array), which is read in place.
+    """
+    return double_array(_spice._str2et_batch(strings), (-1,))
+
+
+def utc2et_batch(strings):
+    """
+    Convert an array of UTC strings to an (N,) array of ephemeris times.
+    strings is as for str2et_batch.
+    """
+    return double_array(_spice._utc2et_batch(strings), (-1,))
+
+
+def _string_result(buf, width):
+    if width:
+        return string_array(buf, width)
+
+    return buf
+
+
+def et2utc_batch(et, format, prec, width=None):
+    """
+    Convert an array of ephemeris times to UTC strings, as et2utc does.
+
+    Returns a list of str, or with a width an (N,) array of fixed-width
+    strings; each result is cut to width characters.
+    """
+    return _string_result(_spice._et2utc_batch(et, format, prec, width or 0), width)
+
+
+def timout_batch(et, pictur, width=None):
+    """
+    Convert an array of ephemeris times to strings in the format given by
+    the picture pictur, as timout does.  Results are as for et2utc_batch.
+    """
+    return _string_result(_spice._timout_batch(et, pictur, width or 0), width)
+
+
+def pxform_batch(from_, to, et):
+    """
+    Return the matrices that rotate position vectors from frame from_ to
+    frame to at an array of epochs, as an (N,3,3) array.
+    """
+    return double_array(_spice._pxform_batch(from_, to, et), (-1, 3, 3))
+
+
+def sxform_batch(from_, to, et):
+    """
+    Return the matrices that transform state vectors from frame from_ to
+    frame to at an array of epochs, as an (N,6,6) array.
+    """
+    return double_array(_spice._sxform_batch(from_, to, et), (-1, 6, 6))
@@ -0,0 +1,335 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+A catalog of kernel files kept in an SQLite database.
+
+Working out which files of a kernel archive cover which bodies and times,
+and which define which frames and pool variables, means reading all of
+them.  A KernelCatalog does that once and keeps the answers on disk: for
+each file its kind, size, modification time and SHA-1 hash, the coverage
+intervals of its SPK, CK and binary PCK segments per ID, and the frames
+and pool variables its text kernels define.  update() reads only files
+that are new or have changed, so a program can start by opening the
+catalog and asking it which files to load:
+
+    catalog = KernelCatalog('kernels.db')
+    catalog.update(glob.glob('archive/*'))
+
+    for path in catalog.plan(['SMAP', 'EARTH'], et0, et1, frames=['SMAP_BUS']):
+        furnsh(path)
+"""
+
+import hashlib
+import heapq
+import numbers
+import os
+import re
+import sqlite3
+
+import _spice
+
+from daf import DAF
+from kernels import KernelManager, _spacecraft
+
+__all__ = ['KernelCatalog']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    number INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    file INTEGER NOT NULL REFERENCES files (number) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    start REAL NOT NULL,
+    stop REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_id ON coverage (kind, id, start);
+CREATE TABLE IF NOT EXISTS frames (
+    file INTEGER NOT NULL REFERENCES files (number) ON DELETE CASCADE,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_name ON frames (name);
+CREATE TABLE IF NOT EXISTS variables (
+    file INTEGER NOT NULL REFERENCES files (number) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS variables_name ON variables (name);
+"""
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_ASSIGNMENT = re.compile(r"([^\s=+(),]+)\s*\+?=")
+_FRAME_NAME = re.compile(r"FRAME_(-?\d+)_NAME\s*\+?=\s*'([^']*)'")
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+
+    with open(path, 'rb') as kernel:
+        for block in iter(lambda: kernel.read(1 << 20), ''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _scan_text(path):
+    """Return the kind of a text kernel, its frames and its pool variables"""
+    kind = 'TEXT'
+    frames = []
+    variables = set()
+    data = False
+
+    with open(path, 'rU') as kernel:
+        for number, line in enumerate(kernel):
+            stripped = line.strip()
+
+            if number == 0 and stripped.startswith('KPL/'):
+                kind = stripped[4:].strip() or kind
+
+            if stripped.startswith('\\begindata'):
+                data = True
+            elif stripped.startswith('\\begintext'):
+                data = False
+            elif data:
+                frames.extend((int(code), name.strip()) for code, name in _FRAME_NAME.findall(line))
+                variables.update(_ASSIGNMENT.findall(_STRING.sub("''", line)))
+
+    return kind, frames, variables
+
+
+class KernelCatalog(object):
+    """
+    The catalog in the SQLite database at path, created if need be.
+    Files are kept by absolute path, numbered in the order they were
+    added; files added later take precedence, as if loaded later.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA foreign_keys = ON')
+
+        # opening a catalog made before writes nothing
+        if not self._db.execute('PRAGMA user_version').fetchone()[0]:
+            self._db.executescript(SCHEMA + 'PRAGMA user_version = 1;')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def update(self, paths):
+        """
+        Add the files at paths to the catalog, or read them again if they
+        have changed since.  A file whose size and modification time are
+        the same is not read; one whose hash is the same is not scanned.
+        Returns the paths that were scanned.
+        """
+        scanned = []
+
+        with self._db:
+            for path in paths:
+                path = os.path.abspath(path)
+                info = os.stat(path)
+                row = self._db.execute('SELECT number, size, mtime, sha1 FROM files WHERE path = ?',
+                                       (path,)).fetchone()
+
+                if row and row[1:3] == (info.st_size, info.st_mtime):
+                    continue
+
+                sha1 = _sha1(path)
+
+                if row and row[3] == sha1:
+                    self._db.execute('UPDATE files SET size = ?, mtime = ? WHERE number = ?',
+                                     (info.st_size, info.st_mtime, row[0]))
+                    continue
+
+                # a file read again keeps its place in the catalog
+                if row:
+                    self._db.execute('DELETE FROM files WHERE number = ?', (row[0],))
+
+                self._scan(path, info, sha1, row and row[0])
+                scanned.append(path)
+
+        return scanned
+
+    def _scan(self, path, info, sha1, number):
+        with open(path, 'rb') as kernel:
+            head = kernel.read(8)
+
+        if head.startswith('DAF/') or head.startswith('NAIF/DAF'):
+            with DAF(path) as daf:
+                kind = daf.idword[4:].strip()
+                segments = daf.segments()
+
+            number = self._insert(number, path, kind, info, sha1)
+
+            # CK summaries are in spacecraft clock ticks
+            self._db.executemany('INSERT INTO coverage VALUES (?, ?, ?, ?, ?)',
+                                 [(number, kind, s.integers[0], s.doubles[0], s.doubles[1]) for s in segments])
+        else:
+            kind, frames, variables = _scan_text(path)
+            number = self._insert(number, path, kind, info, sha1)
+
+            self._db.executemany('INSERT INTO frames VALUES (?, ?, ?)',
+                                 [(number, code, name) for code, name in frames])
+            self._db.executemany('INSERT INTO variables VALUES (?, ?)',
+                                 [(number, name) for name in sorted(variables)])
+
+    def _insert(self, number, path, kind, info, sha1):
+        return self._db.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                                (number, path, kind, info.st_size, info.st_mtime, sha1)).lastrowid
+
+    def remove(self, *paths):
+        """Take files out of the catalog"""
+        with self._db:
+            self._db.executemany('DELETE FROM files WHERE path = ?', [(os.path.abspath(p),) for p in paths])
+
+    def prune(self):
+        """Take the files that no longer exist out of the catalog, and return them"""
+        gone = [path for path, in self._db.execute('SELECT path FROM files') if not os.path.exists(path)]
+        self.remove(*gone)
+
+        return gone
+
+    def files(self, kind=None):
+        """Return the paths of the files of the kind, or all of them, in catalog order"""
+        if kind is None:
+            rows = self._db.execute('SELECT path FROM files ORDER BY number')
+        else:
+            rows = self._db.execute('SELECT path FROM files WHERE kind = ? ORDER BY number', (kind,))
+
+        return [path for path, in rows]
+
+    def info(self, path):
+        """Return the kind, size, modification time and SHA-1 hash of a file, or None"""
+        return self._db.execute('SELECT kind, size, mtime, sha1 FROM files WHERE path = ?',
+                                (os.path.abspath(path),)).fetchone()
+
+    def coverage(self, code, kind='SPK'):
+        """Return the (start, stop, path) intervals of an ID, in catalog order"""
+        return self._db.execute('SELECT start, stop, path FROM coverage JOIN files ON file = number '
+                                'WHERE coverage.kind = ? AND id = ? ORDER BY number, start',
+                                (kind, self._code(code))).fetchall()
+
+    def _code(self, code):
+        if isinstance(code, numbers.Integral):
+            return int(code)
+
+        found = _spice.bods2c(code)
+
+        if found is None:
+            raise _spice.SpiceException('%s is not a known body' % code)
+
+        return found
+
+    def _span(self, code, start, stop, kind):
+        # CK coverage is in spacecraft clock ticks
+        if kind == 'CK':
+            clock = _spacecraft(code)
+            return _spice.sce2c(clock, start), _spice.sce2c(clock, stop)
+
+        return start, stop
+
+    def _cover(self, code, start, stop, kind):
+        """
+        Return the files whose segments for an ID would be used over
+        [start, stop] if all the files were loaded: at each time, the
+        file added last of those covering it.  Raises ValueError for a
+        gap.
+        """
+        intervals = self._db.execute('SELECT start, stop, number FROM coverage JOIN files ON file = number '
+                                     'WHERE coverage.kind = ? AND id = ? AND stop >= ? AND start <= ? '
+                                     'ORDER BY start', (kind, code, start, stop)).fetchall()
+        points = set([start, stop])
+
+        for low, high, number in intervals:
+            points.update(point for point in (low, high) if start < point < stop)
+
+        points = sorted(points)
+        pieces = zip(points[:-1], points[1:]) or [(start, stop)]
+        chosen = set()
+        active = []
+        i = 0
+
+        # the intervals started so far, latest file first, dropping those
+        # that end before the piece does
+        for low, high in pieces:
+            while i < len(intervals) and intervals[i][0] <= low:
+                heapq.heappush(active, (-intervals[i][2], intervals[i][1]))
+                i += 1
+
+            while active and active[0][1] < high:
+                heapq.heappop(active)
+
+            if not active:
+                raise ValueError('no file covers %s %d at %r' % (kind, code, low))
+
+            chosen.add(-active[0][0])
+
+        return chosen
+
+    def plan(self, ids, start, stop=None, kind='SPK', frames=(), variables=()):
+        """
+        Return the files to load for ids (IDs or names) between the
+        ephemeris times start and stop, and for the frames and pool
+        variables given by name, in the order to load them: text kernels
+        first, then in catalog order.  For each ID the files chosen are
+        those whose data would be used if the whole catalog were loaded,
+        so files superseded by files added later are left out.  Raises
+        ValueError if something isn't covered.
+        """
+        if stop is None:
+            stop = start
+
+        if isinstance(ids, (basestring, numbers.Integral)):
+            ids = [ids]
+
+        chosen = set()
+
+        for code in ids:
+            code = self._code(code)
+            span = self._span(code, start, stop, kind)
+            chosen.update(self._cover(code, span[0], span[1], kind))
+
+        for name in frames:
+            chosen.add(self._defining('SELECT file FROM frames WHERE name = ?', name.upper(), 'frame'))
+
+        for name in variables:
+            chosen.add(self._defining('SELECT file FROM variables WHERE name = ?', name, 'pool variable'))
+
+        rows = self._db.execute('SELECT number, path, kind FROM files WHERE number IN (%s)' %
+                                ', '.join('?' * len(chosen)), sorted(chosen)).fetchall()
+        rows.sort(key=lambda row: (row[2] in ('SPK', 'CK', 'PCK'), row[0]))
+
+        return [path for number, path, kind in rows]
+
+    def _defining(self, query, name, what):
+        # the file added last wins, as the one loaded last would
+        row = self._db.execute(query + ' ORDER BY file DESC', (name,)).fetchone()
+
+        if row is None:
+            raise ValueError('no file defines the %s %s' % (what, name))
+
+        return row[0]
+
+    def manager(self, capacity=100):
+        """Return a KernelManager for the SPK, CK and binary PCK files of the catalog"""
+        manager = KernelManager(capacity)
+
+        for path, kind, code, start, stop in self._db.execute(
+                'SELECT path, coverage.kind, id, start, stop FROM coverage JOIN files ON file = number '
+                'ORDER BY number'):
+            manager._add(path, kind, code, start, stop)
+
+        return manager
@@ -0,0 +1,359 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Chebyshev ephemerides and orientations evaluated with NumPy.
+
+SPK types 2 and 3 and binary PCK type 2 segments are fixed length
+records of Chebyshev coefficients.  ChebyshevEphemeris and
+ChebyshevOrientation read the segment summaries of the kernels once and
+view the records in place, as arrays over the mapped files (see
+spice.daf), and then evaluate whole arrays of epochs with NumPy: the segment
+for each epoch is found with searchsorted, the record by its index, and
+the polynomials are summed with the Clenshaw recurrence, without calling
+CSPICE.  The results agree with CSPICE to round-off.
+
+Segments of other types are left out, so a body or frame is only covered
+where one of its Chebyshev segments applies; as in CSPICE, segments of
+files loaded later, and later in a file, take precedence.
+"""
+
+import numbers
+
+import _spice
+
+from arrays import numpy
+from daf import DAF
+
+__all__ = ['ChebyshevEphemeris', 'ChebyshevOrientation']
+
+
+class _Segment(object):
+    """The records of one Chebyshev segment, as arrays"""
+
+    def __init__(self, segment, components):
+        self.start, self.stop = segment.doubles[:2]
+
+        data = segment.data
+        self.init, self.intlen, rsize, n = data[-4:]
+        rsize, n = int(rsize), int(n)
+
+        records = data[:n * rsize].reshape(n, rsize)
+        self.mid = records[:, 0]
+        self.radius = records[:, 1]
+        self.coef = records[:, 2:].reshape(n, components, -1)
+
+    def evaluate(self, et):
+        """Return the values of the polynomials at et and their derivatives"""
+        index = ((et - self.init) // self.intlen).astype(int)
+        index = numpy.clip(index, 0, len(self.mid) - 1)
+
+        radius = self.radius[index][:, None]
+        coef = self.coef[index]
+        s = ((et - self.mid[index]) / self.radius[index])[:, None]
+
+        # Clenshaw for the sum and, differentiated, for its derivative
+        b1 = b2 = d1 = d2 = 0.0
+
+        for k in xrange(coef.shape[2] - 1, 0, -1):
+            d1, d2 = 2.0 * b1 + 2.0 * s * d1 - d2, d1
+            b1, b2 = coef[:, :, k] + 2.0 * s * b1 - b2, b1
+
+        value = coef[:, :, 0] + s * b1 - b2
+        derivative = (b1 + s * d1 - d2) / radius
+
+        return value, derivative * numpy.ones_like(value)
+
+
+class _Coverage(object):
+    """
+    The segments of one body, and for the intervals between their start
+    and stop times the segment that applies there.
+    """
+
+    def __init__(self):
+        self.segments = []      # highest precedence first
+
+    def index(self):
+        bounds = sorted(set([s.start for s in self.segments] + [s.stop for s in self.segments]))
+        winners = []
+
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            middle = 0.5 * (low + high)
+            winner = -1
+
+            for i, segment in enumerate(self.segments):
+                if segment.start <= middle <= segment.stop:
+                    winner = i
+                    break
+
+            winners.append(winner)
+
+        self.bounds = numpy.array(bounds)
+        self.winners = numpy.array(winners + [-1], dtype=int)
+
+    def lookup(self, et):
+        """Return the index of the segment that applies at each epoch, -1 for none"""
+        if len(self.bounds) < 2:
+            if len(self.bounds) and len(self.segments):
+                return numpy.where(et == self.bounds[0], 0, -1)
+
+            return numpy.zeros(len(et), dtype=int) - 1
+
+        i = numpy.searchsorted(self.bounds, et, 'right') - 1
+        inside = (i >= 0) & (i < len(self.bounds) - 1)
+
+        # the stop times are covered too, by the segment ending there if
+        # it takes precedence
+        at_bound = (et == self.bounds[numpy.clip(i, 0, len(self.bounds) - 1)]) & (i > 0)
+        before = self.winners[numpy.clip(i - 1, 0, None)]
+        here = numpy.where(inside, self.winners[numpy.clip(i, 0, None)], -1)
+        prefer = at_bound & (before >= 0) & ((here < 0) | (before < here))
+
+        return numpy.where(prefer, before, here)
+
+
+def _loaded(kind):
+    """Return the loaded kernels of the kind, latest first"""
+    return [_spice.kdata(i, kind)[0] for i in reversed(xrange(_spice.ktotal(kind)))]
+
+
+def _epochs(et):
+    et = numpy.asarray(et, dtype=float)
+    return et.ndim == 0, numpy.atleast_1d(et)
+
+
+def _insufficient(what, count):
+    raise _spice.SpiceException('Insufficient Chebyshev data for %s at %d epochs' % (what, count))
+
+
+class _Chebyshev(object):
+
+    def __init__(self, kernels, kind, types):
+        if numpy is None:
+            raise ImportError('Chebyshev evaluation needs NumPy')
+
+        if kernels is None:
+            kernels = _loaded(kind)
+        elif isinstance(kernels, basestring):
+            kernels = [kernels]
+        else:
+            # given in load order
+            kernels = list(reversed(kernels))
+
+        self.coverage = {}
+
+        for path in kernels:
+            with DAF(path) as daf:
+                for found in reversed(daf.segments()):
+                    components = types.get(found.integers[-3])
+
+                    if components:
+                        segment = _Segment(found, components)
+                        self._add(segment, found.integers)
+                        self.coverage.setdefault(found.integers[0], _Coverage()).segments.append(segment)
+
+        for coverage in self.coverage.values():
+            coverage.index()
+
+
+class ChebyshevEphemeris(_Chebyshev):
+    """
+    The SPK type 2 and 3 segments of kernels, a list of SPK files in the
+    order they would be loaded, or by default of the SPK kernels loaded
+    now.
+
+    States are geometric (no aberration correction) and in the frame of
+    the segments, which must be the same along the way from the target
+    to the observer, as it is in the planetary ephemerides.
+    """
+
+    def __init__(self, kernels=None):
+        _Chebyshev.__init__(self, kernels, 'SPK', {2: 3, 3: 6})
+
+    def _add(self, segment, integers):
+        segment.target, segment.center, segment.frame = integers[:3]
+        segment.type = integers[3]
+
+    def _walk(self, body, et, stop, state, frame):
+        """
+        Add to state the states along the chain of centers from body
+        (an array, one per epoch) until stop or the end of the data.
+        Returns the bodies reached.
+        """
+        body = body.copy()
+        active = body != stop if stop is not None else numpy.ones(len(body), dtype=bool)
+
+        while active.any():
+            for code in numpy.unique(body[active]):
+                where = numpy.nonzero(active & (body == code))[0]
+                coverage = self.coverage.get(code)
+
+                if coverage is None:
+                    active[where] = False
+                    continue
+
+                chosen = coverage.lookup(et[where])
+                active[where[chosen < 0]] = False
+
+                for i in numpy.unique(chosen[chosen >= 0]):
+                    segment = coverage.segments[i]
+                    part = where[chosen == i]
+                    value, derivative = segment.evaluate(et[part])
+
+                    if segment.type == 2:
+                        state[part] += numpy.hstack((value, derivative))
+                    else:
+                        state[part] += value
+
+                    if ((frame[part] >= 0) & (frame[part] != segment.frame)).any():
+                        raise ValueError('the segments from body %d are in different frames' % code)
+
+                    frame[part] = segment.frame
+                    body[part] = segment.center
+                    active[part] = segment.center != stop
+
+        return body
+
+    def state(self, target, et, observer):
+        """
+        Return the state of target relative to observer at et, a scalar
+        or an array of epochs, as a (6,) or (N,6) array.  Bodies may be
+        given by name or ID.
+        """
+        scalar, et = _epochs(et)
+        target, observer = [self._body(body) for body in (target, observer)]
+
+        state = numpy.zeros((len(et), 6))
+        frame = numpy.zeros(len(et), dtype=int) - 1
+        reached = self._walk(numpy.zeros(len(et), dtype=int) + target, et, observer, state, frame)
+
+        # where the target's chain misses the observer, subtract the
+        # observer's chain to the same body
+        missed = numpy.nonzero(reached != observer)[0]
+
+        if len(missed):
+            other = numpy.zeros((len(missed), 6))
+            other_frame = frame[missed]
+            common = self._walk(numpy.zeros(len(missed), dtype=int) + observer, et[missed],
+                                None, other, other_frame)
+
+            if (common != reached[missed]).any():
+                _insufficient('%d relative to %d' % (target, observer), (common != reached[missed]).sum())
+
+            state[missed] -= other
+
+        return state[0] if scalar else state
+
+    def position(self, target, et, observer):
+        """Return the positions of target relative to observer, as state does"""
+        return self.state(target, et, observer)[..., :3]
+
+    def _body(self, body):
+        if isinstance(body, numbers.Integral):
+            return int(body)
+
+        code = _spice.bods2c(body)
+
+        if code is None:
+            raise _spice.SpiceException('%s is not a known body' % body)
+
+        return code
+
+
+def _rotations(angle, axis):
+    """Return the matrices of rotations of frames by angle about axis (1 to 3)"""
+    c, s = numpy.cos(angle), numpy.sin(angle)
+    i, j = [(1, 2), (2, 0), (0, 1)][axis - 1]
+
+    m = numpy.zeros(angle.shape + (3, 3))
+    m[:, axis - 1, axis - 1] = 1.0
+    m[:, i, i] = m[:, j, j] = c
+    m[:, i, j] = s
+    m[:, j, i] = -s
+
+    # and the derivatives with respect to the angle
+    d = numpy.zeros_like(m)
+    d[:, i, i] = d[:, j, j] = -s
+    d[:, i, j] = c
+    d[:, j, i] = -c
+
+    return m, d
+
+
+class ChebyshevOrientation(_Chebyshev):
+    """
+    The binary PCK type 2 segments of kernels, a list of PCK files in the
+    order they would be loaded, or by default of the binary PCK kernels
+    loaded now.
+
+    Orientations are looked up by the frame class ID of the segments,
+    which is the FRAME_<id>_CLASS_ID of the body-fixed frame (3000 for
+    ITRF93, for example).
+    """
+
+    def __init__(self, kernels=None):
+        _Chebyshev.__init__(self, kernels, 'PCK', {2: 3})
+
+    def _add(self, segment, integers):
+        segment.frame = integers[1]
+
+    def _angles(self, classid, et):
+        coverage = self.coverage.get(classid)
+
+        if coverage is None:
+            _insufficient('frame class %d' % classid, len(et))
+
+        chosen = coverage.lookup(et)
+
+        if (chosen < 0).any():
+            _insufficient('frame class %d' % classid, (chosen < 0).sum())
+
+        angles = numpy.zeros((len(et), 3))
+        rates = numpy.zeros((len(et), 3))
+
+        for i in numpy.unique(chosen):
+            part = chosen == i
+            angles[part], rates[part] = coverage.segments[i].evaluate(et[part])
+
+        return angles, rates
+
+    def _matrices(self, classid, et):
+        # the segment angles are the Euler angles of the rotation
+        # [angle 3]3 [angle 2]1 [angle 1]3 from the segment frame
+        angles, rates = self._angles(classid, et)
+
+        a, da = _rotations(angles[:, 2], 3)
+        b, db = _rotations(angles[:, 1], 1)
+        c, dc = _rotations(angles[:, 0], 3)
+
+        m = numpy.matmul(numpy.matmul(a, b), c)
+        dm = (numpy.matmul(numpy.matmul(da * rates[:, 2, None, None], b), c) +
+              numpy.matmul(numpy.matmul(a, db * rates[:, 1, None, None]), c) +
+              numpy.matmul(numpy.matmul(a, b), dc * rates[:, 0, None, None]))
+
+        return m, dm
+
+    def rotation(self, classid, et):
+        """
+        Return the rotation from the segment frame to the body-fixed frame
+        at et, a scalar or an array of epochs, as a (3,3) or (N,3,3) array,
+        as pxform does.
+        """
+        scalar, et = _epochs(et)
+        m = self._matrices(classid, et)[0]
+
+        return m[0] if scalar else m
+
+    def transform(self, classid, et):
+        """
+        Return the state transformation from the segment frame to the
+        body-fixed frame, as a (6,6) or (N,6,6) array, as sxform does.
+        """
+        scalar, et = _epochs(et)
+        m, dm = self._matrices(classid, et)
+
+        xform = numpy.zeros((len(et), 6, 6))
+        xform[:, :3, :3] = xform[:, 3:, 3:] = m
+        xform[:, 3:, :3] = dm
+
+        return xform[0] if scalar else xform
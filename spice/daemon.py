@@ -0,0 +1,382 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+A SPICE server on a Unix domain socket, and its client.
+
+Loading a large meta-kernel takes seconds and the memory of every process
+that loads it.  A SpiceServer loads the kernels once and answers calls
+from any number of client processes over a Unix domain socket; a
+SpiceClient connects in a few milliseconds and calls the spice functions
+of the server by name, as if they were its own:
+
+    python -m spice.daemon /tmp/spice.sock meta.tm
+
+    client = SpiceClient('/tmp/spice.sock')
+    state, lt = client.spkezr('SMAP', et, 'J2000', 'NONE', 'EARTH')
+    states, lts = client.spkezr_batch('SMAP', ets, 'J2000', 'NONE', 'EARTH')
+
+Each message is a fixed header giving two lengths, a marshal encoded
+description of the call or result, and the raw bytes of the arrays in it,
+so batch calls send their epochs and get their results back without
+conversion.  Clients may only call the queries listed in ALLOWED, so
+the kernels and settings of the server stay as they are for everyone.
+
+The messages are unmarshalled as they arrive, and marshal isn't safe
+against data crafted to attack it, so the socket is created readable
+and writable by the user running the server only.  Anyone who can
+connect to it is trusted with the server process; don't open its
+permissions up to other users.
+"""
+
+import array
+import exceptions
+import marshal
+import os
+import signal
+import socket
+import SocketServer
+import stat
+import struct
+import sys
+import threading
+
+import _spice
+
+import parallel
+from arrays import numpy
+
+__all__ = ['SpiceServer', 'SpiceClient', 'serve']
+
+# the lengths of the description and of the array bytes that follow
+HEADER = struct.Struct('<II')
+
+# stands for an array in a description: (ARRAY, index)
+ARRAY = '\0array'
+
+# the functions clients may call: queries, which leave the server as it
+# was for the others.  Cells can't be sent, so the window functions and
+# the geometry finder searches, which fill a cell, aren't among them.
+ALLOWED = frozenset([
+    # time
+    'str2et', 'utc2et', 'et2utc', 'timout', 'tparse', 'tpictr', 'deltet', 'unitim', 'etcal',
+    'sce2c', 'sce2s', 'sce2t', 'scs2e', 'sct2e', 'scencd', 'scdecd', 'scfmt', 'scpart',
+    # names, frames and the pool
+    'bodc2n', 'bodc2s', 'bodn2c', 'bods2c', 'bodfnd', 'bodvcd', 'bodvrd',
+    'cidfrm', 'cnmfrm', 'ccifrm', 'frinfo', 'frmnam', 'namfrm',
+    'dtpool', 'expool', 'gcpool', 'gdpool', 'gipool', 'gnpool', 'kdata', 'kinfo', 'ktotal',
+    # geometry
+    'spkezr', 'spkez', 'spkezp', 'spkpos', 'spkgeo', 'spkgps', 'spkssb',
+    'spkcpo', 'spkcpt', 'spkcvo', 'spkcvt', 'pxform', 'pxfrm2', 'sxform', 'ckgp', 'ckgpav', 'ltime',
+    'subpnt', 'subslr', 'sincpt', 'ilumin', 'illum', 'limbpt', 'termpt', 'occult', 'et2lst', 'lspcn',
+    'conics', 'oscelt', 'edlimb', 'inelpl', 'inedpl', 'nvc2pl', 'nvp2pl', 'pl2nvc', 'pl2nvp',
+    'pl2psv', 'psv2pl', 'pjelpl', 'el2cgv', 'cgv2el', 'npedln', 'npelpt', 'nplnpt', 'surfpt',
+    'surfnm', 'georec', 'recgeo', 'latrec', 'reclat', 'radrec', 'recrad', 'sphrec', 'recsph',
+    'cylrec', 'reccyl', 'pgrrec', 'recpgr',
+    # constants and vectors
+    'clight', 'dpr', 'rpd', 'spd', 'pi', 'halfpi', 'twopi', 'convrt',
+    'vadd', 'vcrss', 'ucrss', 'vdist', 'vdot', 'vhat', 'vminus', 'vnorm', 'vrotv', 'vscl', 'vsep',
+    'vsub', 'mxv', 'mtxv', 'mxm', 'mxmt', 'mtxm', 'xpose', 'invert', 'det', 'trace',
+    'm2q', 'q2m', 'm2eul', 'eul2m', 'axisar', 'raxisa', 'rotate', 'rotmat',
+    # the batch functions
+    'spkezr_batch', 'spkpos_batch', 'pxform_batch', 'sxform_batch',
+    'str2et_batch', 'utc2et_batch', 'et2utc_batch', 'timout_batch',
+])
+
+
+def _receive(sock, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    done = 0
+
+    while done < size:
+        count = sock.recv_into(view[done:], min(size - done, 1 << 20))
+
+        if not count:
+            raise EOFError('the connection was closed')
+
+        done += count
+
+    return data
+
+
+def _encode(value, arrays):
+    """Return value with its arrays replaced by references to arrays"""
+    if numpy is not None and isinstance(value, numpy.generic):
+        return value.item()
+    elif numpy is not None and isinstance(value, numpy.ndarray):
+        arrays.append(('numpy', value.dtype.str, value.shape, numpy.ascontiguousarray(value).tostring()))
+    elif isinstance(value, array.array):
+        arrays.append(('array', value.typecode, len(value), value.tostring()))
+    elif isinstance(value, tuple):
+        return tuple(_encode(item, arrays) for item in value)
+    elif isinstance(value, list):
+        return [_encode(item, arrays) for item in value]
+    else:
+        return value
+
+    return (ARRAY, len(arrays) - 1)
+
+
+def _decode(value, arrays):
+    """Return value with the references to arrays replaced by the arrays"""
+    if isinstance(value, tuple):
+        if len(value) == 2 and value[0] == ARRAY:
+            return arrays[value[1]]
+
+        return tuple(_decode(item, arrays) for item in value)
+
+    if isinstance(value, list):
+        return [_decode(item, arrays) for item in value]
+
+    return value
+
+
+def _pack(value):
+    """Return the message carrying value"""
+    arrays = []
+    description = _encode(value, arrays)
+    layout = [meta[:3] for meta in arrays]
+    head = marshal.dumps((description, layout))
+    body = [data for kind, typecode, shape, data in arrays]
+
+    return HEADER.pack(len(head), sum(len(data) for data in body)) + head + ''.join(body)
+
+
+def _unpack(head, body):
+    """Return the value of a message from its description and array bytes"""
+    description, layout = marshal.loads(head)
+    arrays = []
+    offset = 0
+
+    for kind, typecode, shape in layout:
+        if kind == 'numpy':
+            if numpy is None:
+                raise ImportError('arrays from the other end need NumPy')
+
+            dtype = numpy.dtype(typecode)
+            count = int(numpy.prod(shape))
+            size = dtype.itemsize * count
+
+            # the arrays view the message, which nothing else holds
+            if count:
+                arrays.append(numpy.frombuffer(body, dtype, count, offset).reshape(shape))
+            else:
+                arrays.append(numpy.zeros(shape, dtype))
+        else:
+            values = array.array(typecode)
+            size = values.itemsize * shape
+            values.fromstring(str(body[offset:offset + size]))
+            arrays.append(values)
+
+        offset += size
+
+    return _decode(description, arrays)
+
+
+def _send(sock, value):
+    sock.sendall(_pack(value))
+
+
+def _read(sock):
+    head_size, body_size = HEADER.unpack(str(_receive(sock, HEADER.size)))
+    head = str(_receive(sock, head_size))
+
+    return _unpack(head, _receive(sock, body_size))
+
+
+def _error(error):
+    """Return the exception a client raises for an error of the server"""
+    name, message = error
+
+    if name == 'SpiceException':
+        return _spice.SpiceException(message)
+
+    kind = getattr(exceptions, name, None)
+
+    if isinstance(kind, type) and issubclass(kind, Exception):
+        return kind(message)
+
+    return RuntimeError('%s: %s' % (name, message))
+
+
+class _Handler(SocketServer.BaseRequestHandler):
+
+    def setup(self):
+        with self.server._connections_lock:
+            self.server._connections[self.request] = threading.current_thread()
+
+    def finish(self):
+        with self.server._connections_lock:
+            self.server._connections.pop(self.request, None)
+
+    def handle(self):
+        while True:
+            try:
+                name, args = _read(self.request)
+            except (EOFError, socket.error):
+                # the client went away, or the server is closing
+                return
+
+            try:
+                result = (True, self.server.call(name, args))
+            except Exception as error:
+                result = (False, (type(error).__name__, str(error)))
+
+            try:
+                _send(self.request, result)
+            except (TypeError, ValueError) as error:
+                # a result marshal can't carry
+                _send(self.request, (False, ('TypeError', 'the result of %s cannot be sent: %s' % (name, error))))
+            except socket.error:
+                return
+
+
+class SpiceServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    A server on the Unix domain socket at path, with kernels loaded.  Each
+    client connection is served by a thread; CSPICE runs one call at a
+    time.  serve_forever() serves until shutdown() is called from another
+    thread; close() stops listening, closes the client connections and
+    removes the socket.  Only the user running the server may connect.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, kernels=()):
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError('%s exists and is not a socket' % path)
+
+            probe = socket.socket(socket.AF_UNIX)
+
+            try:
+                probe.connect(path)
+            except socket.error:
+                # left behind by a server that is gone
+                os.unlink(path)
+            else:
+                probe.close()
+                raise ValueError('a server is listening on %s already' % path)
+
+        for kernel in kernels:
+            parallel.furnsh(kernel)
+
+        self._connections = {}      # socket: the thread serving it
+        self._connections_lock = threading.Lock()
+
+        SocketServer.UnixStreamServer.__init__(self, path, _Handler)
+        self.path = path
+
+    def server_bind(self):
+        # create the socket without permissions for the group and others
+        mask = os.umask(0177)
+
+        try:
+            SocketServer.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(mask)
+
+    def call(self, name, args):
+        """
+        Return the result of the spice function name called with args.
+        Raises ValueError for a function not in ALLOWED.
+        """
+        import spice
+
+        function = getattr(spice, name, None) if not name.startswith('_') else None
+
+        if not callable(function):
+            raise AttributeError('spice has no function %s' % name)
+
+        if name not in ALLOWED:
+            raise ValueError('%s may not be called through the server' % name)
+
+        return function(*args)
+
+    def close(self):
+        self.server_close()
+
+        with self._connections_lock:
+            connections = self._connections.items()
+
+        # wake the handlers waiting for requests, and let them finish
+        for connection, thread in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+        for connection, thread in connections:
+            thread.join(1.0)
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class SpiceClient(object):
+    """
+    A connection to the SpiceServer at path.  The functions of the spice
+    module are its methods, called on the server; SPICE errors are raised
+    as SpiceException.  A client may be used by several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX)
+        self._socket.connect(path)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._socket.close()
+
+    def call(self, name, *args):
+        """Return the result of the spice function name on the server"""
+        with self._lock:
+            _send(self._socket, (name, args))
+            ok, result = _read(self._socket)
+
+        if not ok:
+            raise _error(result)
+
+        return result
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def function(*args):
+            return self.call(name, *args)
+
+        function.__name__ = name
+        setattr(self, name, function)
+
+        return function
+
+
+def serve(path, kernels=()):
+    """Load kernels and serve them on the socket at path until interrupted"""
+    server = SpiceServer(path, kernels)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # serve_forever has returned, so shutdown() doesn't wait
+        server.shutdown()
+        server.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: python -m spice.daemon SOCKET [KERNEL ...]')
+
+    # stop on SIGTERM as on an interrupt, removing the socket
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    serve(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,176 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Reading DAF files (SPK, CK and binary PCK kernels) directly.
+
+A DAF is a sequence of 1024 byte records: a file record, then summary
+records, each followed by a name record, that describe the segments, and
+the segment data as double precision words addressed from 1.
+
+A DAF here is mapped into memory read only, and segment data is handed
+out as NumPy arrays viewing the mapping, in the byte order of the file,
+so nothing is copied and nothing is read until it is used.  Processes
+that map the same file share its pages, and a DAF passed to a worker
+process is mapped again there.  The mapping stays valid as long as any
+array viewing it is alive, even after the DAF is closed.
+"""
+
+import array
+import mmap
+import struct
+import sys
+
+from arrays import numpy
+
+__all__ = ['DAF', 'DAFSegment']
+
+RECORD = 1024
+
+
+class DAFSegment(object):
+    """
+    A segment of a DAF: its name, and the nd doubles and ni integers of
+    its summary.  The last two integers are the addresses of its first
+    and last double words.
+    """
+
+    def __init__(self, daf, name, doubles, integers):
+        self.daf = daf
+        self.name = name
+        self.doubles = doubles
+        self.integers = integers
+        self.begin, self.end = integers[-2:]
+
+    def __repr__(self):
+        return 'DAFSegment(%r, %r, %r)' % (self.name, self.doubles, self.integers)
+
+    def __len__(self):
+        return self.end - self.begin + 1
+
+    @property
+    def data(self):
+        """The double words of the segment, as for DAF.read"""
+        return self.daf.read(self.begin, self.end)
+
+
+class DAF(object):
+    """
+    A DAF file opened for reading.  idword is the file type ('DAF/SPK',
+    'DAF/CK', 'DAF/PCK', ...), ifname the internal file name, nd and ni
+    the numbers of double and integer components of the segment
+    summaries, and byteorder '<' or '>'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as daf_file:
+            self._map = mmap.mmap(daf_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        record = self._map[:RECORD]
+
+        if len(record) < RECORD or not (record.startswith('DAF/') or record.startswith('NAIF/DAF')):
+            self.close()
+            raise ValueError('%s is not a DAF file' % path)
+
+        self.idword = record[:8].rstrip()
+
+        fmt = record[88:96]
+
+        if fmt == 'LTL-IEEE':
+            self.byteorder = '<'
+        elif fmt == 'BIG-IEEE':
+            self.byteorder = '>'
+        else:
+            # old files don't name their format; ND is between 0 and 124
+            little = struct.unpack('<i', record[8:12])[0]
+            self.byteorder = '<' if 0 <= little <= 124 else '>'
+
+        self.nd, self.ni = struct.unpack(self.byteorder + '2i', record[8:16])
+        self.ifname = record[16:76].rstrip()
+        self.fward, self.bward, self.free = struct.unpack(self.byteorder + '3i', record[76:88])
+
+        # summary size in double words, and name size in characters
+        self.ss = self.nd + (self.ni + 1) // 2
+        self.nc = 8 * self.ss
+
+        self._segments = None
+
+    def __getstate__(self):
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'DAF(%r)' % self.path
+
+    def close(self):
+        """
+        Let go of the mapping; it is unmapped once no array views it.
+        """
+        self._map = None
+
+    def _record(self, number):
+        return self._map[(number - 1) * RECORD:number * RECORD]
+
+    def segments(self):
+        """Return the segments, in file order, as DAFSegments"""
+        if self._segments is not None:
+            return list(self._segments)
+
+        segments = []
+        number = self.fward
+        doubles = '%s%dd' % (self.byteorder, self.nd)
+        integers = '%s%di' % (self.byteorder, self.ni)
+
+        while number:
+            record = self._record(number)
+            names = self._record(number + 1)
+            next, prev, count = struct.unpack(self.byteorder + '3d', record[:24])
+
+            for i in xrange(int(count)):
+                start = 24 + 8 * self.ss * i
+                middle = start + 8 * self.nd
+                name = names[i * self.nc:(i + 1) * self.nc].rstrip()
+
+                segments.append(DAFSegment(self, name,
+                                           struct.unpack(doubles, record[start:middle]),
+                                           struct.unpack(integers, record[middle:middle + 4 * self.ni])))
+
+            number = int(next)
+
+        self._segments = segments
+
+        return list(segments)
+
+    def read(self, begin, end):
+        """
+        Return the double words from address begin to end, inclusive.  With
+        NumPy this is a read only array viewing the file; without it, an
+        array.array('d') copy in native byte order.
+        """
+        if end < begin:
+            raise ValueError('address %d comes before %d' % (end, begin))
+
+        offset = 8 * (begin - 1)
+
+        if numpy is not None:
+            return numpy.frombuffer(self._map, self.byteorder + 'f8', end - begin + 1, offset)
+
+        words = array.array('d', self._map[offset:8 * end])
+
+        if self.byteorder != ('<' if sys.byteorder == 'little' else '>'):
+            words.byteswap()
+
+        return words
+
+    def raw(self, begin, end):
+        """Return the bytes of the double words from begin to end, without copying them"""
+        return buffer(self._map, 8 * (begin - 1), 8 * (end - begin + 1))
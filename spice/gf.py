@@ -0,0 +1,91 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+GF searches on quantities computed in Python.
+
+gfuds finds when a scalar function of time satisfies a relation and gfudb
+when a boolean function of time is true, with the CSPICE step and root
+finding search rather than sampling in Python.  The confinement window
+may be a double precision Cell or a window array as used by spice.windows;
+the intervals found are written to the result Cell, which is returned.
+
+By default the callables are called with one epoch at a time.  With
+vectorized=True they take an array of epochs (a NumPy array when NumPy is
+installed, otherwise an array.array('d')) and return an array of results
+of the same length.  The epochs GF steps through are then evaluated up to
+batch at a time, and only the root refinement asks for single epochs.
+
+An exception raised by a callable ends the search and is raised again by
+gfuds or gfudb.
+"""
+
+import _spice
+
+from arrays import double_array, numpy
+from objects import Cell
+from windows import window_cell
+
+__all__ = ['gfuds', 'gfudb', 'uddf', 'uddc']
+
+
+def _vectorized(function):
+    """Hand function the epochs as an array and its results back as doubles"""
+    def call(buf):
+        result = function(double_array(buf, (-1,)))
+
+        if numpy is not None:
+            return numpy.asarray(result, dtype=numpy.float64)
+
+        return result
+
+    return call
+
+
+def _confinement(cnfine):
+    if isinstance(cnfine, Cell):
+        return cnfine
+
+    return window_cell(cnfine)
+
+
+def gfuds(udfuns, udqdec, relate, refval, adjust, step, nintvls, cnfine, result,
+          vectorized=False, batch=100, dt=1.0):
+    """
+    Find when udfuns(et) satisfies relate ('>', '<', '=', 'LOCMIN',
+    'ABSMIN', 'LOCMAX' or 'ABSMAX') with refval and adjust, as gfuds does.
+
+    udqdec(et) returns True where udfuns is decreasing.  When udqdec is
+    None this is taken from the derivative of udfuns over +/- dt seconds,
+    as uddc does.  The other arguments are as for gfuds.
+    """
+    if vectorized:
+        udfuns = _vectorized(udfuns)
+        udqdec = udqdec and _vectorized(udqdec)
+    else:
+        batch = 0
+
+    return _spice._gfuds(udfuns, udqdec, relate, refval, adjust, step, nintvls,
+                         _confinement(cnfine), result, batch, dt)
+
+
+def gfudb(udfunb, step, cnfine, result, vectorized=False, batch=100):
+    """
+    Find when udfunb(et) is true, as gfudb does.  udfunb takes the epoch
+    alone; unlike the CSPICE one it isn't passed a udfuns.
+    """
+    if vectorized:
+        udfunb = _vectorized(udfunb)
+    else:
+        batch = 0
+
+    return _spice._gfudb(udfunb, step, _confinement(cnfine), result, batch)
+
+
+def uddf(udfunc, x, dx):
+    """Return the derivative of udfunc at x, taken over +/- dx (uddf)"""
+    return _spice._uddf(udfunc, x, dx)
+
+
+def uddc(udfunc, x, dx):
+    """Return True if udfunc is decreasing at x, as uddc does"""
+    return _spice._uddc(udfunc, x, dx)
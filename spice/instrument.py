@@ -0,0 +1,115 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Call counts and timings of the wrapped CSPICE functions.
+
+Every generated wrapper is compiled with a counter in front of it, which
+does nothing but test a flag until instrumentation is turned on:
+
+    set_instrumentation(True)
+    run()
+    for name, entry in sorted(stats().items(), key=lambda item: -item[1]['seconds']):
+        print name, entry['calls'], entry['seconds'], entry['spice_seconds']
+
+For each function called, stats() gives the number of calls and of
+errors raised, the time spent in the wrapper, all told and at most in one
+call, and how that time splits between CSPICE itself and parsing the
+arguments and building the results.  The times are in seconds and
+include neither the Python code around the wrapper (the memoization
+cache, ...) nor any wait for another thread's CSPICE call.  The batch
+and window functions are counted under their _spice names
+(_spkezr_batch, _wncombine, ...); the other hand-written ones aren't.
+"""
+
+import _spice
+
+__all__ = ['set_instrumentation', 'get_instrumentation', 'instrumentation', 'stats', 'reset_stats',
+           'format_stats']
+
+
+def set_instrumentation(enabled):
+    """
+    Count and time the wrapper calls made from now on when enabled is
+    true, or stop when it is false, the default.  The setting applies to
+    the whole module, in every thread; the counts are kept while it is
+    off.
+    """
+    _spice._set_instrumentation(enabled)
+
+
+def get_instrumentation():
+    """Return True if instrumentation is on"""
+    return _spice._get_instrumentation()
+
+
+class instrumentation(object):
+    """
+    Context manager that turns instrumentation on (or off, with
+    enabled=False) for the calls made inside it:
+
+      with instrumentation():
+          run()
+      print format_stats()
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = get_instrumentation()
+        set_instrumentation(self.enabled)
+        return self
+
+    def __exit__(self, *exc_info):
+        set_instrumentation(self.previous)
+        return False
+
+
+def stats():
+    """
+    Return the counts and times of the functions called while
+    instrumentation was on, since the last reset_stats(), as a dict of
+    dicts by function name, with the keys calls, errors, seconds,
+    max_seconds, spice_seconds and marshal_seconds.
+    """
+    result = {}
+
+    for name, calls, errors, seconds, max_seconds, spice_seconds in _spice._stats():
+        result[name] = {
+            'calls': calls,
+            'errors': errors,
+            'seconds': seconds,
+            'max_seconds': max_seconds,
+            'spice_seconds': spice_seconds,
+            'marshal_seconds': max(seconds - spice_seconds, 0.0),
+        }
+
+    return result
+
+
+def reset_stats():
+    """Set the counts and times of all the functions back to zero"""
+    _spice._reset_stats()
+
+
+def format_stats(limit=None):
+    """
+    Return stats() as a table, one function per line, the function taking
+    the most time first; only the first limit are listed if it is given.
+    The times per call are in microseconds.
+    """
+    entries = sorted(stats().items(), key=lambda item: (-item[1]['seconds'], item[0]))
+
+    if limit is not None:
+        entries = entries[:limit]
+
+    lines = ['%-12s %10s %8s %10s %10s %10s %10s' % ('function', 'calls', 'errors', 'seconds',
+                                                     'us/call', 'max us', 'cspice %')]
+
+    for name, entry in entries:
+        lines.append('%-12s %10d %8d %10.4f %10.2f %10.1f %10.1f' % (
+            name, entry['calls'], entry['errors'], entry['seconds'],
+            1e6 * entry['seconds'] / entry['calls'], 1e6 * entry['max_seconds'],
+            100.0 * entry['spice_seconds'] / entry['seconds'] if entry['seconds'] else 0.0))
+
+    return '\n'.join(lines)
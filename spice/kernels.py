@@ -0,0 +1,210 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Loading kernels on demand.
+
+CSPICE can only have so many files loaded, and searches all the loaded
+segments of a body, so an archive of thousands of SPK or CK files can't
+simply be loaded.  A KernelManager registers SPK, CK and binary PCK files
+without loading them: their segment summaries, read directly from the
+files, go into a coverage index of (ID, start, stop) intervals.  Before a
+query, require() loads the files that cover the IDs and times it needs,
+and unloads the least recently used files beyond the manager's capacity,
+so the cost of a query depends on the files in use, not on the size of
+the archive.
+
+Loading and unloading go through spice.parallel's furnsh and unload, so
+worker pools and memoization see them.  Files that cover the same ID and
+time are loaded in the order they were registered, so the file
+registered last takes precedence, as if all of them had been loaded.
+"""
+
+import bisect
+import collections
+import numbers
+import threading
+
+import _spice
+
+import parallel
+from daf import DAF
+
+__all__ = ['KernelManager']
+
+
+class _IntervalIndex(object):
+    """
+    Intervals (start, stop, value), sorted by start, with the largest stop
+    of each prefix, so the intervals overlapping a span are found by
+    bisection and a scan of the candidates only.
+    """
+
+    def __init__(self):
+        self.intervals = []
+        self._starts = None
+
+    def add(self, start, stop, value):
+        self.intervals.append((start, stop, value))
+        self._starts = None
+
+    def _build(self):
+        self.intervals.sort(key=lambda interval: interval[0])
+        self._starts = [interval[0] for interval in self.intervals]
+        self._reach = []
+
+        reach = float('-inf')
+
+        for start, stop, value in self.intervals:
+            reach = max(reach, stop)
+            self._reach.append(reach)
+
+    def overlapping(self, start, stop):
+        """Return the values of the intervals that overlap [start, stop]"""
+        if self._starts is None:
+            self._build()
+
+        found = []
+        i = bisect.bisect_right(self._starts, stop) - 1
+
+        # the reach only shrinks going back, so stop once it ends before start
+        while i >= 0 and self._reach[i] >= start:
+            if self.intervals[i][1] >= start:
+                found.append(self.intervals[i][2])
+
+            i -= 1
+
+        return found
+
+
+def _spacecraft(instrument):
+    """The spacecraft clock of a CK instrument, as CKMETA defaults it"""
+    return int(instrument / 1000.0)
+
+
+class KernelManager(object):
+    """
+    SPK, CK and binary PCK files loaded as they are needed, at most
+    capacity at a time.  Text kernels (leapseconds, frames, clocks) aren't
+    managed; load them with furnsh as usual.
+
+        manager = KernelManager(50)
+        manager.register(*glob.glob('archive/*.bsp'))
+
+        manager.require(['SMAP', 'EARTH'], et)
+        state, lt = spkezr('SMAP', et, 'J2000', 'NONE', 'EARTH')
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._order = {}                        # path: registration number
+        self._index = {}                        # (kind, ID): _IntervalIndex
+        self._loaded = collections.OrderedDict()    # path: load number, least recently used first
+        self._loads = 0
+        self._lock = threading.RLock()
+
+    def register(self, *paths):
+        """
+        Add the coverage of the segments of DAF files to the index.  The
+        files are not loaded.
+        """
+        with self._lock:
+            for path in paths:
+                with DAF(path) as daf:
+                    kind = daf.idword[4:].strip()
+
+                    if kind not in ('SPK', 'CK', 'PCK'):
+                        raise ValueError('%s is a %s file, not an SPK, CK or binary PCK' % (path, daf.idword))
+
+                    # CK summaries are in spacecraft clock ticks
+                    for segment in daf.segments():
+                        self._add(path, kind, segment.integers[0], segment.doubles[0], segment.doubles[1])
+
+    def _add(self, path, kind, code, start, stop):
+        self._index.setdefault((kind, code), _IntervalIndex()).add(start, stop, path)
+        self._order.setdefault(path, len(self._order))
+
+    @property
+    def registered(self):
+        """The registered files, in the order they were registered"""
+        return sorted(self._order, key=self._order.get)
+
+    @property
+    def loaded(self):
+        """The files loaded by the manager, least recently used first"""
+        return list(self._loaded)
+
+    def covering(self, ids, start, stop=None, kind='SPK'):
+        """
+        Return the registered files of the kind ('SPK', 'CK' or 'PCK') with
+        segments for any of ids (IDs or names, or one of them) between the
+        ephemeris times start and stop, in registration order.  CK IDs are
+        instruments, whose clock kernels must be loaded.
+        """
+        if stop is None:
+            stop = start
+
+        if isinstance(ids, (basestring, numbers.Integral)):
+            ids = [ids]
+
+        found = set()
+
+        for code in ids:
+            if isinstance(code, basestring):
+                code = _spice.bods2c(code)
+
+                if code is None:
+                    continue
+
+            index = self._index.get((kind, code))
+
+            if index is None:
+                continue
+
+            if kind == 'CK':
+                clock = _spacecraft(code)
+                found.update(index.overlapping(_spice.sce2c(clock, start), _spice.sce2c(clock, stop)))
+            else:
+                found.update(index.overlapping(start, stop))
+
+        return sorted(found, key=self._order.get)
+
+    def require(self, ids, start, stop=None, kind='SPK'):
+        """
+        Load the files covering, as for covering, that aren't loaded yet,
+        and unload the least recently used others beyond the capacity.
+        Returns the files covering.
+        """
+        with self._lock:
+            needed = self.covering(ids, start, stop, kind)
+
+            if len(needed) > self.capacity:
+                raise ValueError('%d files are needed, more than the capacity of %d' % (len(needed), self.capacity))
+
+            # the needed files must have been loaded in registration order,
+            # so load them, or load them again, where they weren't
+            last = -1
+
+            for path in needed:
+                load = self._loaded.pop(path, None)
+
+                if load is not None and load < last:
+                    parallel.unload(path)
+                    load = None
+
+                if load is None:
+                    parallel.furnsh(path)
+                    load = self._loads
+                    self._loads += 1
+
+                self._loaded[path] = last = load
+
+            while len(self._loaded) > self.capacity:
+                parallel.unload(self._loaded.popitem(last=False)[0])
+
+            return needed
+
+    def unload_all(self):
+        """Unload all the files loaded by the manager"""
+        with self._lock:
+            while self._loaded:
+                parallel.unload(self._loaded.popitem(last=False)[0])
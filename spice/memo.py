@@ -0,0 +1,203 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Memoization of the query wrappers.
+
+Memoization is off by default.  set_memoization(True) replaces the query
+functions of the spice module (spkezr, pxform, bodvrd, gdpool, bodn2c, ...)
+with versions that keep their most recent results, up to size of them in
+all, in one least recently used cache.  Only calls whose arguments are all
+hashable are cached.  Array results are copied on the way out, so callers
+can't change the cached ones.
+
+The results depend on the loaded kernels and pool, so every call of the
+configuration functions of spice.parallel (furnsh, unload, kclear, clpool,
+pdpool, boddef, ...) empties the cache.  Calls made straight to _spice,
+or through references to the spice functions taken before memoization was
+turned on, go around the cache.
+"""
+
+import collections
+import copy
+import threading
+
+import _spice
+
+import parallel
+
+__all__ = ['set_memoization', 'get_memoization', 'memoization', 'memoization_stats']
+
+# the wrappers whose results depend only on their arguments and the
+# loaded kernels and pool
+QUERIES = ('spkezr', 'spkpos', 'spkez', 'spkezp', 'spkgeo', 'spkgps', 'spkssb',
+           'pxform', 'sxform', 'bodvrd', 'bodvcd', 'gdpool', 'gipool', 'gcpool',
+           'dtpool', 'bodn2c', 'bodc2n', 'bods2c', 'bodc2s', 'namfrm', 'frmnam',
+           'cidfrm', 'cnmfrm', 'str2et', 'utc2et', 'et2utc', 'timout',
+           'scs2e', 'sce2s', 'sct2e', 'sce2c')
+
+_IMMUTABLE = (int, long, float, bool, basestring, type(None))
+
+_missing = object()
+_lock = threading.Lock()
+_entries = collections.OrderedDict()
+_size = 0
+_generation = 0
+_invalidations = 0
+_stats = {}         # name: [hits, misses]
+_originals = {}     # the plain wrappers the memoized ones replaced
+
+
+def _invalidate():
+    global _generation, _invalidations
+
+    with _lock:
+        _generation += 1
+
+        if _entries:
+            _entries.clear()
+            _invalidations += 1
+
+
+parallel._listeners.append(_invalidate)
+
+
+def _copy(value):
+    if isinstance(value, tuple):
+        return tuple([_copy(item) for item in value])
+
+    if isinstance(value, _IMMUTABLE):
+        return value
+
+    return copy.copy(value)
+
+
+def _memoized(name, function):
+    stats = _stats.setdefault(name, [0, 0])
+
+    def call(*args):
+        # the results of the two output modes differ
+        key = (name, args, _spice._get_array_factory() is not None)
+
+        try:
+            hash(key)
+        except TypeError:
+            return function(*args)
+
+        with _lock:
+            value = _entries.pop(key, _missing)
+
+            if value is not _missing:
+                _entries[key] = value
+                stats[0] += 1
+            else:
+                stats[1] += 1
+                generation = _generation
+
+        if value is not _missing:
+            return _copy(value)
+
+        value = function(*args)
+
+        with _lock:
+            # don't keep a result from before a configuration change
+            if generation == _generation and _size:
+                _entries[key] = value
+
+                while len(_entries) > _size:
+                    _entries.popitem(last=False)
+
+        return _copy(value)
+
+    call.__name__ = name
+    call.__doc__ = function.__doc__
+
+    return call
+
+
+def set_memoization(enabled, size=1024):
+    """
+    Turn memoization of the query wrappers on, keeping up to size results,
+    or off.  Turning it on again changes the size; turning it off empties
+    the cache and resets the statistics.
+    """
+    global _size
+
+    import spice
+
+    with _lock:
+        if enabled:
+            _size = size
+
+            while len(_entries) > _size:
+                _entries.popitem(last=False)
+        else:
+            _size = 0
+            _entries.clear()
+            _stats.clear()
+
+    if enabled and not _originals:
+        for name in QUERIES:
+            if hasattr(spice, name):
+                _originals[name] = getattr(spice, name)
+                setattr(spice, name, _memoized(name, _originals[name]))
+    elif not enabled:
+        for name, function in _originals.items():
+            setattr(spice, name, function)
+
+        _originals.clear()
+
+
+def get_memoization():
+    """Return True if memoization is on"""
+    return bool(_originals)
+
+
+class memoization(object):
+    """
+    Context manager for memoizing the query wrappers in a block of code:
+
+        with memoization(size=4096):
+            ...
+
+    Memoization is left on or off at the end, with its previous size, as
+    it was at the start.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = (get_memoization(), _size)
+        set_memoization(True, self.size)
+        return self
+
+    def __exit__(self, *exc_info):
+        enabled, size = self.previous
+
+        if enabled:
+            set_memoization(True, size)
+        else:
+            set_memoization(False)
+
+        return False
+
+
+def memoization_stats():
+    """
+    Return a dict of the cache statistics: 'hits', 'misses', 'size' (the
+    results held), 'maxsize', 'invalidations' (how often configuration
+    calls emptied the cache) and 'functions', which maps each memoized
+    function called so far to its (hits, misses).
+    """
+    with _lock:
+        functions = dict((name, tuple(counts)) for name, counts in _stats.items() if any(counts))
+
+        return {
+            'hits': sum(hits for hits, misses in functions.values()),
+            'misses': sum(misses for hits, misses in functions.values()),
+            'size': len(_entries),
+            'maxsize': _size,
+            'invalidations': _invalidations,
+            'functions': functions,
+        }
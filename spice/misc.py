@@ -1,3 +1,41 @@
 # Released under the BSD license, see LICENSE for details
 
 from _spice import *
+
+import _spice
+
+
+def set_error_device(device):
+    """
+    Send the error reports CSPICE writes when a call fails to device, a
+    file name, 'SCREEN' (standard output, the default) or 'NULL' to drop
+    them.  The errors are raised as SpiceException either way.
+    """
+    _spice._set_error_device(device)
+
+
+def get_error_device():
+    """Return where CSPICE writes its error reports"""
+    return _spice._get_error_device()
+
+
+class error_device(object):
+    """
+    Context manager that sends the CSPICE error reports to device, by
+    default 'NULL', for the calls made inside it:
+
+      with error_device():
+          run()
+    """
+    def __init__(self, device='NULL'):
+        self.device = device
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = get_error_device()
+        set_error_device(self.device)
+        return self
+
+    def __exit__(self, *exc_info):
+        set_error_device(self.previous)
+        return False
@@ -0,0 +1,233 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Batch jobs run over several processes.
+
+CSPICE keeps its state (loaded kernels, the kernel pool, body names) in
+the process and makes one call at a time, so using more cores means more
+processes, each set up the same way.  The configuration functions here
+(furnsh, unload, kclear, ldpool, clpool, pdpool, pipool, dvpool and
+boddef) replace the plain wrappers in the spice module and record every
+call in a session journal.  A SpicePool starts worker processes that
+replay the journal, so they have the kernels, pool variables and body
+names this process had when the pool was started.
+
+SpicePool.map cuts an array of epochs into chunks, runs a batch function
+such as spkezr_batch on each chunk in the workers and joins the results
+back together in order.
+
+Worker processes are forked on Unix; start pools while no other thread is
+inside a CSPICE call.
+"""
+
+import multiprocessing
+
+import _spice
+
+from arrays import numpy
+from batch import spkezr_batch, spkpos_batch, pxform_batch, sxform_batch
+
+__all__ = ['SpicePool', 'parallel_map', 'session',
+           'furnsh', 'unload', 'kclear', 'ldpool', 'clpool',
+           'pdpool', 'pipool', 'dvpool', 'boddef']
+
+# the configuration calls made so far, as (name, args) tuples
+_journal = []
+
+# called with no arguments whenever a configuration call may have changed
+# the loaded state, even one that failed
+_listeners = []
+
+
+def _changed():
+    for listener in _listeners:
+        listener()
+
+
+# the calls that change the kernel pool outside of furnsh
+_POOL_CALLS = ('ldpool', 'clpool', 'pdpool', 'pipool', 'dvpool')
+
+
+def _record(name, args):
+    """
+    Add a call to the journal.  An unload of a file that was loaded with
+    furnsh removes the furnsh entries instead, so loading and unloading
+    the same files over and over keeps the journal the same size.  That
+    isn't done if the pool has been changed since, as unloading a text
+    kernel reloads the pool from the remaining text kernels.
+    """
+    if name == 'unload':
+        loads = [i for i, entry in enumerate(_journal) if entry == ('furnsh', args)]
+
+        if loads and not any(entry[0] in _POOL_CALLS for entry in _journal[loads[0]:]):
+            for i in reversed(loads):
+                del _journal[i]
+            return
+
+    _journal.append((name, args))
+
+
+def _recorded(name):
+    function = getattr(_spice, name)
+
+    def call(*args):
+        try:
+            result = function(*args)
+        finally:
+            _changed()
+
+        _record(name, args)
+
+        return result
+
+    call.__name__ = name
+    call.__doc__ = function.__doc__
+
+    return call
+
+
+furnsh = _recorded('furnsh')
+unload = _recorded('unload')
+ldpool = _recorded('ldpool')
+clpool = _recorded('clpool')
+pdpool = _recorded('pdpool')
+pipool = _recorded('pipool')
+dvpool = _recorded('dvpool')
+boddef = _recorded('boddef')
+
+
+def kclear():
+    """
+    Unload all kernels and clear the kernel pool, as kclear does.  Names
+    added with boddef are kept, so only those stay in the journal.
+    """
+    try:
+        _spice.kclear()
+    finally:
+        _changed()
+
+    _journal[:] = [entry for entry in _journal if entry[0] == 'boddef']
+
+
+def session():
+    """Return the journal of configuration calls as a list of (name, args)"""
+    return list(_journal)
+
+
+def _start_worker(journal):
+    """Set a worker process up the way the journal says"""
+    _spice.kclear()
+
+    for name, args in journal:
+        getattr(_spice, name)(*args)
+
+
+def _run(task):
+    function, args = task
+    return function(*args)
+
+
+def _split(values, count):
+    size = -(-len(values) // count)
+    return [values[i:i + size] for i in xrange(0, len(values), size)]
+
+
+def _join(parts):
+    """Join the results of the chunks, item by item for tuples of results"""
+    first = parts[0]
+
+    if isinstance(first, tuple):
+        return tuple(_join([part[i] for part in parts]) for i in xrange(len(first)))
+
+    if numpy is not None and isinstance(first, numpy.ndarray):
+        return numpy.concatenate(parts)
+
+    joined = first[:0]
+
+    for part in parts:
+        joined += part
+
+    return joined
+
+
+def _is_sequence(value):
+    return not isinstance(value, (basestring, int, long)) and hasattr(value, '__len__')
+
+
+class SpicePool(object):
+    """
+    Worker processes set up with this session's kernels, pool variables
+    and body names, as they are when the pool is made.  processes is the
+    number of workers, by default one per CPU.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self._pool = multiprocessing.Pool(self.processes, _start_worker, (list(_journal),))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the workers"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def starmap(self, function, args, split, chunks=None):
+        """
+        Call function(*args) with the sequences at the positions in split
+        cut into chunks, one call per chunk in the workers, and return the
+        results joined in order.  chunks is the number of chunks, by
+        default four per worker.
+        """
+        count = len(args[split[0]])
+
+        if not count:
+            return function(*args)
+
+        chunks = min(chunks or 4 * self.processes, count)
+        columns = [_split(args[i], chunks) for i in split]
+        tasks = []
+
+        for j in xrange(len(columns[0])):
+            chunk_args = list(args)
+
+            for i, column in zip(split, columns):
+                chunk_args[i] = column[j]
+
+            tasks.append((function, tuple(chunk_args)))
+
+        return _join(self._pool.map(_run, tasks))
+
+    def map(self, function, et, args=(), chunks=None):
+        """Return function(et, *args) computed chunk by chunk in the workers"""
+        return self.starmap(function, (et,) + tuple(args), (0,), chunks)
+
+    def _spk(self, function, targ, et, args):
+        split = (0, 1) if _is_sequence(targ) and len(targ) == len(et) else (1,)
+        return self.starmap(function, (targ, et) + args, split)
+
+    def spkezr(self, targ, et, ref, abcorr, obs):
+        """spkezr_batch over the workers"""
+        return self._spk(spkezr_batch, targ, et, (ref, abcorr, obs))
+
+    def spkpos(self, targ, et, ref, abcorr, obs):
+        """spkpos_batch over the workers"""
+        return self._spk(spkpos_batch, targ, et, (ref, abcorr, obs))
+
+    def pxform(self, fromfr, tofr, et):
+        """pxform_batch over the workers"""
+        return self.starmap(pxform_batch, (fromfr, tofr, et), (2,))
+
+    def sxform(self, fromfr, tofr, et):
+        """sxform_batch over the workers"""
+        return self.starmap(sxform_batch, (fromfr, tofr, et), (2,))
+
+
+def parallel_map(function, et, args=(), processes=None):
+    """Return function(et, *args) computed by a temporary SpicePool"""
+    with SpicePool(processes) as pool:
+        return pool.map(function, et, args)
@@ -0,0 +1,124 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Prepared geometry queries.
+
+spkezr(target, et, frame, abcorr, observer) translates the body names to
+IDs and checks the frame and aberration correction on every call.  A
+Query does that once, keeps the IDs and the canonical frame name, and
+evaluates through spkez/spkezp, which skip the name translation.
+
+The names are resolved again, the next time the query is evaluated,
+after any configuration call of spice.parallel (furnsh, unload, boddef,
+...), since those may change what the names mean.
+"""
+
+import numbers
+
+import _spice
+
+import parallel
+from arrays import double_array
+
+__all__ = ['Query']
+
+# the aberration corrections spkezr accepts, without blanks
+ABCORRS = ('NONE', 'LT', 'LT+S', 'CN', 'CN+S', 'XLT', 'XLT+S', 'XCN', 'XCN+S')
+
+# bumped by every configuration call
+_generation = 0
+
+
+def _changed():
+    global _generation
+    _generation += 1
+
+
+parallel._listeners.append(_changed)
+
+
+def _body_id(body, role):
+    if isinstance(body, numbers.Integral):
+        return int(body)
+
+    code = _spice.bods2c(body)
+
+    if code is None:
+        raise _spice.SpiceException('%s %s is not a known body' % (role, body))
+
+    return code
+
+
+class Query(object):
+    """
+    The state of target relative to observer in frame, with the
+    aberration correction abcorr, ready to be evaluated at any epoch.
+    Bodies may be given by name or ID.
+
+        query = Query('SMAP', 'J2000', 'NONE', 'EARTH')
+        state, lt = query.evaluate(et)
+        states, lts = query.evaluate_batch(ets)
+    """
+
+    def __init__(self, target, frame, abcorr, observer):
+        self.target = target
+        self.frame = frame
+        self.abcorr = abcorr
+        self.observer = observer
+
+        correction = abcorr.replace(' ', '').upper()
+
+        if correction not in ABCORRS:
+            raise ValueError('unknown aberration correction %r' % abcorr)
+
+        self._abcorr = correction
+        self._resolve()
+
+    def _resolve(self):
+        generation = _generation
+
+        self.target_id = _body_id(self.target, 'target')
+        self.observer_id = _body_id(self.observer, 'observer')
+        self.frame_id = _spice.namfrm(self.frame)
+
+        if not self.frame_id:
+            raise _spice.SpiceException('frame %s is not a known frame' % self.frame)
+
+        self._frame = _spice.frmnam(self.frame_id)
+        self._observer = str(self.observer_id)
+        self._generation = generation
+
+    def __repr__(self):
+        return 'Query(%r, %r, %r, %r)' % (self.target, self.frame, self.abcorr, self.observer)
+
+    def evaluate(self, et):
+        """Return the state and light time at et, as spkezr does"""
+        if self._generation != _generation:
+            self._resolve()
+
+        return _spice.spkez(self.target_id, et, self._frame, self._abcorr, self.observer_id)
+
+    def position(self, et):
+        """Return the position and light time at et, as spkpos does"""
+        if self._generation != _generation:
+            self._resolve()
+
+        return _spice.spkezp(self.target_id, et, self._frame, self._abcorr, self.observer_id)
+
+    def evaluate_batch(self, et):
+        """Return the states and light times at an array of epochs, as spkezr_batch does"""
+        if self._generation != _generation:
+            self._resolve()
+
+        out, lt = _spice._spkezr_batch(self.target_id, et, self._frame, self._abcorr, self._observer)
+
+        return double_array(out, (-1, 6)), double_array(lt, (-1,))
+
+    def position_batch(self, et):
+        """Return the positions and light times at an array of epochs, as spkpos_batch does"""
+        if self._generation != _generation:
+            self._resolve()
+
+        out, lt = _spice._spkpos_batch(self.target_id, et, self._frame, self._abcorr, self._observer)
+
+        return double_array(out, (-1, 3)), double_array(lt, (-1,))
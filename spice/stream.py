@@ -0,0 +1,210 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Long runs of states, positions and frame transformations, in chunks.
+
+A product at a fixed cadence over years is too long for one batch call:
+states at 1 second steps for a year take 1.5 GB.  The functions here
+return a Stream instead, which yields the results chunk by chunk, each
+computed by one batch call (see spice.batch), so memory stays the same
+whatever the span:
+
+    for ets, states, lts in stream.states('SMAP', et0, et1, 1.0, 'J2000', 'NONE', 'EARTH'):
+        process(ets, states)
+
+A thread computes the next chunk while the current one is used; the
+batch calls run without the GIL, so the two overlap.  Stream.save writes
+the results to .npy files as they come, and returns them mapped from the
+files:
+
+    states = stream.states('SMAP', et0, et1, 1.0, 'J2000', 'NONE', 'EARTH').save(states='smap.npy')['states']
+"""
+
+import Queue
+import sys
+import threading
+
+from arrays import numpy
+from batch import spkezr_batch, spkpos_batch, pxform_batch, sxform_batch
+
+__all__ = ['Stream', 'states', 'positions', 'transforms']
+
+# epochs per chunk, by default
+CHUNK = 65536
+
+# how long the producer waits at a time for room in the queue, in seconds
+_POLL = 0.1
+
+
+class _Failed(object):
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+
+class Stream(object):
+    """
+    The results of compute(ets) at the epochs t0, t0 + step, ... up to t1,
+    computed chunk epochs at a time.  compute returns a tuple of arrays
+    with one row per epoch, whose names and row shapes are given by
+    outputs, a list of (name, shape) pairs.  Iterating yields a tuple of
+    the epochs and those arrays for each chunk; the epochs are named
+    'ets'.  A Stream can be iterated more than once, computing it again.
+    """
+
+    def __init__(self, compute, outputs, t0, t1, step, chunk=CHUNK):
+        if numpy is None:
+            raise ImportError('streams need NumPy')
+
+        if step <= 0.0:
+            raise ValueError('step must be positive, not %r' % step)
+
+        if t1 < t0:
+            raise ValueError('the stream ends at %r, before it starts at %r' % (t1, t0))
+
+        self.compute = compute
+        self.outputs = [('ets', ())] + list(outputs)
+        self.t0 = t0
+        self.step = step
+        self.chunk = int(chunk)
+
+        # t1 counts if it is a whole number of steps on, give or take round-off
+        self.count = int(numpy.floor((t1 - t0) / step + 1e-9)) + 1
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return '<Stream of %d epochs from %r by %r>' % (self.count, self.t0, self.step)
+
+    @property
+    def shapes(self):
+        """The shapes of the whole outputs, by name"""
+        return dict((name, (self.count,) + tuple(shape)) for name, shape in self.outputs)
+
+    def _epochs(self):
+        for start in xrange(0, self.count, self.chunk):
+            # from the index, so the epochs don't drift
+            yield self.t0 + self.step * numpy.arange(start, min(start + self.chunk, self.count), dtype=float)
+
+    def __iter__(self):
+        queue = Queue.Queue(1)
+        stopped = threading.Event()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    queue.put(item, timeout=_POLL)
+                    return True
+                except Queue.Full:
+                    pass
+
+            return False
+
+        def produce():
+            try:
+                for ets in self._epochs():
+                    if not put((ets,) + tuple(self.compute(ets))):
+                        return
+            except Exception:
+                put(_Failed(sys.exc_info()))
+                return
+
+            put(None)
+
+        producer = threading.Thread(target=produce, name='spice.stream')
+        producer.daemon = True
+        producer.start()
+
+        try:
+            while True:
+                item = queue.get()
+
+                if item is None:
+                    break
+
+                if isinstance(item, _Failed):
+                    raise item.exc_info[0], item.exc_info[1], item.exc_info[2]
+
+                yield item
+        finally:
+            # a consumer that stops early lets the producer go
+            stopped.set()
+            producer.join()
+
+    def save(self, **paths):
+        """
+        Compute the stream and write the outputs named in paths to .npy
+        files at those paths, chunk by chunk, while the next chunk is
+        computed.  Returns the written outputs by name, as read only
+        arrays mapped from the files.
+
+            saved = stream.save(ets='ets.npy', states='states.npy')
+        """
+        names = [name for name, shape in self.outputs]
+        shapes = self.shapes
+
+        for name in paths:
+            if name not in names:
+                raise ValueError('the stream has no output %r, only %s' % (name, ', '.join(names)))
+
+        files = {}
+
+        try:
+            for name, path in paths.items():
+                files[name] = open(path, 'wb')
+                numpy.lib.format.write_array_header_1_0(files[name], {'descr': '<f8', 'fortran_order': False,
+                                                                      'shape': shapes[name]})
+
+            for chunk in self:
+                for name, values in zip(names, chunk):
+                    if name in files:
+                        files[name].write(numpy.ascontiguousarray(values, '<f8').tostring())
+        finally:
+            for output in files.values():
+                output.close()
+
+        return dict((name, numpy.load(path, mmap_mode='r')) for name, path in paths.items())
+
+
+def states(target, t0, t1, step, frame, abcorr, observer, chunk=CHUNK):
+    """
+    Return a Stream of the states of target relative to observer, as
+    spkezr_batch gives them, at the epochs t0 to t1 by step.  It yields
+    (ets, states, lts) chunks; the outputs are named 'ets', 'states' and
+    'lts'.
+    """
+    def compute(ets):
+        return spkezr_batch(target, ets, frame, abcorr, observer)
+
+    return Stream(compute, [('states', (6,)), ('lts', ())], t0, t1, step, chunk)
+
+
+def positions(target, t0, t1, step, frame, abcorr, observer, chunk=CHUNK):
+    """
+    Return a Stream of positions as spkpos_batch gives them, yielding
+    (ets, positions, lts) chunks, as for states.
+    """
+    def compute(ets):
+        return spkpos_batch(target, ets, frame, abcorr, observer)
+
+    return Stream(compute, [('positions', (3,)), ('lts', ())], t0, t1, step, chunk)
+
+
+def transforms(from_, to, t0, t1, step, rates=False, chunk=CHUNK):
+    """
+    Return a Stream of the rotations from frame from_ to frame to, as
+    pxform_batch gives them, or with rates of the state transformations,
+    as sxform_batch gives them.  It yields (ets, matrices) chunks; the
+    outputs are named 'ets' and 'matrices'.
+    """
+    if rates:
+        def compute(ets):
+            return sxform_batch(from_, to, ets),
+
+        return Stream(compute, [('matrices', (6, 6))], t0, t1, step, chunk)
+
+    def compute(ets):
+        return pxform_batch(from_, to, ets),
+
+    return Stream(compute, [('matrices', (3, 3))], t0, t1, step, chunk)
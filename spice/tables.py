@@ -0,0 +1,525 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Interpolation tables built from CSPICE and served without it.
+
+An EphemerisTable samples spkezr for one target, observer, frame and
+aberration correction over a span of time, as densely as a cubic Hermite
+interpolant of the positions and velocities needs to stay within a
+tolerance: each interval between samples is checked against spkezr at
+test points inside it, and split until it passes.  A RotationTable does
+the same for the rotation between two frames, as quaternions and angular
+velocities from sxform (or quaternions alone from pxform, for frames
+without rates), checked against an angular tolerance.  The tables are
+then evaluated with NumPy alone, for a single epoch or an array of them.
+
+Tables are saved as a short header followed by the arrays, and loaded
+with the arrays mapped from the file, so processes serving the same table
+share one copy of it.
+"""
+
+import json
+
+import _spice
+
+from arrays import numpy
+from batch import spkezr_batch, pxform_batch, sxform_batch
+
+__all__ = ['EphemerisTable', 'RotationTable']
+
+MAGIC = 'PYSPICE TABLE 1\n'
+
+# where each interval is checked, as fractions of it
+TEST_POINTS = (0.25, 0.5, 0.75)
+
+
+def _save(path, header, columns):
+    """Write the header and the named arrays, in order"""
+    header = dict(header, columns=[(name, list(array.shape[1:])) for name, array in columns],
+                  count=len(columns[0][1]))
+    text = json.dumps(header, sort_keys=True)
+
+    # pad so the arrays start on a multiple of 8 bytes
+    text += ' ' * (-(len(MAGIC) + len(text) + 1) % 8) + '\n'
+
+    with open(path, 'wb') as table:
+        table.write(MAGIC)
+        table.write(text)
+
+        for name, array in columns:
+            table.write(numpy.ascontiguousarray(array, '<f8').tostring())
+
+
+def _load(path):
+    """Return the header of a table file and its arrays, mapped from the file"""
+    with open(path, 'rb') as table:
+        if table.readline() != MAGIC:
+            raise ValueError('%s is not a table file' % path)
+
+        header = json.loads(table.readline())
+        offset = table.tell()
+
+    count = header['count']
+    arrays = {}
+
+    for name, shape in header['columns']:
+        shape = (count,) + tuple(shape)
+        arrays[str(name)] = numpy.memmap(path, '<f8', 'r', offset, shape)
+        offset += 8 * int(numpy.prod(shape))
+
+    return header, arrays
+
+
+def _epochs(et):
+    et = numpy.asarray(et, dtype=float)
+    return et.ndim == 0, numpy.atleast_1d(et)
+
+
+def _hermite(t0, t1, y0, dy0, y1, dy1, et):
+    """
+    Return the cubic Hermite interpolants of values y and derivatives dy
+    between t0 and t1, and their derivatives, at et.  The times are (N,)
+    arrays and the values (N,k).
+    """
+    h = (t1 - t0)[:, None]
+    s = ((et - t0) / (t1 - t0))[:, None]
+    s2, s3 = s * s, s * s * s
+
+    value = ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * h * dy0 +
+             (3 * s2 - 2 * s3) * y1 + (s3 - s2) * h * dy1)
+    derivative = ((6 * s2 - 6 * s) * y0 / h + (3 * s2 - 4 * s + 1) * dy0 +
+                  (6 * s - 6 * s2) * y1 / h + (3 * s2 - 2 * s) * dy1)
+
+    return value, derivative
+
+
+class _Table(object):
+    """The sample epochs of a table, and how epochs are placed among them"""
+
+    def _intervals(self, et):
+        """Return the interval index of each epoch, checking they are in the span"""
+        if (et < self.start).any() or (et > self.stop).any():
+            raise ValueError('epochs outside the table span %r to %r' % (self.start, self.stop))
+
+        return numpy.clip(numpy.searchsorted(self.ets, et, 'right') - 1, 0, len(self.ets) - 2)
+
+    @property
+    def start(self):
+        return self.ets[0]
+
+    @property
+    def stop(self):
+        return self.ets[-1]
+
+    def __len__(self):
+        return len(self.ets)
+
+
+def _refine(sample, start, stop, step, min_step, fits):
+    """
+    Sample [start, stop] at intervals of at most step, and split the
+    intervals until fits(t0, t1, y0, y1, tests, ys) says each one fits
+    its test points.  sample(ets) returns an (N,k) array of samples.
+    Returns the sample epochs and samples, and the largest error.
+    """
+    count = max(1, int(numpy.ceil((stop - start) / step)))
+    ets = numpy.linspace(start, stop, count + 1)
+    known = dict(zip(ets, sample(ets)))
+    pending = numpy.array([ets[:-1], ets[1:]]).T
+    accepted = [ets]
+    error = 0.0
+
+    while len(pending):
+        if (pending[:, 1] - pending[:, 0]).min() < min_step:
+            raise ValueError('the tolerance needs samples closer than %r seconds' % min_step)
+
+        t0, t1 = pending[:, 0], pending[:, 1]
+        tests = t0[:, None] + (t1 - t0)[:, None] * numpy.array(TEST_POINTS)
+        values = sample(tests.ravel()).reshape(tests.shape + (-1,))
+
+        y0 = numpy.array([known[t] for t in t0])
+        y1 = numpy.array([known[t] for t in t1])
+        errors = fits(t0, t1, y0, y1, tests, values)
+        passed = errors <= 1.0
+
+        if passed.any():
+            error = max(error, errors[passed].max())
+
+        # split the others at the middle test point, which is sampled already
+        middle = tests[~passed, TEST_POINTS.index(0.5)]
+        known.update(zip(middle, values[~passed, TEST_POINTS.index(0.5)]))
+        accepted.append(middle)
+
+        pending = numpy.concatenate((numpy.array([t0[~passed], middle]).T,
+                                     numpy.array([middle, t1[~passed]]).T))
+
+    ets = numpy.unique(numpy.concatenate(accepted))
+
+    return ets, numpy.array([known[t] for t in ets]), error
+
+
+class EphemerisTable(_Table):
+    """
+    Tabulated states of target relative to observer in frame, with the
+    aberration correction abcorr, from the sample epochs ets and states.
+    Tables are made by build() or load().
+
+        table = EphemerisTable.build('SMAP', 'EARTH', 'J2000', 'LT+S', et0, et1, 1e-3)
+        table.save('smap.table')
+
+        table = EphemerisTable.load('smap.table')
+        states, lts = table.state(ets)
+    """
+
+    def __init__(self, target, observer, frame, abcorr, ets, states, tolerance, error):
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        self.target = target
+        self.observer = observer
+        self.frame = frame
+        self.abcorr = abcorr
+        self.ets = ets
+        self.states = states
+        self.tolerance = tolerance
+        self.error = error
+
+    def __repr__(self):
+        return '<EphemerisTable %s from %s in %s, %s, %d samples>' % (
+            self.target, self.observer, self.frame, self.abcorr, len(self))
+
+    @classmethod
+    def build(cls, target, observer, frame, abcorr, start, stop, tolerance,
+              step=None, min_step=1.0):
+        """
+        Sample spkezr between the epochs start and stop until the
+        interpolated positions are within tolerance km of spkezr at the
+        test points of every interval.  step is the largest interval, by
+        default a 64th of the span; min_step the smallest allowed.
+        Raises ValueError if the tolerance needs smaller intervals.
+        """
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        def sample(ets):
+            return spkezr_batch(target, ets, frame, abcorr, observer)[0]
+
+        def fits(t0, t1, y0, y1, tests, values):
+            positions = [_hermite(t0, t1, y0[:, :3], y0[:, 3:], y1[:, :3], y1[:, 3:], tests[:, i])[0]
+                         for i in xrange(tests.shape[1])]
+            errors = numpy.sqrt(((numpy.stack(positions, 1) - values[:, :, :3]) ** 2).sum(-1))
+
+            return errors.max(1) / tolerance
+
+        ets, states, error = _refine(sample, start, stop, step or (stop - start) / 64.0, min_step, fits)
+
+        return cls(target, observer, frame, abcorr, ets, states, tolerance, error * tolerance)
+
+    def save(self, path):
+        """Write the table to a file"""
+        _save(path, {'kind': 'ephemeris', 'target': self.target, 'observer': self.observer,
+                     'frame': self.frame, 'abcorr': self.abcorr, 'tolerance': self.tolerance,
+                     'error': self.error},
+              [('ets', self.ets), ('states', self.states)])
+
+    @classmethod
+    def load(cls, path):
+        """Return the table saved in a file, its arrays mapped from the file"""
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        header, arrays = _load(path)
+
+        if header.get('kind') != 'ephemeris':
+            raise ValueError('%s is not an ephemeris table' % path)
+
+        return cls(header['target'], header['observer'], header['frame'], header['abcorr'],
+                   arrays['ets'], arrays['states'], header['tolerance'], header['error'])
+
+    def state(self, et):
+        """
+        Return the states and light times at et, a scalar or an array of
+        epochs, as (6,) and scalar or (N,6) and (N,) arrays, as spkezr
+        does.  The light times are the distances over the speed of light.
+        """
+        scalar, et = _epochs(et)
+        i = self._intervals(et)
+        y0, y1 = self.states[i], self.states[i + 1]
+
+        position, velocity = _hermite(self.ets[i], self.ets[i + 1],
+                                      y0[:, :3], y0[:, 3:], y1[:, :3], y1[:, 3:], et)
+        state = numpy.hstack((position, velocity))
+        lt = numpy.sqrt((position ** 2).sum(1)) / _spice.clight()
+
+        if scalar:
+            return state[0], lt[0]
+
+        return state, lt
+
+    def position(self, et):
+        """Return the positions and light times at et, as state does"""
+        state, lt = self.state(et)
+        return state[..., :3], lt
+
+
+def _multiply(a, b):
+    """Return the quaternion products a b of (N,4) arrays"""
+    a0, a1, a2, a3 = a.T
+    b0, b1, b2, b3 = b.T
+
+    return numpy.array([a0 * b0 - a1 * b1 - a2 * b2 - a3 * b3,
+                        a0 * b1 + a1 * b0 + a2 * b3 - a3 * b2,
+                        a0 * b2 - a1 * b3 + a2 * b0 + a3 * b1,
+                        a0 * b3 + a1 * b2 - a2 * b1 + a3 * b0]).T
+
+
+def _conjugate(q):
+    return q * [1.0, -1.0, -1.0, -1.0]
+
+
+def _quaternions(m):
+    """Return the quaternions of (N,3,3) rotation matrices, as m2q does"""
+    trace = numpy.trace(m, axis1=1, axis2=2)
+    squares = 0.25 * numpy.array([1.0 + trace,
+                                  1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+                                  1.0 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2],
+                                  1.0 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2]]).T
+
+    # work from the largest component, for accuracy
+    largest = squares.argmax(1)
+    rows = numpy.arange(len(m))
+    big = numpy.sqrt(squares[rows, largest])
+    products = 0.25 * numpy.array([[m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]],
+                                   [m[:, 2, 1] - m[:, 1, 2], m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0]],
+                                   [m[:, 0, 2] - m[:, 2, 0], m[:, 0, 1] + m[:, 1, 0], m[:, 1, 2] + m[:, 2, 1]],
+                                   [m[:, 1, 0] - m[:, 0, 1], m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1]]])
+    others = [[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]]
+
+    q = numpy.zeros((len(m), 4))
+    q[rows, largest] = big
+
+    for k in xrange(4):
+        chosen = largest == k
+        q[numpy.ix_(chosen, others[k])] = products[k][:, chosen].T / big[chosen, None]
+
+    return q * numpy.where(q[:, :1] < 0.0, -1.0, 1.0)
+
+
+def _matrices(q):
+    """Return the rotation matrices of (N,4) unit quaternions, as q2m does"""
+    q0, q1, q2, q3 = q.T
+
+    return numpy.array([[1 - 2 * (q2 * q2 + q3 * q3), 2 * (q1 * q2 - q0 * q3), 2 * (q1 * q3 + q0 * q2)],
+                        [2 * (q1 * q2 + q0 * q3), 1 - 2 * (q1 * q1 + q3 * q3), 2 * (q2 * q3 - q0 * q1)],
+                        [2 * (q1 * q3 - q0 * q2), 2 * (q2 * q3 + q0 * q1), 1 - 2 * (q1 * q1 + q2 * q2)]]).transpose(2, 0, 1)
+
+
+def _cross_matrices(v):
+    """Return the matrices [v]x of (N,3) vectors"""
+    m = numpy.zeros((len(v), 3, 3))
+    m[:, 0, 1], m[:, 0, 2], m[:, 1, 2] = -v[:, 2], v[:, 1], -v[:, 0]
+    m[:, 1, 0], m[:, 2, 0], m[:, 2, 1] = v[:, 2], -v[:, 1], v[:, 0]
+
+    return m
+
+
+def _rates(q, av):
+    """
+    Return the derivatives of quaternions q of a rotation whose angular
+    velocity, as xf2rav gives it, is av
+    """
+    return -0.5 * _multiply(q, numpy.hstack((numpy.zeros((len(q), 1)), av)))
+
+
+def _angles(q, r):
+    """Return the angles of the rotations between unit quaternions q and r"""
+    d = _multiply(_conjugate(r), q)
+    return 2.0 * numpy.arctan2(numpy.sqrt((d[:, 1:] ** 2).sum(1)), abs(d[:, 0]))
+
+
+def _aligned(q, r):
+    """Return q with each quaternion's sign chosen to be nearest r"""
+    return q * numpy.where((q * r).sum(1) < 0.0, -1.0, 1.0)[:, None]
+
+
+def _slerp(q0, q1, s):
+    cos = numpy.clip((q0 * q1).sum(1), -1.0, 1.0)
+    angle = numpy.arccos(cos)
+    sin = numpy.sin(angle)
+
+    # nearly equal quaternions interpolate linearly
+    small = sin < 1e-12
+    sin = numpy.where(small, 1.0, sin)
+    a = numpy.where(small, 1.0 - s, numpy.sin((1.0 - s) * angle) / sin)
+    b = numpy.where(small, s, numpy.sin(s * angle) / sin)
+
+    q = a[:, None] * q0 + b[:, None] * q1
+
+    return q / numpy.sqrt((q * q).sum(1))[:, None]
+
+
+class RotationTable(_Table):
+    """
+    Tabulated rotations from frame from_ to frame to, from the sample
+    epochs ets, quaternions (as m2q gives them) and angular velocities
+    rates (as xf2rav gives them), or None if the table was built from
+    pxform.  Tables are made by build() or load().
+
+        table = RotationTable.build('J2000', 'SMAP_BUS', et0, et1, 1e-6)
+        rotations = table.rotation(ets)
+    """
+
+    def __init__(self, from_, to, ets, quaternions, rates, tolerance, error):
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        self.from_ = from_
+        self.to = to
+        self.ets = ets
+        self.quaternions = quaternions
+        self.rates = rates
+        self.tolerance = tolerance
+        self.error = error
+
+    def __repr__(self):
+        return '<RotationTable %s to %s, %d samples>' % (self.from_, self.to, len(self))
+
+    @classmethod
+    def build(cls, from_, to, start, stop, tolerance, rates=True, step=None, min_step=1.0):
+        """
+        Sample the rotation from frame from_ to frame to between the epochs
+        start and stop until the interpolated rotations are within
+        tolerance radians of it at the test points of every interval.
+        With rates, sxform is sampled and the quaternions interpolated as
+        cubic Hermite polynomials; without them, pxform is sampled and the
+        quaternions interpolated by slerp, which takes more samples.
+        step, min_step and errors are as for EphemerisTable.build.
+        """
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        def sample(ets):
+            if not rates:
+                return _quaternions(pxform_batch(from_, to, ets))
+
+            xforms = sxform_batch(from_, to, ets)
+            m = xforms[:, :3, :3]
+            w = numpy.matmul(m.transpose(0, 2, 1), xforms[:, 3:, :3])
+            av = -0.5 * numpy.array([w[:, 2, 1] - w[:, 1, 2], w[:, 0, 2] - w[:, 2, 0], w[:, 1, 0] - w[:, 0, 1]]).T
+
+            return numpy.hstack((_quaternions(m), av))
+
+        def fits(t0, t1, y0, y1, tests, values):
+            y1 = numpy.hstack((_aligned(y1[:, :4], y0[:, :4]), y1[:, 4:]))
+            errors = [_angles(_interpolate(t0, t1, y0, y1, tests[:, i])[0], values[:, i, :4])
+                      for i in xrange(tests.shape[1])]
+
+            return numpy.max(errors, 0) / tolerance
+
+        ets, samples, error = _refine(sample, start, stop, step or (stop - start) / 64.0, min_step, fits)
+
+        # consecutive quaternions of the same sign, for interpolation
+        q = samples[:, :4].copy()
+
+        for i in xrange(1, len(q)):
+            q[i] = _aligned(q[i:i + 1], q[i - 1:i])[0]
+
+        return cls(from_, to, ets, q, samples[:, 4:] if rates else None, tolerance, error * tolerance)
+
+    def save(self, path):
+        """Write the table to a file"""
+        columns = [('ets', self.ets), ('quaternions', self.quaternions)]
+
+        if self.rates is not None:
+            columns.append(('rates', self.rates))
+
+        _save(path, {'kind': 'rotation', 'from': self.from_, 'to': self.to,
+                     'tolerance': self.tolerance, 'error': self.error}, columns)
+
+    @classmethod
+    def load(cls, path):
+        """Return the table saved in a file, its arrays mapped from the file"""
+        if numpy is None:
+            raise ImportError('tables need NumPy')
+
+        header, arrays = _load(path)
+
+        if header.get('kind') != 'rotation':
+            raise ValueError('%s is not a rotation table' % path)
+
+        return cls(header['from'], header['to'], arrays['ets'], arrays['quaternions'],
+                   arrays.get('rates'), header['tolerance'], header['error'])
+
+    def _evaluate(self, et):
+        i = self._intervals(et)
+        y0 = self.quaternions[i]
+        y1 = self.quaternions[i + 1]
+
+        if self.rates is not None:
+            y0 = numpy.hstack((y0, self.rates[i]))
+            y1 = numpy.hstack((y1, self.rates[i + 1]))
+
+        return _interpolate(self.ets[i], self.ets[i + 1], y0, y1, et)
+
+    def quaternion(self, et):
+        """
+        Return the quaternions at et, a scalar or an array of epochs, as a
+        (4,) or (N,4) array
+        """
+        scalar, et = _epochs(et)
+        q = self._evaluate(et)[0]
+
+        return q[0] if scalar else q
+
+    def rotation(self, et):
+        """Return the rotation matrices at et, as a (3,3) or (N,3,3) array, as pxform does"""
+        scalar, et = _epochs(et)
+        m = _matrices(self._evaluate(et)[0])
+
+        return m[0] if scalar else m
+
+    def angular_velocity(self, et):
+        """Return the angular velocities at et, as a (3,) or (N,3) array, as xf2rav does"""
+        scalar, et = _epochs(et)
+        av = self._angular_velocities(et)[1]
+
+        return av[0] if scalar else av
+
+    def _angular_velocities(self, et):
+        if self.rates is None:
+            raise ValueError('the table of %s to %s has no rates' % (self.from_, self.to))
+
+        q, dq = self._evaluate(et)
+
+        return q, -2.0 * _multiply(_conjugate(q), dq)[:, 1:]
+
+    def transform(self, et):
+        """Return the state transformations at et, as a (6,6) or (N,6,6) array, as sxform does"""
+        scalar, et = _epochs(et)
+        q, av = self._angular_velocities(et)
+        m = _matrices(q)
+
+        xform = numpy.zeros((len(et), 6, 6))
+        xform[:, :3, :3] = xform[:, 3:, 3:] = m
+        xform[:, 3:, :3] = -numpy.matmul(m, _cross_matrices(av))
+
+        return xform[0] if scalar else xform
+
+
+def _interpolate(t0, t1, y0, y1, et):
+    """
+    Return the unit quaternions between samples y0 and y1 (quaternions,
+    followed by angular velocities if there are any) at et, and their
+    derivatives if there are rates
+    """
+    if y0.shape[1] == 4:
+        return _slerp(y0, y1, (et - t0) / (t1 - t0)), None
+
+    q0, q1 = y0[:, :4], y1[:, :4]
+    q, dq = _hermite(t0, t1, q0, _rates(q0, y0[:, 4:]), q1, _rates(q1, y1[:, 4:]), et)
+
+    # back onto the unit sphere
+    norm = numpy.sqrt((q * q).sum(1))[:, None]
+    unit = q / norm
+
+    return unit, dq / norm - unit * (unit * dq).sum(1)[:, None] / norm
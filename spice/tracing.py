@@ -0,0 +1,540 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Traces of the calls made into CSPICE, and their replay.
+
+How a program performs often depends on the exact run of kernel loads and
+queries it makes.  While a Tracer is set, each call of a _spice function
+(the generated wrappers, the batch and the window functions) is written
+to a trace file, with its arguments, its result and how long it took, all
+told and in CSPICE, as spice.stats() counts it:
+
+    with tracing.trace('workload.trace'):
+        run()
+
+A trace starts with the configuration calls made before it, as
+spice.session() gives them, and holds those made while tracing (furnsh,
+unload, pdpool, ...) with the rest, so replaying it sets up the kernels
+each query saw.  replay() makes the calls again, in order, checks their
+results against the traced ones and reports the throughput and the
+latency percentiles, so the workload of a production run becomes a
+benchmark:
+
+    python -m spice.tracing workload.trace -p /ops/kernels=/home/me/kernels
+
+Each record is a message as spice.daemon sends them, so the arrays of
+batch calls are written as they are.  Replaying clears the kernels of the
+process it runs in, and calls _spice directly, behind the back of
+spice.session(); run it in a process of its own.
+"""
+
+import argparse
+import array
+import hashlib
+import json
+import marshal
+import sys
+import threading
+import time
+
+import _spice
+
+import parallel
+from arrays import numpy
+from daemon import HEADER, _pack, _unpack
+from misc import error_device
+from objects import DataType
+
+__all__ = ['Tracer', 'Trace', 'trace', 'replay', 'format_report']
+
+# the first item of the first record of a trace
+MAGIC = 'spice-trace'
+VERSION = 1
+
+# what a Tracer keeps of the results: all of them, a digest of each, or nothing
+RESULTS = ('full', 'digest', None)
+
+# the calls that change the loaded kernels, the pool or the body names
+CHANGES = frozenset(['furnsh', 'unload', 'kclear', 'ldpool', 'clpool', 'pdpool', 'pipool', 'pcpool', 'dvpool',
+                     'boddef'])
+
+# the calls given kernel file names, moved by the paths of replay()
+FILES = frozenset(['furnsh', 'unload', 'ldpool'])
+
+PERCENTILES = (50, 90, 99)
+
+# stand for objects marshal can't carry: (CELL, ...), (OBJECT, type, args), (BYTES, str)
+CELL = '\0cell'
+OBJECT = '\0object'
+BYTES = '\0bytes'
+
+
+def _marker(value):
+    if isinstance(value, tuple) and value and isinstance(value[0], str):
+        return value[0]
+
+
+def _capture(value):
+    """Return a copy of an argument that a message can carry"""
+    if isinstance(value, _spice.Cell):
+        return (CELL, value.dtype, value.size, value.length, value.card, value.isSet, value.adjust,
+                list(value.data)[:value.card])
+
+    if isinstance(value, (bytearray, buffer)):
+        return (BYTES, str(value))
+
+    if isinstance(value, memoryview):
+        return (BYTES, value.tobytes())
+
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return value.copy()
+
+    if isinstance(value, array.array):
+        return array.array(value.typecode, value)
+
+    if isinstance(value, tuple):
+        return tuple(_capture(item) for item in value)
+
+    if isinstance(value, list):
+        return [_capture(item) for item in value]
+
+    if type(value).__module__ == '_spice':
+        # Ellipse, Plane, ...
+        return (OBJECT, type(value).__name__, _capture(value.__reduce__()[1]))
+
+    return value
+
+
+def _restore(value):
+    """Return an argument captured by _capture"""
+    marker = _marker(value)
+
+    if marker == CELL:
+        dtype, size, length, card, is_set, adjust, data = value[1:]
+        cell = _spice.Cell(dtype, size, length)
+        pad = '' if dtype == DataType.CHR else 0
+
+        # left uninitialized, so CSPICE sets the control area up from these
+        cell.data = list(data) + [pad] * (size - len(data))
+        cell.card = card
+        cell.isSet = is_set
+        cell.adjust = adjust
+
+        return cell
+
+    if marker == OBJECT:
+        return getattr(_spice, value[1])(*_restore(value[2]))
+
+    if marker == BYTES:
+        return bytearray(value[1])
+
+    if isinstance(value, tuple):
+        return tuple(_restore(item) for item in value)
+
+    if isinstance(value, list):
+        return [_restore(item) for item in value]
+
+    return value
+
+
+def _canonical(value):
+    """
+    Return a result in a form that compares equal whatever the array
+    output mode: arrays and lists as tuples, and Cells, bytearrays and
+    other objects as _capture has them
+    """
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return _canonical(value.tolist())
+
+    if numpy is not None and isinstance(value, numpy.generic):
+        return value.item()
+
+    if isinstance(value, (tuple, list, array.array)):
+        return tuple(_canonical(item) for item in value)
+
+    return _capture(value)
+
+
+def _digest(value):
+    return hashlib.md5(marshal.dumps(_canonical(value))).hexdigest()
+
+
+def _clock():
+    return time.time()
+
+
+class Tracer(object):
+    """
+    Writes the calls of the _spice functions to a trace file at path from
+    start() until close(), from every thread.  results says what to keep
+    of the result of each call: 'full', to compare the results of a replay
+    within a tolerance, 'digest', an MD5 digest, to check them exactly, or
+    None.  calls counts the calls written.
+
+    Only one Tracer can be set at a time.  The calls its own code makes
+    aren't traced, nor are calls whose arguments can't be written (a
+    Python object where CSPICE wants numbers, say), which are reported as
+    unraisable exceptions.
+    """
+
+    def __init__(self, path, results='full'):
+        if results not in RESULTS:
+            raise ValueError('results must be one of %s, not %r' % (', '.join(map(repr, RESULTS)), results))
+
+        self.path = path
+        self.results = results
+        self.calls = 0
+
+        self._file = None
+        self._lock = threading.Lock()
+        self._start = None
+
+    def __enter__(self):
+        if self._file is None:
+            self.start()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """Start writing the trace, and return the Tracer"""
+        if _spice._get_tracer() is not None:
+            raise ValueError('a tracer is set already')
+
+        session = [(name, _capture(args)) for name, args in parallel.session()]
+
+        self._file = open(self.path, 'wb')
+        self._file.write(_pack((MAGIC, VERSION, self.results, time.time(), session)))
+        self._start = _clock()
+
+        _spice._set_tracer(self)
+
+        return self
+
+    def close(self):
+        """Stop tracing and close the trace file"""
+        if _spice._get_tracer() is self:
+            _spice._set_tracer(None)
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def enter(self, name, args):
+        """Called by _spice before each call"""
+        return name, _capture(args), _clock() - self._start
+
+    def leave(self, token, result, error, seconds, spice_seconds):
+        """Called by _spice after each call, with what enter returned"""
+        name, args, start = token
+
+        if error is not None:
+            ok, outcome = False, (type(error).__name__, str(error))
+        elif self.results == 'full':
+            ok, outcome = True, _canonical(result)
+        elif self.results == 'digest':
+            ok, outcome = True, _digest(result)
+        else:
+            ok, outcome = True, None
+
+        try:
+            message = _pack((name, args, start, seconds, spice_seconds, ok, outcome))
+        except ValueError as exc:
+            raise ValueError('a call of %s cannot be traced: %s' % (name, exc))
+
+        with self._lock:
+            if self._file is not None:
+                self._file.write(message)
+                self.calls += 1
+
+
+def trace(path, results='full'):
+    """
+    Start tracing to the file at path, and return the Tracer, which stops
+    when closed or at the end of a with statement:
+
+        with trace('workload.trace'):
+            run()
+    """
+    return Tracer(path, results).start()
+
+
+def _messages(path):
+    with open(path, 'rb') as trace_file:
+        while True:
+            header = trace_file.read(HEADER.size)
+
+            # a trace cut short, by a crash say, ends with its last whole record
+            if len(header) < HEADER.size:
+                return
+
+            head_size, body_size = HEADER.unpack(header)
+            head = trace_file.read(head_size)
+            body = trace_file.read(body_size)
+
+            if len(head) < head_size or len(body) < body_size:
+                return
+
+            yield _unpack(head, bytearray(body))
+
+
+class Trace(object):
+    """
+    The trace file at path, as a Tracer wrote it.  results is what it kept
+    of the results, time when it started and session the configuration
+    calls made before it, as (name, args) pairs.  Iterating yields its
+    calls as (name, args, start, seconds, spice_seconds, ok, outcome)
+    tuples: the arguments as they were captured, when the call started
+    after the trace did, how long it took in all and in CSPICE, whether it
+    returned, and the result, as results says, or the name and message of
+    the exception it raised.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        for header in _messages(path):
+            break
+        else:
+            raise ValueError('%s is empty' % path)
+
+        if _marker(header) != MAGIC:
+            raise ValueError('%s is not a SPICE trace' % path)
+
+        if header[1] != VERSION:
+            raise ValueError('%s is a version %s trace, not %s' % (path, header[1], VERSION))
+
+        self.results, self.time, self.session = header[2:]
+
+    def __iter__(self):
+        messages = _messages(self.path)
+        next(messages)
+
+        return messages
+
+
+class _Stopwatch(object):
+    """A tracer timing each call as a Tracer does"""
+
+    seconds = 0.0
+
+    def enter(self, name, args):
+        return True
+
+    def leave(self, token, result, error, seconds, spice_seconds):
+        self.seconds = seconds
+
+
+def _moved(name, args, paths):
+    """Return args with the kernel file names of name moved by paths"""
+    if name not in FILES or not paths:
+        return args
+
+    moved = list(args)
+
+    for i, value in enumerate(moved):
+        if isinstance(value, basestring):
+            for old, new in paths.items():
+                if value.startswith(old):
+                    moved[i] = new + value[len(old):]
+                    break
+
+    return tuple(moved)
+
+
+def _same(expected, found, rtol):
+    if isinstance(expected, float) and isinstance(found, float):
+        return (expected == found or abs(expected - found) <= rtol * max(abs(expected), abs(found))
+                or (expected != expected and found != found))
+
+    if rtol and _marker(expected) == BYTES and _marker(found) == BYTES:
+        # the results of the batch functions are mostly doubles
+        if len(expected[1]) == len(found[1]) and len(expected[1]) % 8 == 0:
+            return _same(tuple(array.array('d', expected[1])), tuple(array.array('d', found[1])), rtol)
+
+    if isinstance(expected, tuple) and isinstance(found, tuple):
+        return len(expected) == len(found) and all(_same(a, b, rtol) for a, b in zip(expected, found))
+
+    return expected == found
+
+
+def _matches(results, ok, outcome, result, error, rtol):
+    if error is not None:
+        return not ok and outcome[0] == type(error).__name__
+
+    if not ok:
+        return False
+
+    if results == 'full':
+        return _same(outcome, _canonical(result), rtol)
+
+    if results == 'digest':
+        return outcome == _digest(result)
+
+    return True
+
+
+def _percentiles(values):
+    """Return the latency percentiles of a list of seconds, in seconds"""
+    if not values:
+        return {}
+
+    values = sorted(values)
+    result = dict(('p%d' % p, values[min(len(values) - 1, len(values) * p // 100)]) for p in PERCENTILES)
+    result['max'] = values[-1]
+
+    return result
+
+
+def _shorten(value, size=200):
+    text = repr(value)
+
+    return text if len(text) <= size else text[:size - 3] + '...'
+
+
+def replay(path, rtol=0.0, paths=None, repeat=1, examples=10):
+    """
+    Make the calls of the trace at path again, repeat times over, each
+    time after clearing the kernels and making the configuration calls
+    the trace started with, and return a report, a dict with the keys:
+
+      calls, seconds      the calls replayed, and the time they took
+      throughput          calls per second, Python overhead included
+      latency, recorded   the percentiles of the call times of the
+                          replay and of the trace, in seconds, as a dict
+                          with the keys p50, p90, p99 and max
+      functions           the calls, seconds, latency and recorded
+                          percentiles of each function, by name
+      changes             the calls changing the kernel state
+      mismatches          the calls whose results differ from the traced
+                          ones, or that raised or didn't where the traced
+                          call didn't or did
+      examples            the first few of those as (index, name,
+                          expected, found) with the values as text
+
+    The results are compared as the trace kept them: all the floats
+    within the relative tolerance rtol, including the doubles of the
+    batch results, if it kept them all, or exactly, if it kept digests.
+    paths maps the directories of the kernels when the trace was made to
+    where they are now: {'/ops/kernels': '/home/me/kernels'}.
+    """
+    source = Trace(path)
+    paths = paths or {}
+
+    if _spice._get_tracer() is not None:
+        raise ValueError('a tracer is set; stop it before replaying')
+
+    stopwatch = _Stopwatch()
+    times = {}
+    recorded = {}
+    report = {'calls': 0, 'changes': 0, 'mismatches': 0, 'examples': []}
+    wall = 0.0
+
+    try:
+        for repetition in xrange(repeat):
+            _spice.kclear()
+
+            for name, args in source.session:
+                getattr(_spice, name)(*_moved(name, _restore(args), paths))
+
+            _spice._set_tracer(stopwatch)
+            start = _clock()
+
+            try:
+                for index, (name, args, began, seconds, spice_seconds, ok, outcome) in enumerate(source):
+                    args = _moved(name, _restore(args), paths)
+                    result = error = None
+
+                    try:
+                        result = getattr(_spice, name)(*args)
+                    except Exception as exc:
+                        error = exc
+
+                    times.setdefault(name, []).append(stopwatch.seconds)
+
+                    if not repetition:
+                        recorded.setdefault(name, []).append(seconds)
+
+                    report['calls'] += 1
+                    report['changes'] += name in CHANGES
+
+                    if not _matches(source.results, ok, outcome, result, error, rtol):
+                        report['mismatches'] += 1
+
+                        if len(report['examples']) < examples:
+                            found = '%s: %s' % (type(error).__name__, error) if error is not None else result
+                            expected = outcome if ok else '%s: %s' % outcome
+                            report['examples'].append((index, name, _shorten(expected), _shorten(found)))
+            finally:
+                wall += _clock() - start
+                _spice._set_tracer(None)
+    finally:
+        parallel._changed()
+
+    everything = [seconds for values in times.values() for seconds in values]
+    report['seconds'] = sum(everything)
+    report['throughput'] = report['calls'] / wall if wall else 0.0
+    report['latency'] = _percentiles(everything)
+    report['recorded'] = _percentiles([seconds for values in recorded.values() for seconds in values])
+    report['functions'] = dict((name, {'calls': len(values), 'seconds': sum(values),
+                                       'latency': _percentiles(values),
+                                       'recorded': _percentiles(recorded.get(name, []))})
+                               for name, values in times.items())
+
+    return report
+
+
+def format_report(report, limit=20):
+    """Return a replay report as text, the functions taking the most time first"""
+    def micro(percentiles):
+        return ' '.join('%10.2f' % (1e6 * percentiles.get(key, 0.0)) for key in ('p50', 'p90', 'p99', 'max'))
+
+    lines = ['%d calls, %d changing the kernels, in %.4f s: %.0f calls/s, %d mismatches' % (
+        report['calls'], report['changes'], report['seconds'], report['throughput'], report['mismatches'])]
+
+    lines.append('%-14s %8s %10s %10s %10s %10s  (us)' % ('', 'calls', 'p50', 'p90', 'p99', 'max'))
+    lines.append('%-14s %8d %s' % ('replay', report['calls'], micro(report['latency'])))
+    lines.append('%-14s %8s %s' % ('traced', '', micro(report['recorded'])))
+
+    functions = sorted(report['functions'].items(), key=lambda item: (-item[1]['seconds'], item[0]))
+
+    for name, entry in functions[:limit]:
+        lines.append('%-14s %8d %s' % (name, entry['calls'], micro(entry['latency'])))
+        lines.append('%-14s %8s %s' % ('  traced', '', micro(entry['recorded'])))
+
+    for index, name, expected, found in report['examples']:
+        lines.append('call %d, %s: expected %s, found %s' % (index, name, expected, found))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a SPICE trace')
+    parser.add_argument('trace', help='the trace file')
+    parser.add_argument('-p', '--path', action='append', default=[],
+                        help='OLD=NEW: load the kernels under directory OLD from NEW')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='times to replay the trace')
+    parser.add_argument('-t', '--rtol', type=float, default=0.0, help='relative tolerance of the results')
+    parser.add_argument('-o', '--output', help='write the report as JSON here')
+    args = parser.parse_args(argv)
+
+    paths = dict(path.split('=', 1) for path in args.path)
+
+    # the traced calls that failed fail again; drop the error reports
+    with error_device('NULL'):
+        report = replay(args.trace, args.rtol, paths, args.repeat)
+
+    print format_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# Released under the BSD license, see LICENSE for details
+
+"""
+Window algebra over arrays of intervals.
+
+A window here is an (n,2) array of [left, right] intervals: a NumPy array,
+any other float64 buffer of endpoint pairs, a flat sequence of endpoints
+or a double precision Cell.  Intervals need not be sorted or disjoint; they
+are checked and merged the way wnvald does before use.  Every function
+returns a new (n,2) array and leaves its arguments alone.
+
+The set operations are done by the CSPICE window routines, and a whole
+list of windows is combined in one call by union_all and intersect_all.
+"""
+
+import _spice
+
+from arrays import double_array, bool_array, numpy
+from objects import Cell, DataType
+
+__all__ = ['window_union', 'window_intersect', 'window_difference',
+           'union_all', 'intersect_all', 'window_contains',
+           'window_expand', 'window_contract', 'window_filter', 'window_fill',
+           'window_cell']
+
+
+def _flat(window):
+    """Pass buffers and cells through, flatten sequences of pairs"""
+    if isinstance(window, Cell) or numpy is not None and isinstance(window, numpy.ndarray):
+        return window
+
+    try:
+        memoryview(window)
+        return window
+    except TypeError:
+        pass
+
+    flat = []
+
+    for item in window:
+        if isinstance(item, (list, tuple)):
+            flat.extend(item)
+        else:
+            flat.append(item)
+
+    return flat
+
+
+def _window(buf):
+    return double_array(buf, (-1, 2))
+
+
+def window_union(a, b):
+    """Return the union of windows a and b, as wnunid does"""
+    return _window(_spice._wncombine(_flat(a), _flat(b), 'u'))
+
+
+def window_intersect(a, b):
+    """Return the intersection of windows a and b, as wnintd does"""
+    return _window(_spice._wncombine(_flat(a), _flat(b), 'i'))
+
+
+def window_difference(a, b):
+    """Return window a less window b, as wndifd does"""
+    return _window(_spice._wncombine(_flat(a), _flat(b), 'd'))
+
+
+def union_all(windows):
+    """Return the union of a sequence of windows"""
+    return _window(_spice._wnreduce([_flat(window) for window in windows], 'u'))
+
+
+def intersect_all(windows):
+    """Return the intersection of a sequence of windows"""
+    return _window(_spice._wnreduce([_flat(window) for window in windows], 'i'))
+
+
+def window_contains(window, et):
+    """
+    Return an (N,) bool array telling, for each epoch in the array et,
+    whether it lies in the window (as wnelmd does for one epoch).
+    """
+    return bool_array(_spice._wncontains(_flat(window), et))
+
+
+def window_expand(window, left, right):
+    """
+    Return the window with each interval grown by left at its start and
+    right at its end, as wnexpd does
+    """
+    return _window(_spice._wnadjust(_flat(window), 'e', left, right))
+
+
+def window_contract(window, left, right):
+    """
+    Return the window with each interval shrunk by left at its start and
+    right at its end, as wncond does; intervals that vanish are dropped
+    """
+    return _window(_spice._wnadjust(_flat(window), 'c', left, right))
+
+
+def window_filter(window, small):
+    """Return the window without intervals of length small or less (wnfltd)"""
+    return _window(_spice._wnadjust(_flat(window), 'f', small))
+
+
+def window_fill(window, small):
+    """Return the window with gaps of length small or less filled (wnfild)"""
+    return _window(_spice._wnadjust(_flat(window), 'g', small))
+
+
+def window_cell(window, size=None):
+    """
+    Return a window as a double precision Cell, for the cell based
+    wrappers.  size is the number of endpoints the cell can hold, by
+    default just enough for the window.
+    """
+    flat = _spice._wncombine(_flat(window), (), 'u')
+    endpoints = double_array(flat, (-1,))
+    count = len(endpoints)
+    cell = Cell(DataType.DP, max(count, size or 0))
+
+    if numpy is not None:
+        numpy.asarray(cell)[:count] = endpoints
+    else:
+        data = cell.data
+
+        for i in xrange(count):
+            data[i] = endpoints[i]
+
+    cell.card = count
+
+    return cell
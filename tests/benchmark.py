@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks of the wrapper overhead and of the usual geometry workloads.
+
+Usage:
+
+  % python benchmark.py [-o results.json] [-r REPEAT] [-s SCALE] [-k PATTERN ...] [-c BASELINE.json]
+
+Each benchmark runs a loop of calls REPEAT times and reports the best and
+the median time per call, in microseconds.  The results are written as
+JSON (to stdout by default), with the Python, NumPy, platform and git
+commit they were measured with, so runs on two commits can be compared:
+
+  % python benchmark.py -o before.json
+  ### ... change mkwrapper.py or pyspice.c, rebuild ...
+  % python benchmark.py -o after.json -c before.json
+
+The kernels are those of tests/kernels; benchmarks whose kernels are
+missing (the SMAP loop needs kernels/spk_drm239_WithBurn-full.bsp, as
+test_smap.py does) are reported as skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import spice
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+MYDIR = os.path.dirname( os.path.abspath( __file__ ) )
+
+### for copies of kernels, made by run()
+TMPDIR = None
+
+def kernel(name):
+  return os.path.join( MYDIR, 'kernels', name )
+
+### ( name, group, function ); function(scale) returns ( loop, count ), or
+### None to skip, where loop() makes count calls
+BENCHMARKS = []
+
+def benchmark(group, name):
+  def register(function):
+    BENCHMARKS.append( ( '%s.%s' % ( group, name ), group, function ) )
+    return function
+  return register
+
+def loop_of(count, call, *args):
+  def loop():
+    for i in xrange(count): call( *args )
+  return loop, count
+
+ET0 = 2 * 86400.0
+V = ( 3.0, -4.0, 12.0 )
+W = ( 1.0, 2.0, 2.0 )
+M = ( ( 0.0, -1.0, 0.0 ), ( 1.0, 0.0, 0.0 ), ( 0.0, 0.0, 1.0 ) )
+Q = ( 0.5, 0.5, 0.5, 0.5 )
+
+### Per call overhead, by signature class
+
+@benchmark( 'call', 'scalar_out' )
+def _(scale):
+  return loop_of( int( 200000 * scale ), spice.dpr )
+
+@benchmark( 'call', 'scalar_in_out' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.convrt, 1.0, 'DEGREES', 'RADIANS' )
+
+@benchmark( 'call', 'vector_in' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.vnorm, V )
+
+@benchmark( 'call', 'vector_in_out' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.ucrss, V, W )
+
+@benchmark( 'call', 'matrix_in' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.mxv, M, V )
+
+@benchmark( 'call', 'matrix_out' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.q2m, Q )
+
+@benchmark( 'call', 'matrix_out_arrays' )
+def _(scale):
+  if numpy is None: return None
+  loop, count = loop_of( int( 100000 * scale ), spice.q2m, Q )
+  def arrays():
+    with spice.array_output(): loop()
+  return arrays, count
+
+### a 6x6 matrix: 36 floats and 6 tuples, or one array
+@benchmark( 'call', 'matrix6_out' )
+def _(scale):
+  return loop_of( int( 50000 * scale ), spice.sxform, 'J2000', 'ECLIPJ2000', ET0 )
+
+@benchmark( 'call', 'matrix6_out_arrays' )
+def _(scale):
+  if numpy is None: return None
+  loop, count = loop_of( int( 50000 * scale ), spice.sxform, 'J2000', 'ECLIPJ2000', ET0 )
+  def arrays():
+    with spice.array_output(): loop()
+  return arrays, count
+
+@benchmark( 'call', 'string_in' )
+def _(scale):
+  return loop_of( int( 50000 * scale ), spice.bodn2c, 'EARTH' )
+
+@benchmark( 'call', 'string_out' )
+def _(scale):
+  return loop_of( int( 50000 * scale ), spice.bodc2n, 399 )
+
+@benchmark( 'call', 'cell_in' )
+def _(scale):
+  window = spice.Cell( spice.DataType.DP, 20 )
+  for i in range(10): spice.wninsd( 2.0 * i, 2.0 * i + 1.0, window )
+  return loop_of( int( 100000 * scale ), spice.wncard, window )
+
+@benchmark( 'call', 'cell_in_out' )
+def _(scale):
+  a, b = spice.Cell( spice.DataType.DP, 20 ), spice.Cell( spice.DataType.DP, 20 )
+  for i in range(10):
+    spice.wninsd( 2.0 * i, 2.0 * i + 1.0, a )
+    spice.wninsd( 2.0 * i + 0.5, 2.0 * i + 1.5, b )
+  return loop_of( int( 50000 * scale ), spice.wnunid, a, b, spice.Cell( spice.DataType.DP, 40 ) )
+
+@benchmark( 'call', 'exception' )
+def _(scale):
+  def fails():
+    try: spice.bodvrd( 'NO SUCH BODY', 'RADII', 3 )
+    except spice.SpiceException: pass
+  return loop_of( int( 10000 * scale ), fails )
+
+### Geometry loops modeled on test_smap.py
+
+def smap_step(target, et, center, frame, instrument, radii):
+  state, lt = spice.spkezr( target, et, frame, 'NONE', center )
+  posn, veloc = state[:3], state[3:]
+  mtx = spice.pxform( instrument, frame, et )
+  bore = spice.mxv( mtx, ( 1.0, 0.0, 0.0 ) )
+  ### straight down, so the ray always meets the ellipsoid
+  point = spice.surfpt( posn, spice.vminus( posn ), radii[0], radii[1], radii[2] )
+  spice.reclat( point )
+  spice.et2utc( et, 'ISOC', 3 )
+  spice.vsep( spice.ucrss( posn, veloc ), bore )
+
+@benchmark( 'geometry', 'synthetic_loop' )
+def _(scale):
+  ### the made up bodies and frame of makecheb.c, over Earth
+  radii = spice.bodvrd( 'EARTH', 'RADII', 3 )[1]
+  count = int( 5000 * scale )
+  def loop():
+    for i in xrange(count):
+      smap_step( '-1001', ET0 + 10.0 * i, 'EARTH', 'IAU_EARTH', 'CHEB_TEST_FIXED', radii )
+  return loop, count
+
+@benchmark( 'geometry', 'smap_loop' )
+def _(scale):
+  if not os.path.exists( kernel( 'spk_drm239_WithBurn-full.bsp' ) ): return None
+  radii = spice.bodvrd( 'EARTH', 'RADII', 3 )[1]
+  et0 = spice.utc2et( '2016-06-01T12:00:00' )
+  count = int( 5000 * scale )
+  def loop():
+    for i in xrange(count):
+      smap_step( 'SMAP', et0 + 0.1 * i, 'EARTH', 'IAU_EARTH', 'SMAP_REFLECTOR', radii )
+  return loop, count
+
+@benchmark( 'geometry', 'spkezr' )
+def _(scale):
+  count = int( 50000 * scale )
+  def loop():
+    for i in xrange(count): spice.spkezr( '-1001', ET0 + i, 'J2000', 'NONE', 'EARTH' )
+  return loop, count
+
+@benchmark( 'geometry', 'spkezr_batch' )
+def _(scale):
+  count = int( 500000 * scale )
+  ets = [ ET0 + 0.5 * i for i in xrange(count) ]
+  return lambda: spice.spkezr_batch( -1001, ets, 'J2000', 'NONE', 'EARTH' ), count
+
+@benchmark( 'geometry', 'pxform' )
+def _(scale):
+  count = int( 50000 * scale )
+  def loop():
+    for i in xrange(count): spice.pxform( 'CHEB_TEST_FIXED', 'IAU_EARTH', ET0 + i )
+  return loop, count
+
+@benchmark( 'geometry', 'pxform_batch' )
+def _(scale):
+  count = int( 500000 * scale )
+  ets = [ ET0 + 0.5 * i for i in xrange(count) ]
+  return lambda: spice.pxform_batch( 'CHEB_TEST_FIXED', 'IAU_EARTH', ets ), count
+
+@benchmark( 'geometry', 'surfpt' )
+def _(scale):
+  return loop_of( int( 100000 * scale ), spice.surfpt, ( 7000.0, 0.0, 0.0 ), ( -1.0, 0.1, 0.0 ), 6378.14, 6378.14, 6356.75 )
+
+### Time conversions
+
+def utcs(count):
+  return [ '2016-06-%02dT%02d:%02d:%02d.%03d' % ( 1 + i % 28, i % 24, i % 60, ( 7 * i ) % 60, i % 1000 )
+           for i in xrange(count) ]
+
+@benchmark( 'time', 'str2et' )
+def _(scale):
+  strings = utcs( int( 20000 * scale ) )
+  def loop():
+    for string in strings: spice.str2et( string )
+  return loop, len(strings)
+
+@benchmark( 'time', 'str2et_batch' )
+def _(scale):
+  strings = utcs( int( 100000 * scale ) )
+  return lambda: spice.str2et_batch( strings ), len(strings)
+
+@benchmark( 'time', 'et2utc' )
+def _(scale):
+  count = int( 20000 * scale )
+  def loop():
+    for i in xrange(count): spice.et2utc( ET0 + 17.3 * i, 'ISOC', 3 )
+  return loop, count
+
+@benchmark( 'time', 'et2utc_batch' )
+def _(scale):
+  count = int( 100000 * scale )
+  ets = [ ET0 + 17.3 * i for i in xrange(count) ]
+  return lambda: spice.et2utc_batch( ets, 'ISOC', 3, 24 ), count
+
+@benchmark( 'time', 'timout_batch' )
+def _(scale):
+  count = int( 100000 * scale )
+  ets = [ ET0 + 17.3 * i for i in xrange(count) ]
+  return lambda: spice.timout_batch( ets, 'YYYY-DOYTHR:MN:SC.### ::RND', 24 ), count
+
+### Loading kernels, and importing spice
+
+def furnsh_of(name, scale):
+  ### a copy, so the loaded kernel of the same name stays loaded
+  path = os.path.join( TMPDIR, name )
+  shutil.copy( kernel( name ), path )
+  count = int( 200 * scale ) or 1
+  def loop():
+    for i in xrange(count):
+      spice.furnsh( path )
+      spice.unload( path )
+  return loop, count
+
+@benchmark( 'furnsh', 'lsk' )
+def _(scale): return furnsh_of( 'naif0010.tls', scale )
+
+@benchmark( 'furnsh', 'text_pck' )
+def _(scale): return furnsh_of( 'pck00009.tpc', scale )
+
+@benchmark( 'furnsh', 'fk' )
+def _(scale): return furnsh_of( 'smap_v00.tf', scale )
+
+@benchmark( 'furnsh', 'spk' )
+def _(scale): return furnsh_of( 'cheb_test.bsp', scale )
+
+def python_time(code):
+  ### the time a fresh interpreter takes to run code, in seconds
+  ### finding the same spice package as this process
+  paths = [ os.path.dirname( os.path.dirname( os.path.abspath( spice.__file__ ) ) ), os.environ.get( 'PYTHONPATH' ) ]
+  environ = dict( os.environ, PYTHONPATH = os.pathsep.join( filter( None, paths ) ) )
+  start = time.time()
+  subprocess.check_call( [ sys.executable, '-c', code ], env = environ )
+  return time.time() - start
+
+@benchmark( 'import', 'spice' )
+def _(scale):
+  ### a fresh interpreter importing spice, less one importing nothing
+  count = int( 5 * scale ) or 1
+  def loop():
+    for i in xrange(count): python_time( 'import spice' )
+  return loop, count
+
+@benchmark( 'import', 'python' )
+def _(scale):
+  count = int( 5 * scale ) or 1
+  def loop():
+    for i in xrange(count): python_time( 'pass' )
+  return loop, count
+
+### Running and comparing
+
+KERNELS = [ 'naif0010.tls', 'pck00009.tpc', 'smap_v00.tf', 'smap_test.bsp', 'spk_drm239_WithBurn-full.bsp',
+            'cheb_test.bsp', 'cheb_test.tf', 'cheb_test.bpc' ]
+
+def metadata():
+  try:
+    commit = subprocess.check_output( [ 'git', 'rev-parse', 'HEAD' ], cwd = MYDIR,
+                                      stderr = open( os.devnull, 'w' ) ).strip()
+  except Exception:
+    commit = None
+
+  return dict( python = platform.python_version(), implementation = platform.python_implementation(),
+               numpy = numpy and numpy.__version__, platform = platform.platform(),
+               machine = platform.machine(), commit = commit,
+               time = time.strftime( '%Y-%m-%dT%H:%M:%SZ', time.gmtime() ) )
+
+def run(patterns=(), repeat=5, scale=1.0, log=sys.stderr):
+  global TMPDIR
+  TMPDIR = tempfile.mkdtemp()
+  loaded = [ kernel( name ) for name in KERNELS if os.path.exists( kernel( name ) ) ]
+  for path in loaded: spice.furnsh( path )
+
+  results = {}
+
+  ### the benchmarks make failing calls; drop the error reports CSPICE writes
+  try:
+    with spice.error_device( 'NULL' ):
+      for name, group, function in BENCHMARKS:
+        if patterns and not any( pattern in name for pattern in patterns ): continue
+
+        made = function( scale )
+
+        if made is None:
+          results[name] = dict( group = group, skipped = True )
+          log.write( '%-28s skipped\n' % name )
+          continue
+
+        loop, count = made
+        times = []
+
+        for i in xrange(repeat):
+          start = time.time()
+          loop()
+          times.append( time.time() - start )
+
+        times.sort()
+        results[name] = dict( group = group, calls = count, repeat = repeat,
+                              best_us = 1e6 * times[0] / count, median_us = 1e6 * times[len(times) // 2] / count )
+        log.write( '%-28s %12.3f us %12.3f us\n' % ( name, results[name]['best_us'], results[name]['median_us'] ) )
+  finally:
+    for path in loaded: spice.unload( path )
+    shutil.rmtree( TMPDIR )
+
+  return dict( meta = metadata(), benchmarks = results )
+
+def compare(results, baseline, log=sys.stderr):
+  ### ratios of the best times, after / before; below 1 is faster
+  log.write( '%-28s %12s %12s %8s\n' % ( 'benchmark', 'before, us', 'after, us', 'ratio' ) )
+
+  for name in sorted( results['benchmarks'] ):
+    after, before = results['benchmarks'][name], baseline['benchmarks'].get( name, {} )
+    if 'best_us' in after and 'best_us' in before:
+      log.write( '%-28s %12.3f %12.3f %8.3f\n' % ( name, before['best_us'], after['best_us'],
+                                                     after['best_us'] / before['best_us'] ) )
+
+def main(argv=None):
+  parser = argparse.ArgumentParser( description = 'Benchmark the SPICE wrappers' )
+  parser.add_argument( '-o', '--output', help = 'write the JSON results here rather than to stdout' )
+  parser.add_argument( '-r', '--repeat', type = int, default = 5, help = 'times to run each loop' )
+  parser.add_argument( '-s', '--scale', type = float, default = 1.0, help = 'scale the loop lengths' )
+  parser.add_argument( '-k', '--pattern', action = 'append', default = [], help = 'run the benchmarks whose names contain this' )
+  parser.add_argument( '-c', '--compare', help = 'JSON results to compare with' )
+  args = parser.parse_args( argv )
+
+  results = run( args.pattern, args.repeat, args.scale )
+  text = json.dumps( results, indent = 2, sort_keys = True )
+
+  if args.output:
+    with open( args.output, 'w' ) as output: output.write( text + '\n' )
+  else:
+    print( text )
+
+  if args.compare:
+    with open( args.compare ) as baseline: compare( results, json.load( baseline ) )
+
+if __name__ == '__main__':
+  main()
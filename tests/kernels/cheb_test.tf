@@ -0,0 +1,13 @@
+KPL/FK
+
+Frame for the binary PCK test kernel cheb_test.bpc, made by makecheb.c
+
+\begindata
+
+FRAME_CHEB_TEST_FIXED       = 1400001
+FRAME_1400001_NAME          = 'CHEB_TEST_FIXED'
+FRAME_1400001_CLASS         = 2
+FRAME_1400001_CLASS_ID      = 1400001
+FRAME_1400001_CENTER        = 399
+
+\begintext
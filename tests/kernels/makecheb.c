@@ -0,0 +1,60 @@
+// Create the Chebyshev test kernels cheb_test.bsp and cheb_test.bpc
+
+// cheb_test.bsp has SPK type 2 and 3 segments for the made up bodies
+// -1001 (relative to EARTH) and -1002 (relative to -1001), and a second
+// type 2 segment for -1001 that covers part of the first one.
+// cheb_test.bpc has a binary PCK type 2 segment for the frame class
+// 1400001, used by the CHEB_TEST_FIXED frame of cheb_test.tf.
+
+// build command assumes this file is in PySPICE/tests/kernels/,
+// and that ../../cspice/ has CSPICE
+
+// gcc -I../../cspice/include makecheb.c ../../cspice/lib/cspice.a -lm -o makecheb
+
+#include <math.h>
+#include <stdio.h>
+#include "SpiceUsr.h"
+
+#define MAXCOEF 2000
+
+// smooth made up coefficients, falling off with the degree
+void
+coefficients( SpiceInt n, SpiceInt ncomp, SpiceInt degree, SpiceDouble scale, SpiceDouble *cdata ) {
+SpiceInt i, j, k;
+
+  for ( i = 0; i < n; ++ i ) {
+    for ( j = 0; j < ncomp; ++ j ) {
+      for ( k = 0; k <= degree; ++ k ) {
+        *cdata++ = scale * sin( 1.3 * i + 0.7 * k + 2.1 * j + 0.5 ) / ( ( k + 1 ) * ( k + 1 ) );
+      }
+    }
+  }
+}
+
+int
+main() {
+SpiceDouble day = 86400.0;
+SpiceDouble cdata[MAXCOEF];
+SpiceInt handle;
+
+  spkopn_c( "cheb_test.bsp", "Chebyshev test SPK", 0, &handle );
+
+  coefficients( 10, 3, 7, 7000.0, cdata );
+  spkw02_c( handle, -1001, 399, "J2000", 0.0, 10 * day, "type 2 for -1001", day, 10, 7, cdata, 0.0 );
+
+  coefficients( 8, 6, 5, 300.0, cdata );
+  spkw03_c( handle, -1002, -1001, "J2000", 0.0, 8 * 0.5 * day, "type 3 for -1002", 0.5 * day, 8, 5, cdata, 0.0 );
+
+  coefficients( 4, 3, 4, 9000.0, cdata );
+  spkw02_c( handle, -1001, 399, "J2000", 3 * day, 7 * day, "type 2 for -1001, days 3 to 7", day, 4, 4, cdata, 3 * day );
+
+  spkcls_c( handle );
+
+  pckopn_c( "cheb_test.bpc", "Chebyshev test PCK", 0, &handle );
+
+  coefficients( 10, 3, 6, 0.3, cdata );
+  pckw02_c( handle, 1400001, "J2000", 0.0, 10 * day, "type 2 for CHEB_TEST_FIXED", day, 10, 6, cdata, 0.0 );
+
+  pckcls_c( handle );
+  return 0;
+}
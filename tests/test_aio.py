@@ -0,0 +1,74 @@
+import os
+import spice
+import unittest
+
+try:
+  from spice import aio
+except ImportError:
+  aio = None
+
+### Test the asyncio facade and its batching
+@unittest.skipIf( aio is None, 'needs asyncio or trollius' )
+class TestAio(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls pck00009.tpc smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.et0 = spice.utc2et( '2016-06-01T12:00:00' )
+    self.frame = 'EARTH_SUN_ORBIT'
+    self.loop = aio.asyncio.new_event_loop()
+    self.dispatcher = aio.Dispatcher( window = 0.05 )
+
+  def tearDown(self):
+    self.dispatcher.close()
+    self.loop.close()
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def wait(self, futures):
+    return self.loop.run_until_complete( aio.asyncio.gather( *futures, return_exceptions = True ) )
+
+  def test_batched(self):
+    ets = [ self.et0 + 60.0 * i for i in range(50) ]
+    futures = ( [ self.dispatcher.spkezr( 'SMAP', et, self.frame, 'NONE', 'EARTH', loop = self.loop ) for et in ets ] +
+                [ self.dispatcher.pxform( 'J2000', 'IAU_EARTH', et, loop = self.loop ) for et in ets[:10] ] )
+    results = self.wait( futures )
+
+    ### the scalar results, from one batch call per key
+    self.assertEqual( results[:50], [ spice.spkezr( 'SMAP', et, self.frame, 'NONE', 'EARTH' ) for et in ets ] )
+    self.assertEqual( results[50:], [ spice.pxform( 'J2000', 'IAU_EARTH', et ) for et in ets[:10] ] )
+    self.assertEqual( ( self.dispatcher.batches, self.dispatcher.requests ), ( 2, 60 ) )
+
+    ### array output comes back the same way
+    spice.set_array_output( True )
+    try:
+      state, lt = self.wait( [ self.dispatcher.spkpos( 'SMAP', ets[0], self.frame, 'NONE', 'EARTH', loop = self.loop ) ] )[0]
+      self.assertEqual( list( state ), list( spice.spkpos( 'SMAP', ets[0], self.frame, 'NONE', 'EARTH' )[0] ) )
+    finally:
+      spice.set_array_output( False )
+
+  def test_errors(self):
+    ### a failing request fails alone
+    futures = [ self.dispatcher.spkezr( 'SMAP', et, self.frame, 'NONE', 'EARTH', loop = self.loop )
+                for et in ( self.et0, self.et0 + 1e9, self.et0 + 60.0 ) ]
+    futures.append( self.dispatcher.call( 'str2et', '2016-06-01T12:00:00', loop = self.loop ) )
+    results = self.wait( futures )
+
+    self.assertTrue( isinstance( results[1], spice.SpiceException ) )
+    self.assertEqual( results[2], spice.spkezr( 'SMAP', self.et0 + 60.0, self.frame, 'NONE', 'EARTH' ) )
+    self.assertEqual( results[3], spice.str2et( '2016-06-01T12:00:00' ) )
+
+  def test_closed_loop(self):
+    ### a request from a loop closed meanwhile doesn't stop the worker
+    closed = aio.asyncio.new_event_loop()
+    self.dispatcher.call( 'str2et', '2016-06-01T12:00:00', loop = closed )
+    closed.close()
+    results = self.wait( [ self.dispatcher.call( 'str2et', '2016-06-01T12:00:00', loop = self.loop ) ] )
+
+    self.assertEqual( results, [ spice.str2et( '2016-06-01T12:00:00' ) ] )
+    self.assertTrue( self.dispatcher._worker.is_alive() )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,147 @@
+import os
+import spice
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+def flat(a):
+  ### Batch results are ndarrays with NumPy, flat array.array('d') without
+  if numpy is not None: return list(numpy.ravel(a))
+  return list(a)
+
+### Test batch SPK queries against the scalar wrappers
+class TestSpkBatch(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    ### smap_test.bsp is relative to EARTH in the EARTH_SUN_ORBIT frame,
+    ### which needs no other ephemeris when abcorr is NONE
+    self.frame = 'EARTH_SUN_ORBIT'
+    et0 = spice.utc2et( '2016-06-01T12:00:00' )
+    self.ets = [ et0 + 60.0 * i for i in range(10) ]
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_spkezr_batch(self):
+    states, lts = spice.spkezr_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    expected = [ spice.spkezr( 'SMAP', et, self.frame, 'NONE', 'EARTH' ) for et in self.ets ]
+    if numpy is not None:
+      self.assertEqual( states.shape, (10,6) )
+      self.assertEqual( lts.shape, (10,) )
+    self.assertEqual( flat(states), [ x for st,lt in expected for x in st ] )
+    self.assertEqual( flat(lts), [ lt for st,lt in expected ] )
+
+  def test_spkpos_batch(self):
+    posns, lts = spice.spkpos_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    expected = [ spice.spkpos( 'SMAP', et, self.frame, 'NONE', 'EARTH' ) for et in self.ets ]
+    self.assertEqual( flat(posns), [ x for pos,lt in expected for x in pos ] )
+
+  def test_broadcast_targets(self):
+    ### IDs and names mixed, one epoch broadcast against the targets
+    states, lts = spice.spkezr_batch( [ -205, 'SMAP', 'EARTH' ], self.ets[0], self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( flat(states)[:6], flat(states)[6:12] )
+    self.assertEqual( flat(states)[12:], [0.0] * 6 )
+
+    ### unicode names, as the scalar wrappers take them
+    self.assertEqual( flat( spice.spkezr_batch( u'SMAP', self.ets[0], self.frame, 'NONE', 'EARTH' )[0] ), flat(states)[6:12] )
+    self.assertEqual( flat( spice.spkezr_batch( [ u'SMAP' ], self.ets[0], self.frame, 'NONE', u'EARTH' )[0] ), flat(states)[6:12] )
+
+    ### mismatched lengths cannot be broadcast
+    self.assertRaises( ValueError, spice.spkezr_batch, [ 'SMAP', 'SMAP' ], self.ets, self.frame, 'NONE', 'EARTH' )
+
+  def test_buffer_input(self):
+    if numpy is None: return
+    ets = numpy.array( self.ets )
+    states, lts = spice.spkezr_batch( 'SMAP', ets, self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( flat(states), flat(spice.spkezr_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )[0]) )
+
+  def test_batch_exception(self):
+    self.assertRaises( spice.SpiceException, spice.spkezr_batch, 'SMAP', self.ets, self.frame, 'NONE', 'MARS' )
+
+    ### an ID target needs an observer with an ID
+    self.assertRaises( spice.SpiceException, spice.spkezr_batch, 399, self.ets, self.frame, 'NONE', 'NO SUCH BODY' )
+    self.assertRaises( TypeError, spice.spkezr_batch, [ 'SMAP', 1.5 ], self.ets[:2], self.frame, 'NONE', 'EARTH' )
+
+    ### the batch stops at the first error and leaves no error behind
+    self.assertRaises( spice.SpiceException, spice.et2utc_batch, [ 0.0, 0.0 ], 'NOFORMAT', 3 )
+    self.assertEqual( spice.et2utc_batch( [ 0.0 ], 'ISOC', 0 ), [ '2000-01-01T11:58:56' ] )
+
+
+### Test batch frame transformations against the scalar wrappers
+class TestXformBatch(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls pck00009.tpc'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+    et0 = spice.utc2et( '2016-06-01T12:00:00' )
+    self.ets = [ et0 + 3600.0 * i for i in range(24) ]
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_pxform_batch(self):
+    mtxs = spice.pxform_batch( 'IAU_EARTH', 'J2000', self.ets )
+    expected = [ spice.pxform( 'IAU_EARTH', 'J2000', et ) for et in self.ets ]
+    if numpy is not None:
+      self.assertEqual( mtxs.shape, (24,3,3) )
+    self.assertEqual( flat(mtxs), [ x for mtx in expected for row in mtx for x in row ] )
+
+  def test_sxform_batch(self):
+    xforms = spice.sxform_batch( 'IAU_EARTH', 'J2000', self.ets )
+    expected = [ spice.sxform( 'IAU_EARTH', 'J2000', et ) for et in self.ets ]
+    if numpy is not None:
+      self.assertEqual( xforms.shape, (24,6,6) )
+    self.assertEqual( flat(xforms), [ x for xform in expected for row in xform for x in row ] )
+
+  def test_xform_batch_exception(self):
+    self.assertRaises( spice.SpiceException, spice.pxform_batch, 'IAU_EARTH', 'NO_SUCH_FRAME', self.ets )
+
+
+### Test batch time string conversions against the scalar wrappers
+class TestTimeBatch(unittest.TestCase):
+
+  def setUp(self):
+    self.lsk = os.path.join( os.path.dirname(__file__), 'kernels', 'naif0010.tls' )
+    spice.furnsh( self.lsk )
+    self.utcs = [ '2016-06-01T12:%02d:00' % i for i in range(60) ]
+
+  def tearDown(self):
+    spice.unload( self.lsk )
+
+  def test_str2et_batch(self):
+    expected = [ spice.str2et( utc ) for utc in self.utcs ]
+    self.assertEqual( flat(spice.str2et_batch( self.utcs )), expected )
+    self.assertEqual( flat(spice.utc2et_batch( self.utcs )), [ spice.utc2et( utc ) for utc in self.utcs ] )
+    if numpy is not None:
+      ### fixed-width "S" arrays are read in place
+      self.assertEqual( flat(spice.str2et_batch( numpy.array( self.utcs ) )), expected )
+
+  def test_et2utc_batch(self):
+    ets = spice.str2et_batch( self.utcs )
+    expected = [ spice.et2utc( et, 'ISOC', 3 ) for et in flat(ets) ]
+    self.assertEqual( spice.et2utc_batch( ets, 'ISOC', 3 ), expected )
+    fixed = spice.et2utc_batch( ets, 'ISOC', 3, width=23 )
+    self.assertEqual( [ str(i) for i in fixed ], expected )
+    self.assertEqual( [ str(i) for i in spice.et2utc_batch( ets, 'ISOC', 3, width=10 ) ], [ i[:10] for i in expected ] )
+
+  def test_timout_batch(self):
+    pictur = 'YYYY-MM-DD HR:MN:SC ::UTC'
+    ets = spice.str2et_batch( self.utcs )
+    self.assertEqual( spice.timout_batch( ets, pictur ), [ spice.timout( et, pictur ) for et in flat(ets) ] )
+
+  def test_time_batch_exception(self):
+    self.assertRaises( spice.SpiceException, spice.str2et_batch, [ '2016-06-01', 'not a time' ] )
+
+
+if __name__=="__main__":
+  unittest.main()
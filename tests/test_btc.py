@@ -1,5 +1,10 @@
 import spice
 import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 """
 This string contains a SPICE text kernel which can be loaded
 via
@@ -113,6 +118,64 @@ class TestSpiceCells(unittest.TestCase):
       ### Compare data
       self.assertEqual( a.data, cmp )
 
+  ### Cells are passed to CSPICE in place and handed back unchanged
+  def test_in_place(self):
+    window = spice.Cell( spice.DataType.DP, 8 )
+    self.assertTrue( spice.wninsd( 1.0, 2.0, window ) is window )
+    spice.wninsd( 5.0, 7.0, window )
+    self.assertEqual( window.card, 4 )
+    self.assertEqual( window.data[:4], [ 1.0, 2.0, 5.0, 7.0 ] )
+
+    other = spice.Cell( spice.DataType.DP, 8 )
+    spice.wninsd( 1.5, 6.0, other )
+    union = spice.wnunid( window, other, spice.Cell( spice.DataType.DP, 8 ) )
+    self.assertEqual( union.data[:union.card], [ 1.0, 7.0 ] )
+
+    ### the input windows are not touched
+    self.assertEqual( window.card, 4 )
+
+  ### The keywords of the old Python Cell class still work
+  def test_keywords(self):
+    cell = spice.Cell( dtArg = spice.DataType.CHR, szArg = 3, lenArg = 10 )
+    self.assertEqual( ( cell.dtype, cell.size, cell.length ), ( spice.DataType.CHR, 3, 10 ) )
+    self.assertEqual( spice.Cell( spice.DataType.CHR, 3, length = 10 ).length, 10 )
+    self.assertEqual( cell.isSet, False )
+    self.assertRaises( TypeError, spice.Cell, spice.DataType.CHR, 3, length = 10, lenArg = 10 )
+
+  ### The data are exported through the buffer interface
+  def test_buffer(self):
+    window = spice.Cell( spice.DataType.DP, 6 )
+    spice.wninsd( 1.0, 2.0, window )
+    view = memoryview( window )
+    self.assertEqual( view.format, 'd' )
+    self.assertEqual( view.shape, (6,) )
+
+    chars = memoryview( spice.Cell( spice.DataType.CHR, 2, 8 ) )
+    self.assertEqual( chars.format, '8s' )
+    self.assertEqual( chars.itemsize, 8 )
+
+  @unittest.skipIf( numpy is None, 'NumPy is not installed' )
+  def test_numpy(self):
+    window = spice.Cell( spice.DataType.DP, 6 )
+    spice.wninsd( 1.0, 2.0, window )
+    data = numpy.asarray( window )
+    self.assertEqual( list(data[:2]), [ 1.0, 2.0 ] )
+
+    ### writes through the array are seen by CSPICE
+    data[1] = 3.0
+    self.assertEqual( window.data[1], 3.0 )
+    self.assertEqual( spice.wnfetd( window, 0 ), ( 1.0, 3.0 ) )
+    self.assertEqual( list(numpy.frombuffer( window )[:2]), [ 1.0, 3.0 ] )
+
+  def test_errors(self):
+    self.assertRaises( TypeError, spice.Cell, spice.DataType.BOOL, 4 )
+    self.assertRaises( TypeError, spice.wninsd, 1.0, 2.0, [ 0.0 ] * 4 )
+
+    cell = spice.Cell( spice.DataType.INT, 2 )
+    self.assertRaises( IndexError, cell.data.__getitem__, 2 )
+    self.assertRaises( ValueError, setattr, cell, 'card', 3 )
+    self.assertRaises( ValueError, setattr, cell, 'data', [ 1, 2, 3 ] )
+
 
 if __name__=="__main__":
   unittest.main()
@@ -0,0 +1,87 @@
+import os
+import spice
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+### Test fixed-size array inputs given as buffers instead of tuples
+@unittest.skipIf( numpy is None, 'NumPy is not installed' )
+class TestBufferInputs(unittest.TestCase):
+
+  def setUp(self):
+    self.mtx = ( (0.0, -1.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 1.0) )
+    self.v1 = ( 1.0, 2.0, 3.0 )
+    self.v2 = ( -4.0, 5.0, 0.5 )
+
+  def test_vectors(self):
+    expected = spice.vsub( self.v1, self.v2 )
+    self.assertEqual( spice.vsub( numpy.array(self.v1), numpy.array(self.v2) ), expected )
+    self.assertEqual( spice.vsub( memoryview(numpy.array(self.v1)), self.v2 ), expected )
+    self.assertEqual( spice.vsep( numpy.array(self.v1), numpy.array(self.v2) ), spice.vsep( self.v1, self.v2 ) )
+
+  def test_matrix(self):
+    expected = spice.mxv( self.mtx, self.v1 )
+    self.assertEqual( spice.mxv( numpy.array(self.mtx), numpy.array(self.v1) ), expected )
+
+    ### non-contiguous or differently typed arrays still work, element by element
+    self.assertEqual( spice.mxv( numpy.array(self.mtx).T.T, numpy.array(self.v1)[::1] ), expected )
+    self.assertEqual( spice.mxv( numpy.array(self.mtx, dtype=numpy.float32), [1, 2, 3] ), expected )
+    self.assertEqual( spice.mxv( numpy.array(self.mtx).T, self.v1 ), spice.mxv( list(zip(*self.mtx)), self.v1 ) )
+
+  def test_wrong_shape(self):
+    self.assertRaises( TypeError, spice.vsub, numpy.zeros(4), self.v2 )
+    self.assertRaises( TypeError, spice.mxv, numpy.zeros(9), self.v1 )
+    self.assertRaises( TypeError, spice.vsub, ( 1.0, 2.0 ), self.v2 )
+
+
+### Test array output mode
+@unittest.skipIf( numpy is None, 'NumPy is not installed' )
+class TestArrayOutputs(unittest.TestCase):
+
+  def setUp(self):
+    self.mtx = ( (0.0, -1.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 1.0) )
+    self.v1 = ( 1.0, 2.0, 3.0 )
+
+  def tearDown(self):
+    spice.set_array_output( False )
+
+  def test_array_output(self):
+    expected = spice.mxv( self.mtx, self.v1 )
+    self.assertFalse( spice.get_array_output() )
+    spice.set_array_output( True )
+    self.assertTrue( spice.get_array_output() )
+    vout = spice.mxv( self.mtx, self.v1 )
+    self.assertTrue( isinstance( vout, numpy.ndarray ) )
+    self.assertEqual( vout.shape, (3,) )
+    self.assertEqual( tuple(vout), expected )
+
+    ### scalar outputs are unchanged
+    self.assertEqual( spice.vsep( self.v1, self.v1 ), 0.0 )
+
+  def test_array_output_context(self):
+    with spice.array_output():
+      mtx = spice.q2m( ( 1.0, 0.0, 0.0, 0.0 ) )
+      self.assertEqual( mtx.shape, (3,3) )
+      self.assertEqual( mtx.tolist(), [ [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0] ] )
+    self.assertFalse( spice.get_array_output() )
+    self.assertEqual( spice.q2m( ( 1.0, 0.0, 0.0, 0.0 ) ), ( (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0) ) )
+
+  def test_array_output_dynamic(self):
+    ### outputs whose length is only known after the call, as from bodvrd
+    pck = os.path.join( os.path.dirname(__file__), 'kernels', 'pck00009.tpc' )
+    spice.furnsh( pck )
+    try:
+      dim, radii = spice.bodvrd( 'EARTH', 'RADII', 3 )
+      with spice.array_output():
+        adim, aradii = spice.bodvrd( 'EARTH', 'RADII', 3 )
+    finally:
+      spice.unload( pck )
+    self.assertEqual( adim, dim )
+    self.assertEqual( aradii.shape, (3,) )
+    self.assertEqual( tuple(aradii), radii )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import spice
+import tempfile
+import unittest
+
+DAY = 86400.0
+
+### Test the kernel catalog and its load plans
+class TestCatalog(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.abspath( os.path.join( os.path.dirname(__file__), 'kernels' ) )
+    self.names = 'cheb_test.bsp cheb_test.bpc cheb_test.tf smap_test.bsp smap_v00.tf naif0010.tls'.split()
+    self.kernels = dict( ( name, os.path.join( mydir, name ) ) for name in self.names )
+    self.tmpdir = tempfile.mkdtemp()
+    self.catalog = spice.KernelCatalog( os.path.join( self.tmpdir, 'kernels.db' ) )
+
+  def tearDown(self):
+    self.catalog.close()
+    shutil.rmtree( self.tmpdir )
+
+  def test_update(self):
+    catalog = self.catalog
+    paths = [ self.kernels[name] for name in self.names ]
+    self.assertEqual( catalog.update( paths ), paths )
+    self.assertEqual( catalog.update( paths ), [] )
+    self.assertEqual( catalog.files(), paths )
+
+    self.assertEqual( [ catalog.info( path )[0] for path in paths ], [ 'SPK', 'PCK', 'FK', 'SPK', 'TEXT', 'LSK' ] )
+    self.assertEqual( catalog.info( paths[0] )[1], os.path.getsize( paths[0] ) )
+    self.assertEqual( catalog.coverage( -1001 ), [ ( 0.0, 10 * DAY, paths[0] ), ( 3 * DAY, 7 * DAY, paths[0] ) ] )
+    self.assertEqual( catalog.coverage( 1400001, 'PCK' ), [ ( 0.0, 10 * DAY, paths[1] ) ] )
+
+    ### a copy whose time changes isn't scanned again, one whose contents change is
+    copy = os.path.join( self.tmpdir, 'copy.bsp' )
+    shutil.copy( paths[0], copy )
+    self.assertEqual( catalog.update( [ copy ] ), [ copy ] )
+    os.utime( copy, ( 1e9, 1e9 ) )
+    self.assertEqual( catalog.update( [ copy ] ), [] )
+    self.assertEqual( catalog.info( copy )[2], 1e9 )
+
+    shutil.copy( paths[3], copy )
+    self.assertEqual( catalog.update( [ copy ] ), [ copy ] )
+    self.assertEqual( catalog.files()[-1], copy )
+    self.assertEqual( catalog.coverage( -1001 )[2:], [] )
+    self.assertEqual( len( catalog.coverage( 'SMAP' ) ), 2 )
+
+    ### the catalog is kept on disk
+    catalog.close()
+    self.catalog = catalog = spice.KernelCatalog( catalog.path )
+    self.assertEqual( catalog.files( 'SPK' ), [ paths[0], paths[3], copy ] )
+
+    os.remove( copy )
+    self.assertEqual( catalog.prune(), [ copy ] )
+    self.assertEqual( catalog.files( 'SPK' ), [ paths[0], paths[3] ] )
+
+  def test_plan(self):
+    catalog = self.catalog
+    catalog.update( [ self.kernels[name] for name in self.names ] )
+
+    cheb, smap = self.kernels['cheb_test.bsp'], self.kernels['smap_test.bsp']
+    self.assertEqual( catalog.plan( -1001, 0.0, 10 * DAY ), [ cheb ] )
+    self.assertEqual( catalog.plan( [ 'SMAP' ], 5e8, frames = [ 'smap_bus' ], variables = [ 'DELTET/DELTA_AT' ] ),
+                      [ self.kernels['smap_v00.tf'], self.kernels['naif0010.tls'], smap ] )
+    self.assertEqual( catalog.plan( 1400001, DAY, kind = 'PCK', frames = [ 'CHEB_TEST_FIXED' ] ),
+                      [ self.kernels['cheb_test.tf'], self.kernels['cheb_test.bpc'] ] )
+
+    self.assertRaises( ValueError, catalog.plan, -1002, 0.0, 5 * DAY )
+    self.assertRaises( ValueError, catalog.plan, -205, 0.0 )
+    self.assertRaises( ValueError, catalog.plan, -1001, 0.0, frames = [ 'NO_SUCH_FRAME' ] )
+
+    ### files the others make unnecessary are left out
+    copies = []
+    for i in range(3):
+      copies.append( os.path.join( self.tmpdir, 'copy%d.bsp' % i ) )
+      shutil.copy( cheb, copies[-1] )
+    catalog.update( copies )
+    self.assertEqual( len( catalog.plan( [ -1001, -1002 ], 0.0, 4 * DAY ) ), 1 )
+
+    ### and of files covering the same span, the one added last wins
+    self.assertEqual( catalog.plan( -1001, 0.0, 10 * DAY ), [ copies[-1] ] )
+    self.assertEqual( catalog.plan( [ -1001, -1002 ], DAY ), [ copies[-1] ] )
+
+    manager = catalog.manager( 2 )
+    self.assertEqual( manager.covering( -1002, DAY ), [ cheb ] + copies )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,66 @@
+import os
+import spice
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+DAY = 86400.0
+
+### Test the NumPy Chebyshev evaluators against CSPICE
+@unittest.skipIf( numpy is None, 'needs NumPy' )
+class TestChebyshev(unittest.TestCase):
+
+  def setUp(self):
+    ### the kernels are made by kernels/makecheb.c
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'cheb_test.bsp cheb_test.tf cheb_test.bpc'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def assertClose(self, got, expected, scale):
+    self.assertTrue( abs( got - expected ).max() < 1e-14 * scale, abs( got - expected ).max() )
+
+  def test_ephemeris(self):
+    ephemeris = spice.ChebyshevEphemeris()
+
+    ### type 2, with a later segment covering days 3 to 7, and its ends
+    ets = numpy.concatenate( ( numpy.linspace( 0.0, 10 * DAY, 501 ), [ 3 * DAY, 7 * DAY ] ) )
+    expected = numpy.array( [ spice.spkez( -1001, et, 'J2000', 'NONE', 399 )[0] for et in ets ] )
+    self.assertClose( ephemeris.state( -1001, ets, 'EARTH' ), expected, 1e4 )
+    self.assertClose( ephemeris.position( -1001, ets, 399 ), expected[:, :3], 1e4 )
+
+    ### type 3, along chains of centers in both directions
+    ets = numpy.linspace( 0.0, 4 * DAY, 301 )
+    for target, observer in [ ( -1002, 399 ), ( -1002, -1001 ), ( -1001, -1002 ), ( 399, -1002 ) ]:
+      expected = numpy.array( [ spice.spkez( target, et, 'J2000', 'NONE', observer )[0] for et in ets ] )
+      self.assertClose( ephemeris.state( target, ets, observer ), expected, 1e4 )
+
+    self.assertEqual( ephemeris.state( -1002, 100.0, 399 ).shape, ( 6, ) )
+    self.assertRaises( spice.SpiceException, ephemeris.state, -1002, 5 * DAY, 399 )
+    self.assertRaises( spice.SpiceException, ephemeris.state, -1001, 1.0, 10 )
+
+    ### kernels given by name
+    ephemeris = spice.ChebyshevEphemeris( self.kernels[0] )
+    self.assertEqual( len( ephemeris.coverage[-1001].segments ), 2 )
+
+  def test_orientation(self):
+    orientation = spice.ChebyshevOrientation()
+    ets = numpy.linspace( 0.0, 10 * DAY, 501 )
+
+    expected = numpy.array( [ spice.sxform( 'J2000', 'CHEB_TEST_FIXED', et ) for et in ets ] )
+    self.assertClose( orientation.transform( 1400001, ets ), expected, 1.0 )
+
+    expected = numpy.array( spice.pxform( 'J2000', 'CHEB_TEST_FIXED', 1000.0 ) )
+    self.assertClose( orientation.rotation( 1400001, 1000.0 ), expected, 1.0 )
+
+    self.assertRaises( spice.SpiceException, orientation.rotation, 1400001, [ 11 * DAY ] )
+    self.assertRaises( spice.SpiceException, orientation.rotation, 3000, 0.0 )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,118 @@
+import os
+import shutil
+import socket
+import spice
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+### Test the SPICE server and its client over a Unix domain socket
+class TestDaemon(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.path.join( self.tmpdir, 'spice.sock' )
+
+    self.server = spice.SpiceServer( self.path, self.kernels )
+    self.thread = threading.Thread( target = self.server.serve_forever )
+    self.thread.start()
+
+    self.et = spice.utc2et( '2016-06-01T12:00:00' )
+    self.frame = 'EARTH_SUN_ORBIT'
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.thread.join()
+    self.server.close()
+    for kernel in self.kernels: spice.unload( kernel )
+    shutil.rmtree( self.tmpdir )
+
+  def test_calls(self):
+    with spice.SpiceClient( self.path ) as client:
+      self.assertEqual( client.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ),
+                        spice.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ) )
+      self.assertEqual( client.str2et( '2016-06-01T12:00:00' ), self.et )
+
+      ### errors come back as the same exceptions
+      self.assertRaises( spice.SpiceException, client.spkezr, 'SMAP', self.et + 1e9, self.frame, 'NONE', 'EARTH' )
+      self.assertRaises( AttributeError, client.no_such_function )
+
+      ### and the kernels of the server are its own
+      self.assertRaises( ValueError, client.furnsh, self.kernels[0] )
+      self.assertRaises( ValueError, client.kclear )
+      for name in 'erract errprt spkopn serve SpiceServer KernelManager set_instrumentation reset_stats'.split():
+        self.assertRaises( ValueError, client.call, name )
+
+      ### nor can cells go over the socket
+      for name in 'wncard card window_union gfuds'.split():
+        self.assertRaises( ValueError, client.call, name )
+
+      ### only the user running the server may connect
+      self.assertEqual( stat.S_IMODE( os.stat( self.path ).st_mode ) & 0077, 0 )
+      self.assertTrue( os.path.exists( self.path ) )
+      self.assertRaises( ValueError, spice.SpiceServer, self.path )
+
+    ### a file that isn't a socket is left alone
+    path = os.path.join( self.tmpdir, 'kernel.bsp' )
+    open( path, 'w' ).close()
+    self.assertRaises( ValueError, spice.SpiceServer, path )
+    self.assertTrue( os.path.exists( path ) )
+
+  @unittest.skipIf( numpy is None, 'needs NumPy' )
+  def test_arrays(self):
+    ets = self.et + numpy.arange( 1000.0 )
+
+    with spice.SpiceClient( self.path ) as client:
+      states, lts = client.spkezr_batch( 'SMAP', ets, self.frame, 'NONE', 'EARTH' )
+      expected, expected_lts = spice.spkezr_batch( 'SMAP', ets, self.frame, 'NONE', 'EARTH' )
+      self.assertEqual( states.shape, ( 1000, 6 ) )
+      self.assertEqual( states.tolist(), expected.tolist() )
+      self.assertEqual( lts.tolist(), expected_lts.tolist() )
+
+      ### fixed-width strings too
+      utcs = client.et2utc_batch( ets[:5], 'ISOC', 3, 24 )
+      self.assertEqual( utcs.tolist(), spice.et2utc_batch( ets[:5], 'ISOC', 3, 24 ).tolist() )
+
+  def test_process(self):
+    ### a server in a process of its own, and a stale socket
+    path = os.path.join( self.tmpdir, 'process.sock' )
+    stale = socket.socket( socket.AF_UNIX )
+    stale.bind( path )
+    stale.close()
+    server = subprocess.Popen( [ sys.executable, '-m', 'spice.daemon', path ] + self.kernels,
+                               stderr = subprocess.PIPE )
+
+    try:
+      for i in range(500):
+        try:
+          client = spice.SpiceClient( path )
+          break
+        except Exception:
+          time.sleep( 0.02 )
+
+      self.assertEqual( client.spkpos( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ),
+                        spice.spkpos( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ) )
+    finally:
+      server.terminate()
+      errors = server.communicate()[1]
+
+    ### stopping with a client still connected is quiet
+    self.assertEqual( errors, '' )
+    self.assertFalse( os.path.exists( path ) )
+    self.assertRaises( ( EOFError, socket.error ), client.str2et, '2016-06-01T12:00:00' )
+    client.close()
+
+if __name__ == '__main__':
+  unittest.main()
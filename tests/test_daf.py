@@ -0,0 +1,110 @@
+import os
+import pickle
+import shutil
+import spice
+import struct
+import tempfile
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+def big_endian(path, copy):
+  ### Write a big endian copy of a little endian DAF
+  data = open( path, 'rb' ).read()
+  nd, ni, fward = struct.unpack( '<2i', data[8:16] ) + struct.unpack( '<i', data[76:80] )
+  out = bytearray( data )
+  out[8:16] = struct.pack( '>2i', nd, ni )
+  out[76:88] = struct.pack( '>3i', *struct.unpack( '<3i', data[76:88] ) )
+  out[88:96] = 'BIG-IEEE'
+
+  def swap(start, count, code):
+    size = struct.calcsize( code )
+    values = struct.unpack( '<%d%s' % ( count, code ), data[start:start + size * count] )
+    out[start:start + size * count] = struct.pack( '>%d%s' % ( count, code ), *values )
+
+  summaries = []
+  number = fward
+  while number:
+    summaries.append( number )
+    start = 1024 * ( number - 1 )
+    next, prev, count = struct.unpack( '<3d', data[start:start + 24] )
+    swap( start, 3, 'd' )
+    ss = nd + ( ni + 1 ) // 2
+    for i in range( int( count ) ):
+      swap( start + 24 + 8 * ss * i, nd, 'd' )
+      swap( start + 24 + 8 * ss * i + 8 * nd, 2 * ( ss - nd ), 'i' )
+    number = int( next )
+
+  ### everything after the first summary record but summaries and names is data
+  for number in range( fward + 2, len( data ) // 1024 + 1 ):
+    if number not in summaries and number - 1 not in summaries:
+      swap( 1024 * ( number - 1 ), 128, 'd' )
+
+  open( copy, 'wb' ).write( out )
+
+### Test reading DAF files directly
+class TestDAF(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.spk = os.path.join( mydir, 'kernels', 'cheb_test.bsp' )
+    self.pck = os.path.join( mydir, 'kernels', 'cheb_test.bpc' )
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree( self.tmpdir )
+
+  def test_segments(self):
+    daf = spice.DAF( self.spk )
+    self.assertEqual( ( daf.idword, daf.nd, daf.ni, daf.byteorder ), ( 'DAF/SPK', 2, 6, '<' ) )
+    self.assertEqual( daf.ifname, 'Chebyshev test SPK' )
+
+    segments = daf.segments()
+    self.assertEqual( [ s.name for s in segments ],
+                      [ 'type 2 for -1001', 'type 3 for -1002', 'type 2 for -1001, days 3 to 7' ] )
+    self.assertEqual( [ s.integers[:4] for s in segments ],
+                      [ ( -1001, 399, 1, 2 ), ( -1002, -1001, 1, 3 ), ( -1001, 399, 1, 2 ) ] )
+    self.assertEqual( segments[2].doubles, ( 3 * 86400.0, 7 * 86400.0 ) )
+
+    ### the directory of a type 2 segment: init, intlen, rsize, n
+    self.assertEqual( list( segments[0].data[-4:] ), [ 0.0, 86400.0, 26.0, 10.0 ] )
+    self.assertEqual( len( segments[0].data ), len( segments[0] ) )
+    self.assertEqual( len( daf.raw( segments[0].begin, segments[0].end ) ), 8 * len( segments[0] ) )
+
+    pck = spice.DAF( self.pck )
+    self.assertEqual( ( pck.idword, pck.nd, pck.ni ), ( 'DAF/PCK', 2, 5 ) )
+    self.assertEqual( pck.segments()[0].integers[:3], ( 1400001, 1, 2 ) )
+
+    self.assertRaises( ValueError, spice.DAF, os.path.join( os.path.dirname(__file__), 'kernels', 'naif0010.tls' ) )
+
+  def test_byte_order(self):
+    copy = os.path.join( self.tmpdir, 'big.bsp' )
+    big_endian( self.spk, copy )
+
+    little, big = spice.DAF( self.spk ), spice.DAF( copy )
+    self.assertEqual( big.byteorder, '>' )
+    self.assertEqual( [ ( s.name, s.doubles, s.integers ) for s in big.segments() ],
+                      [ ( s.name, s.doubles, s.integers ) for s in little.segments() ] )
+
+    for a, b in zip( little.segments(), big.segments() ):
+      self.assertEqual( list( a.data ), list( b.data ) )
+
+  @unittest.skipIf( numpy is None, 'needs NumPy' )
+  def test_views(self):
+    daf = spice.DAF( self.spk )
+    data = daf.segments()[1].data
+    self.assertFalse( data.flags.writeable )
+    self.assertFalse( data.flags.owndata )
+
+    ### views outlive the DAF, and a pickled DAF maps the file again
+    daf.close()
+    self.assertEqual( data[-1], 8.0 )
+
+    again = pickle.loads( pickle.dumps( spice.DAF( self.spk ) ) )
+    self.assertEqual( list( again.segments()[1].data ), list( data ) )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -11,3 +11,12 @@ class ExceptionTestCase(TestCase):
 
     def test_spice_exception(self):
         self.assertRaises(spice.SpiceException, spice.furnsh, '/dev/null')
+
+    def test_error_device(self):
+        self.assertEqual(spice.get_error_device(), 'SCREEN')
+
+        with spice.error_device():
+            self.assertEqual(spice.get_error_device(), 'NULL')
+            self.assertRaises(spice.SpiceException, spice.furnsh, '/dev/null')
+
+        self.assertEqual(spice.get_error_device(), 'SCREEN')
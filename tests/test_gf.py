@@ -0,0 +1,124 @@
+import math
+import spice
+import unittest
+
+def wave(et):
+  return math.sin( et / 1000.0 )
+
+class Counter(object):
+  ### a vectorized wave that keeps the number of epochs of each call
+  def __init__(self):
+    self.calls = []
+
+  def __call__(self, ets):
+    self.calls.append( len(ets) )
+    return [ wave(et) for et in ets ]
+
+def intervals(cell):
+  data = cell.data[:cell.card]
+  return list( zip( data[0::2], data[1::2] ) )
+
+### Test GF searches with Python callbacks
+class TestGF(unittest.TestCase):
+
+  def setUp(self):
+    self.cnfine = [ ( 0.0, 20000.0 ) ]
+
+  def result(self):
+    return spice.Cell( spice.DataType.DP, 200 )
+
+  def assertIntervals(self, found, expected):
+    self.assertEqual( len(found), len(expected) )
+
+    for ( left, right ), ( expected_left, expected_right ) in zip( found, expected ):
+      self.assertAlmostEqual( left, expected_left, 3 )
+      self.assertAlmostEqual( right, expected_right, 3 )
+
+  def above_half(self):
+    ### sin(x) > 0.5 for x in (pi/6, 5pi/6) + 2k pi
+    found = []
+
+    for k in range(4):
+      left = 1000.0 * ( math.pi / 6 + 2 * k * math.pi )
+      right = 1000.0 * ( 5 * math.pi / 6 + 2 * k * math.pi )
+      found.append( ( left, min( right, 20000.0 ) ) )
+
+    return found
+
+  def test_gfuds(self):
+    result = self.result()
+    self.assertTrue( spice.gfuds( wave, None, '>', 0.5, 0.0, 300.0, 100, self.cnfine, result ) is result )
+    self.assertIntervals( intervals( result ), self.above_half() )
+
+    ### with udqdec given, and a Cell for the confinement window
+    cnfine = spice.window_cell( self.cnfine )
+    decreasing = lambda et: math.cos( et / 1000.0 ) < 0.0
+    result = spice.gfuds( wave, decreasing, 'LOCMAX', 0.0, 0.0, 300.0, 100, cnfine, self.result() )
+    maxima = [ 1000.0 * ( math.pi / 2 + 2 * k * math.pi ) for k in range(3) ]
+    self.assertIntervals( intervals( result ), zip( maxima, maxima ) )
+
+  def test_vectorized(self):
+    epochs = []
+    def scalar_wave(et):
+      epochs.append(et)
+      return wave(et)
+
+    scalar = spice.gfuds( scalar_wave, None, '>', 0.5, 0.0, 300.0, 100, self.cnfine, self.result() )
+
+    counter = Counter()
+    result = spice.gfuds( counter, None, '>', 0.5, 0.0, 300.0, 100, self.cnfine, self.result(),
+                          vectorized = True )
+    self.assertEqual( intervals( result ), intervals( scalar ) )
+
+    ### the 67 steps, at +/- dt for the derivatives, are taken in one call;
+    ### the root refinement still asks for an epoch or a pair at a time
+    self.assertEqual( max( counter.calls ), 2 * 67 )
+    self.assertTrue( len( counter.calls ) < len( epochs ) - 67 )
+
+    counter = Counter()
+    spice.gfuds( counter, None, '>', 0.5, 0.0, 300.0, 100, self.cnfine, self.result(),
+                 vectorized = True, batch = 10 )
+    self.assertEqual( max( counter.calls ), 2 * 10 )
+
+  def test_gfudb(self):
+    above = lambda et: wave(et) > 0.5
+    result = spice.gfudb( above, 300.0, self.cnfine, self.result() )
+    self.assertIntervals( intervals( result ), self.above_half() )
+
+    calls = []
+    def vectorized(ets):
+      calls.append( len(ets) )
+      return [ above(et) for et in ets ]
+
+    vectorized_result = spice.gfudb( vectorized, 300.0, self.cnfine, self.result(), vectorized = True )
+    self.assertEqual( intervals( vectorized_result ), intervals( result ) )
+    self.assertTrue( max(calls) > 1 )
+
+  def test_errors(self):
+    def fail(et):
+      if et > 5000.0:
+        raise ZeroDivisionError('from the callback')
+      return wave(et)
+
+    self.assertRaises( ZeroDivisionError, spice.gfuds, fail, None, '>', 0.5, 0.0, 300.0, 100,
+                       self.cnfine, self.result() )
+    self.assertRaises( ZeroDivisionError, spice.gfudb, lambda et: fail(et) > 0.5, 300.0,
+                       self.cnfine, self.result() )
+    self.assertRaises( ValueError, spice.gfuds, lambda ets: [ 0.0 ], None, '>', 0.5, 0.0, 300.0, 100,
+                       self.cnfine, self.result(), vectorized = True )
+    self.assertRaises( TypeError, spice.gfudb, None, 300.0, self.cnfine, self.result() )
+    self.assertRaises( spice.SpiceException, spice.gfuds, wave, None, '!', 0.5, 0.0, 300.0, 100,
+                       self.cnfine, self.result() )
+
+    ### the SPICE error state was reset
+    result = spice.gfuds( wave, None, '>', 0.5, 0.0, 300.0, 100, self.cnfine, self.result() )
+    self.assertIntervals( intervals( result ), self.above_half() )
+
+  def test_derivatives(self):
+    self.assertAlmostEqual( spice.uddf( lambda x: x * x, 3.0, 1.0e-3 ), 6.0, 6 )
+    self.assertTrue( spice.uddc( lambda x: -x, 0.0, 1.0 ) )
+    self.assertFalse( spice.uddc( wave, 0.0, 1.0 ) )
+    self.assertRaises( ZeroDivisionError, spice.uddf, lambda x: 1.0 / x, 1.0, 1.0 )
+
+if __name__ == '__main__':
+  unittest.main()
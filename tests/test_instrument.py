@@ -0,0 +1,70 @@
+import os
+import spice
+import threading
+import unittest
+
+### Test the call counts and timings of the wrappers
+class TestInstrument(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.frame = 'EARTH_SUN_ORBIT'
+    self.et = spice.utc2et( '2016-06-01T12:00:00' )
+    spice.reset_stats()
+
+  def tearDown(self):
+    spice.set_instrumentation( False )
+    spice.reset_stats()
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_stats(self):
+    ### nothing is counted while instrumentation is off
+    self.assertFalse( spice.get_instrumentation() )
+    spice.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( spice.stats(), {} )
+
+    with spice.instrumentation():
+      self.assertTrue( spice.get_instrumentation() )
+      for i in range(10):
+        spice.spkezr( 'SMAP', self.et + i, self.frame, 'NONE', 'EARTH' )
+      self.assertRaises( spice.SpiceException, spice.str2et, 'no such time' )
+    self.assertFalse( spice.get_instrumentation() )
+
+    stats = spice.stats()
+    self.assertEqual( sorted( stats ), [ 'spkezr', 'str2et' ] )
+    self.assertEqual( ( stats['spkezr']['calls'], stats['spkezr']['errors'] ), ( 10, 0 ) )
+    self.assertEqual( ( stats['str2et']['calls'], stats['str2et']['errors'] ), ( 1, 1 ) )
+
+    entry = stats['spkezr']
+    self.assertTrue( 0.0 < entry['spice_seconds'] <= entry['seconds'] )
+    self.assertAlmostEqual( entry['spice_seconds'] + entry['marshal_seconds'], entry['seconds'] )
+    self.assertTrue( entry['seconds'] / 10 <= entry['max_seconds'] <= entry['seconds'] )
+
+    lines = spice.format_stats().splitlines()
+    self.assertEqual( len( lines ), 3 )
+    self.assertEqual( sorted( line.split()[0] for line in lines[1:] ), [ 'spkezr', 'str2et' ] )
+
+    spice.reset_stats()
+    self.assertEqual( spice.stats(), {} )
+
+  def test_threads(self):
+    ### calls from several threads are all counted
+    def run():
+      for i in range(100):
+        spice.spkpos( 'SMAP', self.et + i, self.frame, 'NONE', 'EARTH' )
+
+    spice.set_instrumentation( True )
+    threads = [ threading.Thread( target=run ) for i in range(4) ]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    entry = spice.stats()['spkpos']
+    self.assertEqual( entry['calls'], 400 )
+    self.assertTrue( entry['spice_seconds'] <= entry['seconds'] )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,107 @@
+import os
+import random
+import spice
+import unittest
+
+from spice.kernels import _IntervalIndex
+
+DAY = 86400.0
+
+### Test loading kernels on demand
+class TestKernelManager(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.cheb, self.smap, self.pck = [ os.path.join( mydir, 'kernels', i ) for i in
+                                       'cheb_test.bsp smap_test.bsp cheb_test.bpc'.split() ]
+    self.manager = spice.KernelManager( 1 )
+    self.manager.register( self.cheb, self.smap, self.pck )
+
+  def tearDown(self):
+    self.manager.unload_all()
+
+  def test_index(self):
+    ### the index finds what a scan of all the intervals finds
+    index = _IntervalIndex()
+    intervals = []
+    for i in range(300):
+      start = random.uniform( 0.0, 1000.0 )
+      intervals.append( ( start, start + random.expovariate( 0.1 ), i ) )
+      index.add( *intervals[-1] )
+
+    for i in range(300):
+      start = random.uniform( -10.0, 1010.0 )
+      stop = start + random.choice( [ 0.0, 1.0, 50.0 ] )
+      expected = [ value for low, high, value in intervals if low <= stop and high >= start ]
+      self.assertEqual( sorted( index.overlapping( start, stop ) ), expected )
+
+  def test_require(self):
+    manager = self.manager
+    self.assertEqual( manager.registered, [ self.cheb, self.smap, self.pck ] )
+    self.assertEqual( manager.covering( -1001, 5 * DAY ), [ self.cheb ] )
+    self.assertEqual( manager.covering( [ -1002 ], 5 * DAY, 6 * DAY ), [] )
+    self.assertEqual( manager.covering( 1400001, 0.0, kind = 'PCK' ), [ self.pck ] )
+    self.assertEqual( manager.loaded, [] )
+
+    self.assertEqual( manager.require( [ -1001, 'EARTH' ], DAY ), [ self.cheb ] )
+    self.assertEqual( spice.ktotal( 'SPK' ), 1 )
+    state = spice.spkez( -1001, DAY, 'J2000', 'NONE', 399 )[0]
+
+    ### SMAP pushes the Chebyshev kernel out
+    et = 5e8
+    self.assertEqual( manager.require( 'SMAP', et ), [ self.smap ] )
+    self.assertEqual( manager.loaded, [ self.smap ] )
+    self.assertEqual( spice.kdata( 0, 'SPK' )[0], self.smap )
+    self.assertRaises( spice.SpiceException, spice.spkez, -1001, DAY, 'J2000', 'NONE', 399 )
+
+    manager.require( -1001, DAY )
+    self.assertEqual( spice.spkez( -1001, DAY, 'J2000', 'NONE', 399 )[0], state )
+
+    manager.capacity = 2
+    manager.require( [ -205 ], 5e8 )
+    self.assertEqual( manager.loaded, [ self.cheb, self.smap ] )
+    manager.require( [ -1001 ], DAY )
+    self.assertEqual( manager.loaded, [ self.smap, self.cheb ] )
+    self.assertEqual( spice.ktotal( 'SPK' ), 2 )
+
+    self.assertRaises( ValueError, manager.register, os.path.join( os.path.dirname(__file__), 'kernels', 'naif0010.tls' ) )
+
+  def test_session(self):
+    ### evictions take their loads back out of the session journal
+    before = spice.session()
+    for i in range(20):
+      self.manager.require( -1001, DAY )
+      self.manager.require( 'SMAP', 5e8 )
+    self.assertEqual( spice.session(), before + [ ( 'furnsh', ( self.smap, ) ) ] )
+    self.manager.unload_all()
+    self.assertEqual( spice.session(), before )
+
+    ### but not past a change to the pool
+    lsk = os.path.join( os.path.dirname(__file__), 'kernels', 'naif0010.tls' )
+    spice.furnsh( self.cheb )
+    spice.ldpool( lsk )
+    spice.unload( self.cheb )
+    self.assertEqual( spice.session()[len(before):], [ ( 'furnsh', ( self.cheb, ) ),
+      ( 'ldpool', ( lsk, ) ), ( 'unload', ( self.cheb, ) ) ] )
+
+  def test_precedence(self):
+    ### files covering the same body and time are loaded in registration order
+    manager = spice.KernelManager( 3 )
+    manager.register( self.smap, self.cheb )
+    manager.require( -205, 5e8 )
+    manager.require( -1001, DAY )
+    self.assertEqual( manager.require( [ -205, -1001 ], 0.0, 6e8 ), [ self.smap, self.cheb ] )
+    self.assertEqual( [ spice.kdata( i, 'SPK' )[0] for i in range(2) ], [ self.smap, self.cheb ] )
+
+    manager.unload_all()
+
+    other = spice.KernelManager( 3 )
+    other.register( self.cheb, self.smap )
+    other.require( -205, 5e8 )
+    other.require( -1001, DAY )
+    self.assertEqual( other.require( [ -205, -1001 ], 0.0, 6e8 ), [ self.cheb, self.smap ] )
+    self.assertEqual( [ spice.kdata( i, 'SPK' )[0] for i in range(2) ], [ self.cheb, self.smap ] )
+    other.unload_all()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,106 @@
+import os
+import spice
+import unittest
+
+### Test memoization of the query wrappers
+class TestMemo(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.frame = 'EARTH_SUN_ORBIT'
+    self.et = spice.utc2et( '2016-06-01T12:00:00' )
+
+  def tearDown(self):
+    spice.set_memoization( False )
+    spice.set_array_output( False )
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_hits(self):
+    plain = spice.spkezr
+    expected = spice.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' )
+
+    spice.set_memoization( True, 4 )
+    self.assertTrue( spice.get_memoization() )
+    self.assertEqual( spice.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ), expected )
+    self.assertEqual( spice.spkezr( 'SMAP', self.et, self.frame, 'NONE', 'EARTH' ), expected )
+    self.assertEqual( spice.bodn2c( 'EARTH' ), 399 )
+    self.assertEqual( spice.bodn2c( 'EARTH' ), 399 )
+
+    stats = spice.memoization_stats()
+    self.assertEqual( ( stats['hits'], stats['misses'], stats['size'], stats['maxsize'] ), ( 2, 2, 2, 4 ) )
+    self.assertEqual( stats['functions'], { 'spkezr': ( 1, 1 ), 'bodn2c': ( 1, 1 ) } )
+
+    ### least recently used results go first
+    for i in range(5):
+      spice.pxform( 'J2000', 'ECLIPJ2000', self.et + i )
+    self.assertEqual( spice.memoization_stats()['size'], 4 )
+    spice.bodn2c( 'EARTH' )
+    self.assertEqual( spice.memoization_stats()['functions']['bodn2c'], ( 1, 2 ) )
+
+    spice.set_memoization( False )
+    self.assertFalse( spice.get_memoization() )
+    self.assertTrue( spice.spkezr is plain )
+    self.assertEqual( spice.memoization_stats()['hits'], 0 )
+
+  def test_invalidation(self):
+    with spice.memoization():
+      et = spice.str2et( '2016-06-01T12:00:00' )
+      self.assertEqual( spice.str2et( '2016-06-01T12:00:00' ), et )
+
+      ### defining names empties the cache
+      spice.boddef( 'MEMO_BODY', -777 )
+      self.assertEqual( spice.memoization_stats()['size'], 0 )
+      self.assertEqual( spice.memoization_stats()['invalidations'], 1 )
+      self.assertEqual( spice.bodn2c( 'MEMO_BODY' ), -777 )
+
+      ### so do unloading and loading kernels
+      spice.str2et( '2016-06-01T12:00:00' )
+      spice.unload( self.kernels[0] )
+      self.assertRaises( spice.SpiceException, spice.str2et, '2016-06-01T12:00:00' )
+      spice.furnsh( self.kernels[0] )
+      self.assertEqual( spice.str2et( '2016-06-01T12:00:00' ), et )
+      self.assertEqual( spice.memoization_stats()['invalidations'], 2 )
+
+    ### errors are not cached
+    with spice.memoization():
+      self.assertRaises( spice.SpiceException, spice.str2et, 'not a time' )
+      self.assertRaises( spice.SpiceException, spice.str2et, 'not a time' )
+      self.assertEqual( spice.memoization_stats()['size'], 0 )
+
+  def test_nested(self):
+    ### a block inside memoization leaves it on, with its size and results
+    spice.set_memoization( True, 4096 )
+    spice.str2et( '2016-06-01T12:00:00' )
+
+    with spice.memoization( 16 ):
+      self.assertEqual( spice.memoization_stats()['maxsize'], 16 )
+
+    self.assertTrue( spice.get_memoization() )
+    self.assertEqual( spice.memoization_stats()['maxsize'], 4096 )
+    self.assertEqual( spice.memoization_stats()['misses'], 1 )
+    spice.str2et( '2016-06-01T12:00:00' )
+    self.assertEqual( spice.memoization_stats()['hits'], 1 )
+
+    ### and one outside it turns it off again
+    spice.set_memoization( False )
+    with spice.memoization():
+      pass
+    self.assertFalse( spice.get_memoization() )
+
+  def test_array_results_copied(self):
+    spice.set_memoization( True )
+    rotation = spice.pxform( 'J2000', 'ECLIPJ2000', self.et )
+
+    spice.set_array_output( True )
+    first = spice.pxform( 'J2000', 'ECLIPJ2000', self.et )
+    first[0][0] = 2.0
+    second = spice.pxform( 'J2000', 'ECLIPJ2000', self.et )
+    self.assertEqual( second[0][0], rotation[0][0] )
+    self.assertEqual( spice.memoization_stats()['functions']['pxform'], ( 1, 2 ) )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+import os
+import spice
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+def flat(a):
+  if numpy is not None: return list(numpy.ravel(a))
+  return list(a)
+
+def body_codes(ets, name):
+  ### run in the workers: what they know of a boddef made in the parent
+  return [ spice.bodn2c( name ) for et in ets ]
+
+def kernel_counts(ets):
+  return [ spice.ktotal( 'ALL' ) for et in ets ]
+
+### Test batch jobs over worker processes
+class TestParallel(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.frame = 'EARTH_SUN_ORBIT'
+    et0 = spice.utc2et( '2016-06-01T12:00:00' )
+    self.ets = [ et0 + 60.0 * i for i in range(50) ]
+    self.pool = spice.SpicePool( 3 )
+
+  def tearDown(self):
+    self.pool.close()
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_spkezr(self):
+    states, lts = self.pool.spkezr( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    expected_states, expected_lts = spice.spkezr_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( flat(states), flat(expected_states) )
+    self.assertEqual( flat(lts), flat(expected_lts) )
+
+    ### a target per epoch is split along with the epochs
+    positions, lts = self.pool.spkpos( [ 'SMAP' ] * 50, self.ets, self.frame, 'NONE', 'EARTH' )
+    expected, expected_lts = spice.spkpos_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( flat(positions), flat(expected) )
+
+  def test_pxform(self):
+    rotations = self.pool.pxform( 'J2000', 'ECLIPJ2000', self.ets )
+    self.assertEqual( flat(rotations), flat( spice.pxform_batch( 'J2000', 'ECLIPJ2000', self.ets ) ) )
+    self.assertEqual( flat( self.pool.pxform( 'J2000', 'ECLIPJ2000', [] ) ), [] )
+
+  def test_session(self):
+    spice.boddef( 'PARALLEL_TEST_BODY', -4242 )
+
+    ### the pool made in setUp predates the boddef
+    with spice.SpicePool( 2 ) as pool:
+      self.assertEqual( pool.map( body_codes, range(8), ( 'PARALLEL_TEST_BODY', ) ), [ -4242 ] * 8 )
+      self.assertEqual( pool.map( kernel_counts, range(8) ), [ spice.ktotal( 'ALL' ) ] * 8 )
+
+    self.assertEqual( spice.parallel_map( kernel_counts, range(4), processes = 2 ), [ 3 ] * 4 )
+    self.assertTrue( ( 'boddef', ( 'PARALLEL_TEST_BODY', -4242 ) ) in spice.session() )
+
+  def test_errors(self):
+    self.assertRaises( spice.SpiceException, self.pool.pxform, 'J2000', 'NO_SUCH_FRAME', self.ets )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,7 +1,8 @@
 # Released under the BSD license, see LICENSE for details
 
-import os, sys, unittest
-from spice import Ellipse, Plane
+import os, sys, unittest, pickle, struct
+import spice
+from spice import Ellipse, Plane, EkAttDsc, EkSegSum
 
 class TestFile(unittest.TestCase):
     def testEllipse(self):
@@ -28,6 +29,117 @@ class TestFile(unittest.TestCase):
         self.assertTrue(p.normal == normal)
         self.assertTrue(p.constant == constant)
 
+    def testDefaults(self):
+        ellipse = Ellipse()
+        self.assertEqual(ellipse.center, [0.0] * 3)
+        self.assertEqual(ellipse.semi_major, [0.0] * 3)
+
+        plane = Plane()
+        self.assertEqual(plane.normal, [0.0] * 3)
+        self.assertEqual(plane.constant, 0.0)
+
+    def testFixedLayout(self):
+        ellipse = Ellipse()
+        self.assertRaises(AttributeError, setattr, ellipse, 'radius', 1.0)
+        self.assertRaises(TypeError, setattr, ellipse, 'center', [1.0, 2.0])
+
+    def testBuffer(self):
+        ellipse = Ellipse(center=(1, 2, 3), semi_major=(4, 5, 6), semi_minor=(7, 8, 9))
+        view = memoryview(ellipse)
+        self.assertEqual(view.shape, (3, 3))
+        self.assertEqual(view.format, 'd')
+
+        plane = Plane((0, 0, 1), 2.0)
+        self.assertEqual(memoryview(plane).shape, (3,))
+
+    def testVectorViews(self):
+        ellipse = Ellipse(center=(1, 2, 3), semi_major=(4, 5, 6), semi_minor=(7, 8, 9))
+        ellipse.center[0] = 10.0
+        ellipse.semi_minor[2] = -1
+        self.assertEqual(ellipse.center, [10.0, 2.0, 3.0])
+        self.assertEqual(struct.unpack_from('3d', ellipse.semi_minor), (7.0, 8.0, -1.0))
+        self.assertEqual(memoryview(ellipse.center).shape, (3,))
+        self.assertRaises(IndexError, ellipse.center.__setitem__, 3, 1.0)
+        self.assertRaises(TypeError, ellipse.center.__setitem__, 0, 'x')
+
+        ### the view keeps its ellipse alive
+        center = Ellipse(center=(1, 2, 3)).center
+        self.assertEqual(list(center), [1.0, 2.0, 3.0])
+
+        plane = Plane((0, 0, 1), 2.0)
+        plane.normal[1] = 5.0
+        self.assertEqual(plane.normal, [0.0, 5.0, 1.0])
+        self.assertEqual(str(plane), '<Plane: normal=0.0, 5.0, 1.0; constant=2.0>')
+
+        ### slices read and write like list slices
+        self.assertEqual(plane.normal[0:2], [0.0, 5.0])
+        self.assertEqual(plane.normal[::-1], [1.0, 5.0, 0.0])
+        self.assertEqual(plane.normal[-1], 1.0)
+        plane.normal[:2] = (3.0, 4.0)
+        self.assertEqual(plane.normal, [3.0, 4.0, 1.0])
+        self.assertRaises(TypeError, plane.normal.__setitem__, slice(0, 2), (1.0,))
+        self.assertRaises(TypeError, plane.normal.__getitem__, 'x')
+
+    def testCompare(self):
+        nan = float('nan')
+        self.assertEqual(Plane((0.0, 0.0, 1.0), 0.0), Plane((-0.0, 0.0, 1.0), -0.0))
+        self.assertNotEqual(Plane((nan, 0.0, 1.0), 0.0), Plane((nan, 0.0, 1.0), 0.0))
+
+        ### the columns past ncols don't count
+        segsum = EkSegSum('TABLE', 10, cnames=['A', 'B'])
+        other = EkSegSum('TABLE', 10, cnames=['A', 'C'])
+        self.assertNotEqual(segsum, other)
+        other.cnames = ['A']
+        segsum.cnames = ['A']
+        self.assertEqual(segsum, other)
+
+    def testHash(self):
+        ### hashed by identity, as the classes they replace were
+        ellipse = Ellipse()
+        plane = Plane()
+        self.assertEqual(hash(ellipse), hash(ellipse))
+        self.assertEqual(len(set([ellipse, plane, Ellipse(), ellipse])), 3)
+        self.assertEqual(len(set([EkAttDsc(), EkSegSum()])), 2)
+
+    def testPickle(self):
+        ellipse = Ellipse(center=(1, 2, 3), semi_major=(4, 5, 6), semi_minor=(7, 8, 9))
+        plane = Plane([0.0, 0.0, 1.0], 2.5)
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertEqual(pickle.loads(pickle.dumps(ellipse, protocol)), ellipse)
+            self.assertEqual(pickle.loads(pickle.dumps(plane, protocol)), plane)
+
+    def testEkTypes(self):
+        attdsc = EkAttDsc(cclass=1, dtype=spice.DataType.SPICE_INT, size=1, indexd=True)
+        self.assertEqual(attdsc.cclass, 1)
+        self.assertTrue(attdsc.indexd is True)
+        self.assertTrue(attdsc.nullok is False)
+
+        segsum = EkSegSum('TABLE', 10, cnames=['A', 'B'], cdescrs=[attdsc, EkAttDsc()])
+        self.assertEqual(segsum.tabnam, 'TABLE')
+        self.assertEqual(segsum.ncols, 2)
+        self.assertEqual(segsum.cnames, ['A', 'B'])
+        self.assertEqual(segsum.cdescrs[0], attdsc)
+        self.assertEqual(pickle.loads(pickle.dumps(segsum, 2)), segsum)
+
+    def testGeometry(self):
+        ### the limb of a sphere of radius 1 seen from (0, 0, 2) lies in
+        ### the plane z = 0.5
+        limb = spice.edlimb(1.0, 1.0, 1.0, [0.0, 0.0, 2.0])
+        self.assertTrue(isinstance(limb, Ellipse))
+        self.assertAlmostEqual(limb.center[2], 0.5)
+
+        plane = spice.nvc2pl([0.0, 0.0, 1.0], 0.5)
+        self.assertTrue(isinstance(plane, Plane))
+
+        nxpts, xpt1, xpt2 = spice.inelpl(limb, plane)
+        self.assertEqual(nxpts, -1)
+
+        projected = spice.pjelpl(limb, spice.nvc2pl([0.0, 0.0, 1.0], 0.0))
+        self.assertAlmostEqual(projected.center[2], 0.0)
+
+        self.assertRaises(TypeError, spice.inelpl, limb, [0.0, 0.0, 1.0, 0.5])
+
 
 if __name__ == '__main__':
     unittest.main()
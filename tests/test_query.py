@@ -0,0 +1,61 @@
+import os
+import spice
+import unittest
+
+def flat(a):
+  ### Batch results are ndarrays with NumPy, flat array.array('d') without
+  try:
+    import numpy
+    return list(numpy.ravel(a))
+  except ImportError:
+    return list(a)
+
+### Test prepared queries against the plain wrappers
+class TestQuery(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.frame = 'EARTH_SUN_ORBIT'
+    et0 = spice.utc2et( '2016-06-01T12:00:00' )
+    self.ets = [ et0 + 60.0 * i for i in range(10) ]
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+
+  def test_evaluate(self):
+    query = spice.Query( 'SMAP', self.frame.lower(), 'none', 'EARTH' )
+    self.assertEqual( ( query.target_id, query.observer_id ), ( -205, 399 ) )
+
+    for et in self.ets:
+      self.assertEqual( query.evaluate( et ), spice.spkezr( 'SMAP', et, self.frame, 'NONE', 'EARTH' ) )
+      self.assertEqual( query.position( et ), spice.spkpos( 'SMAP', et, self.frame, 'NONE', 'EARTH' ) )
+
+    states, lts = query.evaluate_batch( self.ets )
+    expected, expected_lts = spice.spkezr_batch( 'SMAP', self.ets, self.frame, 'NONE', 'EARTH' )
+    self.assertEqual( flat( states ), flat( expected ) )
+    self.assertEqual( flat( lts ), flat( expected_lts ) )
+
+    positions, lts = query.position_batch( self.ets )
+    for i in range(10):
+      self.assertEqual( flat( positions )[3*i:3*i+3], flat( expected )[6*i:6*i+3] )
+
+  def test_resolution(self):
+    self.assertRaises( ValueError, spice.Query, 'SMAP', 'J2000', 'LT+Q', 'EARTH' )
+    self.assertRaises( spice.SpiceException, spice.Query, 'NO SUCH BODY', 'J2000', 'NONE', 'EARTH' )
+    self.assertRaises( spice.SpiceException, spice.Query, 'SMAP', 'NO SUCH FRAME', 'NONE', 'EARTH' )
+
+    ### names are resolved again after configuration calls
+    spice.boddef( 'QUERY_BODY', -205 )
+    query = spice.Query( 'QUERY_BODY', self.frame, 'NONE', 399 )
+    spice.boddef( 'QUERY_BODY', -206 )
+    self.assertRaises( spice.SpiceException, query.evaluate, self.ets[0] )
+    self.assertEqual( query.target_id, -206 )
+    spice.boddef( 'QUERY_BODY', -205 )
+    self.assertEqual( query.evaluate( self.ets[0] ), spice.spkezr( 'SMAP', self.ets[0], self.frame, 'NONE', 'EARTH' ) )
+
+if __name__ == '__main__':
+  unittest.main()
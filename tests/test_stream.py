@@ -0,0 +1,63 @@
+import os
+import shutil
+import spice
+import tempfile
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+### Test streams of batch results in chunks
+@unittest.skipIf( numpy is None, 'needs NumPy' )
+class TestStream(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls pck00009.tpc smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.start = spice.utc2et( '2016-06-01T12:00:00' )
+    self.stop = self.start + 3600.0
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+    shutil.rmtree( self.tmpdir )
+
+  def test_states(self):
+    stream = spice.stream.states( 'SMAP', self.start, self.stop, 10.0, 'EARTH_SUN_ORBIT', 'NONE', 'EARTH', chunk = 100 )
+    self.assertEqual( len( stream ), 361 )
+
+    chunks = list( stream )
+    self.assertEqual( [ len( ets ) for ets, states, lts in chunks ], [ 100, 100, 100, 61 ] )
+
+    ### the same as one batch call
+    ets = numpy.concatenate( [ chunk[0] for chunk in chunks ] )
+    self.assertEqual( ( ets[0], ets[-1] ), ( self.start, self.stop ) )
+    states, lts = spice.spkezr_batch( 'SMAP', ets, 'EARTH_SUN_ORBIT', 'NONE', 'EARTH' )
+    self.assertEqual( numpy.concatenate( [ chunk[1] for chunk in chunks ] ).tolist(), states.tolist() )
+    self.assertEqual( numpy.concatenate( [ chunk[2] for chunk in chunks ] ).tolist(), lts.tolist() )
+
+    ### stopping early, and errors from the producer
+    for chunk in stream: break
+    self.assertRaises( spice.SpiceException, list,
+                       spice.stream.positions( 'SMAP', self.start, self.stop, 10.0, 'EARTH_SUN_ORBIT', 'NONE', 'MARS' ) )
+    self.assertRaises( ValueError, spice.stream.states, 'SMAP', self.stop, self.start, 10.0, 'EARTH_SUN_ORBIT', 'NONE', 'EARTH' )
+
+  def test_save(self):
+    stream = spice.stream.transforms( 'J2000', 'IAU_EARTH', self.start, self.stop, 7.0, rates = True, chunk = 64 )
+    paths = dict( ets = os.path.join( self.tmpdir, 'ets.npy' ), matrices = os.path.join( self.tmpdir, 'xforms.npy' ) )
+    saved = stream.save( **paths )
+
+    self.assertTrue( isinstance( saved['matrices'], numpy.memmap ) )
+    self.assertEqual( saved['matrices'].shape, ( len( stream ), 6, 6 ) )
+    self.assertEqual( numpy.load( paths['ets'] ).tolist(), ( self.start + 7.0 * numpy.arange( len( stream ) ) ).tolist() )
+    self.assertEqual( saved['matrices'].tolist(), spice.sxform_batch( 'J2000', 'IAU_EARTH', saved['ets'] ).tolist() )
+
+    self.assertRaises( ValueError, stream.save, states = paths['ets'] )
+
+if __name__ == '__main__':
+  unittest.main()
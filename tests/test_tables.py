@@ -0,0 +1,127 @@
+import os
+import shutil
+import spice
+import tempfile
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+### Test interpolation tables against CSPICE
+@unittest.skipIf( numpy is None, 'needs NumPy' )
+class TestEphemerisTable(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in
+                     'naif0010.tls smap_v00.tf smap_test.bsp'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.frame = 'EARTH_SUN_ORBIT'
+    self.start = spice.utc2et( '2016-06-01T12:00:00' )
+    self.stop = self.start + 86400.0
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+    shutil.rmtree( self.tmpdir )
+
+  def test_build(self):
+    table = spice.EphemerisTable.build( 'SMAP', 'EARTH', self.frame, 'NONE', self.start, self.stop, 1e-3 )
+    self.assertTrue( table.error <= 1e-3 )
+    self.assertEqual( ( table.start, table.stop ), ( self.start, self.stop ) )
+
+    ### within the tolerance between the test points too
+    ets = numpy.random.uniform( self.start, self.stop, 2000 )
+    expected, expected_lts = spice.spkezr_batch( 'SMAP', ets, self.frame, 'NONE', 'EARTH' )
+    states, lts = table.state( ets )
+    self.assertTrue( numpy.sqrt( ( ( states[:, :3] - expected[:, :3] ) ** 2 ).sum(1) ).max() < 1e-3 )
+    self.assertTrue( abs( lts - expected_lts ).max() < 1e-3 / spice.clight() )
+
+    ### and exact at the samples
+    state, lt = table.state( table.ets[5] )
+    self.assertTrue( abs( state - spice.spkezr( 'SMAP', table.ets[5], self.frame, 'NONE', 'EARTH' )[0] ).max() < 1e-9 )
+
+    ### a tighter tolerance takes more samples
+    tighter = spice.EphemerisTable.build( 'SMAP', 'EARTH', self.frame, 'NONE', self.start, self.stop, 1e-6 )
+    self.assertTrue( len( tighter ) > len( table ) )
+
+    self.assertRaises( ValueError, table.state, self.stop + 1.0 )
+    self.assertRaises( ValueError, spice.EphemerisTable.build, 'SMAP', 'EARTH', self.frame, 'NONE',
+                       self.start, self.stop, 1e-9, min_step = 600.0 )
+
+  def test_save(self):
+    table = spice.EphemerisTable.build( 'SMAP', 'EARTH', self.frame, 'NONE', self.start, self.stop, 1e-3 )
+    path = os.path.join( self.tmpdir, 'smap.table' )
+    table.save( path )
+
+    loaded = spice.EphemerisTable.load( path )
+    self.assertTrue( isinstance( loaded.states, numpy.memmap ) )
+    self.assertEqual( ( loaded.target, loaded.frame, loaded.abcorr, loaded.error ),
+                      ( 'SMAP', self.frame, 'NONE', table.error ) )
+
+    ets = numpy.linspace( self.start, self.stop, 101 )
+    self.assertEqual( loaded.state( ets )[0].tolist(), table.state( ets )[0].tolist() )
+    self.assertEqual( loaded.position( ets[3] )[0].tolist(), table.state( ets[3] )[0][:3].tolist() )
+
+    self.assertRaises( ValueError, spice.EphemerisTable.load, self.kernels[0] )
+
+### Test rotation tables against CSPICE
+@unittest.skipIf( numpy is None, 'needs NumPy' )
+class TestRotationTable(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = [ os.path.join( mydir, 'kernels', i ) for i in 'naif0010.tls pck00009.tpc'.split() ]
+    for kernel in self.kernels: spice.furnsh( kernel )
+
+    self.start = spice.utc2et( '2016-06-01T12:00:00' )
+    self.stop = self.start + 86400.0
+    self.ets = numpy.random.uniform( self.start, self.stop, 2000 )
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    for kernel in self.kernels: spice.unload( kernel )
+    shutil.rmtree( self.tmpdir )
+
+  def test_build(self):
+    table = spice.RotationTable.build( 'J2000', 'IAU_EARTH', self.start, self.stop, 1e-8 )
+    self.assertTrue( table.error <= 1e-8 )
+
+    ### rotations within the tolerance between the test points too
+    self.assertTrue( abs( table.rotation( self.ets ) - spice.pxform_batch( 'J2000', 'IAU_EARTH', self.ets ) ).max() < 2e-8 )
+
+    ### and the state transformations, rates included
+    xforms = spice.sxform_batch( 'J2000', 'IAU_EARTH', self.ets )
+    self.assertTrue( abs( table.transform( self.ets ) - xforms ).max() < 2e-8 )
+
+    ### the quaternions are those of m2q at the samples
+    et = table.ets[7]
+    q = numpy.array( spice.m2q( spice.pxform( 'J2000', 'IAU_EARTH', et ) ) )
+    self.assertTrue( min( abs( table.quaternion( et ) - q ).max(), abs( table.quaternion( et ) + q ).max() ) < 1e-12 )
+
+    ### without rates, by slerp
+    slerped = spice.RotationTable.build( 'J2000', 'IAU_EARTH', self.start, self.stop, 1e-8, rates = False )
+    self.assertTrue( slerped.rates is None )
+    self.assertTrue( abs( slerped.rotation( self.ets ) - spice.pxform_batch( 'J2000', 'IAU_EARTH', self.ets ) ).max() < 2e-8 )
+    self.assertRaises( ValueError, slerped.transform, self.start )
+
+  def test_save(self):
+    table = spice.RotationTable.build( 'J2000', 'IAU_EARTH', self.start, self.stop, 1e-8 )
+    path = os.path.join( self.tmpdir, 'earth.table' )
+    table.save( path )
+
+    loaded = spice.RotationTable.load( path )
+    self.assertTrue( isinstance( loaded.quaternions, numpy.memmap ) )
+    self.assertEqual( ( loaded.from_, loaded.to, loaded.error ), ( 'J2000', 'IAU_EARTH', table.error ) )
+    self.assertEqual( loaded.transform( self.ets ).tolist(), table.transform( self.ets ).tolist() )
+
+    ### tables of one kind don't load as the other
+    spice.EphemerisTable( 'SMAP', 'EARTH', 'J2000', 'NONE', table.ets, numpy.zeros( ( len( table ), 6 ) ),
+                          1.0, 0.0 ).save( path )
+    self.assertRaises( ValueError, spice.RotationTable.load, path )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,90 @@
+import array
+import os
+import threading
+import spice
+import unittest
+
+### Test CSPICE calls from several threads
+class TestThreads(unittest.TestCase):
+
+  def setUp(self):
+    self.lsk = os.path.join( os.path.dirname(__file__), 'kernels', 'naif0010.tls' )
+    spice.furnsh( self.lsk )
+
+  def tearDown(self):
+    spice.unload( self.lsk )
+
+  def test_gil_released(self):
+    ### a Python thread keeps running during a long CSPICE call
+    ets = array.array( 'd', xrange( 2000000 ) )
+    counts = []
+    done = threading.Event()
+
+    def count():
+      while not done.is_set():
+        counts.append( None )
+
+    thread = threading.Thread( target = count )
+    thread.start()
+
+    try:
+      before = len( counts )
+      spice.pxform_batch( 'J2000', 'ECLIPJ2000', ets )
+      during = len( counts ) - before
+    finally:
+      done.set()
+      thread.join()
+
+    self.assertTrue( during > 1000, during )
+
+  def test_errors_stay_in_thread(self):
+    ### each thread sees the errors of its own calls only
+    good = spice.str2et( '2004-06-11T19:32:00' )
+    problems = []
+
+    def convert(offset):
+      for i in range(300):
+        if ( i + offset ) % 2:
+          try:
+            spice.str2et( 'not a time' )
+            problems.append( 'no exception' )
+          except spice.SpiceException:
+            pass
+        else:
+          try:
+            if spice.str2et( '2004-06-11T19:32:00' ) != good:
+              problems.append( 'wrong result' )
+          except spice.SpiceException, e:
+            problems.append( str(e) )
+
+    threads = [ threading.Thread( target = convert, args = ( offset, ) ) for offset in range(4) ]
+
+    for thread in threads:
+      thread.start()
+
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual( problems, [] )
+
+  def test_callback_calls_spice(self):
+    ### callbacks run holding the SPICE lock and may call wrappers
+    def z(et):
+      return spice.pxform( 'J2000', 'ECLIPJ2000', et )[2][2] - 0.5
+
+    result = spice.gfuds( z, None, '>', 0.0, 0.0, 100.0, 10, [ ( 0.0, 1000.0 ) ],
+                          spice.Cell( spice.DataType.DP, 20 ) )
+    self.assertEqual( result.card, 2 )
+
+    def bad(et):
+      return spice.str2et( 'not a time' )
+
+    self.assertRaises( spice.SpiceException, spice.gfuds, bad, None, '>', 0.0, 0.0, 100.0, 10,
+                       [ ( 0.0, 1000.0 ) ], spice.Cell( spice.DataType.DP, 20 ) )
+    self.assertRaises( RuntimeError, spice.gfudb,
+                       lambda et: spice.gfudb( bool, 1.0, [ ( 0.0, 1.0 ) ], spice.Cell( spice.DataType.DP, 20 ) ),
+                       100.0, [ ( 0.0, 1000.0 ) ], spice.Cell( spice.DataType.DP, 20 ) )
+    self.assertEqual( spice.str2et( '2000-01-01T12:00:00' ) > 0.0, True )
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import spice
+import tempfile
+import unittest
+
+from spice import tracing
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+### Test traces of the _spice calls and their replay
+class TestTracing(unittest.TestCase):
+
+  def setUp(self):
+    mydir = os.path.dirname(__file__)
+    self.kernels = os.path.join( mydir, 'kernels' )
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.path.join( self.tmpdir, 'calls.trace' )
+
+    spice.kclear()
+    spice.furnsh( os.path.join( self.kernels, 'naif0010.tls' ) )
+
+  def tearDown(self):
+    spice.kclear()
+    shutil.rmtree( self.tmpdir )
+
+  def test_replay(self):
+    smap = [ os.path.join( self.kernels, i ) for i in 'smap_v00.tf smap_test.bsp'.split() ]
+
+    with tracing.trace( self.path ) as tracer:
+      for kernel in smap: spice.furnsh( kernel )
+      et = spice.utc2et( '2016-06-01T12:00:00' )
+      for i in range(10):
+        spice.spkezr( 'SMAP', et + 60 * i, 'EARTH_SUN_ORBIT', 'NONE', 'EARTH' )
+      if numpy is not None:
+        spice.spkezr_batch( 'SMAP', et + numpy.arange( 100.0 ), 'EARTH_SUN_ORBIT', 'NONE', 'EARTH' )
+      self.assertRaises( spice.SpiceException, spice.str2et, 'no such time' )
+
+      ### a window built up over calls
+      window = spice.Cell( spice.DataType.DP, 10 )
+      spice.wninsd( 1.0, 2.0, window )
+      spice.wninsd( 5.0, 6.0, window )
+      self.assertEqual( spice.wncard( window ), 2 )
+
+    ### the calls made by then aren't traced
+    self.assertEqual( tracing._spice._get_tracer(), None )
+    spice.et2utc( et, 'ISOC', 3 )
+
+    count = 18 if numpy is not None else 17
+    self.assertEqual( tracer.calls, count )
+
+    trace = tracing.Trace( self.path )
+    self.assertEqual( trace.results, 'full' )
+    self.assertEqual( [ name for name, args in trace.session ], [ 'furnsh' ] )
+
+    calls = list( trace )
+    self.assertEqual( [ call[0] for call in calls[:3] ], [ 'furnsh', 'furnsh', 'utc2et' ] )
+    self.assertEqual( calls[2][1], ( '2016-06-01T12:00:00', ) )
+    self.assertEqual( calls[2][5:], ( True, et ) )
+    self.assertTrue( all( call[3] >= call[4] >= 0.0 for call in calls ) )
+    failed = [ call for call in calls if not call[5] ]
+    self.assertEqual( [ ( call[0], call[6][0] ) for call in failed ], [ ( 'str2et', 'SpiceException' ) ] )
+
+    report = tracing.replay( self.path, repeat = 2 )
+    self.assertEqual( report['calls'], 2 * count )
+    self.assertEqual( report['changes'], 4 )
+    self.assertEqual( report['mismatches'], 0, report['examples'] )
+    self.assertEqual( report['functions']['spkezr']['calls'], 20 )
+    latency = report['latency']
+    self.assertTrue( 0.0 < latency['p50'] <= latency['p90'] <= latency['p99'] <= latency['max'] )
+    self.assertTrue( report['throughput'] > 0.0 )
+    self.assertTrue( 'spkezr' in tracing.format_report( report ) )
+
+  def test_mismatch(self):
+    ### a trace of a kernel that changes after it, replayed from where it moved
+    traced = os.path.join( self.tmpdir, 'traced' )
+    moved = os.path.join( self.tmpdir, 'moved' )
+    os.mkdir( traced )
+    os.mkdir( moved )
+    shutil.copy( os.path.join( self.kernels, 'pck00009.tpc' ), traced )
+
+    with tracing.trace( self.path, results = 'digest' ):
+      spice.furnsh( os.path.join( traced, 'pck00009.tpc' ) )
+      radii = spice.bodvrd( 'EARTH', 'RADII', 3 )
+
+    with open( os.path.join( traced, 'pck00009.tpc' ) ) as pck:
+      text = pck.read()
+    with open( os.path.join( moved, 'pck00009.tpc' ), 'w' ) as pck:
+      pck.write( text.replace( '6356.75', '6356.76' ) )
+    shutil.rmtree( traced )
+
+    paths = { traced: moved }
+    self.assertEqual( tracing.replay( self.path, paths = paths )['mismatches'], 1 )
+
+    ### the same, keeping the results, within a tolerance
+    os.rename( moved, traced )
+    with tracing.trace( self.path ):
+      spice.furnsh( os.path.join( traced, 'pck00009.tpc' ) )
+      spice.bodvrd( 'EARTH', 'RADII', 3 )
+    os.rename( traced, moved )
+
+    report = tracing.replay( self.path, paths = paths )
+    self.assertEqual( report['mismatches'], 0 )
+
+    with open( os.path.join( moved, 'pck00009.tpc' ), 'w' ) as pck:
+      pck.write( text )
+
+    report = tracing.replay( self.path, paths = paths )
+    self.assertEqual( report['mismatches'], 1 )
+    self.assertEqual( report['examples'][0][:2], ( 1, 'bodvrd' ) )
+    self.assertEqual( tracing.replay( self.path, 1e-5, paths )['mismatches'], 0 )
+
+if __name__ == '__main__':
+  unittest.main()
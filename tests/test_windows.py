@@ -0,0 +1,79 @@
+import spice
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+def pairs(window):
+  ### flatten to a list of (left, right) tuples, with or without NumPy
+  flat = list( numpy.asarray(window).ravel() if numpy is not None else window )
+  return list( zip( flat[0::2], flat[1::2] ) )
+
+### Test window algebra on interval arrays
+class TestWindows(unittest.TestCase):
+
+  def setUp(self):
+    ### the examples in the wnunid, wnintd and wndifd headers
+    self.a = [ ( 1.0, 3.0 ), ( 7.0, 11.0 ), ( 23.0, 27.0 ) ]
+    self.b = [ ( 2.0, 6.0 ), ( 8.0, 10.0 ), ( 16.0, 18.0 ) ]
+
+  def test_set_operations(self):
+    self.assertEqual( pairs( spice.window_union( self.a, self.b ) ),
+                      [ ( 1.0, 6.0 ), ( 7.0, 11.0 ), ( 16.0, 18.0 ), ( 23.0, 27.0 ) ] )
+    self.assertEqual( pairs( spice.window_intersect( self.a, self.b ) ),
+                      [ ( 2.0, 3.0 ), ( 8.0, 10.0 ) ] )
+    self.assertEqual( pairs( spice.window_difference( self.a, self.b ) ),
+                      [ ( 1.0, 2.0 ), ( 7.0, 8.0 ), ( 10.0, 11.0 ), ( 23.0, 27.0 ) ] )
+
+  def test_unsorted_input(self):
+    ### intervals are merged and sorted the way wnvald does
+    self.assertEqual( pairs( spice.window_union( [ ( 5.0, 6.0 ), ( 1.0, 2.0 ), ( 1.5, 3.0 ) ], [] ) ),
+                      [ ( 1.0, 3.0 ), ( 5.0, 6.0 ) ] )
+    self.assertRaises( spice.SpiceException, spice.window_union, [ ( 2.0, 1.0 ) ], [] )
+    self.assertRaises( ValueError, spice.window_union, [ 1.0, 2.0, 3.0 ], [] )
+
+  def test_reductions(self):
+    windows = [ [ ( float(i), i + 0.5 ) ] for i in range(100) ]
+    union = pairs( spice.union_all( windows ) )
+    self.assertEqual( len(union), 100 )
+    self.assertEqual( union[42], ( 42.0, 42.5 ) )
+
+    self.assertEqual( pairs( spice.union_all( [ self.a, self.b ] ) ),
+                      pairs( spice.window_union( self.a, self.b ) ) )
+    self.assertEqual( pairs( spice.intersect_all( [ self.a, self.b, [ ( 0.0, 9.0 ) ] ] ) ),
+                      [ ( 2.0, 3.0 ), ( 8.0, 9.0 ) ] )
+    self.assertEqual( pairs( spice.intersect_all( windows ) ), [] )
+
+  def test_contains(self):
+    flags = spice.window_contains( self.a, [ 0.0, 1.0, 2.0, 5.0, 11.0, 30.0 ] )
+    self.assertEqual( list(flags), [ False, True, True, False, True, False ] )
+
+  def test_adjust(self):
+    self.assertEqual( pairs( spice.window_expand( self.a, 2.0, 1.0 ) ),
+                      [ ( -1.0, 4.0 ), ( 5.0, 12.0 ), ( 21.0, 28.0 ) ] )
+    self.assertEqual( pairs( spice.window_contract( self.a, 1.0, 1.0 ) ),
+                      [ ( 2.0, 2.0 ), ( 8.0, 10.0 ), ( 24.0, 26.0 ) ] )
+    self.assertEqual( pairs( spice.window_filter( self.a, 2.0 ) ),
+                      [ ( 7.0, 11.0 ), ( 23.0, 27.0 ) ] )
+    self.assertEqual( pairs( spice.window_fill( self.a, 4.0 ) ),
+                      [ ( 1.0, 11.0 ), ( 23.0, 27.0 ) ] )
+
+  def test_cells(self):
+    ### cells and interval arrays can be mixed
+    cell = spice.window_cell( self.a, 20 )
+    self.assertEqual( cell.size, 20 )
+    self.assertEqual( cell.card, 6 )
+    spice.wninsd( 30.0, 31.0, cell )
+    self.assertEqual( pairs( spice.window_union( cell, self.b ) )[-1], ( 30.0, 31.0 ) )
+
+  @unittest.skipIf( numpy is None, 'NumPy is not installed' )
+  def test_numpy(self):
+    a = numpy.array( self.a )
+    self.assertEqual( spice.window_union( a, numpy.array( self.b ) ).shape, (4, 2) )
+    self.assertEqual( spice.window_contains( a, numpy.linspace( 0.0, 30.0, 31 ) ).sum(), 3 + 5 + 5 )
+
+
+if __name__=="__main__":
+  unittest.main()